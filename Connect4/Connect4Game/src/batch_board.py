@@ -0,0 +1,193 @@
+import abc
+from typing import Optional, Sequence, Tuple, Union
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from .board import Board, ColumnFullError, ColumnOutOfBoundsError
+
+# what the cells of a BatchBoard hold
+EMPTY = 0
+FIRST_PLAYER = 1
+SECOND_PLAYER = -1
+
+PlayerPieces = Union[int, np.ndarray]
+
+
+class BatchBoard(object):
+    """
+    num_games boards of the same size that are played in lockstep.
+
+    cells is an (num_games, num_rows, num_cols) int8 array holding EMPTY, FIRST_PLAYER or
+    SECOND_PLAYER, with row 0 at the bottom like Board. Because the players are +1 and -1,
+    a window of num_pieces_to_win spots belongs to one player exactly when its sum is
+    +num_pieces_to_win or -num_pieces_to_win, so wins are found with sliding window sums.
+    """
+
+    def __init__(self, num_games: int, num_rows: int, num_cols: int, num_pieces_to_win: int) -> None:
+        if num_games < 1 or num_rows < 1 or num_cols < 1 or num_pieces_to_win < 1:
+            raise ValueError('num_games, num_rows, num_cols and num_pieces_to_win must all be at least 1')
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.num_pieces_to_win = num_pieces_to_win
+        self.cells = np.zeros((num_games, num_rows, num_cols), dtype=np.int8)
+        self.heights = np.zeros((num_games, num_cols), dtype=np.int32)
+        self.num_pieces = np.zeros(num_games, dtype=np.int32)
+
+    @property
+    def num_games(self) -> int:
+        return self.cells.shape[0]
+
+    def is_column_full(self, columns: np.ndarray) -> np.ndarray:
+        """
+        :param columns: a column for every game
+        :return: whether each game's column is full
+        """
+        return self.heights[np.arange(self.num_games), columns] >= self.num_rows
+
+    def legal_moves(self) -> np.ndarray:
+        """
+        :return: a (num_games, num_cols) array of which columns are not full
+        """
+        return self.heights < self.num_rows
+
+    def is_full(self) -> np.ndarray:
+        """
+        :return: whether each board is full
+        """
+        return self.num_pieces >= self.num_rows * self.num_cols
+
+    def add_piece_to_column(self, pieces: PlayerPieces, columns: np.ndarray,
+                            active: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Add a piece to one column of every active game
+        :param pieces: FIRST_PLAYER or SECOND_PLAYER, either one for all games or one per game
+        :param columns: the column to play in for every game
+        :param active: which games to play in, all of them if None
+        :return: the row every piece was added to, -1 for games that were not active
+        :raises: ColumnOutOfBoundsError if an active game's column is out of bounds
+        :raises: ColumnFullError if an active game's column is full, in which case no game is changed
+        """
+        columns = np.asarray(columns)
+        games = np.arange(self.num_games) if active is None else np.flatnonzero(active)
+        game_columns = columns[games]
+        if np.any((game_columns < 0) | (game_columns >= self.num_cols)):
+            raise ColumnOutOfBoundsError(f'Every column needs to be between 0 and {self.num_cols - 1}.')
+        rows = self.heights[games, game_columns]
+        if np.any(rows >= self.num_rows):
+            full_games = games[rows >= self.num_rows]
+            raise ColumnFullError(f'Games {full_games.tolist()} played in a full column.')
+
+        game_pieces = pieces if np.isscalar(pieces) else np.asarray(pieces)[games]
+        self.cells[games, rows, game_columns] = game_pieces
+        self.heights[games, game_columns] += 1
+        self.num_pieces[games] += 1
+
+        all_rows = np.full(self.num_games, -1, dtype=np.int32)
+        all_rows[games] = rows
+        return all_rows
+
+    def winners(self, games: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Look for num_pieces_to_win in a row on every board using sliding window sums
+        :param games: the indices of the games to check, all of them if None
+        :return: FIRST_PLAYER or SECOND_PLAYER for every game one of them has won, EMPTY for the others
+        """
+        cells = self.cells if games is None else self.cells[games]
+        length = self.num_pieces_to_win
+        found = np.zeros(cells.shape[0], dtype=np.int8)
+        for player in (FIRST_PLAYER, SECOND_PLAYER):
+            found[self._has_run(cells, player * length)] = player
+        return found
+
+    def _has_run(self, cells: np.ndarray, target: int) -> np.ndarray:
+        length = self.num_pieces_to_win
+        won = np.zeros(cells.shape[0], dtype=bool)
+        if length <= self.num_cols:  # horizontal
+            sums = sliding_window_view(cells, length, axis=2).sum(axis=-1, dtype=np.int32)
+            won |= (sums == target).any(axis=(1, 2))
+        if length <= self.num_rows:  # vertical
+            sums = sliding_window_view(cells, length, axis=1).sum(axis=-1, dtype=np.int32)
+            won |= (sums == target).any(axis=(1, 2))
+        if length <= min(self.num_rows, self.num_cols):  # both diagonals
+            squares = sliding_window_view(cells, (length, length), axis=(1, 2))
+            sums = np.trace(squares, axis1=-2, axis2=-1, dtype=np.int32)
+            won |= (sums == target).any(axis=(1, 2))
+            sums = np.trace(squares[..., ::-1], axis1=-2, axis2=-1, dtype=np.int32)
+            won |= (sums == target).any(axis=(1, 2))
+        return won
+
+    def is_winning_move(self, rows: np.ndarray, columns: np.ndarray, games: np.ndarray) -> np.ndarray:
+        """
+        Check only the lines through the pieces just added, which is much cheaper than winners
+        once the boards are bigger than num_pieces_to_win
+        :param rows: the row of the piece just added to each game in games
+        :param columns: the column of the piece just added to each game in games
+        :param games: the indices of the games to check
+        :return: whether each of those pieces is part of num_pieces_to_win in a row
+        """
+        cells = self.cells
+        pieces = cells[games, rows, columns]
+        won = np.zeros(len(games), dtype=bool)
+        for row_step, column_step in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            count = np.ones(len(games), dtype=np.int32)
+            for sign in (1, -1):
+                run = np.ones(len(games), dtype=bool)
+                for distance in range(1, self.num_pieces_to_win):
+                    spot_rows = rows + sign * distance * row_step
+                    spot_columns = columns + sign * distance * column_step
+                    run &= (spot_rows >= 0) & (spot_rows < self.num_rows) & \
+                        (spot_columns >= 0) & (spot_columns < self.num_cols)
+                    run &= cells[games, spot_rows.clip(0, self.num_rows - 1),
+                                 spot_columns.clip(0, self.num_cols - 1)] == pieces
+                    count += run
+            won |= count >= self.num_pieces_to_win
+        return won
+
+    def draw(self, game: int, blank_char: str = '*', pieces: str = 'XO') -> str:
+        """
+        :param game: the index of the game to draw
+        :param blank_char: the character for an empty spot
+        :param pieces: the characters for the first and the second player
+        :return: the board of one game drawn the same way as Board
+        """
+        board = Board(self.num_rows, self.num_cols, blank_char)
+        for row, column in zip(*np.nonzero(self.cells[game])):
+            board[row][column] = pieces[0] if self.cells[game, row, column] == FIRST_PLAYER else pieces[1]
+        return repr(board)
+
+
+class BatchPlayer(abc.ABC):
+    """
+    Something that picks a column for many games at once
+    """
+
+    @abc.abstractmethod
+    def get_moves(self, batch_board: BatchBoard, active: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        :param batch_board: the boards to pick moves on
+        :param active: which games need a move, all of them if None
+        :return: a column for every game, only the ones for active games are used
+        """
+        ...
+
+
+def play_batch(batch_board: BatchBoard, players: Sequence[BatchPlayer]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Play every game of batch_board to the end, with players taking turns starting from the first one
+    :param batch_board: the boards to play on, empty or at least without a winner yet
+    :param players: two objects with a get_moves(batch_board, active) method returning a column per game
+    :return: the winner of every game (FIRST_PLAYER, SECOND_PLAYER or EMPTY for a tie) and how many plies it lasted
+    """
+    winners = np.zeros(batch_board.num_games, dtype=np.int8)
+    plies = batch_board.num_pieces.copy()
+    active = ~batch_board.is_full()
+    turn = 0
+    while active.any():
+        piece = FIRST_PLAYER if turn % 2 == 0 else SECOND_PLAYER
+        columns = players[turn % 2].get_moves(batch_board, active)
+        games = np.flatnonzero(active)
+        rows = batch_board.add_piece_to_column(piece, columns, active)[games]
+        plies[games] += 1
+        winners[games[batch_board.is_winning_move(rows, columns[games], games)]] = piece
+        active &= (winners == EMPTY) & ~batch_board.is_full()
+        turn += 1
+    return winners, plies
@@ -0,0 +1,264 @@
+import argparse
+import importlib.util
+import json
+import platform
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from .board import Board
+from .game import BOARD_BACKENDS
+from .players import random_ai, basic_ai
+from . import selfplay
+
+MICRO_SIZES = ((6, 7), (50, 50))
+GAME_SIZES = ((6, 7), (10, 10), (20, 20), (50, 50))
+NUM_PIECES_TO_WIN = 4
+# how many games the numpy benchmarks play in lockstep
+BATCH_GAMES = 4096
+
+
+class Benchmark(NamedTuple):
+    name: str
+    # called once before timing, returns the function to time
+    setup: Callable[[], Callable[[], Any]]
+    # how many operations one call of the timed function does
+    ops_per_call: int = 1
+
+
+class BenchmarkResult(NamedTuple):
+    name: str
+    ops_per_sec: float
+    calls: int
+    seconds: float
+
+
+def measure(func: Callable[[], Any], min_time: float = 0.2, repeat: int = 3) -> Tuple[int, float]:
+    """
+    Time func by calling it in batches that take at least min_time seconds
+    :param func: the function to time
+    :param min_time: the shortest a batch of calls may take
+    :param repeat: how many batches to time once the batch size is found
+    :return: the number of calls in a batch and the fastest time a batch took
+    """
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        calls *= 2 if elapsed <= 0 else max(2, min(10, int(min_time / elapsed) + 1))
+    best = elapsed
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        best = min(best, time.perf_counter() - start)
+    return calls, best
+
+
+def random_position(board: Board, fraction: float, seed: int = 0) -> List[Tuple[int, int]]:
+    """
+    Fill fraction of board with alternating X and O pieces in random columns
+    :param board: the board to fill
+    :param fraction: how much of the board to fill
+    :param seed: the seed for picking columns
+    :return: the row,column of every piece added
+    """
+    rng = random.Random(seed)
+    spots = []
+    for turn in range(int(board.num_rows * board.num_cols * fraction)):
+        column = rng.choice([col for col in range(board.num_cols) if not board.is_column_full(col)])
+        spots.append((board.add_piece_to_column('XO'[turn % 2], column), column))
+    return spots
+
+
+def _fill_board(backend: str, num_rows: int, num_cols: int) -> Callable[[], Callable[[], Any]]:
+    columns = [column for column in range(num_cols) for _ in range(num_rows)]
+
+    def setup() -> Callable[[], Any]:
+        board_type = BOARD_BACKENDS[backend]
+
+        def fill() -> None:
+            board = board_type(num_rows, num_cols, '*')
+            for turn, column in enumerate(columns):
+                board.add_piece_to_column('XO'[turn & 1], column)
+        return fill
+    return setup
+
+
+def _count_max_matches(backend: str, num_rows: int, num_cols: int) -> Callable[[], Callable[[], Any]]:
+    def setup() -> Callable[[], Any]:
+        board = BOARD_BACKENDS[backend](num_rows, num_cols, '*')
+        spots = random_position(board, 0.6)
+
+        def count() -> None:
+            for row, column in spots:
+                board.count_max_matches(row, column)
+        return count
+    return setup
+
+
+def _board_method(backend: str, num_rows: int, num_cols: int, method: Callable[[Board], Any]) \
+        -> Callable[[], Callable[[], Any]]:
+    def setup() -> Callable[[], Any]:
+        board = BOARD_BACKENDS[backend](num_rows, num_cols, '*')
+        random_position(board, 0.6)
+        return lambda: method(board)
+    return setup
+
+
+def _get_move(player_class: type, num_rows: int, num_cols: int) -> Callable[[], Callable[[], Any]]:
+    def setup() -> Callable[[], Any]:
+        board = BOARD_BACKENDS['list'](num_rows, num_cols, '*')
+        board.enable_window_index(NUM_PIECES_TO_WIN)
+        random_position(board, 0.4)
+        player = player_class(f'{player_class.__name__} 1', 'X')
+        player.opponent = player_class(f'{player_class.__name__} 2', 'O', player)
+        return lambda: player.get_move(board, NUM_PIECES_TO_WIN)
+    return setup
+
+
+def _full_games(player_types: Tuple[str, str], backend: str, num_rows: int, num_cols: int) \
+        -> Callable[[], Callable[[], Any]]:
+    def setup() -> Callable[[], Any]:
+        seeds = iter(range(sys.maxsize))
+        return lambda: selfplay.play_game(selfplay.GameSpec(
+            game=0, seed=next(seeds), player_types=player_types, num_rows=num_rows, num_cols=num_cols,
+            num_pieces_to_win=NUM_PIECES_TO_WIN, board_backend=backend))
+    return setup
+
+
+def _batch_games(num_games: int, num_rows: int, num_cols: int) -> Callable[[], Callable[[], Any]]:
+    def setup() -> Callable[[], Any]:
+        from .batch_board import BatchBoard, play_batch
+        from .players.batch_random_ai import BatchRandomAi
+        players = [BatchRandomAi(1), BatchRandomAi(2)]
+        return lambda: play_batch(BatchBoard(num_games, num_rows, num_cols, NUM_PIECES_TO_WIN), players)
+    return setup
+
+
+def default_benchmarks() -> List[Benchmark]:
+    """
+    :return: every benchmark in the suite
+    """
+    benchmarks = []
+    for backend in ('list', 'bitboard'):
+        for num_rows, num_cols in MICRO_SIZES:
+            size = f'{backend}/{num_rows}x{num_cols}'
+            benchmarks += [
+                Benchmark(f'board.add_piece_to_column[{size}]', _fill_board(backend, num_rows, num_cols),
+                          num_rows * num_cols),
+                Benchmark(f'board.count_max_matches[{size}]', _count_max_matches(backend, num_rows, num_cols),
+                          int(num_rows * num_cols * 0.6)),
+                Benchmark(f'board.is_full[{size}]',
+                          _board_method(backend, num_rows, num_cols, lambda board: board.is_full)),
+                Benchmark(f'board.__repr__[{size}]', _board_method(backend, num_rows, num_cols, repr)),
+            ]
+    for num_rows, num_cols in MICRO_SIZES:
+        size = f'{num_rows}x{num_cols}'
+        benchmarks += [
+            Benchmark(f'RandomAi.get_move[{size}]', _get_move(random_ai.RandomAi, num_rows, num_cols)),
+            Benchmark(f'BasicAi.get_move[{size}]', _get_move(basic_ai.BasicAi, num_rows, num_cols)),
+        ]
+    for backend in ('list', 'bitboard'):
+        for num_rows, num_cols in GAME_SIZES:
+            size = f'{backend}/{num_rows}x{num_cols}'
+            for player_types in (('random', 'random'), ('basic', 'basic')):
+                benchmarks.append(Benchmark(f'games.{player_types[0]}_vs_{player_types[1]}[{size}]',
+                                            _full_games(player_types, backend, num_rows, num_cols)))
+    if importlib.util.find_spec('numpy') is not None:
+        for num_rows, num_cols in GAME_SIZES:
+            benchmarks.append(Benchmark(f'games.batch_random_vs_random[numpy/{num_rows}x{num_cols}]',
+                                        _batch_games(BATCH_GAMES, num_rows, num_cols), BATCH_GAMES))
+    return benchmarks
+
+
+def run_benchmarks(benchmarks: Sequence[Benchmark], min_time: float = 0.2, repeat: int = 3,
+                   on_result: Optional[Callable[[BenchmarkResult], None]] = None) -> Dict[str, BenchmarkResult]:
+    """
+    :param benchmarks: the benchmarks to run
+    :param min_time: the shortest a timed batch of calls may take
+    :param repeat: how many batches to time, the fastest one counts
+    :param on_result: called with every result as soon as it is ready
+    :return: the result of every benchmark by name
+    """
+    results = {}
+    for benchmark in benchmarks:
+        calls, seconds = measure(benchmark.setup(), min_time, repeat)
+        result = BenchmarkResult(benchmark.name, calls * benchmark.ops_per_call / seconds, calls, seconds)
+        results[benchmark.name] = result
+        if on_result is not None:
+            on_result(result)
+    return results
+
+
+def to_baseline(results: Dict[str, BenchmarkResult]) -> Dict[str, Any]:
+    """
+    :param results: the results of run_benchmarks
+    :return: the results and the machine they were measured on, ready to be saved as JSON
+    """
+    return {
+        'machine': {'python': platform.python_version(), 'implementation': platform.python_implementation(),
+                    'platform': platform.platform(), 'processor': platform.processor()},
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': {name: {'ops_per_sec': result.ops_per_sec} for name, result in results.items()},
+    }
+
+
+def find_regressions(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float = 0.1) \
+        -> List[Tuple[str, float, float, float]]:
+    """
+    :param baseline: a previous run, in the to_baseline format
+    :param current: this run, in the to_baseline format
+    :param threshold: how much slower a benchmark may get before it counts, 0.1 is 10%
+    :return: the name, old ops/sec, new ops/sec and slowdown of every benchmark that got slower than threshold
+    """
+    regressions = []
+    for name, result in current['results'].items():
+        old = baseline['results'].get(name)
+        if old is None:
+            continue
+        slowdown = old['ops_per_sec'] / result['ops_per_sec'] - 1
+        if slowdown > threshold:
+            regressions.append((name, old['ops_per_sec'], result['ops_per_sec'], slowdown))
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Run the benchmark suite, save it as a baseline and compare it to an older one
+    :return: 1 if anything regressed, 0 otherwise
+    """
+    parser = argparse.ArgumentParser(description='Measure how fast the board, the players and whole games are.')
+    parser.add_argument('--output', help='file to save the results to as a JSON baseline')
+    parser.add_argument('--compare', help='a baseline from an earlier run to check for regressions against')
+    parser.add_argument('--threshold', type=float, default=0.1, help='slowdown that counts as a regression')
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds to time each batch of calls for')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--filter', default='', help='only run benchmarks with this in their name')
+    args = parser.parse_args(argv)
+
+    benchmarks = [benchmark for benchmark in default_benchmarks() if args.filter in benchmark.name]
+    results = run_benchmarks(benchmarks, args.min_time, args.repeat,
+                             lambda result: print(f'{result.name:<48} {result.ops_per_sec:>14,.1f} ops/sec'))
+    current = to_baseline(results)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(current, output, indent=2)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = find_regressions(json.load(baseline_file), current, args.threshold)
+        for name, old, new, slowdown in regressions:
+            print(f'REGRESSION {name}: {old:,.1f} -> {new:,.1f} ops/sec ({slowdown:.0%} slower)')
+        if regressions:
+            return 1
+        print(f'No regressions over {args.threshold:.0%}.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
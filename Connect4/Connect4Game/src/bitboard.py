@@ -0,0 +1,268 @@
+from typing import Dict, List, Iterator, Tuple
+from .board import Board, EmptySpotError
+
+
+class BitBoard(Board):
+    """
+    A Board that keeps one integer bitmask per piece instead of a grid of characters.
+
+    The cells of the board are laid out column by column, each column using
+    num_rows + 1 bits. The extra bit on top of every column is always 0 so that
+    shifting a mask never lets a run of pieces wrap from one column into the next.
+
+        bit index of row,col = col * (num_rows + 1) + row
+
+    Rows returned from __getitem__ and __iter__ are snapshots built from the masks,
+    so writing into them does not change the board.
+    """
+
+    def __init__(self, num_rows: int, num_cols: int, blank_char: str) -> None:
+        if num_rows < 1 or num_cols < 1:
+            raise ValueError(f'A board needs at least 1 row and 1 column but got {num_rows}x{num_cols}')
+        self.blank_char = blank_char
+        self._num_rows = num_rows
+        self._num_cols = num_cols
+        self._column_height = num_rows + 1  # + 1 for the empty sentinel bit on top of every column
+        self._masks: Dict[str, int] = {}
+        self._occupied = 0
+        self._full_mask = self.bottom_mask(num_rows, num_cols) * ((1 << num_rows) - 1)
+        self._init_bookkeeping(num_cols)
+        # how far a mask has to be shifted to move one step in each direction
+        # vertical, horizontal, left diagonal (row + 1, col + 1), right diagonal (row - 1, col + 1)
+        self._direction_shifts = (1, self._column_height, self._column_height + 1, self._column_height - 1)
+
+    @staticmethod
+    def bottom_mask(num_rows: int, num_cols: int) -> int:
+        """
+        :param num_rows: the number of rows in the board
+        :param num_cols: the number of columns in the board
+        :return: a mask with the bottom bit of every column set
+        """
+        column_height = num_rows + 1
+        return sum(1 << (col * column_height) for col in range(num_cols))
+
+    @staticmethod
+    def has_run(mask: int, shift: int, length: int) -> bool:
+        """
+        Check if mask has length bits in a row, each one shift bits away from the last
+        :param mask: the mask to check
+        :param shift: the distance between consecutive bits of the run
+        :param length: how many bits in a row to look for
+        :return: whether mask contains such a run
+        """
+        run = mask
+        run_length = 1
+        while run_length < length and run:
+            step = min(run_length, length - run_length)
+            # a bit survives if it starts a run of run_length and so does the bit step positions later
+            run &= run >> (step * shift)
+            run_length += step
+        return run != 0
+
+    @staticmethod
+    def winning_spots(pieces: int, empty: int, shifts: Tuple[int, ...], length: int) -> int:
+        """
+        Find every empty spot that would give pieces length bits in a row, playable or not
+        :param pieces: the mask to complete runs of
+        :param empty: the mask of the empty spots on the board
+        :param shifts: the distance between consecutive bits of a run in every direction
+        :param length: how many bits in a row make a run
+        :return: the mask of the spots
+        """
+        spots = 0
+        for shift in shifts:
+            # before[i] has the spots with i pieces in a row right before them, after[i] right after them
+            before = [empty]
+            after = [empty]
+            for distance in range(1, length):
+                before.append(before[-1] & (pieces << (distance * shift)))
+                after.append(after[-1] & (pieces >> (distance * shift)))
+            for num_before in range(length):
+                spots |= before[num_before] & after[length - 1 - num_before]
+        return spots & empty
+
+    @property
+    def num_rows(self) -> int:
+        """
+        :return: the number of rows in the board
+        """
+        return self._num_rows
+
+    @property
+    def num_cols(self) -> int:
+        """
+        :return: the number of columns in the board
+        """
+        return self._num_cols
+
+    @property
+    def contents(self) -> List[List[str]]:
+        """
+        :return: a list of lists snapshot of the board, with row 0 at the bottom
+        """
+        rows = [[self.blank_char] * self.num_cols for _ in range(self.num_rows)]
+        for piece, mask in self._masks.items():
+            bits = bin(mask)[:1:-1]  # lowest bit first, without the 0b prefix
+            index = bits.find('1')
+            while index != -1:
+                column, row = divmod(index, self._column_height)
+                rows[row][column] = piece
+                index = bits.find('1', index + 1)
+        return rows
+
+    @property
+    def is_full(self) -> bool:
+        """
+        :return: whether the board is full or not
+        """
+        return self._occupied == self._full_mask
+
+    def mask_for(self, piece: str) -> int:
+        """
+        :param piece: the piece to get the mask of
+        :return: the mask of every spot holding piece
+        """
+        return self._masks.get(piece, 0)
+
+    def _bit_index(self, row: int, column: int) -> int:
+        return column * self._column_height + row
+
+    def contains_blank_character(self, row: int, column: int) -> bool:
+        """
+        Checks whether row,col contains a blank character
+        :param row:  row to check
+        :param column: column to check
+        :return: whether row,col contains a blank character or not
+        """
+        return not (self._occupied >> self._bit_index(row, column)) & 1
+
+    def _place_piece(self, row: int, column: int, piece: str) -> None:
+        bit = 1 << self._bit_index(row, column)
+        self._clear_piece(row, column)
+        self._masks[piece] = self._masks.get(piece, 0) | bit
+        self._occupied |= bit
+
+    def _clear_piece(self, row: int, column: int) -> None:
+        bit = 1 << self._bit_index(row, column)
+        if self._occupied & bit:
+            for piece, mask in self._masks.items():
+                if mask & bit:
+                    self._masks[piece] = mask ^ bit
+                    break
+            self._occupied ^= bit
+
+    def get_piece_at(self, row: int, column: int) -> str:
+        """
+        Get the piece at row,col
+        :param row: row index
+        :param column:  column index
+        :return: the piece at row, col
+        """
+        if not (0 <= row < self.num_rows and 0 <= column < self.num_cols):
+            raise IndexError(f'{row},{column} is not on the board')
+        bit = 1 << self._bit_index(row, column)
+        if self._occupied & bit:
+            for piece, mask in self._masks.items():
+                if mask & bit:
+                    return piece
+        return self.blank_char
+
+    def has_won(self, piece: str, num_pieces_to_win: int) -> bool:
+        """
+        Check the whole board for num_pieces_to_win of piece in a row using shift-and-mask
+        :param piece: the piece to check
+        :param num_pieces_to_win: how many pieces in a row count as a win
+        :return: whether piece has num_pieces_to_win in a row anywhere on the board
+        """
+        mask = self.mask_for(piece)
+        return any(self.has_run(mask, shift, num_pieces_to_win) for shift in self._direction_shifts)
+
+    def count_max_matches(self, row: int, col: int) -> int:
+        """
+        The maximum number of uninterrupted matches going either horizontally, vertically,
+        or diagonally from row,col
+        :param: row: the row to check
+        :param: col: the column to check
+        :return: The maximum number of uninterrupted matches going either horizontally, vertically,
+        or diagonally from row,col
+        """
+        start, mask = self._mask_through(row, col)
+        most_in_a_row = 1
+        for shift in self._direction_shifts:
+            pieces_in_a_row = self._count_run(mask, start, shift)
+            if pieces_in_a_row > most_in_a_row:
+                most_in_a_row = pieces_in_a_row
+        return most_in_a_row
+
+    def _mask_through(self, row: int, column: int) -> Tuple[int, int]:
+        """
+        :param row: the row of the spot
+        :param column: the column of the spot
+        :return: the bit index of row,col and the mask of the piece sitting there
+        :raises: EmptySpotError if row,col is blank
+        """
+        start = column * self._column_height + row
+        for mask in self._masks.values():
+            if (mask >> start) & 1:
+                return start, mask
+        raise EmptySpotError(f'There is no piece at {row},{column}')
+
+    @staticmethod
+    def _count_run(mask: int, start: int, shift: int) -> int:
+        """
+        Count the bits of mask in a row through start going both forward and backwards by shift
+        :param mask: the mask of the piece at start
+        :param start: the bit index to count from
+        :param shift: the distance between consecutive bits of the run
+        :return: the length of the run through start
+        """
+        pieces_in_a_row = 1  # the piece itself
+        # the sentinel bits stop runs at the top and bottom of columns, bits past the
+        # last column are always 0 and negative bit indices mean we walked off the left side
+        for step in (shift, -shift):
+            index = start + step
+            while index >= 0 and (mask >> index) & 1:
+                pieces_in_a_row += 1
+                index += step
+        return pieces_in_a_row
+
+    def _count_matches_forwards_and_backwards(self, row_start: int, column_start: int,
+                                              row_step: int, column_step: int) -> int:
+        """
+        Count the number of pieces matching the piece at row_start, column_start
+        Going both forward (row_step, column_step) and backwards (-row_step, -column_step)
+        :param row_start: the row of the spot to check
+        :param column_start: the column of the spot to check
+        :param row_step: how much to advance the row by in each iteration of the search
+        :param column_step: how much to advance the column by in each iteration of the search
+        :return: the number of pieces in a row through row_start, column_start
+        """
+        if row_step == 0 and column_step == 0:
+            raise ValueError('row_step and col_step cannot both be 0')
+        start, mask = self._mask_through(row_start, column_start)
+        return self._count_run(mask, start, row_step + column_step * self._column_height)
+
+    def __iter__(self) -> Iterator[List[str]]:
+        """
+        Iterate through the rows
+        :return:
+        """
+        for row in range(self.num_rows):
+            yield self[row]
+
+    def __getitem__(self, index: int) -> List[str]:
+        """
+        Get a snapshot of the index row of the board
+        :param index: the index of the row to get
+        :return: the indexth row of the board
+        """
+        row = range(self.num_rows)[index]
+        return [self.get_piece_at(row, column) for column in range(self.num_cols)]
+
+    def column_iterate(self) -> Iterator[Tuple[str, ...]]:
+        """
+        Allow iteration through the columns
+        :return:
+        """
+        for column in range(self.num_cols):
+            yield tuple(self.get_piece_at(row, column) for row in range(self.num_rows))
@@ -1,5 +1,27 @@
+import copy
+import functools
 import itertools
-from typing import List, Iterator
+from typing import Dict, List, Iterator, Optional, Tuple
+from .window_index import WindowIndex
+
+_HASH_BITS = (1 << 64) - 1
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def zobrist_key(slot: int, row: int, column: int) -> int:
+    """
+    The random 64 bit number for the slot-th player having a piece at row,column.
+    Keys are made with splitmix64 instead of a table of random numbers, so they are the
+    same in every process and do not need any memory for boards that are never played on
+    :param slot: the order the player first put a piece on the board in, starting from 0
+    :param row: the row of the spot
+    :param column: the column of the spot
+    :return: the key to xor into the hash of a board
+    """
+    value = (((row << 32) | (column << 8) | slot) + 0x9E3779B97F4A7C15) & _HASH_BITS
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & _HASH_BITS
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & _HASH_BITS
+    return value ^ (value >> 31)
 
 
 class BoardError(Exception):
@@ -18,12 +40,30 @@ class EmptySpotError(BoardError):
     pass
 
 
+class NoMoveToUndoError(BoardError):
+    pass
+
+
 class Board(object):
 
     def __init__(self, num_rows: int, num_cols: int, blank_char: str) -> None:
         self.contents = [[blank_char for col in range(num_cols)] for row in range(num_rows)]
         self.blank_char = blank_char
-        self._number_of_pieces_in_columns = [0] * self.num_cols
+        self._init_bookkeeping(num_cols)
+
+    def _init_bookkeeping(self, num_cols: int) -> None:
+        """
+        Set up everything the board tracks besides where the pieces are
+        :param num_cols: the number of columns in the board
+        :return: None
+        """
+        self._number_of_pieces_in_columns = [0] * num_cols
+        self._num_pieces = 0
+        self._history: List[int] = []
+        self.window_index: Optional[WindowIndex] = None
+        self._piece_slots: Dict[str, int] = {}
+        self._zobrist_hash = 0
+        self._mirrored_zobrist_hash = 0
 
     @property
     def num_rows(self) -> int:
@@ -39,6 +79,65 @@ class Board(object):
         """
         return len(self.contents[0])
 
+    @property
+    def num_pieces(self) -> int:
+        """
+        :return: the number of pieces that have been added to the board and not removed
+        """
+        return self._num_pieces
+
+    @property
+    def history(self) -> Tuple[int, ...]:
+        """
+        :return: the columns played with push_move that have not been popped yet, oldest first
+        """
+        return tuple(self._history)
+
+    def copy(self) -> "Board":
+        """
+        :return: a board with the same pieces, history, hashes and window index, which can be changed
+        without changing this one
+        """
+        return copy.deepcopy(self)
+
+    @property
+    def zobrist_hash(self) -> int:
+        """
+        :return: a 64 bit hash of where every piece is, kept up to date on every move
+        """
+        return self._zobrist_hash
+
+    @property
+    def mirrored_zobrist_hash(self) -> int:
+        """
+        :return: the zobrist hash the board would have if it was flipped left to right
+        """
+        return self._mirrored_zobrist_hash
+
+    def canonical_hash(self) -> Tuple[int, bool]:
+        """
+        A hash that is the same for a position and its left to right mirror image
+        :return: the smaller of zobrist_hash and mirrored_zobrist_hash,
+        and whether it was the mirrored one (so columns stored with it need flipping)
+        """
+        if self._mirrored_zobrist_hash < self._zobrist_hash:
+            return self._mirrored_zobrist_hash, True
+        return self._zobrist_hash, False
+
+    def _update_hashes(self, piece: str, row: int, column: int) -> None:
+        """
+        Add piece at row,column to the hashes, or take it out if it is already in them
+        :param piece: the piece
+        :param row: the row of the piece
+        :param column: the column of the piece
+        :return: None
+        """
+        slot = self._piece_slots.get(piece)
+        if slot is None:
+            slot = self._piece_slots[piece] = len(self._piece_slots)
+        self._zobrist_hash ^= zobrist_key(slot, row, column)
+        self._mirrored_zobrist_hash ^= zobrist_key(slot, row, self.num_cols - 1 - column)
+
     @property
     def is_full(self) -> bool:
         """
@@ -71,8 +170,31 @@ class Board(object):
         """
         return self.contents[row][column] == self.blank_char
 
+    def enable_window_index(self, num_pieces_to_win: int) -> Optional[WindowIndex]:
+        """
+        Start keeping a WindowIndex of every num_pieces_to_win long window on the board.
+        The index is updated on every add_piece_to_column and remove_piece_from_position.
+        Backends that cannot afford an index return None and leave window_index as None
+        :param num_pieces_to_win: how long the windows are
+        :return: the index, which is also available as window_index
+        """
+        if self.window_index is None or self.window_index.num_pieces_to_win != num_pieces_to_win:
+            index = WindowIndex(self.num_rows, self.num_cols, num_pieces_to_win)
+            for row in range(self.num_rows):
+                for column in range(self.num_cols):
+                    if not self.contains_blank_character(row, column):
+                        index.piece_added(self.get_piece_at(row, column), row, column)
+            self.window_index = index
+        return self.window_index
+
     def remove_piece_from_position(self, row: int, column: int) -> None:
-        self.contents[row][column] = self.blank_char
+        piece = self.get_piece_at(row, column)
+        if piece != self.blank_char:
+            self._num_pieces -= 1
+            self._update_hashes(piece, row, column)
+            if self.window_index is not None:
+                self.window_index.piece_removed(piece, row, column)
+        self._clear_piece(row, column)
         self._number_of_pieces_in_columns[column] -= 1
 
     def add_piece_to_column(self, piece: str, column: int) -> int:
@@ -94,10 +216,59 @@ class Board(object):
             raise ColumnFullError(f'You cannot play in {column} because it is full.')
         else:
             row = self._number_of_pieces_in_columns[column]
-            self.contents[row][column] = piece
+            self._place_piece(row, column, piece)
             self._number_of_pieces_in_columns[column] += 1
+            self._num_pieces += 1
+            self._update_hashes(piece, row, column)
+            if self.window_index is not None:
+                self.window_index.piece_added(piece, row, column)
             return row
 
+    def push_move(self, column: int, piece: str) -> int:
+        """
+        Add piece to column and remember the move so it can be undone with pop_move
+        :param column: the column to add the piece to
+        :param piece: the piece to add
+        :return: the row the piece was added to
+        :raises: the same errors as add_piece_to_column, in which case nothing is remembered
+        """
+        row = self.add_piece_to_column(piece, column)
+        self._history.append(column)
+        return row
+
+    def pop_move(self) -> Tuple[int, int]:
+        """
+        Undo the last move made with push_move
+        :return: the row and column the piece was removed from
+        :raises: NoMoveToUndoError if there are no moves to undo
+        """
+        if not self._history:
+            raise NoMoveToUndoError('There are no moves to undo.')
+        column = self._history.pop()
+        row = self._number_of_pieces_in_columns[column] - 1
+        self.remove_piece_from_position(row, column)
+        return row, column
+
+    def _place_piece(self, row: int, column: int, piece: str) -> None:
+        """
+        Store piece at row,col. Backends override this to change how pieces are stored
+        :param row: the row to store the piece in
+        :param column: the column to store the piece in
+        :param piece: the piece to store
+        :return: None
+        """
+        self.contents[row][column] = piece
+
+    def _clear_piece(self, row: int, column: int) -> None:
+        """
+        Replace whatever is at row,col with the blank character.
+        Backends override this to change how pieces are stored
+        :param row: the row to clear
+        :param column: the column to clear
+        :return: None
+        """
+        self.contents[row][column] = self.blank_char
+
     def get_piece_at(self, row: int, column: int) -> str:
         """
         Get the piece at row,col
@@ -0,0 +1,244 @@
+import asyncio
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Union
+from .events import Event, GameObserver, GameSnapshot, GameStarted, GameTied, GameWon, MoveMade
+
+# what a full subscriber queue does with a new event:
+# DROP throws the oldest queued event away, so the subscriber misses it but keeps up with the game,
+# COALESCE replaces everything queued with one GameSnapshot of the game so far, so nothing is lost
+DROP = 'drop'
+COALESCE = 'coalesce'
+BACKPRESSURE_POLICIES = (DROP, COALESCE)
+
+
+class Subscription(object):
+    """
+    The events of one Broadcaster waiting for one subscriber, read with get or async for.
+    At most max_queued events wait at a time, whatever policy says happens to the rest
+    """
+
+    def __init__(self, broadcaster: "Broadcaster", max_queued: int, policy: str) -> None:
+        """
+        :param broadcaster: where the events come from
+        :param max_queued: the most events that can wait to be read
+        :param policy: DROP or COALESCE
+        :raises: ValueError if max_queued is not positive or policy is not one of BACKPRESSURE_POLICIES
+        """
+        if max_queued < 1:
+            raise ValueError(f'max_queued must be at least 1 but is {max_queued}')
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f'policy must be one of {", ".join(BACKPRESSURE_POLICIES)} but is {policy}')
+        self.broadcaster = broadcaster
+        self.max_queued = max_queued
+        self.policy = policy
+        self.delivered = 0  # events read by the subscriber
+        self.dropped = 0  # events thrown away by DROP
+        self.coalesced = 0  # events folded into a snapshot by COALESCE
+        self.closed = False
+        self._queue: Deque[Event] = deque()
+        self._waiter: Optional[asyncio.Future] = None
+
+    @property
+    def num_queued(self) -> int:
+        """
+        :return: how many events are waiting to be read
+        """
+        return len(self._queue)
+
+    def offer(self, event: Event, snapshot: Callable[[], GameSnapshot]) -> None:
+        """
+        Queue event without ever waiting for the subscriber
+        :param event: the event to queue
+        :param snapshot: makes the snapshot COALESCE puts in place of a full queue, which must include event
+        :return: None
+        """
+        if self.closed:
+            return
+        if len(self._queue) < self.max_queued:
+            self._queue.append(event)
+        elif self.policy == DROP:
+            self._queue.popleft()
+            self._queue.append(event)
+            self.dropped += 1
+        else:
+            self.coalesced += len(self._queue) + 1
+            self._queue.clear()
+            self._queue.append(snapshot())
+        self._wake()
+
+    def close(self) -> None:
+        """
+        End the subscription. Events already queued can still be read
+        :return: None
+        """
+        self.closed = True
+        self._wake()
+
+    def unsubscribe(self) -> None:
+        """
+        Stop getting events from the broadcaster and end the subscription
+        :return: None
+        """
+        self.broadcaster.unsubscribe(self)
+
+    async def get(self) -> Optional[Event]:
+        """
+        Wait for the next event
+        :return: the oldest queued event, or None once the subscription is closed and every event has been read
+        """
+        while not self._queue:
+            if self.closed:
+                return None
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        self.delivered += 1
+        return self._queue.popleft()
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> Event:
+        event = await self.get()
+        if event is None:
+            raise StopAsyncIteration
+        return event
+
+    def _wake(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+
+class Broadcaster(GameObserver):
+    """
+    Fans the events of one game out to any number of subscribers in an event loop.
+
+    Publishing only appends to each subscriber's bounded queue, so however slow a subscriber is,
+    the game never waits for it: its queue drops or coalesces events instead, see BACKPRESSURE_POLICIES.
+    The game may run in another thread, notify hands its events over to the broadcaster's loop.
+    """
+
+    def __init__(self, max_queued: int = 64, policy: str = COALESCE,
+                 loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """
+        :param max_queued: the default queue size of a subscription
+        :param policy: the default policy of a subscription, one of BACKPRESSURE_POLICIES
+        :param loop: the loop the subscribers read in, the running loop at the first subscribe if None
+        :raises: ValueError if policy is not one of BACKPRESSURE_POLICIES
+        """
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f'policy must be one of {", ".join(BACKPRESSURE_POLICIES)} but is {policy}')
+        self.max_queued = max_queued
+        self.policy = policy
+        self.events_published = 0
+        self.closed = False
+        self._loop = loop
+        # a dict so subscribers are told in the order they subscribed and can leave in constant time
+        self._subscriptions: Dict[Subscription, None] = {}
+        self._started: Optional[GameStarted] = None
+        self._moves: List[MoveMade] = []
+        self._result: Optional[Union[GameWon, GameTied]] = None
+        self._snapshot: Optional[GameSnapshot] = None
+
+    @property
+    def num_subscribers(self) -> int:
+        return len(self._subscriptions)
+
+    def subscribe(self, max_queued: Optional[int] = None, policy: Optional[str] = None,
+                  catch_up: bool = True) -> Subscription:
+        """
+        Start queueing events for a new subscriber. Subscribing to a closed broadcaster gives a closed subscription
+        :param max_queued: the most events that can wait to be read, the broadcaster's default if None
+        :param policy: what happens to events that do not fit, the broadcaster's default if None
+        :param catch_up: whether the first event is a snapshot of what has happened so far, when anything has
+        :return: the new subscription
+        :raises: ValueError if max_queued is not positive or policy is not one of BACKPRESSURE_POLICIES
+        """
+        if self._loop is None:
+            try:
+                self._loop = asyncio.get_running_loop()
+            except RuntimeError:
+                pass
+        subscription = Subscription(self, max_queued if max_queued is not None else self.max_queued,
+                                    policy if policy is not None else self.policy)
+        if catch_up and self._started is not None:
+            subscription.offer(self.snapshot(), self.snapshot)
+        if self.closed:
+            subscription.close()
+        else:
+            self._subscriptions[subscription] = None
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        :param subscription: a subscription to this broadcaster, which is closed.
+        Unsubscribing more than once does nothing
+        :return: None
+        """
+        self._subscriptions.pop(subscription, None)
+        subscription.close()
+
+    def snapshot(self) -> GameSnapshot:
+        """
+        :return: everything published so far
+        """
+        if self._snapshot is None:
+            self._snapshot = GameSnapshot(self._started, tuple(self._moves), self._result)
+        return self._snapshot
+
+    def notify(self, event: Event) -> None:
+        """
+        Publish event from whichever thread the game runs in
+        :param event: what happened in the game
+        :return: None
+        """
+        self._call_in_loop(self.publish, event)
+
+    def publish(self, event: Event) -> None:
+        """
+        Queue event for every subscriber. Must be called in the broadcaster's loop, see notify
+        :param event: the event to queue
+        :return: None
+        """
+        if self.closed:
+            return
+        if isinstance(event, GameStarted):
+            self._started, self._moves, self._result = event, [], None
+        elif isinstance(event, MoveMade):
+            self._moves.append(event)
+        elif isinstance(event, (GameWon, GameTied)):
+            self._result = event
+        elif isinstance(event, GameSnapshot):
+            self._started, self._moves, self._result = event.started, list(event.moves), event.result
+        self._snapshot = None
+        self.events_published += 1
+        for subscription in self._subscriptions:
+            subscription.offer(event, self.snapshot)
+
+    def close(self) -> None:
+        """
+        Close every subscription once the events published before now have been queued
+        :return: None
+        """
+        self._call_in_loop(self._close)
+
+    def _close(self) -> None:
+        self.closed = True
+        subscriptions, self._subscriptions = self._subscriptions, {}
+        for subscription in subscriptions:
+            subscription.close()
+
+    def _call_in_loop(self, function: Callable[..., None], *args: Event) -> None:
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if self._loop is None or running is self._loop:
+            function(*args)
+            return
+        try:
+            self._loop.call_soon_threadsafe(function, *args)
+        except RuntimeError:
+            pass  # the loop is closed, so nobody is listening any more
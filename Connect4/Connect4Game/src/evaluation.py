@@ -0,0 +1,258 @@
+import abc
+import functools
+import json
+import os
+from typing import Callable, Dict, Mapping, NamedTuple, Optional, Tuple, Union
+from .bitboard import BitBoard
+from .board import Board
+
+# the environment variable naming a weights file AI players load when they are not given weights
+WEIGHTS_ENVIRONMENT_VARIABLE = 'CONNECT4_WEIGHTS'
+# open_1 ... open_N features exist for windows of up to this many pieces
+MAX_OPEN_WINDOW_FEATURE = 7
+
+
+class WeightsFileError(Exception):
+    pass
+
+
+class _Geometry(NamedTuple):
+    full: int  # every spot on the board
+    shifts: Tuple[int, ...]
+    center: int  # every spot in the middle column, or the middle two columns
+    first_player_rows: int  # rows 1, 3, 5, ... counting from 1 at the bottom
+    second_player_rows: int  # rows 2, 4, 6, ...
+
+
+@functools.lru_cache(maxsize=None)
+def _geometry(num_rows: int, num_cols: int) -> _Geometry:
+    column_height = num_rows + 1
+    bottom = BitBoard.bottom_mask(num_rows, num_cols)
+    column = (1 << num_rows) - 1
+    center = sum(column << (col * column_height) for col in {(num_cols - 1) // 2, num_cols // 2})
+    first_player_rows = sum(bottom << row for row in range(0, num_rows, 2))
+    return _Geometry(full=bottom * column, shifts=(1, column_height, column_height + 1, column_height - 1),
+                     center=center, first_player_rows=first_player_rows,
+                     second_player_rows=bottom * column ^ first_player_rows)
+
+
+class Position(object):
+    """
+    A board seen from the side to move, handed to every feature. Masks in the BitBoard layout are
+    worked out the first time a feature asks for them, so features that do not need them cost nothing
+    """
+
+    def __init__(self, the_board: Board, piece: str, other_piece: str, num_pieces_to_win: int) -> None:
+        self.board = the_board
+        self.piece = piece
+        self.other_piece = other_piece
+        self.num_pieces_to_win = num_pieces_to_win
+        self._masks: Optional[Tuple[int, int]] = None
+        self._threats: Optional[Tuple[int, int]] = None
+
+    @property
+    def geometry(self) -> _Geometry:
+        return _geometry(self.board.num_rows, self.board.num_cols)
+
+    @property
+    def masks(self) -> Tuple[int, int]:
+        """
+        :return: the mask of the pieces of the side to move and the mask of the other side's pieces
+        """
+        if self._masks is None:
+            if isinstance(self.board, BitBoard):
+                self._masks = (self.board.mask_for(self.piece), self.board.mask_for(self.other_piece))
+            else:
+                masks = {self.piece: 0, self.other_piece: 0}
+                column_height = self.board.num_rows + 1
+                for row_index, row in enumerate(self.board):
+                    for col_index, spot in enumerate(row):
+                        if spot in masks:
+                            masks[spot] |= 1 << (col_index * column_height + row_index)
+                self._masks = (masks[self.piece], masks[self.other_piece])
+        return self._masks
+
+    @property
+    def threats(self) -> Tuple[int, int]:
+        """
+        :return: the empty spots that would win the game for the side to move and for the other side
+        """
+        if self._threats is None:
+            mine, theirs = self.masks
+            geometry = self.geometry
+            empty = geometry.full & ~(mine | theirs)
+            self._threats = (BitBoard.winning_spots(mine, empty, geometry.shifts, self.num_pieces_to_win),
+                             BitBoard.winning_spots(theirs, empty, geometry.shifts, self.num_pieces_to_win))
+        return self._threats
+
+    @property
+    def moves_first(self) -> bool:
+        """
+        :return: whether the side to move is the player who made the first move of the game
+        """
+        return self.board.num_pieces % 2 == 0
+
+
+def _count(mask: int) -> int:
+    return bin(mask).count('1')
+
+
+def open_windows(num_pieces: int, position: Position) -> float:
+    """
+    :return: how many more windows with num_pieces pieces and no other pieces in them the side to move has.
+    Needs the board's window index, without it the feature is 0
+    """
+    window_index = position.board.window_index
+    if window_index is None or window_index.num_pieces_to_win != position.num_pieces_to_win or \
+            num_pieces >= position.num_pieces_to_win:
+        return 0
+    return window_index.open_windows(position.piece, num_pieces) - \
+        window_index.open_windows(position.other_piece, num_pieces)
+
+
+def center_control(position: Position) -> float:
+    """
+    :return: how many more pieces the side to move has in the middle column (or middle two columns)
+    """
+    mine, theirs = position.masks
+    center = position.geometry.center
+    return _count(mine & center) - _count(theirs & center)
+
+
+def threats(position: Position) -> float:
+    """
+    :return: how many more empty spots would win the game for the side to move than for the other side
+    """
+    mine, theirs = position.threats
+    return _count(mine) - _count(theirs)
+
+
+def odd_even_threats(position: Position) -> float:
+    """
+    When the board fills up the player who moved first ends up playing into the odd rows and the
+    other player into the even rows, counting from 1 at the bottom, so only threats on those rows
+    tend to come true.
+    :return: how many more threats on their own rows the side to move has than the other side
+    """
+    mine, theirs = position.threats
+    geometry = position.geometry
+    my_rows, their_rows = (geometry.first_player_rows, geometry.second_player_rows) if position.moves_first else \
+        (geometry.second_player_rows, geometry.first_player_rows)
+    return _count(mine & my_rows) - _count(theirs & their_rows)
+
+
+Feature = Callable[[Position], float]
+
+# every feature a weight can be given for. Add to it to plug in a new feature
+FEATURES: Dict[str, Feature] = {
+    **{f'open_{num_pieces}': functools.partial(open_windows, num_pieces)
+       for num_pieces in range(1, MAX_OPEN_WINDOW_FEATURE + 1)},
+    'center': center_control,
+    'threats': threats,
+    'odd_even_threats': odd_even_threats,
+}
+
+# open windows weighted by the square of their length, the evaluation AlphaBetaAi always had
+DEFAULT_WEIGHTS: Dict[str, float] = {
+    **{f'open_{num_pieces}': num_pieces * num_pieces for num_pieces in range(1, MAX_OPEN_WINDOW_FEATURE + 1)},
+    'center': 0,
+    'threats': 0,
+    'odd_even_threats': 0,
+}
+
+
+class Evaluation(abc.ABC):
+    """
+    Scores positions nobody has won yet for a searching player
+    """
+
+    @abc.abstractmethod
+    def evaluate(self, the_board: Board, piece: str, other_piece: str, num_pieces_to_win: int) -> int:
+        """
+        :param the_board: the board to score
+        :param piece: the piece of the side to move
+        :param other_piece: the piece of the other side
+        :param num_pieces_to_win: how many pieces in a row win the game
+        :return: the score of the position for the side to move, higher is better
+        """
+        ...
+
+
+class FeatureEvaluation(Evaluation):
+    """
+    Scores a position as the weighted sum of FEATURES. Features with a weight of 0 are not worked out
+    """
+
+    def __init__(self, weights: Optional[Mapping[str, float]] = None) -> None:
+        """
+        :param weights: the weight of every feature, missing features weigh 0. DEFAULT_WEIGHTS if None
+        :raises: ValueError if a weight is given for a feature that is not in FEATURES
+        """
+        weights = DEFAULT_WEIGHTS if weights is None else weights
+        unknown = set(weights) - set(FEATURES)
+        if unknown:
+            raise ValueError(f'{", ".join(sorted(unknown))} not in {", ".join(FEATURES)}')
+        self.weights = {name: float(weight) for name, weight in weights.items()}
+        self._weighted_features = [(FEATURES[name], weight) for name, weight in self.weights.items() if weight]
+
+    def features(self, the_board: Board, piece: str, other_piece: str, num_pieces_to_win: int) -> Dict[str, float]:
+        """
+        :return: the value of every feature for the position, from the point of view of piece
+        """
+        position = Position(the_board, piece, other_piece, num_pieces_to_win)
+        return {name: feature(position) for name, feature in FEATURES.items()}
+
+    def evaluate(self, the_board: Board, piece: str, other_piece: str, num_pieces_to_win: int) -> int:
+        position = Position(the_board, piece, other_piece, num_pieces_to_win)
+        return round(sum(weight * feature(position) for feature, weight in self._weighted_features))
+
+
+def save_weights(path: str, weights: Mapping[str, float], **details: object) -> None:
+    """
+    Write weights to a JSON file, replacing it in one step so a player loading it never sees half a file
+    :param path: where to write the weights
+    :param weights: the weight of every feature
+    :param details: anything else worth keeping with the weights, such as how they were tuned
+    :return: None
+    """
+    temporary_path = f'{path}.tmp{os.getpid()}'
+    with open(temporary_path, 'w') as weights_file:
+        json.dump({'weights': dict(weights), **details}, weights_file, indent=2, sort_keys=True)
+        weights_file.write('\n')
+    os.replace(temporary_path, path)
+
+
+@functools.lru_cache(maxsize=None)
+def load_weights(path: str) -> Dict[str, float]:
+    """
+    :param path: a file written by save_weights
+    :return: the weights in the file, read once per process
+    :raises: WeightsFileError if the file cannot be read or has weights for unknown features
+    """
+    try:
+        with open(path) as weights_file:
+            weights = json.load(weights_file)['weights']
+    except (OSError, ValueError, KeyError, TypeError) as error:
+        raise WeightsFileError(f'{path} is not a weights file: {error}')
+    if not isinstance(weights, dict) or set(weights) - set(FEATURES):
+        raise WeightsFileError(f'{path} has weights for features that do not exist')
+    return weights
+
+
+def load_evaluation(evaluation: Optional[Union[str, Mapping[str, float], Evaluation]] = None) -> Evaluation:
+    """
+    :param evaluation: an Evaluation, the weights of a FeatureEvaluation or the path of a weights file.
+    A path ending in .npz is a model written by learned_evaluation, which needs numpy.
+    None uses the file named by the CONNECT4_WEIGHTS environment variable, or DEFAULT_WEIGHTS
+    :return: the evaluation
+    """
+    if isinstance(evaluation, Evaluation):
+        return evaluation
+    if evaluation is None:
+        evaluation = os.environ.get(WEIGHTS_ENVIRONMENT_VARIABLE) or None
+    if isinstance(evaluation, str) and evaluation.endswith('.npz'):
+        from .learned_evaluation import load_model  # numpy is only needed for learned evaluations
+        return load_model(evaluation)
+    if isinstance(evaluation, str):
+        evaluation = load_weights(evaluation)
+    return FeatureEvaluation(evaluation)
@@ -0,0 +1,80 @@
+import abc
+import json
+from typing import Any, Dict, NamedTuple, Optional, Tuple, Union
+
+
+class GameStarted(NamedTuple):
+    TYPE = 'started'
+    num_rows: int
+    num_cols: int
+    num_pieces_to_win: int
+    players: Tuple[str, ...]  # the name of every player, in turn order
+    pieces: Tuple[str, ...]  # the piece of every player, in turn order
+
+
+class MoveMade(NamedTuple):
+    TYPE = 'move'
+    ply: int  # how many moves were made before this one
+    player: str
+    piece: str
+    row: int
+    column: int
+
+
+class GameWon(NamedTuple):
+    TYPE = 'win'
+    player: str
+    piece: str
+    plies: int
+
+
+class GameTied(NamedTuple):
+    TYPE = 'tie'
+    plies: int
+
+
+class GameSnapshot(NamedTuple):
+    """
+    Everything that has happened in a game so far, standing in for a run of events
+    """
+    TYPE = 'snapshot'
+    started: Optional[GameStarted]
+    moves: Tuple[MoveMade, ...]
+    result: Optional[Union[GameWon, GameTied]]
+
+
+Event = Union[GameStarted, MoveMade, GameWon, GameTied, GameSnapshot]
+
+
+def event_to_dict(event: Event) -> Dict[str, Any]:
+    """
+    :return: the event as a dictionary of plain values, with its kind under 'type'
+    """
+    if isinstance(event, GameSnapshot):
+        return {'type': event.TYPE,
+                'started': None if event.started is None else event_to_dict(event.started),
+                'moves': [event_to_dict(made) for made in event.moves],
+                'result': None if event.result is None else event_to_dict(event.result)}
+    return {'type': event.TYPE, **event._asdict()}
+
+
+def event_to_json(event: Event) -> str:
+    """
+    :return: the event as one line of JSON
+    """
+    return json.dumps(event_to_dict(event))
+
+
+class GameObserver(abc.ABC):
+    """
+    Told about everything that happens in a Game it was added to, see Game.add_observer
+    """
+
+    @abc.abstractmethod
+    def notify(self, event: Event) -> None:
+        """
+        Called as soon as something happens, before the game carries on, so it should return quickly
+        :param event: what happened
+        :return: None
+        """
+        ...
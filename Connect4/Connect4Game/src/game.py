@@ -1,19 +1,49 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Type, Union, TYPE_CHECKING
 from .board import Board
-from Connect4Game.src.players import human_player, player, random_ai, basic_ai
+from .bitboard import BitBoard
+from .sparse_board import SparseBoard
+from .renderer import FullRenderer, Renderer, RENDERERS
+from .events import Event, GameObserver, GameStarted, GameTied, GameWon, MoveMade
+from Connect4Game.src.players import human_player, player, random_ai, basic_ai, alpha_beta_ai, mcts_ai, lazy_smp_ai, \
+    learned_ai
+
+if TYPE_CHECKING:
+    from . import move
+
+
+# the values the board_backend key of a configuration file can take
+BOARD_BACKENDS: Dict[str, Type[Board]] = {
+    'list': Board,
+    'bitboard': BitBoard,
+    'sparse': SparseBoard,
+}
+
+# the player types a user can choose from, some of which need more than the standard library, see check_available
+PLAYER_TYPES: Dict[str, Type["player.Player"]] = {
+    'human': human_player.HumanPlayer,
+    'random': random_ai.RandomAi,
+    'basic': basic_ai.BasicAi,
+    'alphabeta': alpha_beta_ai.AlphaBetaAi,
+    'mcts': mcts_ai.MctsAi,
+    'lazysmp': lazy_smp_ai.LazySmpAi,
+    'learned': learned_ai.LearnedAi,
+}
+
+# the player types the workers key of a configuration file is passed on to
+MULTIPROCESS_PLAYER_TYPES = ('mcts', 'lazysmp')
 
 
 class Game(object):
 
     @staticmethod
-    def create_game_from_file(path_to_file: str) -> "Game":
+    def read_config_file(path_to_file: str) -> Dict[str, Union[int, str]]:
         """
-        create a game from the specified configuration file
-        :param path_to_file: the follow holding the configuration
-        :return: a game setup up based on the configuration file
+        read a configuration file made of key : value lines
+        :param path_to_file: the file holding the configuration
+        :return: every key and its value, converted to an int when possible
         """
         with open(path_to_file) as config_file:
-            config = {}
+            config: Dict[str, Union[int, str]] = {}
             for line in config_file:
                 line = line.strip()
                 if line:
@@ -25,15 +55,52 @@ class Game(object):
                     except ValueError:
                         pass
                     config[var] = value
-            board = Board(config['num_rows'], config['num_cols'], config['blank_char'])
-            return Game(board, config['num_pieces_to_win'])  # type: ignore[arg-type]
+            return config
+
+    @staticmethod
+    def create_game_from_file(path_to_file: str) -> "Game":
+        """
+        create a game from the specified configuration file
+        The optional board_backend key picks how the board is stored (one of BOARD_BACKENDS)
+        and the optional renderer key how the game is shown (one of RENDERERS).
+        The optional workers key is how many processes the MULTIPROCESS_PLAYER_TYPES players search with, 1 by default
+        :param path_to_file: the follow holding the configuration
+        :return: a game setup up based on the configuration file
+        :raises: ValueError if board_backend is not one of BOARD_BACKENDS, renderer is not one of RENDERERS
+        or workers is not a positive number
+        """
+        config = Game.read_config_file(path_to_file)
+        backend_name = str(config.get('board_backend', 'list')).lower()
+        if backend_name not in BOARD_BACKENDS:
+            raise ValueError(f'board_backend must be one of {", ".join(BOARD_BACKENDS)} but is {backend_name}')
+        renderer_name = str(config.get('renderer', 'full')).lower()
+        if renderer_name not in RENDERERS:
+            raise ValueError(f'renderer must be one of {", ".join(RENDERERS)} but is {renderer_name}')
+        workers = config.get('workers', 1)
+        if not isinstance(workers, int) or workers < 1:
+            raise ValueError(f'workers must be a positive number but is {workers}')
+        player_options = {player_type: {'workers': workers} for player_type in MULTIPROCESS_PLAYER_TYPES}
+        board = BOARD_BACKENDS[backend_name](config['num_rows'], config['num_cols'], config['blank_char'])  # type: ignore[arg-type]
+        return Game(board, config['num_pieces_to_win'], renderer=RENDERERS[renderer_name](),  # type: ignore[arg-type]
+                    player_options=player_options)
 
     def __init__(self, board: Board, num_pieces_to_win: int,
-                 players: Optional[List["player.Player"]] = None) -> None:
+                 players: Optional[List["player.Player"]] = None, renderer: Optional[Renderer] = None,
+                 player_options: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        """
+        :param players: the players, asked for with setup_players if None
+        :param renderer: how the game is shown, a FullRenderer if None
+        :param player_options: extra keyword arguments for the players setup_players creates, by player type
+        """
         self.cur_player_turn = 0
         self.board = board
         self.num_pieces_to_win = num_pieces_to_win
+        self.renderer = renderer if renderer is not None else FullRenderer()
+        self.player_options = player_options if player_options is not None else {}
+        self.board.enable_window_index(num_pieces_to_win)
         self.someone_won: bool = False
+        self.observers: List[GameObserver] = []
+        self._started = False
         if players is not None:
             self.players: List[player.Player] = players
         else:
@@ -61,20 +128,21 @@ class Game(object):
         Can only be safely called after checking if someone won the game
         :return: if the game ended in a tie
         """
-        return self.board.is_full
+        return self.board.num_pieces >= self.board.num_rows * self.board.num_cols
 
     @staticmethod
     def get_valid_player_type_from_user(player_num: int) -> str:
-        legal_player_types = ('human', 'random', 'basic')
+        legal_player_types = tuple(PLAYER_TYPES)
+        choices = ' or '.join(('Human', 'Random', 'Basic', 'AlphaBeta', 'MCTS', 'LazySMP', 'Learned'))
         while True:
             print(f'Choose the type for Player {player_num + 1}')
-            player_type_input = input('Enter Human or Random or Basic: ')
+            player_type_input = input(f'Enter {choices}: ')
             player_type = player_type_input.strip().lower()
             for legal_player_type in legal_player_types:
                 if legal_player_type.startswith(player_type) and player_type != '':
                     return legal_player_type
             else:
-                print(f'{player_type} is not one of Human or Random or Basic. Please try again.')
+                print(f'{player_type} is not one of {choices}. Please try again.')
                 
 
     def setup_players(self) -> None:
@@ -84,31 +152,113 @@ class Game(object):
         """
         num_players = 2
         for i in range(num_players):
-            player_type = self.get_valid_player_type_from_user(player_num=i)
-            if player_type == 'human':
-                new_player = human_player.HumanPlayer.create_for_game(self.players, self.board.blank_char)
-            elif player_type == 'random':
-                new_player = random_ai.RandomAi.create_for_game(self.players, self.board.blank_char)
-            else:
-                new_player = basic_ai.BasicAi.create_for_game(self.players, self.board.blank_char)
+            while True:
+                player_type = self.get_valid_player_type_from_user(player_num=i)
+                options = self.player_options.get(player_type, {})
+                try:
+                    PLAYER_TYPES[player_type].check_available(**options)
+                except player.PlayerUnavailableError as error:
+                    print(error)
+                else:
+                    break
+            new_player = PLAYER_TYPES[player_type].create_for_game(self.players, self.board.blank_char, **options)
             self.players.append(new_player)
         # player 1 points to the opponent object
         self.players[0].opponent = self.players[1] # player 1 - point object to refer to each other
         self.players[1].opponent = self.players[0]
 
-    def play(self) -> None:
+    def add_observer(self, observer: GameObserver) -> None:
         """
-        Play a game of Connect4 to completion
+        Tell observer about everything that happens in this game from now on
+        :param observer: the observer to add
         :return: None
         """
-        while True:
-            print(self.board)
-            player_move = self.cur_player.take_turn(self.board, self.num_pieces_to_win)
-            if player_move.ends_game(self):
-                self.someone_won = self.is_part_of_win(player_move.row, player_move.column)
-                break
+        self.observers.append(observer)
+
+    def remove_observer(self, observer: GameObserver) -> None:
+        """
+        :param observer: an observer added with add_observer
+        :return: None
+        :raises: ValueError if observer was never added
+        """
+        self.observers.remove(observer)
+
+    def notify_observers(self, event: Event) -> None:
+        """
+        :param event: what happened, passed to every observer in the order they were added
+        :return: None
+        """
+        for observer in self.observers:
+            observer.notify(event)
+
+    def start(self) -> None:
+        """
+        Tell the observers the game is starting, unless they have been told already.
+        play calls this, and so does the first end_turn for games played one turn at a time
+        :return: None
+        """
+        if self._started:
+            return
+        self._started = True
+        self.notify_observers(GameStarted(self.board.num_rows, self.board.num_cols, self.num_pieces_to_win,
+                                          tuple(str(each) for each in self.players),
+                                          tuple(each.piece for each in self.players)))
+
+    def play(self, renderer: Optional[Renderer] = None) -> None:
+        """
+        Play a game of Connect4 to completion, closing the players once it is over
+        :param renderer: how to show the game, the game's own renderer if None
+        :return: None
+        """
+        renderer = renderer if renderer is not None else self.renderer
+        self.start()
+        renderer.start(self)
+        try:
+            while True:
+                player_move = self.play_turn()
+                renderer.move_made(self, player_move)
+                if self.is_game_over():
+                    break
+        finally:
+            self.close_players()
+        self.declare_winner_or_tie(renderer)
+
+    def close_players(self) -> None:
+        """
+        Let every player free what it holds on to, see Player.close
+        :return: None
+        """
+        for each in self.players:
+            each.close()
+
+    def play_turn(self) -> "move.Move":
+        """
+        Have the current player take their turn without printing anything.
+        If the move does not end the game it becomes the next player's turn
+        :return: the move the current player made
+        """
+        player_move = self.cur_player.take_turn(self.board, self.num_pieces_to_win)
+        self.end_turn(player_move)
+        return player_move
+
+    def end_turn(self, player_move: "move.Move") -> None:
+        """
+        Finish the current player's turn after player_move has been made on the board,
+        telling the observers about the move and, if it ended the game, the result.
+        If the move does not end the game it becomes the next player's turn
+        :param player_move: the move the current player made
+        :return: None
+        """
+        self.start()
+        maker = player_move.maker
+        plies = self.board.num_pieces
+        self.notify_observers(MoveMade(plies - 1, str(maker), maker.piece,
+                                       player_move.row, player_move.column))  # type: ignore[arg-type]
+        if player_move.ends_game(self):
+            self.someone_won = self.is_part_of_win(player_move.row, player_move.column)  # type: ignore[arg-type]
+            self.notify_observers(GameWon(str(maker), maker.piece, plies) if self.someone_won else GameTied(plies))
+        else:
             self.change_turn()
-        self.declare_winner_or_tie()
 
     def is_game_over(self) -> bool:
         """
@@ -127,6 +277,9 @@ class Game(object):
         if self.board.contains_blank_character(row, column):
             raise ValueError(f'{row},{column} contains a blank space')
 
+        window_index = self.board.window_index
+        if window_index is not None and window_index.num_pieces_to_win == self.num_pieces_to_win:
+            return window_index.is_part_of_win(row, column, self.board.get_piece_at(row, column))
         return self.board.count_max_matches(row, column) >= self.num_pieces_to_win
 
     def change_turn(self) -> None:
@@ -136,13 +289,18 @@ class Game(object):
         """
         self.cur_player_turn = (self.cur_player_turn + 1) % self.num_players
 
-    def declare_winner_or_tie(self) -> None:
+    def declare_winner_or_tie(self, renderer: Optional[Renderer] = None) -> None:
         """
-        Print out who won the game or if it was a tie
-        :return:
+        Show the final board and who won the game or if it was a tie, see result_message
+        :param renderer: how to show it, the game's own renderer if None
+        :return: None
+        """
+        (renderer if renderer is not None else self.renderer).finish(self)
+
+    def result_message(self) -> str:
+        """
+        :return: who won the game or that it was a tie
         """
-        print(self.board)
         if self.someone_won:
-            print(f'{self.cur_player} won the game!')
-        else:
-            print('Tie Game.')
+            return f'{self.cur_player} won the game!'
+        return 'Tie Game.'
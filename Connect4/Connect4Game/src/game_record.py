@@ -0,0 +1,352 @@
+import argparse
+import os
+import struct
+from typing import BinaryIO, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+from .board import Board, BoardError
+from .game import Game, BOARD_BACKENDS
+from .move import Move
+from .players import player
+from .renderer import Renderer
+
+# a file of game records starts with MAGIC and a 32 bit version. Every record after that is a
+# _RECORD_HEADER, then one byte per move holding the column played, then, if the record has
+# annotations, one signed 32 bit number per move. Everything is little endian
+MAGIC = b'C4GAMES\x00'
+VERSION = 1
+_FILE_HEADER = struct.Struct('<8sI')
+# num_rows, num_cols, num_pieces_to_win, flags, winner, num_moves
+_RECORD_HEADER = struct.Struct('<HHHBBI')
+_ANNOTATION = struct.Struct('<i')
+
+HAS_ANNOTATIONS = 0x01
+NO_WINNER = 0xFF
+MAX_COLS = 256  # a column has to fit in one byte
+MAX_SIZE = 0xFFFF
+
+PIECES = ('X', 'O')
+BLANK_CHAR = '*'
+DEFAULT_CHECKPOINT_EVERY = 32
+
+
+class GameRecordError(Exception):
+    pass
+
+
+class GameRecord(NamedTuple):
+    num_rows: int
+    num_cols: int
+    num_pieces_to_win: int
+    moves: bytes  # the column of every move, in order, first player first
+    winner: Optional[int] = None  # the index of the winning player, None for a tie or an unfinished game
+    annotations: Optional[Tuple[int, ...]] = None  # one number per move, such as the score of a search
+
+    @classmethod
+    def from_moves(cls, num_rows: int, num_cols: int, num_pieces_to_win: int, moves: Iterable[int],
+                   winner: Optional[int] = None, annotations: Optional[Iterable[int]] = None) -> "GameRecord":
+        """
+        :param moves: the column of every move, in order
+        :param annotations: one number per move, or None
+        :return: the record of the game
+        :raises: GameRecordError if the game does not fit in a record
+        """
+        if not 0 < num_cols <= MAX_COLS or not 0 < num_rows <= MAX_SIZE or not 0 < num_pieces_to_win <= MAX_SIZE:
+            raise GameRecordError(f'A {num_rows}x{num_cols} board needing {num_pieces_to_win} in a row '
+                                  f'does not fit in a game record.')
+        try:
+            move_bytes = bytes(moves)
+        except ValueError:
+            raise GameRecordError('Every move has to be a column from 0 to 255.')
+        if any(column >= num_cols for column in move_bytes):
+            raise GameRecordError(f'Every move has to be a column from 0 to {num_cols - 1}.')
+        if winner is not None and not 0 <= winner < len(PIECES):
+            raise GameRecordError(f'{winner} is not the index of a player.')
+        if annotations is not None:
+            annotations = tuple(annotations)
+            if len(annotations) != len(move_bytes):
+                raise GameRecordError(f'{len(annotations)} annotations for {len(move_bytes)} moves.')
+        return cls(num_rows, num_cols, num_pieces_to_win, move_bytes, winner, annotations)
+
+    @property
+    def plies(self) -> int:
+        return len(self.moves)
+
+    def to_bytes(self) -> bytes:
+        """
+        :return: the record as it is stored in a file
+        """
+        flags = HAS_ANNOTATIONS if self.annotations is not None else 0
+        header = _RECORD_HEADER.pack(self.num_rows, self.num_cols, self.num_pieces_to_win, flags,
+                                     NO_WINNER if self.winner is None else self.winner, len(self.moves))
+        if self.annotations is None:
+            return header + self.moves
+        return header + self.moves + struct.pack(f'<{len(self.annotations)}i', *self.annotations)
+
+
+def _open(source: Union[str, BinaryIO], mode: str) -> Tuple[BinaryIO, bool]:
+    """
+    :return: the file and whether it was opened here, so it has to be closed here too
+    """
+    if isinstance(source, (str, os.PathLike)):
+        return open(source, mode), True  # type: ignore[return-value]
+    return source, False
+
+
+class RecordWriter(object):
+    """
+    Writes game records to a file one at a time, so a run of self-play can archive its games
+    as they finish without keeping them around
+    """
+
+    def __init__(self, destination: Union[str, BinaryIO], append: bool = False) -> None:
+        """
+        :param destination: a path or a binary file open for writing
+        :param append: whether to add to the records already in the file at the path
+        :raises: GameRecordError if the file to append to is not a file of game records
+        """
+        appending = append and isinstance(destination, (str, os.PathLike)) and os.path.getsize(destination) > 0
+        if appending:
+            with open(destination, 'rb') as existing:  # type: ignore[arg-type]
+                _read_file_header(existing)
+        self._file, self._owns_file = _open(destination, 'ab' if append else 'wb')
+        if not appending:
+            self._file.write(_FILE_HEADER.pack(MAGIC, VERSION))
+        self.count = 0
+
+    def write(self, record: GameRecord) -> None:
+        """
+        :param record: the record to add to the end of the file
+        :return: None
+        """
+        self._file.write(record.to_bytes())
+        self.count += 1
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._owns_file:
+            self._file.close()
+        else:
+            self._file.flush()
+
+    def __enter__(self) -> "RecordWriter":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def _read_exactly(source: BinaryIO, size: int) -> bytes:
+    data = source.read(size)
+    if len(data) != size:
+        raise GameRecordError(f'The file ends in the middle of a record, {size - len(data)} bytes are missing.')
+    return data
+
+
+def _read_file_header(source: BinaryIO) -> None:
+    header = source.read(_FILE_HEADER.size)
+    if len(header) != _FILE_HEADER.size:
+        raise GameRecordError('Not a file of game records, it is too short.')
+    magic, version = _FILE_HEADER.unpack(header)
+    if magic != MAGIC:
+        raise GameRecordError('Not a file of game records.')
+    if version != VERSION:
+        raise GameRecordError(f'Game records version {version} is not supported, only version {VERSION} is.')
+
+
+def read_records(source: Union[str, BinaryIO]) -> Iterator[GameRecord]:
+    """
+    Read the records in a file one at a time. Only one record is in memory at once,
+    so files of any size can be scanned
+    :param source: a path or a binary file written by RecordWriter
+    :return: every record in the file, in the order they were written
+    :raises: GameRecordError if the file is not a file of game records or is cut short
+    """
+    records_file, owns_file = _open(source, 'rb')
+    try:
+        _read_file_header(records_file)
+        while True:
+            header = records_file.read(_RECORD_HEADER.size)
+            if not header:
+                return
+            if len(header) != _RECORD_HEADER.size:
+                raise GameRecordError('The file ends in the middle of a record header.')
+            num_rows, num_cols, num_pieces_to_win, flags, winner, num_moves = _RECORD_HEADER.unpack(header)
+            moves = _read_exactly(records_file, num_moves)
+            annotations = None
+            if flags & HAS_ANNOTATIONS:
+                annotations = struct.unpack(f'<{num_moves}i',
+                                            _read_exactly(records_file, num_moves * _ANNOTATION.size))
+            yield GameRecord(num_rows, num_cols, num_pieces_to_win, moves,
+                             None if winner == NO_WINNER else winner, annotations)
+    finally:
+        if owns_file:
+            records_file.close()
+
+
+class RecordedPlayer(player.Player):
+    """
+    A player in a game that already happened, who makes the moves it made in the record again
+    """
+
+    @classmethod
+    def get_valid_piece(cls, players: List["player.Player"], blank_char: str, case_matters: bool = False) -> str:
+        return PIECES[len(players)]
+
+    @classmethod
+    def get_valid_name(cls, players: List["player.Player"], case_matters: bool = False) -> str:
+        return f'Player {len(players) + 1}'
+
+    def __init__(self, name: str, piece: str, moves: Iterable[int] = (),
+                 opponent: Optional["player.Player"] = None) -> None:
+        """
+        :param moves: the columns the player played, in order
+        """
+        super().__init__(name, piece, opponent)
+        self._moves = iter(moves)
+
+    def get_move(self, the_board: Board, num_pieces_to_win: int) -> Move:
+        """
+        :return: the player's next move in the record
+        :raises: GameRecordError if the record has no more moves for the player or the move cannot be made,
+        so a broken record stops the game instead of the next recorded move being tried in its place
+        """
+        column = next(self._moves, None)
+        if column is None:
+            raise GameRecordError(f'The record has no more moves for {self.name}.')
+        if not 0 <= column < the_board.num_cols or the_board.is_column_full(column):
+            raise GameRecordError(f'{self.name} cannot play column {column} of the record.')
+        return Move(self, column)
+
+
+class Replay(object):
+    """
+    Rebuilds the positions of a recorded game by making its moves on a board.
+    A copy of the board is kept every checkpoint_every plies as the game is replayed, so going
+    to any ply only makes the moves since the closest checkpoint before it
+    """
+
+    def __init__(self, record: GameRecord, board_backend: str = 'bitboard',
+                 checkpoint_every: int = DEFAULT_CHECKPOINT_EVERY) -> None:
+        """
+        :param record: the game to replay
+        :param board_backend: which of BOARD_BACKENDS to rebuild the positions on
+        :param checkpoint_every: how many plies apart the checkpoints are
+        :raises: ValueError if checkpoint_every is not positive or board_backend is unknown
+        """
+        if checkpoint_every < 1:
+            raise ValueError('checkpoint_every has to be at least 1.')
+        if board_backend not in BOARD_BACKENDS:
+            raise ValueError(f'{board_backend} is not one of {", ".join(BOARD_BACKENDS)}')
+        self.record = record
+        self.checkpoint_every = checkpoint_every
+        self.players: List[player.Player] = [RecordedPlayer(f'Player {i + 1}', piece)
+                                             for i, piece in enumerate(PIECES)]
+        self._checkpoints: List[Board] = [BOARD_BACKENDS[board_backend](record.num_rows, record.num_cols,
+                                                                        BLANK_CHAR)]
+
+    def __len__(self) -> int:
+        return self.record.plies
+
+    def game(self, renderer: Optional[Renderer] = None) -> Game:
+        """
+        :param renderer: how to show the game, see Game
+        :return: a game on an empty board whose players make the moves of the record when it is played
+        """
+        players: List[player.Player] = [RecordedPlayer(f'Player {i + 1}', piece, self.record.moves[i::len(PIECES)])
+                                        for i, piece in enumerate(PIECES)]
+        players[0].opponent, players[1].opponent = players[1], players[0]
+        return Game(self._checkpoints[0].copy(), self.record.num_pieces_to_win, players, renderer)
+
+    def _make_moves(self, the_board: Board, start: int, end: int) -> None:
+        for ply in range(start, end):
+            try:
+                Move(self.players[ply % len(self.players)], self.record.moves[ply]).make(the_board)
+            except BoardError as error:
+                raise GameRecordError(f'Move {ply + 1} of the record cannot be made: {error}')
+
+    def position(self, ply: Optional[int] = None) -> Board:
+        """
+        :param ply: how many moves to make, None for all of them. Negative numbers count back from the end
+        :return: a new board holding the position after ply moves, which can be changed freely
+        :raises: IndexError if the game does not have ply moves
+        :raises: GameRecordError if a move in the record cannot be made
+        """
+        if ply is None:
+            ply = len(self)
+        elif ply < 0:
+            ply += len(self)
+        if not 0 <= ply <= len(self):
+            raise IndexError(f'The game has {len(self)} plies, so there is no position after {ply}.')
+        checkpoint = min(ply // self.checkpoint_every, len(self._checkpoints) - 1)
+        the_board = self._checkpoints[checkpoint].copy()
+        reached = checkpoint * self.checkpoint_every
+        while reached + self.checkpoint_every <= ply:
+            self._make_moves(the_board, reached, reached + self.checkpoint_every)
+            reached += self.checkpoint_every
+            self._checkpoints.append(the_board.copy())
+        self._make_moves(the_board, reached, ply)
+        return the_board
+
+    def positions(self) -> Iterator[Board]:
+        """
+        :return: one board that is changed in place after every move, starting with the empty board
+        """
+        the_board = self._checkpoints[0].copy()
+        yield the_board
+        for ply in range(len(self)):
+            self._make_moves(the_board, ply, ply + 1)
+            yield the_board
+
+
+def replay(record: GameRecord, ply: Optional[int] = None, board_backend: str = 'bitboard') -> Board:
+    """
+    :param record: the game to replay
+    :param ply: how many moves to make, None for all of them
+    :param board_backend: which of BOARD_BACKENDS to rebuild the position on
+    :return: the position after ply moves of the game
+    """
+    return Replay(record, board_backend).position(ply)
+
+
+def summarize(records: Iterable[GameRecord]) -> Tuple[int, int, List[int]]:
+    """
+    :return: how many games there were, how many plies they had in total and how many each player won
+    """
+    games = plies = 0
+    wins = [0] * len(PIECES)
+    for record in records:
+        games += 1
+        plies += record.plies
+        if record.winner is not None:
+            wins[record.winner] += 1
+    return games, plies, wins
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Summarize a file of game records or show a position from one of its games
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description='Read a file of game records.')
+    parser.add_argument('path')
+    parser.add_argument('--game', type=int, default=None, help='show a position from this game, counting from 0')
+    parser.add_argument('--ply', type=int, default=None, help='how many moves into the game, defaults to the end')
+    args = parser.parse_args(argv)
+
+    if args.game is None:
+        games, plies, wins = summarize(read_records(args.path))
+        print(f'{games} games, {plies} plies, ' +
+              ', '.join(f'player {i + 1} won {won}' for i, won in enumerate(wins)) + f', {games - sum(wins)} not won')
+        return
+    for number, record in enumerate(read_records(args.path)):
+        if number == args.game:
+            print(f'{record.num_rows}x{record.num_cols}, {record.num_pieces_to_win} in a row to win, '
+                  f'moves: {" ".join(str(column) for column in record.moves)}')
+            print(replay(record, args.ply))
+            return
+    raise SystemExit(f'{args.path} does not have a game {args.game}.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,377 @@
+import bisect
+import collections
+import functools
+import json
+import signal
+import sys
+import threading
+import time
+import weakref
+from typing import Any, Callable, Counter, Deque, Dict, Iterator, List, MutableMapping, NamedTuple, Optional, Tuple
+from .board import Board, BoardError
+from .game import Game
+from .move import Move, MoveError
+from .players import player, mcts_ai
+
+# upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 0.1, 1.0, 10.0, float('inf'))
+COUNTERS = ('turns', 'moves', 'win_checks', 'board_copies', 'retries', 'nodes', 'playouts', 'games')
+# how many finished games keep their own totals
+MAX_GAMES_KEPT = 1000
+METRIC_PREFIX = 'connect4'
+
+
+class Histogram(object):
+    """
+    Counts how many observations fell into each of LATENCY_BUCKETS, like a Prometheus histogram
+    """
+
+    def __init__(self) -> None:
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def cumulative(self) -> Iterator[Tuple[float, int]]:
+        """
+        :return: every bucket bound with how many observations were at most that long
+        """
+        total = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.buckets):
+            total += count
+            yield bound, total
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'count': self.count, 'sum': self.sum,
+                'buckets': {('+Inf' if bound == float('inf') else repr(bound)): count
+                            for bound, count in self.cumulative()}}
+
+
+class GameTotals(NamedTuple):
+    plies: int
+    seconds: float  # from the first move to the last
+    win_checks: int
+    winner: Optional[str]  # None for a tie
+
+
+class _OpenGame(object):
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.plies = 0
+        self.win_checks = 0
+
+
+class Instruments(object):
+    """
+    Latency histograms, counters and per game totals for the functions a game spends its time in.
+
+    Nothing is measured until enable is called, which replaces Player.take_turn, every get_move,
+    Move.make, Game.is_part_of_win, Game.end_turn and the board copies, Board.copy and the MCTS one,
+    with versions that measure themselves. disable puts the originals back, so while disabled the game runs exactly
+    the code it would run without this module. Only calls made in this process are measured.
+    """
+
+    def __init__(self) -> None:
+        self._patches: List[Tuple[Any, str, Any]] = []
+        # the totals of the games still being played, which go away with their game if it is never finished
+        self._open_games: MutableMapping[Game, _OpenGame] = weakref.WeakKeyDictionary()
+        self._local = threading.local()
+        self.profiler: Optional[SamplingProfiler] = None
+        self.reset()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._patches)
+
+    def reset(self) -> None:
+        """
+        Forget everything measured so far
+        :return: None
+        """
+        self.counters: Counter[str] = collections.Counter({name: 0 for name in COUNTERS})
+        self.latencies: Dict[Tuple[str, str], Histogram] = collections.defaultdict(Histogram)
+        self.games: Deque[GameTotals] = collections.deque(maxlen=MAX_GAMES_KEPT)
+        self._open_games.clear()
+
+    def _observe(self, operation: str, label: str, start: float) -> None:
+        self.latencies[(operation, label)].observe(time.perf_counter() - start)
+
+    def _patch(self, owner: Any, name: str, make_wrapper: Callable[[Callable[..., Any]], Callable[..., Any]]) -> None:
+        original = owner.__dict__[name]
+        wrapper = functools.wraps(original)(make_wrapper(original))
+        self._patches.append((owner, name, original))
+        setattr(owner, name, wrapper)
+
+    def enable(self) -> None:
+        """
+        Start measuring. Player classes defined after this are only measured through take_turn
+        :return: None
+        """
+        if self.enabled:
+            return
+        self._patch(player.Player, 'take_turn', self._timed_take_turn)
+        for player_class in set(_subclasses(player.Player)):
+            if 'get_move' in player_class.__dict__:
+                self._patch(player_class, 'get_move', self._timed_get_move)
+        self._patch(Move, 'make', self._timed_make)
+        self._patch(Game, 'is_part_of_win', self._timed_win_check)
+        self._patch(Game, 'end_turn', self._counted_end_turn)
+        self._patch(Board, 'copy', self._counted_copy)
+        self._patch(mcts_ai, '_copy_board', self._counted_copy)
+
+    def disable(self) -> None:
+        """
+        Stop measuring and put every original function back. What was measured is kept
+        :return: None
+        """
+        while self._patches:
+            owner, name, original = self._patches.pop()
+            setattr(owner, name, original)
+
+    def _timed_take_turn(self, take_turn: Callable[..., Any]) -> Callable[..., Any]:
+        def wrapper(the_player: "player.Player", *args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return take_turn(the_player, *args, **kwargs)
+            finally:
+                self._observe('take_turn', type(the_player).__name__, start)
+                self.counters['turns'] += 1
+        return wrapper
+
+    def _timed_get_move(self, get_move: Callable[..., Any]) -> Callable[..., Any]:
+        def wrapper(the_player: "player.Player", *args: Any, **kwargs: Any) -> Any:
+            if getattr(self._local, 'in_get_move', False):
+                return get_move(the_player, *args, **kwargs)  # a subclass calling super().get_move
+            self._local.in_get_move = True
+            start = time.perf_counter()
+            try:
+                player_move = get_move(the_player, *args, **kwargs)
+            except MoveError:
+                self.counters['retries'] += 1  # take_turn asks again
+                raise
+            finally:
+                self._local.in_get_move = False
+                self._observe('get_move', type(the_player).__name__, start)
+            stats = getattr(the_player, 'last_search', None)
+            self.counters['nodes'] += getattr(stats, 'nodes', 0)
+            self.counters['playouts'] += getattr(stats, 'playouts', 0)
+            return player_move
+        return wrapper
+
+    def _timed_make(self, make: Callable[..., Any]) -> Callable[..., Any]:
+        def wrapper(the_move: Move, *args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                result = make(the_move, *args, **kwargs)
+            except BoardError:
+                self.counters['retries'] += 1
+                raise
+            finally:
+                self._observe('move_make', '', start)
+            self.counters['moves'] += 1
+            return result
+        return wrapper
+
+    def _timed_win_check(self, is_part_of_win: Callable[..., Any]) -> Callable[..., Any]:
+        def wrapper(the_game: Game, *args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return is_part_of_win(the_game, *args, **kwargs)
+            finally:
+                self._observe('is_part_of_win', '', start)
+                self.counters['win_checks'] += 1
+                self._open_game(the_game).win_checks += 1
+        return wrapper
+
+    def _counted_end_turn(self, end_turn: Callable[..., Any]) -> Callable[..., Any]:
+        def wrapper(the_game: Game, *args: Any, **kwargs: Any) -> Any:
+            result = end_turn(the_game, *args, **kwargs)
+            totals = self._open_game(the_game)
+            totals.plies += 1
+            if the_game.is_game_over():
+                del self._open_games[the_game]
+                self.counters['games'] += 1
+                self.games.append(GameTotals(totals.plies, time.perf_counter() - totals.start, totals.win_checks,
+                                             str(the_game.cur_player) if the_game.someone_won else None))
+            return result
+        return wrapper
+
+    def _counted_copy(self, copy_board: Callable[..., Any]) -> Callable[..., Any]:
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            self.counters['board_copies'] += 1
+            return copy_board(*args, **kwargs)
+        return wrapper
+
+    def _open_game(self, the_game: Game) -> _OpenGame:
+        totals = self._open_games.get(the_game)
+        if totals is None:
+            totals = self._open_games[the_game] = _OpenGame()
+        return totals
+
+    def abandon_game(self, the_game: Game) -> None:
+        """
+        Forget a game that will never be finished, such as one a player left, without counting it
+        :param the_game: the game to forget
+        :return: None
+        """
+        self._open_games.pop(the_game, None)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        :return: everything measured, as plain data
+        """
+        latencies: Dict[str, Dict[str, Any]] = collections.defaultdict(dict)
+        for (operation, label), histogram in sorted(self.latencies.items()):
+            latencies[operation][label or 'all'] = histogram.to_dict()
+        return {'enabled': self.enabled, 'counters': dict(self.counters), 'latency_seconds': latencies,
+                'games': [totals._asdict() for totals in self.games]}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    def to_prometheus(self) -> str:
+        """
+        :return: the counters and histograms in the Prometheus text exposition format.
+        Per game totals are left out, they are not metrics
+        """
+        lines = []
+        for name in sorted(self.counters):
+            metric = f'{METRIC_PREFIX}_{name}_total'
+            lines += [f'# TYPE {metric} counter', f'{metric} {self.counters[name]}']
+        metric = f'{METRIC_PREFIX}_latency_seconds'
+        lines.append(f'# TYPE {metric} histogram')
+        for (operation, label), histogram in sorted(self.latencies.items()):
+            labels = f'operation="{operation}"' + (f',player="{label}"' if label else '')
+            for bound, count in histogram.cumulative():
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{metric}_bucket{{{labels},le="{le}"}} {count}')
+            lines.append(f'{metric}_sum{{{labels}}} {histogram.sum!r}')
+            lines.append(f'{metric}_count{{{labels}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def start_profiler(self, interval: float = 0.005, thread: Optional[threading.Thread] = None) -> "SamplingProfiler":
+        """
+        Start sampling where a thread spends its time, whether or not the instruments are enabled
+        :param interval: seconds between samples
+        :param thread: the thread to sample, the calling thread by default
+        :return: the running profiler
+        """
+        self.stop_profiler()
+        self.profiler = SamplingProfiler(interval, thread)
+        self.profiler.start()
+        return self.profiler
+
+    def stop_profiler(self) -> Optional["SamplingProfiler"]:
+        """
+        :return: the profiler that was stopped, which still holds its samples, or None if none was running
+        """
+        profiler = self.profiler if self.profiler is not None and self.profiler.running else None
+        if profiler is not None:
+            profiler.stop()
+        return profiler
+
+    def toggle_profiler(self) -> bool:
+        """
+        :return: whether the profiler is running now
+        """
+        if self.stop_profiler() is None:
+            self.start_profiler()
+            return True
+        return False
+
+
+class SamplingProfiler(object):
+    """
+    Looks at the stack of one thread every interval seconds from a background thread and counts
+    the stacks it sees. Sampling costs the profiled thread nothing but the time the sampler
+    holds the interpreter lock, and nothing at all once stopped
+    """
+
+    def __init__(self, interval: float = 0.005, thread: Optional[threading.Thread] = None) -> None:
+        self.interval = interval
+        self.thread_id = (thread or threading.current_thread()).ident
+        self.samples: Counter[Tuple[str, ...]] = collections.Counter()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._sampler is not None and self._sampler.is_alive()
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample, name='connect4-profiler', daemon=True)
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)  # type: ignore[arg-type]
+            stack = []
+            while frame is not None:
+                stack.append(f'{frame.f_code.co_name} ({frame.f_code.co_filename}:{frame.f_lineno})')
+                frame = frame.f_back
+            if stack:
+                self.samples[tuple(reversed(stack))] += 1
+
+    def top(self, count: int = 10) -> List[Tuple[str, int]]:
+        """
+        :param count: how many functions to list
+        :return: the functions that were running when the most samples were taken, with how many samples
+        """
+        functions: Counter[str] = collections.Counter()
+        for stack, samples in self.samples.items():
+            functions[stack[-1]] += samples
+        return functions.most_common(count)
+
+    def collapsed(self) -> str:
+        """
+        :return: the samples in the collapsed stack format flame graph tools read
+        """
+        return ''.join(f'{";".join(stack)} {samples}\n' for stack, samples in sorted(self.samples.items()))
+
+
+def _subclasses(cls: type) -> Iterator[type]:
+    for subclass in cls.__subclasses__():
+        yield subclass
+        yield from _subclasses(subclass)
+
+
+def install_profiler_signal(signal_number: Optional[int] = None) -> None:
+    """
+    Start or stop the profiler of INSTRUMENTS whenever the process gets signal_number,
+    e.g. kill -USR1 <pid>. The main thread is the one sampled. Stopping prints the busiest functions
+    :param signal_number: the signal to toggle on, SIGUSR1 by default
+    :return: None
+    :raises: ValueError if no signal is given and the platform has no SIGUSR1
+    """
+    if signal_number is None:
+        if not hasattr(signal, 'SIGUSR1'):
+            raise ValueError('This platform has no SIGUSR1, pass another signal.')
+        signal_number = signal.SIGUSR1
+    main_thread = threading.main_thread()
+
+    def toggle(signum: int, frame: Any) -> None:
+        stopped = INSTRUMENTS.stop_profiler()
+        if stopped is None:
+            INSTRUMENTS.start_profiler(thread=main_thread)
+        else:
+            for function, samples in stopped.top():
+                print(f'{samples:8} {function}', file=sys.stderr)
+
+    signal.signal(signal_number, toggle)
+
+
+# the instruments every part of the program shares
+INSTRUMENTS = Instruments()
+enable = INSTRUMENTS.enable
+disable = INSTRUMENTS.disable
+reset = INSTRUMENTS.reset
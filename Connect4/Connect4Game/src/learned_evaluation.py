@@ -0,0 +1,366 @@
+import argparse
+import functools
+import json
+import os
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+from .board import Board
+from .evaluation import Evaluation, Position
+from .game_record import GameRecord, Replay, read_records
+
+# a learned evaluation predicts the result of the game for the side to move, from -1 for a loss to 1 for
+# a win. Scores are that times SCORE_SCALE, well inside the scores AlphaBetaAi keeps for wins and losses
+SCORE_SCALE = 10_000
+FORMAT_VERSION = 1
+
+
+class LearnedModelError(Exception):
+    pass
+
+
+class FeatureEncoder(object):
+    """
+    Turns positions on a board of one size into rows of features, many positions at a time.
+
+    Positions come in as the masks of the side to move and of the other side, laid out like BitBoard.
+    The features of a position are one per spot holding 1 where the side to move has a piece, one per
+    spot for the other side's pieces, how many windows of num_pieces_to_win spots each side has
+    with 1, 2, ... num_pieces_to_win - 1 of its pieces and none of the other side's, and 1 if the side
+    to move moved first. The windows are counted for every position at once with one matrix multiply
+    of the pieces by a matrix with a column for every window, holding 1 in the window's spots.
+    """
+
+    def __init__(self, num_rows: int, num_cols: int, num_pieces_to_win: int) -> None:
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.num_pieces_to_win = num_pieces_to_win
+        self.num_cells = num_rows * num_cols
+        column_height = num_rows + 1
+        self._mask_bytes = (column_height * num_cols + 7) // 8
+        # the bit of every spot, in row major order from the bottom left
+        self._bits = np.array([col * column_height + row for row in range(num_rows) for col in range(num_cols)])
+        windows = []
+        for row_step, col_step in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            for row in range(num_rows):
+                for col in range(num_cols):
+                    end_row = row + row_step * (num_pieces_to_win - 1)
+                    end_col = col + col_step * (num_pieces_to_win - 1)
+                    if 0 <= end_row < num_rows and 0 <= end_col < num_cols:
+                        windows.append([(row + row_step * i) * num_cols + col + col_step * i
+                                        for i in range(num_pieces_to_win)])
+        self._windows = np.zeros((self.num_cells, len(windows)), dtype=np.float32)
+        for window, spots in enumerate(windows):
+            self._windows[spots, window] = 1
+        self.num_features = 2 * self.num_cells + 2 * (num_pieces_to_win - 1) + 1
+
+    def cells(self, masks: Sequence[int]) -> np.ndarray:
+        """
+        :param masks: masks laid out like BitBoard
+        :return: a (len(masks), num_rows * num_cols) array of 0 and 1, in row major order from the bottom left
+        """
+        data = b''.join(mask.to_bytes(self._mask_bytes, 'little') for mask in masks)
+        bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8).reshape(len(masks), self._mask_bytes),
+                             axis=1, bitorder='little')
+        return bits[:, self._bits].astype(np.float32)
+
+    def mirror(self, cells: np.ndarray) -> np.ndarray:
+        """
+        :param cells: positions as returned by cells
+        :return: the positions with the columns the other way round
+        """
+        return cells.reshape(-1, self.num_rows, self.num_cols)[:, :, ::-1].reshape(-1, self.num_cells)
+
+    def encode(self, mine: np.ndarray, theirs: np.ndarray) -> np.ndarray:
+        """
+        :param mine: the pieces of the side to move in every position, as returned by cells
+        :param theirs: the pieces of the other side
+        :return: a (positions, num_features) array with the features of every position
+        """
+        my_counts = mine @ self._windows
+        their_counts = theirs @ self._windows
+        my_open = [((my_counts == num_pieces) & (their_counts == 0)).sum(axis=1)
+                   for num_pieces in range(1, self.num_pieces_to_win)]
+        their_open = [((their_counts == num_pieces) & (my_counts == 0)).sum(axis=1)
+                      for num_pieces in range(1, self.num_pieces_to_win)]
+        moves_first = mine.sum(axis=1) == theirs.sum(axis=1)
+        return np.column_stack([mine, theirs, *my_open, *their_open, moves_first]).astype(np.float32)
+
+    def encode_masks(self, mine: Sequence[int], theirs: Sequence[int]) -> np.ndarray:
+        """
+        :return: the features of the positions with the side to move's masks mine and the other side's theirs
+        """
+        return self.encode(self.cells(mine), self.cells(theirs))
+
+
+class LearnedEvaluation(Evaluation):
+    """
+    Scores positions with a small neural network, or a linear model when it has no hidden layer,
+    trained by train_evaluation to predict who wins. It only knows the board size and rules it was
+    trained for. evaluate_masks scores a whole batch of positions with one matrix multiply per layer,
+    which is much cheaper per position than scoring them one at a time
+    """
+
+    def __init__(self, num_rows: int, num_cols: int, num_pieces_to_win: int,
+                 parameters: Dict[str, np.ndarray]) -> None:
+        """
+        :param parameters: the arrays of the model: mean and scale to standardize the features with,
+        hidden_weights and hidden_bias for the hidden layer if there is one, then output_weights and output_bias
+        """
+        self.encoder = FeatureEncoder(num_rows, num_cols, num_pieces_to_win)
+        self.parameters = {name: np.asarray(array, dtype=np.float64) for name, array in parameters.items()}
+
+    @property
+    def num_hidden(self) -> int:
+        return len(self.parameters['hidden_bias']) if 'hidden_bias' in self.parameters else 0
+
+    def matches(self, num_rows: int, num_cols: int, num_pieces_to_win: int) -> bool:
+        """
+        :return: whether the model was trained for this board size and these rules
+        """
+        encoder = self.encoder
+        return (encoder.num_rows, encoder.num_cols, encoder.num_pieces_to_win) == \
+            (num_rows, num_cols, num_pieces_to_win)
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """
+        :param features: rows of features as returned by FeatureEncoder.encode
+        :return: the predicted result of every position for the side to move, between -1 and 1
+        """
+        return np.tanh(_forward(self.parameters, _standardize(self.parameters, features))[0])
+
+    def evaluate_masks(self, mine: Sequence[int], theirs: Sequence[int]) -> np.ndarray:
+        """
+        :param mine: the mask of the side to move in every position, laid out like BitBoard
+        :param theirs: the mask of the other side in every position
+        :return: the score of every position for the side to move, as integers
+        """
+        return np.rint(self.predict(self.encoder.encode_masks(mine, theirs)) * SCORE_SCALE).astype(np.int64)
+
+    def evaluate(self, the_board: Board, piece: str, other_piece: str, num_pieces_to_win: int) -> int:
+        """
+        :raises: ValueError if the model was trained for another board size or other rules
+        """
+        if not self.matches(the_board.num_rows, the_board.num_cols, num_pieces_to_win):
+            raise ValueError(f'The model was trained for {self.encoder.num_rows}x{self.encoder.num_cols} boards '
+                             f'with {self.encoder.num_pieces_to_win} in a row to win.')
+        mine, theirs = Position(the_board, piece, other_piece, num_pieces_to_win).masks
+        return int(self.evaluate_masks([mine], [theirs])[0])
+
+    def save(self, path: str, **details: object) -> None:
+        """
+        Write the model to a NumPy .npz file, replacing it in one step so a player loading it never sees half a file
+        :param details: anything else worth keeping with the model, such as how it was trained
+        :return: None
+        """
+        encoder = self.encoder
+        temporary_path = f'{path}.tmp{os.getpid()}'
+        with open(temporary_path, 'wb') as model_file:
+            np.savez(model_file, format_version=FORMAT_VERSION,
+                     geometry=np.array([encoder.num_rows, encoder.num_cols, encoder.num_pieces_to_win]),
+                     details=np.array(json.dumps(details)), **self.parameters)
+        os.replace(temporary_path, path)
+
+
+@functools.lru_cache(maxsize=None)
+def load_model(path: str) -> LearnedEvaluation:
+    """
+    :param path: a file written by LearnedEvaluation.save
+    :return: the model, read once per process
+    :raises: LearnedModelError if the file is not a model
+    """
+    try:
+        with np.load(path) as arrays:
+            if int(arrays['format_version']) != FORMAT_VERSION:
+                raise LearnedModelError(f'{path} is version {int(arrays["format_version"])} but only version '
+                                        f'{FORMAT_VERSION} can be read')
+            num_rows, num_cols, num_pieces_to_win = (int(value) for value in arrays['geometry'])
+            parameters = {name: arrays[name] for name in arrays.files
+                          if name not in ('format_version', 'geometry', 'details')}
+    except (OSError, ValueError, KeyError) as error:
+        raise LearnedModelError(f'{path} is not a learned evaluation: {error}')
+    return LearnedEvaluation(num_rows, num_cols, num_pieces_to_win, parameters)
+
+
+def _standardize(parameters: Dict[str, np.ndarray], features: np.ndarray) -> np.ndarray:
+    return (features - parameters['mean']) / parameters['scale']
+
+
+def _forward(parameters: Dict[str, np.ndarray], inputs: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    :return: the output of the model before the tanh, and what the hidden layer put out if there is one
+    """
+    if 'hidden_weights' not in parameters:
+        return inputs @ parameters['output_weights'] + parameters['output_bias'], None
+    hidden = np.maximum(inputs @ parameters['hidden_weights'] + parameters['hidden_bias'], 0)
+    return hidden @ parameters['output_weights'] + parameters['output_bias'], hidden
+
+
+class TrainingData(NamedTuple):
+    features: np.ndarray  # one row per position, see FeatureEncoder
+    targets: np.ndarray  # how the game ended for the side to move: 1 for a win, -1 for a loss, 0 for a tie
+    num_rows: int
+    num_cols: int
+    num_pieces_to_win: int
+
+
+def read_training_data(records: Iterable[GameRecord], mirror: bool = True) -> TrainingData:
+    """
+    Replay every game and turn every position in it where the game was still going into a training example
+    :param records: finished games, all on the same board with the same rules
+    :param mirror: whether to also add every position with its columns the other way round
+    :return: the features of every position and how the game ended for the side to move
+    :raises: ValueError if there are no games or the games were played on different boards
+    """
+    encoder: Optional[FeatureEncoder] = None
+    first_masks: List[int] = []
+    second_masks: List[int] = []
+    targets: List[float] = []
+    for record in records:
+        if encoder is None:
+            encoder = FeatureEncoder(record.num_rows, record.num_cols, record.num_pieces_to_win)
+        elif (record.num_rows, record.num_cols, record.num_pieces_to_win) != \
+                (encoder.num_rows, encoder.num_cols, encoder.num_pieces_to_win):
+            raise ValueError('Every game has to be played on the same board with the same rules.')
+        # on bitboards Position reads the masks straight off the board
+        game_replay = Replay(record, board_backend='bitboard')
+        first_piece, second_piece = (recorded.piece for recorded in game_replay.players)
+        for ply, the_board in zip(range(record.plies), game_replay.positions()):
+            first_mask, second_mask = Position(the_board, first_piece, second_piece, record.num_pieces_to_win).masks
+            first_masks.append(first_mask)
+            second_masks.append(second_mask)
+            targets.append(0.0 if record.winner is None else 1.0 if record.winner == ply % 2 else -1.0)
+    if encoder is None:
+        raise ValueError('There are no games to learn from.')
+
+    first, second = encoder.cells(first_masks), encoder.cells(second_masks)
+    first_to_move = (first.sum(axis=1) == second.sum(axis=1))[:, None]
+    mine, theirs = np.where(first_to_move, first, second), np.where(first_to_move, second, first)
+    target_array = np.array(targets)
+    if mirror:
+        mine = np.concatenate([mine, encoder.mirror(mine)])
+        theirs = np.concatenate([theirs, encoder.mirror(theirs)])
+        target_array = np.concatenate([target_array, target_array])
+    return TrainingData(encoder.encode(mine, theirs), target_array, encoder.num_rows, encoder.num_cols,
+                        encoder.num_pieces_to_win)
+
+
+class TrainingEpoch(NamedTuple):
+    epoch: int
+    training_loss: float  # the mean squared error on the positions trained on
+    validation_loss: Optional[float]  # the mean squared error on the positions held back, None if there are none
+    seconds: float
+
+
+def train_evaluation(data: TrainingData, num_hidden: int = 32, epochs: int = 20, learning_rate: float = 0.003,
+                     batch_size: int = 256, l2: float = 1e-4, validation_fraction: float = 0.1, seed: int = 0,
+                     on_epoch: Optional[Callable[[TrainingEpoch], None]] = None) -> LearnedEvaluation:
+    """
+    Fit a model to data with mini-batch gradient descent and Adam, on the CPU.
+    The model's tanh output is fit to the targets by mean squared error, with l2 weight decay
+    :param num_hidden: how many units the hidden layer has, 0 for a linear model
+    :param validation_fraction: the share of the positions held back to measure the model on
+    :param on_epoch: called after every pass over the positions
+    :return: the trained model
+    """
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(data.targets))
+    num_validation = int(len(order) * validation_fraction)
+    validation, training = order[:num_validation], order[num_validation:]
+    features = data.features
+    mean = features[training].mean(axis=0)
+    scale = features[training].std(axis=0)
+    scale[scale == 0] = 1
+
+    num_features = features.shape[1]
+    parameters: Dict[str, np.ndarray] = {}
+    if num_hidden:
+        parameters['hidden_weights'] = rng.normal(0, np.sqrt(2 / num_features), (num_features, num_hidden))
+        parameters['hidden_bias'] = np.zeros(num_hidden)
+        parameters['output_weights'] = rng.normal(0, np.sqrt(1 / num_hidden), num_hidden)
+    else:
+        parameters['output_weights'] = np.zeros(num_features)
+    parameters['output_bias'] = np.zeros(())
+    # Adam's running averages of the gradients and of their squares
+    moments = {name: np.zeros_like(array) for name, array in parameters.items()}
+    squares = {name: np.zeros_like(array) for name, array in parameters.items()}
+    beta1, beta2, epsilon = 0.9, 0.999, 1e-8
+    standardized = (features - mean) / scale
+    step = 0
+
+    def loss(rows: np.ndarray) -> float:
+        return float(np.mean((np.tanh(_forward(parameters, standardized[rows])[0]) - data.targets[rows]) ** 2))
+
+    for epoch in range(epochs):
+        start = time.perf_counter()
+        rng.shuffle(training)
+        for batch_start in range(0, len(training), batch_size):
+            rows = training[batch_start:batch_start + batch_size]
+            inputs = standardized[rows]
+            output, hidden = _forward(parameters, inputs)
+            predicted = np.tanh(output)
+            # back through the tanh and the mean squared error
+            output_gradient = 2 * (predicted - data.targets[rows]) * (1 - predicted * predicted) / len(rows)
+            gradients = {'output_bias': output_gradient.sum()}
+            if hidden is None:
+                gradients['output_weights'] = inputs.T @ output_gradient
+            else:
+                gradients['output_weights'] = hidden.T @ output_gradient
+                hidden_gradient = np.outer(output_gradient, parameters['output_weights']) * (hidden > 0)
+                gradients['hidden_weights'] = inputs.T @ hidden_gradient
+                gradients['hidden_bias'] = hidden_gradient.sum(axis=0)
+            step += 1
+            for name, gradient in gradients.items():
+                if name.endswith('weights'):
+                    gradient = gradient + 2 * l2 * parameters[name]
+                moments[name] = beta1 * moments[name] + (1 - beta1) * gradient
+                squares[name] = beta2 * squares[name] + (1 - beta2) * gradient * gradient
+                parameters[name] = parameters[name] - learning_rate * (moments[name] / (1 - beta1 ** step)) / \
+                    (np.sqrt(squares[name] / (1 - beta2 ** step)) + epsilon)
+        if on_epoch is not None:
+            on_epoch(TrainingEpoch(epoch, loss(training), loss(validation) if len(validation) else None,
+                                   time.perf_counter() - start))
+    return LearnedEvaluation(data.num_rows, data.num_cols, data.num_pieces_to_win,
+                             {'mean': mean, 'scale': scale, **parameters})
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Train a learned evaluation on a file of game records
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description='Train a NumPy evaluation on self-play games.')
+    parser.add_argument('records', nargs='+', help='files of game records, see selfplay.py --format records')
+    parser.add_argument('--output', default='evaluation.npz', help='the model file to write')
+    parser.add_argument('--hidden', type=int, default=32, help='units in the hidden layer, 0 for a linear model')
+    parser.add_argument('--epochs', type=int, default=20)
+    parser.add_argument('--learning-rate', type=float, default=0.003)
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--l2', type=float, default=1e-4)
+    parser.add_argument('--validation', type=float, default=0.1, help='the share of positions to hold back')
+    parser.add_argument('--no-mirror', action='store_true', help='do not add the mirror image of every position')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    records = (record for path in args.records for record in read_records(path))
+    try:
+        data = read_training_data(records, mirror=not args.no_mirror)
+    except ValueError as error:
+        parser.error(str(error))
+        return
+    print(f'{len(data.targets)} positions from {data.num_rows}x{data.num_cols} games read in '
+          f'{time.perf_counter() - start:.1f}s')
+
+    def report(epoch: TrainingEpoch) -> None:
+        validation = '' if epoch.validation_loss is None else f', validation loss {epoch.validation_loss:.4f}'
+        print(f'epoch {epoch.epoch + 1}: training loss {epoch.training_loss:.4f}{validation} ({epoch.seconds:.1f}s)')
+
+    model = train_evaluation(data, args.hidden, args.epochs, args.learning_rate, args.batch_size, args.l2,
+                             args.validation, args.seed, report)
+    model.save(args.output, records=args.records, hidden=args.hidden, epochs=args.epochs)
+    print(f'Wrote {args.output}')
+
+
+if __name__ == '__main__':
+    main()
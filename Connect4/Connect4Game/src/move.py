@@ -1,7 +1,9 @@
-from typing import Optional, Any
+from typing import Optional, Any, TYPE_CHECKING
 from .players import player
 from . import board
-from . import game
+
+if TYPE_CHECKING:  # game imports the players, which import this module
+    from . import game
 
 
 class MoveError(Exception):
@@ -39,7 +41,7 @@ class Move(object):
         :param the_board: the board to apply the move to
         :return: None
         """
-        self.row = the_board.add_piece_to_column(self.maker.piece, self.column)
+        self.row = the_board.push_move(self.column, self.maker.piece)
 
     def ends_game(self, the_game: "game.Game") -> bool:
         """
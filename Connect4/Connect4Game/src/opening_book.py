@@ -0,0 +1,276 @@
+import argparse
+import functools
+import mmap
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from .bitboard import BitBoard
+from .board import Board
+from .transposition_table import EXACT, TTEntry, pack_entry, unpack_entry
+
+# the file starts with a header, then num_slots entries of a 64 bit key and a 64 bit
+# transposition_table.pack_entry, all little endian. An entry whose data is 0 is empty
+MAGIC = b'C4BOOK\x00\x00'
+VERSION = 1
+_HEADER = struct.Struct('<8sIIIIIIQQ')
+HEADER_SIZE = 64
+_ENTRY = struct.Struct('<QQ')
+ENTRY_SIZE = _ENTRY.size
+
+
+class OpeningBookError(Exception):
+    pass
+
+
+class BookMove(NamedTuple):
+    column: int
+    score: int  # from the point of view of the side to move, in AlphaBetaAi scores
+    depth: int  # how deep the position was searched to find the move
+
+
+class BookEntry(NamedTuple):
+    """
+    One analysed position, in its canonical orientation
+    """
+    key: int  # Board.canonical_hash of the position
+    depth: int
+    score: int
+    move: int
+
+
+class OpeningBook(object):
+    """
+    A read-only table of analysed positions that is memory-mapped instead of read, so opening
+    it costs nothing and every process that opens the same file shares its pages.
+
+    The table is direct-mapped: a position can only be in the slot its key picks, so a lookup
+    is always exactly one probe whether the position is in the book or not. Positions with more
+    pieces than the book was built for are not even probed.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        :param path: a file written by write_book
+        :raises: OpeningBookError if the file is not an opening book
+        """
+        self.path = path
+        with open(path, 'rb') as book_file:
+            header = book_file.read(HEADER_SIZE)
+            if len(header) < HEADER_SIZE:
+                raise OpeningBookError(f'{path} is too short to be an opening book')
+            (magic, version, self.num_rows, self.num_cols, self.num_pieces_to_win, self.max_plies, _,
+             self.num_slots, self.num_entries) = _HEADER.unpack_from(header)
+            if magic != MAGIC:
+                raise OpeningBookError(f'{path} is not an opening book')
+            if version != VERSION:
+                raise OpeningBookError(f'{path} is version {version} but only version {VERSION} can be read')
+            if self.num_slots & (self.num_slots - 1) or \
+                    os.fstat(book_file.fileno()).st_size != HEADER_SIZE + self.num_slots * ENTRY_SIZE:
+                raise OpeningBookError(f'{path} is damaged')
+            self._mmap = mmap.mmap(book_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._slot_mask = self.num_slots - 1
+
+    def __len__(self) -> int:
+        return self.num_entries
+
+    def __enter__(self) -> "OpeningBook":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def matches(self, num_rows: int, num_cols: int, num_pieces_to_win: int) -> bool:
+        """
+        :return: whether the book was built for this board size and these rules
+        """
+        return (self.num_rows, self.num_cols, self.num_pieces_to_win) == (num_rows, num_cols, num_pieces_to_win)
+
+    def probe(self, key: int) -> Optional[TTEntry]:
+        """
+        :param key: the canonical hash of a position
+        :return: what the book knows about the position, or None if it is not in the book
+        """
+        stored_key, data = _ENTRY.unpack_from(self._mmap, HEADER_SIZE + (key & self._slot_mask) * ENTRY_SIZE)
+        if data == 0 or stored_key != key:
+            return None
+        return unpack_entry(data)
+
+    def lookup(self, the_board: Board) -> Optional[BookMove]:
+        """
+        :param the_board: a board of the size the book was built for
+        :return: the book move for the position on the_board, or None if the book does not have one
+        """
+        if the_board.num_pieces > self.max_plies:
+            return None
+        key, mirrored = the_board.canonical_hash()
+        entry = self.probe(key)
+        if entry is None:
+            return None
+        column = the_board.num_cols - 1 - entry.move if mirrored else entry.move
+        return BookMove(column, entry.score, entry.depth)
+
+
+@functools.lru_cache(maxsize=None)
+def load_book(path: str) -> OpeningBook:
+    """
+    :param path: the file of an opening book
+    :return: the book, opened once per process no matter how many players ask for it
+    """
+    return OpeningBook(path)
+
+
+def write_book(path: str, num_rows: int, num_cols: int, num_pieces_to_win: int, max_plies: int,
+               entries: Iterable[BookEntry], num_slots: Optional[int] = None) -> int:
+    """
+    Write an opening book. When two positions want the same slot the deeper analysed one is kept.
+    The file is written next to path and moved over it, so processes reading the old book are not disturbed
+    :param path: where to write the book
+    :param num_rows: the rows of the board the positions are on
+    :param num_cols: the columns of the board the positions are on
+    :param num_pieces_to_win: the rules the positions were analysed with
+    :param max_plies: the most pieces any position in entries has
+    :param entries: the analysed positions
+    :param num_slots: the size of the table, rounded up to a power of two. Defaults to eight times the entries,
+    which at 16 bytes a slot keeps all but a few percent of positions
+    :return: how many entries made it into the book
+    """
+    entries = list(entries)
+    if num_slots is None:
+        num_slots = 8 * len(entries)
+    num_slots = 1 << max(0, (max(1, num_slots) - 1).bit_length())
+    slots: Dict[int, BookEntry] = {}
+    for entry in entries:
+        slot = entry.key & (num_slots - 1)
+        old = slots.get(slot)
+        if old is None or entry.depth > old.depth:
+            slots[slot] = entry
+
+    table = bytearray(num_slots * ENTRY_SIZE)
+    for slot, entry in slots.items():
+        _ENTRY.pack_into(table, slot * ENTRY_SIZE, entry.key, pack_entry(entry.depth, EXACT, entry.score, entry.move))
+    header = _HEADER.pack(MAGIC, VERSION, num_rows, num_cols, num_pieces_to_win, max_plies, 0,
+                          num_slots, len(slots))
+    temporary_path = f'{path}.tmp{os.getpid()}'
+    with open(temporary_path, 'wb') as book_file:
+        book_file.write(header.ljust(HEADER_SIZE, b'\x00'))
+        book_file.write(table)
+    os.replace(temporary_path, path)
+    return len(slots)
+
+
+def board_from_moves(moves: Sequence[int], num_rows: int, num_cols: int) -> Board:
+    """
+    :param moves: the columns played, starting with the first player
+    :return: a board with X and O taking turns playing moves
+    """
+    board = BitBoard(num_rows, num_cols, '*')
+    for turn, column in enumerate(moves):
+        board.push_move(column, 'XO'[turn % 2])
+    return board
+
+
+def opening_positions(num_rows: int, num_cols: int, num_pieces_to_win: int, max_plies: int) \
+        -> Iterator[Tuple[int, ...]]:
+    """
+    :return: a move sequence for every position with at most max_plies pieces that nobody has won yet,
+    once per position and its mirror image
+    """
+    seen = set()
+    frontier: List[Tuple[int, ...]] = [()]
+    for plies in range(max_plies + 1):
+        next_frontier = []
+        for moves in frontier:
+            board = board_from_moves(moves, num_rows, num_cols)
+            key = board.canonical_hash()[0]
+            if key in seen:
+                continue
+            seen.add(key)
+            yield moves
+            if plies == max_plies:
+                continue
+            for column in range(num_cols):
+                if board.is_column_full(column):
+                    continue
+                row = board.push_move(column, 'XO'[plies % 2])
+                if board.count_max_matches(row, column) < num_pieces_to_win and not board.is_full:
+                    next_frontier.append(moves + (column,))
+                board.pop_move()
+        frontier = next_frontier
+
+
+class _Analysis(NamedTuple):
+    moves: Tuple[int, ...]
+    num_rows: int
+    num_cols: int
+    num_pieces_to_win: int
+    max_depth: int
+    time_budget: float
+
+
+def analyse_position(analysis: _Analysis) -> BookEntry:
+    """
+    Search one position with AlphaBetaAi
+    :param analysis: the position and how long to search it
+    :return: the best move found, flipped to match the canonical hash
+    """
+    from .players.alpha_beta_ai import AlphaBetaAi
+    from .transposition_table import TranspositionTable
+    board = board_from_moves(analysis.moves, analysis.num_rows, analysis.num_cols)
+    pieces = 'XO' if len(analysis.moves) % 2 == 0 else 'OX'
+    searcher = AlphaBetaAi('Book', pieces[0], time_budget=analysis.time_budget, max_depth=analysis.max_depth,
+                           verbose=False, transposition_table=TranspositionTable(1 << 22))
+    searcher.opponent = AlphaBetaAi('Opponent', pieces[1], searcher, verbose=False)
+    stats = searcher.search(board, analysis.num_pieces_to_win)
+    key, mirrored = board.canonical_hash()
+    return BookEntry(key, stats.depth, stats.score, board.num_cols - 1 - stats.column if mirrored else stats.column)
+
+
+def build_book(num_rows: int, num_cols: int, num_pieces_to_win: int, max_plies: int, max_depth: int,
+               time_budget: float = 60.0, workers: Optional[int] = None) -> List[BookEntry]:
+    """
+    Analyse every opening position across a pool of processes
+    :param max_plies: the most pieces a position in the book may have
+    :param max_depth: how deep to search every position
+    :param time_budget: the most seconds to spend on one position
+    :param workers: how many processes to use, None for one per core and 1 to analyse in this process
+    :return: an entry for every position
+    """
+    analyses = [_Analysis(moves, num_rows, num_cols, num_pieces_to_win, max_depth, time_budget)
+                for moves in opening_positions(num_rows, num_cols, num_pieces_to_win, max_plies)]
+    if workers == 1:
+        return list(map(analyse_position, analyses))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(analyse_position, analyses, chunksize=4))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Build an opening book from the command line
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description='Analyse every opening position and save the best moves.')
+    parser.add_argument('output', help='the book file to write')
+    parser.add_argument('--rows', type=int, default=6)
+    parser.add_argument('--cols', type=int, default=7)
+    parser.add_argument('--pieces-to-win', type=int, default=4)
+    parser.add_argument('--plies', type=int, default=4, help='the most pieces a position in the book may have')
+    parser.add_argument('--depth', type=int, default=10, help='how deep to search every position')
+    parser.add_argument('--time-budget', type=float, default=60.0, help='the most seconds to spend on a position')
+    parser.add_argument('--workers', type=int, default=None, help='defaults to one per core')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    entries = build_book(args.rows, args.cols, args.pieces_to_win, args.plies, args.depth,
+                         args.time_budget, args.workers)
+    written = write_book(args.output, args.rows, args.cols, args.pieces_to_win, args.plies, entries)
+    print(f'Analysed {len(entries)} positions in {time.perf_counter() - start:.1f}s, '
+          f'wrote {written} to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
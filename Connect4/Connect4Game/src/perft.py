@@ -0,0 +1,224 @@
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from .board import Board
+from .game import BOARD_BACKENDS, Game
+from .solver import InvalidPositionError, parse_moves
+
+# the nodes, wins and draws at every depth from the empty 6x7 board with 4 in a row to win,
+# the first player moving first. Every backend has to agree with them
+KNOWN_COUNTS_6X7: Tuple[Tuple[int, int, int], ...] = (
+    (7, 0, 0),
+    (49, 0, 0),
+    (343, 0, 0),
+    (2401, 0, 0),
+    (16807, 0, 0),
+    (117649, 0, 0),
+    (823536, 13032, 0),
+    (5673234, 44430, 0),
+    (39394572, 1086882, 0),
+)
+
+
+class PerftCounts(NamedTuple):
+    """
+    What was found at one depth of the game tree
+    """
+    nodes: int  # positions reached by that many moves without the game ending before them
+    wins: int  # of those, the ones where the last move won the game
+    draws: int  # of those, the ones where the last move filled the board without winning
+
+
+class PerftResult(NamedTuple):
+    backend: str
+    counts: List[PerftCounts]  # counts[0] is one move from the root
+    seconds: float
+
+    @property
+    def nodes(self) -> int:
+        return sum(counts.nodes for counts in self.counts)
+
+    @property
+    def nodes_per_sec(self) -> float:
+        return self.nodes / self.seconds if self.seconds > 0 else float('inf')
+
+
+class PerftJob(NamedTuple):
+    """
+    The subtree under one root move, small enough to send to another process
+    """
+    backend: str
+    num_rows: int
+    num_cols: int
+    num_pieces_to_win: int
+    moves: Tuple[int, ...]  # the moves from the empty board to the root
+    column: int  # the root move
+    depth: int  # counting the root move
+    pieces: str = 'XO'
+
+
+def root_board(backend: str, num_rows: int, num_cols: int, num_pieces_to_win: int, moves: Sequence[int],
+               pieces: str = 'XO') -> Board:
+    """
+    :param backend: one of BOARD_BACKENDS
+    :param moves: the columns played from the empty board, the first player playing first
+    :return: a board with moves played on it
+    :raises: InvalidPositionError if a move is not on the board, goes in a full column or ends the game
+    """
+    board = BOARD_BACKENDS[backend](num_rows, num_cols, ' ')
+    for ply, column in enumerate(moves):
+        if not board.is_column_in_bounds(column) or board.is_column_full(column):
+            raise InvalidPositionError(f'Move {ply + 1} in column {column + 1} cannot be played.')
+        row = board.add_piece_to_column(pieces[ply % 2], column)
+        if board.count_max_matches(row, column) >= num_pieces_to_win or \
+                board.num_pieces == num_rows * num_cols:
+            raise InvalidPositionError(f'The game is over after move {ply + 1}.')
+    return board
+
+
+def _perft(board: Board, depth: int, num_pieces_to_win: int, pieces: str, ply: int,
+           nodes: List[int], wins: List[int], draws: List[int]) -> None:
+    piece = pieces[board.num_pieces % 2]
+    num_spots = board.num_rows * board.num_cols
+    for column in range(board.num_cols):
+        if board.is_column_full(column):
+            continue
+        row = board.add_piece_to_column(piece, column)
+        nodes[ply] += 1
+        if board.count_max_matches(row, column) >= num_pieces_to_win:
+            wins[ply] += 1
+        elif board.num_pieces == num_spots:
+            draws[ply] += 1
+        elif depth > 1:
+            _perft(board, depth - 1, num_pieces_to_win, pieces, ply + 1, nodes, wins, draws)
+        board.remove_piece_from_position(row, column)
+
+
+def perft(board: Board, depth: int, num_pieces_to_win: int, pieces: str = 'XO') -> List[PerftCounts]:
+    """
+    Play out every sequence of up to depth moves from board, not going on from positions where the game ended.
+    Only the Board operations the game itself uses are called, so it measures and checks the rules engine
+    :param board: the root position, which should not have ended yet. It is the same again afterwards
+    :param depth: how many moves deep to go
+    :param num_pieces_to_win: how many pieces in a row win
+    :param pieces: the piece of the first player then the second, the side to move is picked by num_pieces
+    :return: the counts at every depth, the first being one move from the root
+    """
+    nodes, wins, draws = [0] * depth, [0] * depth, [0] * depth
+    if depth > 0:
+        _perft(board, depth, num_pieces_to_win, pieces, 0, nodes, wins, draws)
+    return [PerftCounts(*counts) for counts in zip(nodes, wins, draws)]
+
+
+def run_job(job: PerftJob) -> List[PerftCounts]:
+    """
+    :return: the counts of the subtree under job's root move, the first being the root move itself
+    """
+    board = root_board(job.backend, job.num_rows, job.num_cols, job.num_pieces_to_win, job.moves, job.pieces)
+    row = board.add_piece_to_column(job.pieces[board.num_pieces % 2], job.column)
+    if board.count_max_matches(row, job.column) >= job.num_pieces_to_win:
+        return [PerftCounts(1, 1, 0)] + [PerftCounts(0, 0, 0)] * (job.depth - 1)
+    if board.num_pieces == job.num_rows * job.num_cols:
+        return [PerftCounts(1, 0, 1)] + [PerftCounts(0, 0, 0)] * (job.depth - 1)
+    return [PerftCounts(1, 0, 0)] + perft(board, job.depth - 1, job.num_pieces_to_win, job.pieces)
+
+
+def split_perft(backend: str, num_rows: int, num_cols: int, num_pieces_to_win: int, moves: Sequence[int],
+                depth: int, workers: Optional[int] = None, pieces: str = 'XO') -> PerftResult:
+    """
+    Run perft with the subtree of every root move in its own job, spread over processes
+    :param workers: how many processes to use, one per core if None. 1 runs every job in this process
+    :return: the summed counts, timed including starting the processes
+    :raises: InvalidPositionError if moves is not a position the game can go on from
+    """
+    start = time.perf_counter()
+    board = root_board(backend, num_rows, num_cols, num_pieces_to_win, moves, pieces)
+    jobs = [PerftJob(backend, num_rows, num_cols, num_pieces_to_win, tuple(moves), column, depth, pieces)
+            for column in range(num_cols) if not board.is_column_full(column)] if depth > 0 else []
+    if workers == 1:
+        results = list(map(run_job, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(run_job, jobs))
+    counts = [PerftCounts(*map(sum, zip(*at_depth))) for at_depth in zip(*results)] if results else \
+        [PerftCounts(0, 0, 0)] * depth
+    return PerftResult(backend, counts, time.perf_counter() - start)
+
+
+def check_counts(result: PerftResult, known: Sequence[Tuple[int, int, int]]) -> Optional[int]:
+    """
+    :return: the first depth, counted from 1, where result disagrees with known, or None if it agrees
+    as far as both go
+    """
+    for depth, (counts, known_counts) in enumerate(zip(result.counts, known), start=1):
+        if tuple(counts) != tuple(known_counts):
+            return depth
+    return None
+
+
+def format_result(result: PerftResult) -> str:
+    lines = [f'{"depth":>5} {"nodes":>14} {"wins":>12} {"draws":>12}']
+    lines += [f'{depth:>5} {counts.nodes:>14,} {counts.wins:>12,} {counts.draws:>12,}'
+              for depth, counts in enumerate(result.counts, start=1)]
+    lines.append(f'{result.backend}: {result.nodes:,} nodes in {result.seconds:.2f}s, '
+                 f'{result.nodes_per_sec:,.0f} nodes/sec')
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Count the game tree from a position on every backend asked for and check the counts
+    :return: 1 if the backends disagree with each other or with the known counts, 0 otherwise
+    """
+    parser = argparse.ArgumentParser(description='Count every move sequence to a depth to check and time the rules.')
+    parser.add_argument('moves', nargs='?', default='',
+                        help='the columns played before the root counted from 1, like 4453, or 10,4,4 on wide boards')
+    parser.add_argument('--depth', type=int, default=6)
+    parser.add_argument('--backend', choices=list(BOARD_BACKENDS) + ['all'], default='all')
+    parser.add_argument('--config', default='config_files/connect4_config.txt',
+                        help='a configuration file with the board size and rules')
+    parser.add_argument('--rows', type=int)
+    parser.add_argument('--cols', type=int)
+    parser.add_argument('--pieces-to-win', type=int)
+    parser.add_argument('--workers', type=int, default=None, help='defaults to one per core, 1 runs in this process')
+    args = parser.parse_args(argv)
+
+    config = Game.read_config_file(args.config)
+    num_rows = args.rows or int(config['num_rows'])
+    num_cols = args.cols or int(config['num_cols'])
+    num_pieces_to_win = args.pieces_to_win or int(config['num_pieces_to_win'])
+    backends = list(BOARD_BACKENDS) if args.backend == 'all' else [args.backend]
+    try:
+        moves = parse_moves(args.moves)
+        results: Dict[str, PerftResult] = {}
+        for backend in backends:
+            results[backend] = split_perft(backend, num_rows, num_cols, num_pieces_to_win, moves, args.depth,
+                                           args.workers)
+            print(format_result(results[backend]))
+    except InvalidPositionError as error:
+        parser.error(str(error))
+        return 2
+
+    failed = False
+    if (num_rows, num_cols, num_pieces_to_win) == (6, 7, 4) and not moves:
+        for backend, result in results.items():
+            depth = check_counts(result, KNOWN_COUNTS_6X7)
+            if depth is not None:
+                print(f'MISMATCH {backend}: depth {depth} should be {KNOWN_COUNTS_6X7[depth - 1]}')
+                failed = True
+        checked = min(args.depth, len(KNOWN_COUNTS_6X7))
+        if not failed:
+            print(f'Every backend matches the known counts to depth {checked}.')
+    first, *others = results.values()
+    for result in others:
+        depth = check_counts(result, first.counts)
+        if depth is not None:
+            print(f'MISMATCH {result.backend}: depth {depth} differs from {first.backend}')
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
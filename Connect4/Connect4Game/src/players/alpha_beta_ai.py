@@ -0,0 +1,449 @@
+import threading
+import time
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple, Union
+from Connect4Game.src.players import human_player, player, random_ai
+from Connect4Game.src.transposition_table import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+from Connect4Game.src.opening_book import OpeningBook, load_book
+from Connect4Game.src.tablebase import Tablebase, TablebaseEntry, load_tablebase
+from Connect4Game.src.evaluation import Evaluation, load_evaluation
+from .. import move, board
+
+
+class SearchStats(NamedTuple):
+    depth: int  # the deepest search that finished
+    nodes: int
+    seconds: float
+    score: int
+    column: int
+    from_book: bool = False
+    pondered_seconds: float = 0.0  # how long the position was searched during the opponent's turn
+    from_tablebase: bool = False
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.seconds if self.seconds > 0 else float(self.nodes)
+
+
+class _SearchTimeout(Exception):
+    pass
+
+
+class _Pondering(object):
+    """
+    Searches the position after each likely reply of the opponent in a background thread,
+    most likely reply first, for up to the searcher's time budget each
+    """
+
+    def __init__(self, searcher: "AlphaBetaAi", the_board: "board.Board", num_pieces_to_win: int,
+                 replies: List[int]) -> None:
+        self.searcher = searcher
+        self.board = the_board
+        self.num_pieces_to_win = num_pieces_to_win
+        self.replies = replies
+        # what was found for the position after each reply, by its zobrist hash
+        self.results: Dict[int, SearchStats] = {}
+        self._thread = threading.Thread(target=self._run, name=f'{searcher.name} pondering', daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        the_board = self.board
+        for column in self.replies:
+            if self.searcher._stop_requested:
+                break
+            row = the_board.push_move(column, self.searcher.opponent.piece)
+            if the_board.count_max_matches(row, column) < self.num_pieces_to_win and \
+                    the_board.num_pieces < the_board.num_rows * the_board.num_cols:
+                stats = self.searcher.search(the_board, self.num_pieces_to_win)
+                if stats.depth > 0:
+                    self.results[the_board.zobrist_hash] = stats
+            the_board.pop_move()
+
+    def stop(self) -> Dict[int, SearchStats]:
+        """
+        Stop searching, keeping the deepest finished search of the reply being searched
+        :return: what was found for the position after each reply, by its zobrist hash
+        """
+        self.searcher._stop_requested = True
+        self._thread.join()
+        return self.results
+
+
+class AlphaBetaAi(random_ai.RandomAi):
+    """
+    A player that searches the game tree with negamax and alpha-beta pruning.
+    It deepens the search one ply at a time until it runs out of time_budget seconds
+    (or reaches max_depth) and plays the best move of the deepest search that finished.
+    Searched positions are cached in transposition_table, which lives for as long as the
+    player does and can be shared with other players.
+    Positions in opening_book are played from the book without searching. The book can be
+    given as a path, in which case it is only opened when the player first needs it.
+    On boards a tablebase was made for, the best move is read from the tablebase instead, which
+    can be given as a path too.
+    Positions the search stops at are scored by evaluation, see evaluation.load_evaluation.
+
+    A pondering player keeps searching in a background thread after making its move: it searches the
+    position after each of the opponent's replies, the one its own search expected first. When the opponent
+    has moved the search of the reply that was made is picked up where it left off, with the time spent
+    pondering it taken off the time budget, and the searches of the other replies are thrown away.
+    The transposition table is shared with the background search, so the entries it stored are found again.
+    By default a player only ponders against a HumanPlayer, who leaves the CPU idle while they think.
+    """
+
+    WIN_SCORE = 1_000_000
+    # scores further than this from 0 are wins or losses, everything closer is a guess
+    MAX_EVALUATION = WIN_SCORE // 2
+    # how many moves to try between looking at the clock, every node tries one move per column
+    MOVES_BETWEEN_TIME_CHECKS = 8192
+
+    @classmethod
+    def get_valid_name(cls, players: List["player.Player"], case_matters: bool = False) -> str:
+        return f'AlphaBetaAi {len(players) + 1}'
+
+    def __init__(self, name: str, piece: str, opponent: Optional["player.Player"] = None,
+                 time_budget: float = 1.0, max_depth: Optional[int] = None, verbose: bool = True,
+                 transposition_table: Optional[TranspositionTable] = None,
+                 opening_book: Optional[Union[str, OpeningBook]] = None,
+                 evaluation: Optional[Union[str, Mapping[str, float], Evaluation]] = None,
+                 ponder: Optional[bool] = None, tablebase: Optional[Union[str, Tablebase]] = None) -> None:
+        """
+        :param ponder: whether to search during the opponent's turn, None to only do it against a HumanPlayer
+        :param tablebase: the tablebase to play from, or its path
+        """
+        super().__init__(name, piece, opponent)
+        self.evaluation = load_evaluation(evaluation)
+        self.transposition_table = TranspositionTable() if transposition_table is None else transposition_table
+        self.time_budget = time_budget
+        self.max_depth = max_depth
+        self.verbose = verbose
+        self.last_search: Optional[SearchStats] = None
+        self._opening_book = opening_book
+        self._tablebase = tablebase
+        self._nodes = 0
+        self._deadline: Optional[float] = None
+        self._nodes_between_time_checks = 1
+        self._num_pieces_to_win = 0
+        self._column_order: List[int] = []
+        self.ponder = ponder
+        self._pondering: Optional[_Pondering] = None
+        self._stop_requested = False
+
+    def take_turn(self, the_board: "board.Board", num_pieces_to_win: int) -> "move.Move":
+        """
+        Make the best move found, then start pondering if the player ponders
+        :return: the move made
+        """
+        player_move = super().take_turn(the_board, num_pieces_to_win)
+        ponder = self.ponder if self.ponder is not None else isinstance(self.opponent, human_player.HumanPlayer)
+        game_goes_on = the_board.count_max_matches(player_move.row, player_move.column) < num_pieces_to_win and \
+            the_board.num_pieces < the_board.num_rows * the_board.num_cols  # type: ignore[arg-type]
+        if ponder and game_goes_on:
+            self.start_pondering(the_board, num_pieces_to_win)
+        return player_move
+
+    def start_pondering(self, the_board: "board.Board", num_pieces_to_win: int) -> None:
+        """
+        Start searching the replies to the position on the_board, with the opponent to move, in the background.
+        A copy of the_board is searched, so the_board can be played on straight away
+        :param the_board: the board after this player's move
+        :param num_pieces_to_win: how many pieces in a row win the game
+        :return: None
+        """
+        self.stop_pondering()
+        searcher = AlphaBetaAi(f'{self.name} (pondering)', self.piece, self.opponent, self.time_budget,
+                               self.max_depth, verbose=False, transposition_table=self.transposition_table,
+                               opening_book=self.opening_book, evaluation=self.evaluation, ponder=False,
+                               tablebase=self.tablebase)
+        # the copy hashes the same as the_board, so the table entries are shared
+        ponder_board = the_board.copy()
+        replies = self.ordered_columns(ponder_board)
+        key, mirrored = ponder_board.canonical_hash()
+        entry = self.transposition_table.probe(key)
+        if entry is not None and entry.move is not None:
+            expected = ponder_board.num_cols - 1 - entry.move if mirrored else entry.move
+            if expected in replies:
+                replies.remove(expected)
+                replies.insert(0, expected)
+        self._pondering = _Pondering(searcher, ponder_board, num_pieces_to_win, replies)
+
+    def stop_pondering(self) -> Dict[int, SearchStats]:
+        """
+        Stop pondering, if the player is
+        :return: what was found for the position after each reply searched, by the zobrist hash of the position
+        """
+        if self._pondering is None:
+            return {}
+        results = self._pondering.stop()
+        self._pondering = None
+        return results
+
+    def close(self) -> None:
+        """
+        Stop pondering, so no search goes on after the game is over
+        :return: None
+        """
+        self.stop_pondering()
+
+    def get_move(self, the_board: "board.Board", num_pieces_to_win: int) -> "move.Move":
+        """
+        Search for the best move within the time budget
+        :return: the best move found
+        """
+        self.last_search = self.search(the_board, num_pieces_to_win)
+        if self.verbose:
+            print(self.report())
+        return move.Move(self, self.last_search.column)
+
+    @property
+    def opening_book(self) -> Optional[OpeningBook]:
+        """
+        :return: the opening book, opened the first time it is asked for if it was given as a path
+        """
+        if isinstance(self._opening_book, str):
+            self._opening_book = load_book(self._opening_book)
+        return self._opening_book
+
+    @property
+    def tablebase(self) -> Optional[Tablebase]:
+        """
+        :return: the tablebase, opened the first time it is asked for if it was given as a path
+        """
+        if isinstance(self._tablebase, str):
+            self._tablebase = load_tablebase(self._tablebase)
+        return self._tablebase
+
+    def _score_from_tablebase(self, entry: TablebaseEntry) -> int:
+        """
+        :return: the score a search that saw to the end of the game would give entry
+        """
+        if entry.result == 'draw':
+            return 0
+        score = self.WIN_SCORE - entry.plies_to_end
+        return score if entry.result == 'win' else -score
+
+    def report(self) -> str:
+        """
+        :return: a description of the last search
+        """
+        if self.last_search is None:
+            return f'{self.name} has not searched yet.'
+        stats = self.last_search
+        if stats.from_book:
+            return f'{self.name} played column {stats.column} from the opening book ' \
+                   f'(searched to depth {stats.depth} when the book was built).'
+        if stats.from_tablebase:
+            if stats.score == 0:
+                return f'{self.name} played column {stats.column} from the tablebase, which says the game is a draw.'
+            plies = self.WIN_SCORE - abs(stats.score)
+            return f'{self.name} played column {stats.column} from the tablebase, ' \
+                   f'which says it {"wins" if stats.score > 0 else "loses"} in {plies} plies.'
+        table = self.transposition_table
+        hit_rate = 100 * table.hits / max(1, table.hits + table.misses)
+        pondered = f' after pondering for {stats.pondered_seconds:.2f}s' if stats.pondered_seconds else ''
+        return f'{self.name} searched to depth {stats.depth}: {stats.nodes} nodes in {stats.seconds:.2f}s' \
+               f'{pondered} ({stats.nodes_per_second:.0f} nodes/sec, {hit_rate:.0f}% table hits, ' \
+               f'{table.evictions} evictions)'
+
+    def search(self, the_board: "board.Board", num_pieces_to_win: int) -> SearchStats:
+        """
+        Run iterative deepening from the_board with self to move.
+        If the position was searched while pondering, the search carries on from the depth pondering reached.
+        The board is left exactly as it was found
+        :param the_board: the board to search from
+        :param num_pieces_to_win: how many pieces in a row win the game
+        :return: the result of the deepest search that finished
+        """
+        pondered = self.stop_pondering().get(the_board.zobrist_hash)
+        if pondered is not None and pondered.from_book:
+            return pondered
+        start = time.perf_counter()
+        tablebase = self.tablebase
+        if tablebase is not None and tablebase.matches(the_board.num_rows, the_board.num_cols, num_pieces_to_win):
+            found = tablebase.best_move(the_board, self.piece)
+            if found is not None:
+                return SearchStats(0, 0, time.perf_counter() - start, self._score_from_tablebase(found[1]),
+                                   found[0], from_tablebase=True)
+        book = self.opening_book
+        if book is not None and book.matches(the_board.num_rows, the_board.num_cols, num_pieces_to_win):
+            book_move = book.lookup(the_board)
+            if book_move is not None and not the_board.is_column_full(book_move.column):
+                return SearchStats(book_move.depth, 0, time.perf_counter() - start, book_move.score,
+                                   book_move.column, from_book=True)
+        self._nodes = 0
+        self._nodes_between_time_checks = max(1, self.MOVES_BETWEEN_TIME_CHECKS // the_board.num_cols)
+        self._num_pieces_to_win = num_pieces_to_win
+        self._column_order = self.ordered_columns(the_board, include_full_columns=True)
+        history_length = len(the_board.history)
+        empty_spots = the_board.num_rows * the_board.num_cols - the_board.num_pieces
+        max_depth = empty_spots if self.max_depth is None else min(self.max_depth, empty_spots)
+
+        root_moves = self.ordered_columns(the_board)
+        stats = SearchStats(0, 0, 0.0, 0, root_moves[0])
+        first_depth = 1
+        # the pondering counts towards the time budget
+        budget_end = start + self.time_budget
+        if pondered is not None:
+            stats = pondered._replace(pondered_seconds=pondered.seconds)
+            first_depth = pondered.depth + 1
+            root_moves.remove(pondered.column)
+            root_moves.insert(0, pondered.column)
+            budget_end -= pondered.seconds
+            if abs(pondered.score) > self.WIN_SCORE - the_board.num_rows * the_board.num_cols:
+                first_depth = max_depth + 1
+        # even the first depth is cut short, stats then still holds a move to play
+        self._deadline = budget_end
+        for depth in range(first_depth, max_depth + 1):
+            if time.perf_counter() >= budget_end:
+                break
+            try:
+                column, score = self._search_root(the_board, root_moves, depth)
+            except _SearchTimeout:
+                while len(the_board.history) > history_length:
+                    the_board.pop_move()
+                break
+            stats = SearchStats(depth, self._nodes, time.perf_counter() - start, score, column,
+                                pondered_seconds=stats.pondered_seconds)
+            root_moves.remove(column)
+            root_moves.insert(0, column)
+            if abs(score) > self.WIN_SCORE - the_board.num_rows * the_board.num_cols or \
+                    time.perf_counter() >= budget_end:
+                break
+        return stats._replace(nodes=self._nodes, seconds=time.perf_counter() - start)
+
+    @staticmethod
+    def ordered_columns(the_board: "board.Board", include_full_columns: bool = False) -> List[int]:
+        """
+        :param the_board: the board to find moves on
+        :param include_full_columns: whether to also return the columns that are full
+        :return: the columns that are not full, closest to the center first
+        """
+        center = (the_board.num_cols - 1) / 2
+        columns = sorted(range(the_board.num_cols), key=lambda column: abs(column - center))
+        return [column for column in columns if include_full_columns or not the_board.is_column_full(column)]
+
+    def _search_root(self, the_board: "board.Board", root_moves: List[int], depth: int) -> Tuple[int, int]:
+        alpha = -self.WIN_SCORE - 1
+        beta = self.WIN_SCORE + 1
+        best_column = root_moves[0]
+        for column in root_moves:
+            row = the_board.push_move(column, self.piece)
+            if the_board.count_max_matches(row, column) >= self._num_pieces_to_win:
+                score = self.WIN_SCORE - 1
+            else:
+                score = -self._negamax(the_board, depth - 1, -beta, -alpha, 1, self.opponent.piece, self.piece)
+            the_board.pop_move()
+            if score > alpha:
+                alpha = score
+                best_column = column
+        return best_column, alpha
+
+    def _negamax(self, the_board: "board.Board", depth: int, alpha: int, beta: int, ply: int,
+                 piece: str, other_piece: str) -> int:
+        """
+        :param the_board: the board to search
+        :param depth: how many more plies to search
+        :param alpha: the score the side to move is already guaranteed
+        :param beta: the score the opponent is already guaranteed, as seen by the side to move
+        :param ply: how many plies have been played since the root
+        :param piece: the piece of the side to move
+        :param other_piece: the piece of the other side
+        :return: the score of the position for the side to move
+        """
+        self._visit()
+        columns = [column for column in self._column_order if not the_board.is_column_full(column)]
+        if not columns:
+            return 0  # tie game
+
+        # winning right away is always best, and finding it first saves searching the other moves
+        for column in columns:
+            row = the_board.push_move(column, piece)
+            wins = the_board.count_max_matches(row, column) >= self._num_pieces_to_win
+            the_board.pop_move()
+            if wins:
+                return self.WIN_SCORE - ply - 1
+
+        if depth <= 0:
+            return max(-self.MAX_EVALUATION, min(self.MAX_EVALUATION, self.evaluate(the_board, piece, other_piece)))
+
+        original_alpha = alpha
+        key, mirrored = the_board.canonical_hash()
+        entry = self.transposition_table.probe(key)
+        if entry is not None:
+            if entry.move is not None:
+                table_column = the_board.num_cols - 1 - entry.move if mirrored else entry.move
+                if table_column in columns:
+                    columns.remove(table_column)
+                    columns.insert(0, table_column)
+            if entry.depth >= depth:
+                score = self._score_from_table(entry.score, ply)
+                if entry.flag == EXACT:
+                    return score
+                elif entry.flag == LOWER_BOUND:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
+                if alpha >= beta:
+                    return score
+
+        best = -self.WIN_SCORE - 1
+        best_column = columns[0]
+        for column in columns:
+            the_board.push_move(column, piece)
+            score = -self._negamax(the_board, depth - 1, -beta, -alpha, ply + 1, other_piece, piece)
+            the_board.pop_move()
+            if score > best:
+                best = score
+                best_column = column
+                if score > alpha:
+                    alpha = score
+                    if alpha >= beta:
+                        break
+
+        if best <= original_alpha:
+            flag = UPPER_BOUND
+        elif best >= beta:
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self.transposition_table.store(key, depth, flag, self._score_to_table(best, ply),
+                                       the_board.num_cols - 1 - best_column if mirrored else best_column)
+        return best
+
+    def _visit(self) -> None:
+        """
+        Count a node, and stop the search if it is out of time or has been asked to stop
+        :return: None
+        :raises: _SearchTimeout if the search should stop
+        """
+        self._nodes += 1
+        # pondering is stopped as soon as the opponent moves, so the flag is looked at on every node
+        if self._stop_requested or (self._nodes % self._nodes_between_time_checks == 0 and
+                                    self._deadline is not None and time.perf_counter() > self._deadline):
+            raise _SearchTimeout()
+
+    def _score_to_table(self, score: int, ply: int) -> int:
+        """
+        Win and loss scores count plies from the root, but the same position can be reached
+        at different plies, so the table stores them counting plies from the position instead
+        """
+        if score > self.MAX_EVALUATION:
+            return score + ply
+        elif score < -self.MAX_EVALUATION:
+            return score - ply
+        return score
+
+    def _score_from_table(self, score: int, ply: int) -> int:
+        if score > self.MAX_EVALUATION:
+            return score - ply
+        elif score < -self.MAX_EVALUATION:
+            return score + ply
+        return score
+
+    def evaluate(self, the_board: "board.Board", piece: str, other_piece: str) -> int:
+        """
+        Score a position nobody has won yet from the point of view of piece
+        :param the_board: the board to score
+        :param piece: the piece of the side to move
+        :param other_piece: the piece of the other side
+        :return: the score of the position
+        """
+        return self.evaluation.evaluate(the_board, piece, other_piece, self._num_pieces_to_win)
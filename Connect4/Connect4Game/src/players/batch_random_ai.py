@@ -0,0 +1,24 @@
+from typing import Optional
+import numpy as np
+from Connect4Game.src.batch_board import BatchBoard, BatchPlayer
+
+
+class BatchRandomAi(BatchPlayer):
+    """
+    RandomAi for a whole BatchBoard at once: every game gets a column picked uniformly
+    at random from the columns of that game that are not full
+    """
+
+    def __init__(self, seed: Optional[int] = None) -> None:
+        self.rng = np.random.default_rng(seed)
+
+    def get_moves(self, batch_board: BatchBoard, active: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        :param batch_board: the boards to pick moves on
+        :param active: which games need a move, all of them if None
+        :return: a random column that is not full for every game, 0 for games that are full
+        """
+        # the legal column with the highest random number is a uniform pick among the legal columns
+        weights = self.rng.random((batch_board.num_games, batch_board.num_cols))
+        weights[~batch_board.legal_moves()] = -1
+        return weights.argmax(axis=1)
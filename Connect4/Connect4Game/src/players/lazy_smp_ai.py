@@ -0,0 +1,136 @@
+import os
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import List, Mapping, Optional, Union
+from Connect4Game.src.players import player, random_ai
+from Connect4Game.src.players.alpha_beta_ai import AlphaBetaAi, SearchStats
+from Connect4Game.src.shared_transposition_table import SharedTranspositionTable
+from Connect4Game.src.transposition_table import TranspositionTable
+from Connect4Game.src.opening_book import OpeningBook
+from Connect4Game.src.tablebase import Tablebase
+from Connect4Game.src.evaluation import Evaluation
+from .. import board
+
+
+class _Helper(AlphaBetaAi):
+    """
+    A search run in a helper process. It starts its root moves from a different column than the other
+    searches so they spread out over the tree, and stops as soon as the table says to
+    """
+
+    def __init__(self, worker: int, piece: str, other_piece: str, time_budget: float, max_depth: Optional[int],
+                 transposition_table: SharedTranspositionTable, evaluation: Evaluation) -> None:
+        super().__init__(f'Helper {worker}', piece, random_ai.RandomAi('Opponent', other_piece), time_budget,
+                         max_depth, verbose=False, transposition_table=transposition_table, evaluation=evaluation,
+                         ponder=False)
+        self.worker = worker
+
+    @property  # type: ignore[override]
+    def _stop_requested(self) -> bool:
+        return self.transposition_table.stop  # type: ignore[attr-defined]
+
+    @_stop_requested.setter
+    def _stop_requested(self, stop: bool) -> None:
+        pass  # only the process that started the search stops it
+
+    def ordered_columns(self, the_board: "board.Board",  # type: ignore[override]
+                        include_full_columns: bool = False) -> List[int]:
+        columns = AlphaBetaAi.ordered_columns(the_board, include_full_columns)
+        if include_full_columns or not columns:
+            return columns  # the order moves are tried in below the root stays the same
+        shift = self.worker % len(columns)
+        return columns[shift:] + columns[:shift]
+
+
+def _search_in_worker(the_board: "board.Board", num_pieces_to_win: int, worker: int, piece: str, other_piece: str,
+                      time_budget: float, max_depth: Optional[int], transposition_table: SharedTranspositionTable,
+                      evaluation: Evaluation) -> SearchStats:
+    helper = _Helper(worker, piece, other_piece, time_budget, max_depth, transposition_table, evaluation)
+    return helper.search(the_board, num_pieces_to_win)
+
+
+class LazySmpAi(AlphaBetaAi):
+    """
+    An AlphaBetaAi that searches with Lazy SMP: the same iterative deepening search runs in this process
+    and in workers - 1 helper processes at once, all sharing one SharedTranspositionTable.
+    The searches do not talk to each other besides the table, but each one finds the positions the
+    others already searched there, so together they get deeper than one search would in the same time.
+    When the search in this process is done the helpers are told to stop, and the move of the deepest
+    search that finished is played, this process's search winning ties.
+    Only one search runs unless workers says otherwise, so a player made for an ordinary game or for
+    self-play, which already plays one game per core, does not start any processes.
+    Game.play closes the player once the game is over, which stops the helpers and frees the table.
+    """
+
+    @classmethod
+    def get_valid_name(cls, players: List["player.Player"], case_matters: bool = False) -> str:
+        return f'LazySmpAi {len(players) + 1}'
+
+    def __init__(self, name: str, piece: str, opponent: Optional["player.Player"] = None,
+                 time_budget: float = 1.0, max_depth: Optional[int] = None, verbose: bool = True,
+                 workers: Optional[int] = 1, memory_bytes: int = TranspositionTable.DEFAULT_MEMORY_BYTES,
+                 opening_book: Optional[Union[str, OpeningBook]] = None,
+                 evaluation: Optional[Union[str, Mapping[str, float], Evaluation]] = None,
+                 ponder: Optional[bool] = None, tablebase: Optional[Union[str, Tablebase]] = None) -> None:
+        """
+        :param workers: how many searches to run at once, counting the one in this process. One per core if None
+        :param memory_bytes: how big the shared transposition table is
+        """
+        self.workers = max(1, workers if workers is not None else os.cpu_count() or 1)
+        table = SharedTranspositionTable(memory_bytes) if self.workers > 1 else TranspositionTable(memory_bytes)
+        super().__init__(name, piece, opponent, time_budget, max_depth, verbose, table, opening_book, evaluation,
+                         ponder, tablebase)
+        self.worker_searches: List[SearchStats] = []
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def close(self) -> None:
+        """
+        Stop pondering and the helper processes, and free the shared transposition table
+        :return: None
+        """
+        super().close()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        if isinstance(self.transposition_table, SharedTranspositionTable) and self.transposition_table.owner:
+            self.transposition_table.unlink()
+            self.transposition_table = TranspositionTable(self.transposition_table.memory_bytes)
+
+    def report(self) -> str:
+        """
+        :return: a description of the last search, including how deep every worker got
+        """
+        text = super().report()
+        if len(self.worker_searches) > 1:
+            text += ' [workers reached depths ' + ', '.join(str(stats.depth) for stats in self.worker_searches) + ']'
+        return text
+
+    def search(self, the_board: "board.Board", num_pieces_to_win: int) -> SearchStats:
+        """
+        Search the_board with every worker and combine what they found
+        :return: the result of the deepest search, with the nodes of every search added up
+        """
+        table = self.transposition_table
+        if self.workers == 1 or not isinstance(table, SharedTranspositionTable):
+            stats = super().search(the_board, num_pieces_to_win)
+            self.worker_searches = [stats]
+            return stats
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers - 1)
+        table.stop = False
+        futures: List[Future] = [self._executor.submit(_search_in_worker, the_board, num_pieces_to_win, worker,
+                                                       self.piece, self.opponent.piece, self.time_budget,
+                                                       self.max_depth, table, self.evaluation)
+                                 for worker in range(1, self.workers)]
+        try:
+            stats = super().search(the_board, num_pieces_to_win)
+        finally:
+            table.stop = True
+            helper_searches = [future.result() for future in futures]
+            table.stop = False
+        self.worker_searches = [stats] + helper_searches
+        best = stats
+        for helper_stats in self.worker_searches[1:]:
+            if helper_stats.depth > best.depth:
+                best = helper_stats
+        return best._replace(nodes=sum(search.nodes for search in self.worker_searches), seconds=stats.seconds,
+                             pondered_seconds=stats.pondered_seconds)
@@ -0,0 +1,100 @@
+import importlib.util
+import os
+from typing import Any, List, Optional, Union, TYPE_CHECKING
+from Connect4Game.src.players import player
+from Connect4Game.src.players.alpha_beta_ai import AlphaBetaAi
+from Connect4Game.src.evaluation import Position
+from Connect4Game.src.opening_book import OpeningBook
+from Connect4Game.src.tablebase import Tablebase
+from Connect4Game.src.transposition_table import TranspositionTable
+from .. import board
+
+if TYPE_CHECKING:
+    from Connect4Game.src.learned_evaluation import LearnedEvaluation
+
+# the environment variable naming the model LearnedAi players load when they are not given one
+MODEL_ENVIRONMENT_VARIABLE = 'CONNECT4_MODEL'
+
+
+class LearnedAi(AlphaBetaAi):
+    """
+    An AlphaBetaAi that scores positions with a LearnedEvaluation.
+
+    With batch_leaves, the nodes one ply above the search frontier score all of their leaves with one
+    call to the model instead of one call per leaf: the leaves that win, lose or tie right away are
+    scored like AlphaBetaAi scores them, and the rest go through the model together. The node's score
+    is then exact, as if alpha-beta had searched every leaf, and costs one batch however many leaves it has.
+
+    The model needs numpy, which is only imported once a LearnedAi is made, so the player can be listed
+    with the others without it.
+    """
+
+    @classmethod
+    def check_available(cls, **options: Any) -> None:
+        """
+        :raises: PlayerUnavailableError if numpy is not installed, or if options has no model and
+        the CONNECT4_MODEL environment variable names none
+        """
+        if importlib.util.find_spec('numpy') is None:
+            raise player.PlayerUnavailableError('LearnedAi needs numpy, see the numpy extra of setup.py')
+        if options.get('model') is None and not os.environ.get(MODEL_ENVIRONMENT_VARIABLE):
+            raise player.PlayerUnavailableError(
+                f'LearnedAi needs a model, or a path to one in {MODEL_ENVIRONMENT_VARIABLE}')
+
+    @classmethod
+    def get_valid_name(cls, players: List["player.Player"], case_matters: bool = False) -> str:
+        return f'LearnedAi {len(players) + 1}'
+
+    def __init__(self, name: str, piece: str, opponent: Optional["player.Player"] = None,
+                 time_budget: float = 1.0, max_depth: Optional[int] = None, verbose: bool = True,
+                 model: Optional[Union[str, "LearnedEvaluation"]] = None, batch_leaves: bool = True,
+                 transposition_table: Optional[TranspositionTable] = None,
+                 opening_book: Optional[Union[str, OpeningBook]] = None, ponder: Optional[bool] = None,
+                 tablebase: Optional[Union[str, Tablebase]] = None) -> None:
+        """
+        :param model: the model or the path of a file written by LearnedEvaluation.save.
+        None uses the file named by the CONNECT4_MODEL environment variable
+        :param batch_leaves: whether to score the leaves below a node in one batch
+        :raises: PlayerUnavailableError if there is no model or numpy is not installed, see check_available
+        """
+        self.check_available(model=model)
+        from Connect4Game.src.learned_evaluation import load_model
+        model = model if model is not None else os.environ[MODEL_ENVIRONMENT_VARIABLE]
+        super().__init__(name, piece, opponent, time_budget, max_depth, verbose, transposition_table, opening_book,
+                         load_model(model) if isinstance(model, str) else model, ponder, tablebase)
+        self.batch_leaves = batch_leaves
+
+    def _negamax(self, the_board: "board.Board", depth: int, alpha: int, beta: int, ply: int,
+                 piece: str, other_piece: str) -> int:
+        if depth != 1 or not self.batch_leaves:
+            return super()._negamax(the_board, depth, alpha, beta, ply, piece, other_piece)
+        self._visit()
+        columns = [column for column in self._column_order if not the_board.is_column_full(column)]
+        if not columns:
+            return 0  # tie game
+
+        best = -self.WIN_SCORE - 1
+        leaves_mine: List[int] = []
+        leaves_theirs: List[int] = []
+        for column in columns:
+            self._visit()
+            row = the_board.push_move(column, piece)
+            if the_board.count_max_matches(row, column) >= self._num_pieces_to_win:
+                the_board.pop_move()
+                return self.WIN_SCORE - ply - 1
+            leaf = Position(the_board, other_piece, piece, self._num_pieces_to_win)
+            mine, theirs = leaf.masks
+            the_board.pop_move()
+            full = leaf.geometry.full
+            playable = ((mine | theirs) + (full & ~(full << 1))) & full
+            if not playable:
+                best = max(best, 0)  # the move fills the board
+            elif leaf.threats[0] & playable:
+                best = max(best, -(self.WIN_SCORE - ply - 2))  # the other side wins with its next move
+            else:
+                leaves_mine.append(mine)
+                leaves_theirs.append(theirs)
+        if leaves_mine:
+            scores = self.evaluation.evaluate_masks(leaves_mine, leaves_theirs)  # type: ignore[attr-defined]
+            best = max(best, -max(-self.MAX_EVALUATION, min(self.MAX_EVALUATION, int(scores.min()))))
+        return best
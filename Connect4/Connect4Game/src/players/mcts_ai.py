@@ -0,0 +1,343 @@
+import math
+import random
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from Connect4Game.src.bitboard import BitBoard
+from Connect4Game.src.players import player, random_ai
+from .. import move, board
+
+# the playout policies a MctsAi can use
+PLAYOUT_POLICIES = ('random', 'basic')
+
+
+class MctsStats(NamedTuple):
+    playouts: int  # across every tree
+    seconds: float
+    trees: int
+    column: int
+    visits: Dict[int, int]  # how often each column was tried at the root, summed over the trees
+    win_rate: float  # of the column played, from the point of view of the player
+
+    @property
+    def playouts_per_second_per_core(self) -> float:
+        return self.playouts / self.seconds / self.trees if self.seconds > 0 else float(self.playouts)
+
+
+class _Node(object):
+    """
+    A position in the search tree, reached by mover playing column
+    """
+    __slots__ = ('column', 'mover', 'children', 'untried', 'visits', 'wins', 'winner')
+
+    def __init__(self, column: Optional[int], mover: Optional[str], untried: List[int],
+                 winner: Optional[str] = None) -> None:
+        self.column = column
+        self.mover = mover
+        self.children: Dict[int, "_Node"] = {}
+        self.untried = untried  # the moves that do not have a child yet, in the order they will be expanded
+        self.visits = 0
+        self.wins = 0.0  # from the point of view of mover, a draw counts as half a win
+        # the piece that won with this move, blank_char for a draw, None if the game goes on
+        self.winner = winner
+
+
+class _Tree(object):
+    """
+    One Monte Carlo search tree over a private BitBoard copy of the position
+    """
+
+    def __init__(self, the_board: BitBoard, piece: str, other_piece: str, num_pieces_to_win: int,
+                 exploration: float, playout_policy: str, rng: random.Random,
+                 root: Optional[_Node] = None) -> None:
+        self.board = the_board
+        self.pieces = {piece: other_piece, other_piece: piece}
+        self.piece = piece
+        self.num_pieces_to_win = num_pieces_to_win
+        self.exploration = exploration
+        self.playout_policy = playout_policy
+        self.rng = rng
+        self.root = root if root is not None else _Node(None, other_piece, self._legal_moves())
+        self.playouts = 0
+
+    def _legal_moves(self) -> List[int]:
+        columns = [column for column in range(self.board.num_cols) if not self.board.is_column_full(column)]
+        self.rng.shuffle(columns)
+        return columns
+
+    def _play(self, column: int, piece: str) -> Optional[str]:
+        """
+        :return: the winner after piece plays column, blank_char for a draw, None if the game goes on
+        """
+        row = self.board.push_move(column, piece)
+        if self.board.count_max_matches(row, column) >= self.num_pieces_to_win:
+            return piece
+        if self.board.is_full:
+            return self.board.blank_char
+        return None
+
+    def run(self, max_playouts: Optional[int], deadline: Optional[float]) -> None:
+        """
+        Add playouts to the tree until max_playouts or the deadline, whichever comes first, but at least one
+        :return: None
+        """
+        start = self.playouts
+        while max_playouts is None or self.playouts - start < max_playouts:
+            self.playout()
+            # looking at the clock is not free, so only do it every few playouts
+            if deadline is not None and (self.playouts - start) % 16 == 0 and time.perf_counter() >= deadline:
+                break
+
+    def playout(self) -> None:
+        """
+        Select a leaf with UCT, expand it by one move, play the game out with the policy and back up the result
+        :return: None
+        """
+        the_board = self.board
+        history_length = len(the_board.history)
+        node = self.root
+        path = [node]
+        while node.winner is None and not node.untried and node.children:
+            node = self._select(node)
+            the_board.push_move(node.column, self.pieces[node.mover])
+            path.append(node)
+
+        winner = node.winner
+        if winner is None and node.untried:
+            column = node.untried.pop()
+            mover = self.pieces[node.mover]
+            winner = self._play(column, mover)
+            child = _Node(column, mover, [] if winner is not None else self._legal_moves(), winner)
+            node.children[column] = child
+            node = child
+            path.append(node)
+        if winner is None:
+            winner = self._rollout(self.pieces[node.mover])
+
+        for visited in path:
+            visited.visits += 1
+            if winner == visited.mover:
+                visited.wins += 1
+            elif winner == the_board.blank_char:
+                visited.wins += 0.5
+        while len(the_board.history) > history_length:
+            the_board.pop_move()
+        self.playouts += 1
+
+    def _select(self, node: _Node) -> _Node:
+        log_visits = math.log(node.visits)
+        exploration = self.exploration
+        return max(node.children.values(),
+                   key=lambda child: child.wins / child.visits + exploration * math.sqrt(log_visits / child.visits))
+
+    def _rollout(self, piece: str) -> str:
+        """
+        Play the game out from the current position with piece to move
+        :return: the winner, or blank_char for a draw
+        """
+        the_board = self.board
+        columns = [column for column in range(the_board.num_cols) if not the_board.is_column_full(column)]
+        while True:
+            column = None
+            if self.playout_policy == 'basic':
+                column = self._forced_column(columns, piece)
+            if column is None:
+                column = self.rng.choice(columns)
+            winner = self._play(column, piece)
+            if winner is not None:
+                return winner
+            if the_board.is_column_full(column):
+                columns.remove(column)
+            piece = self.pieces[piece]
+
+    def _forced_column(self, columns: Sequence[int], piece: str) -> Optional[int]:
+        # what BasicAi does: win if it can, otherwise block the opponent from winning
+        the_board = self.board
+        for checked in (piece, self.pieces[piece]):
+            for column in columns:
+                row = the_board.push_move(column, checked)
+                wins = the_board.count_max_matches(row, column) >= self.num_pieces_to_win
+                the_board.pop_move()
+                if wins:
+                    return column
+        return None
+
+    def root_results(self) -> Dict[int, Tuple[int, float]]:
+        """
+        :return: the visits and wins of every move at the root
+        """
+        return {column: (child.visits, child.wins) for column, child in self.root.children.items()}
+
+
+def _copy_board(the_board: "board.Board", blank_char: str) -> BitBoard:
+    """
+    :return: a BitBoard with the pieces of the_board, made by replaying its history so only the spots played in
+    are read. A board with pieces added without push_move is read spot by spot instead
+    """
+    copy = BitBoard(the_board.num_rows, the_board.num_cols, blank_char)
+    if len(the_board.history) == the_board.num_pieces:
+        heights: Dict[int, int] = {}
+        for column in the_board.history:
+            row = heights.get(column, 0)
+            copy.push_move(column, the_board.get_piece_at(row, column))
+            heights[column] = row + 1
+        return copy
+    for column in range(the_board.num_cols):
+        for row in range(the_board.num_rows):
+            piece = the_board[row][column]
+            if piece == the_board.blank_char:
+                break
+            copy.add_piece_to_column(piece, column)
+    return copy
+
+
+def _search_in_worker(rows: List[List[str]], blank_char: str, piece: str, other_piece: str,
+                      num_pieces_to_win: int, exploration: float, playout_policy: str, seed: int,
+                      max_playouts: Optional[int], time_budget: Optional[float]) -> Tuple[Dict[int, Tuple[int, float]], int]:
+    """
+    Search a fresh tree in another process
+    :return: the visits and wins of every root move, and how many playouts were run
+    """
+    the_board = BitBoard(len(rows), len(rows[0]), blank_char)
+    for column in range(the_board.num_cols):
+        for row in range(the_board.num_rows):
+            if rows[row][column] == blank_char:
+                break
+            the_board.add_piece_to_column(rows[row][column], column)
+    tree = _Tree(the_board, piece, other_piece, num_pieces_to_win, exploration, playout_policy, random.Random(seed))
+    tree.run(max_playouts, None if time_budget is None else time.perf_counter() + time_budget)
+    return tree.root_results(), tree.playouts
+
+
+class MctsAi(random_ai.RandomAi):
+    """
+    A player that picks moves with Monte Carlo Tree Search (UCT).
+    Every tree plays games out to the end with the playout_policy: 'random' plays like RandomAi and
+    'basic' plays like BasicAi, taking wins and blocking the opponent's.
+
+    With more than one worker the search is root-parallel: each worker grows its own tree from
+    the same position and the visit counts of the root moves are added up. The tree in this
+    process is kept after every move, and the part of it below the moves that were actually
+    played is reused for the next search. Game.play and self-play close the player once the game
+    is over, which stops the workers and lets go of the tree.
+    """
+
+    @classmethod
+    def get_valid_name(cls, players: List["player.Player"], case_matters: bool = False) -> str:
+        return f'MctsAi {len(players) + 1}'
+
+    def __init__(self, name: str, piece: str, opponent: Optional["player.Player"] = None,
+                 time_budget: Optional[float] = 1.0, max_playouts: Optional[int] = None, workers: int = 1,
+                 playout_policy: str = 'random', exploration: float = math.sqrt(2), verbose: bool = True) -> None:
+        super().__init__(name, piece, opponent)
+        if time_budget is None and max_playouts is None:
+            raise ValueError('A MctsAi needs a time_budget, a max_playouts or both')
+        if playout_policy not in PLAYOUT_POLICIES:
+            raise ValueError(f'{playout_policy} is not one of {", ".join(PLAYOUT_POLICIES)}')
+        self.time_budget = time_budget
+        self.max_playouts = max_playouts
+        self.workers = max(1, workers)
+        self.playout_policy = playout_policy
+        self.exploration = exploration
+        self.verbose = verbose
+        self.last_search: Optional[MctsStats] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._tree: Optional[_Tree] = None
+        self._tree_contents: Optional[List[List[str]]] = None
+
+    def close(self) -> None:
+        """
+        Stop the worker processes, if there are any, and let go of the kept tree
+        :return: None
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+        self._tree = None
+        self._tree_contents = None
+
+    def get_move(self, the_board: "board.Board", num_pieces_to_win: int) -> "move.Move":
+        """
+        Search for the best move within the time or playout budget
+        :return: the move played most often at the root
+        """
+        self.last_search = self.search(the_board, num_pieces_to_win)
+        if self.verbose:
+            print(self.report())
+        return move.Move(self, self.last_search.column)
+
+    def report(self) -> str:
+        """
+        :return: a description of the last search
+        """
+        if self.last_search is None:
+            return f'{self.name} has not searched yet.'
+        stats = self.last_search
+        return f'{self.name} ran {stats.playouts} playouts in {stats.seconds:.2f}s on {stats.trees} ' \
+               f'tree{"s" if stats.trees > 1 else ""} ({stats.playouts_per_second_per_core:.0f} playouts/sec ' \
+               f'per core) and expects to win {stats.win_rate:.0%} with column {stats.column}'
+
+    def search(self, the_board: "board.Board", num_pieces_to_win: int) -> MctsStats:
+        """
+        Search the position on the_board with self to move. the_board is not changed
+        :param the_board: the board to search from
+        :param num_pieces_to_win: how many pieces in a row win the game
+        :return: what the search found
+        """
+        start = time.perf_counter()
+        deadline = None if self.time_budget is None else start + self.time_budget
+        playouts_per_tree = None if self.max_playouts is None else max(1, self.max_playouts // self.workers)
+        contents = [list(row) for row in the_board]
+        rng = random.Random(random.getrandbits(64))
+
+        futures: List[Future] = []
+        if self.workers > 1:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers - 1)
+            futures = [self._executor.submit(_search_in_worker, contents, the_board.blank_char, self.piece,
+                                             self.opponent.piece, num_pieces_to_win, self.exploration,
+                                             self.playout_policy, rng.getrandbits(64), playouts_per_tree,
+                                             self.time_budget)
+                       for _ in range(self.workers - 1)]
+
+        tree = self._reuse_tree(contents, the_board, num_pieces_to_win, rng)
+        tree.run(playouts_per_tree, deadline)
+        results = [(tree.root_results(), tree.playouts)] + [future.result() for future in futures]
+
+        visits: Dict[int, int] = {}
+        wins: Dict[int, float] = {}
+        for root_results, _ in results:
+            for column, (column_visits, column_wins) in root_results.items():
+                visits[column] = visits.get(column, 0) + column_visits
+                wins[column] = wins.get(column, 0.0) + column_wins
+        column = max(visits, key=lambda col: (visits[col], wins[col]))
+
+        # keep the part of the tree below the move played for the next search
+        child = tree.root.children.get(column)
+        if child is not None:
+            tree.root = child
+            self._tree = tree
+            contents[sum(row[column] != the_board.blank_char for row in contents)][column] = self.piece
+            self._tree_contents = contents
+        return MctsStats(playouts=sum(playouts for _, playouts in results), seconds=time.perf_counter() - start,
+                         trees=len(results), column=column, visits=visits,
+                         win_rate=wins[column] / visits[column])
+
+    def _reuse_tree(self, contents: List[List[str]], the_board: "board.Board", num_pieces_to_win: int,
+                    rng: random.Random) -> _Tree:
+        """
+        :return: the tree from the last search moved down to the current position if the opponent made
+        exactly one move since, otherwise a new tree
+        """
+        search_board = _copy_board(the_board, the_board.blank_char)
+        root = None
+        if self._tree is not None and self._tree_contents is not None and \
+                self._tree.num_pieces_to_win == num_pieces_to_win and \
+                len(contents) == len(self._tree_contents) and len(contents[0]) == len(self._tree_contents[0]):
+            changed = [(row, column) for row, (new_row, old_row) in enumerate(zip(contents, self._tree_contents))
+                       for column, (new, old) in enumerate(zip(new_row, old_row)) if new != old]
+            if len(changed) == 1 and contents[changed[0][0]][changed[0][1]] == self.opponent.piece:
+                root = self._tree.root.children.get(changed[0][1])
+        self._tree = None
+        return _Tree(search_board, self.piece, self.opponent.piece, num_pieces_to_win, self.exploration,
+                     self.playout_policy, rng, root)
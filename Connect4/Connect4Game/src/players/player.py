@@ -3,21 +3,38 @@ from typing import Any, List, Optional
 from .. import move
 from ..board import Board, BoardError
 
+
+class PlayerUnavailableError(Exception):
+    """
+    Raised when a type of player cannot be made here, such as when it needs a package that is not installed
+    """
+
+
 class Player(abc.ABC):
 
     @classmethod
-    def create_for_game(cls, players: List["Player"], blank_char: str) -> "Player":
+    def check_available(cls, **options: Any) -> None:
+        """
+        Check that a player of this type can be made, before asking the user anything about it
+        :param options: the extra keyword arguments the player would be made with
+        :return: None
+        :raises: PlayerUnavailableError if the player cannot be made
+        """
+
+    @classmethod
+    def create_for_game(cls, players: List["Player"], blank_char: str, **options: Any) -> "Player":
         """
         Create player for user input
         :param players: The other players in the game
         :param blank_char: The blank character in the board
+        :param options: extra keyword arguments for the player
         :return: A player created from this user's input
         """
         while True:
             try:
                 name = cls.get_valid_name(players)
                 piece = cls.get_valid_piece(players, blank_char)
-                return cls(name, piece)
+                return cls(name, piece, **options)
             except ValueError as error:
                 print(error)
 
@@ -78,6 +95,13 @@ class Player(abc.ABC):
         """
         ...
 
+    def close(self) -> None:
+        """
+        Free whatever the player holds on to between moves, such as processes or threads.
+        Called once the game the player was in is over. Players that hold nothing do nothing
+        :return: None
+        """
+
     def __str__(self) -> str:
         return self.name
 
@@ -0,0 +1,344 @@
+import argparse
+import mmap
+import os
+import struct
+from typing import Iterable, Iterator, Optional, Sequence, Tuple, Union
+from .bitboard import BitBoard
+from .board import Board
+from .game import BOARD_BACKENDS
+from .game_record import BLANK_CHAR, PIECES, GameRecord, GameRecordError, Replay, read_records
+
+# the file starts with a header, then three arrays, each as long as the store's capacity:
+# a 64 bit key per position, the packed positions and a hash table of 32 bit position numbers,
+# where 0 is an empty slot and n is position n - 1. Everything is little endian
+MAGIC = b'C4POS\x00\x00\x00'
+VERSION = 1
+# magic, version, num_rows, num_cols, width, capacity, num_slots, count
+_HEADER = struct.Struct('<8sIIIIQQQ')
+HEADER_SIZE = 64
+_COUNT_OFFSET = _HEADER.size - 8
+_KEY = struct.Struct('<Q')
+_SLOT = struct.Struct('<I')
+MAX_CAPACITY = (1 << 32) - 2
+
+_MASK64 = (1 << 64) - 1
+
+
+class PositionStoreError(Exception):
+    pass
+
+
+class PositionCodec(object):
+    """
+    Packs a position into a fixed number of bytes: one mask per player, laid out like a BitBoard
+    (bit col * (num_rows + 1) + row) and padded to whole 64 bit words. A 6x7 position takes 16 bytes.
+    Only the pieces are kept, not the order they were played in
+    """
+
+    def __init__(self, num_rows: int, num_cols: int, pieces: Sequence[str] = PIECES) -> None:
+        """
+        :param pieces: the piece of the first player, then the piece of the second player
+        :raises: ValueError if there are not exactly two different pieces
+        """
+        if len(pieces) != 2 or pieces[0] == pieces[1]:
+            raise ValueError(f'A position has two different pieces, not {pieces}')
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.pieces = tuple(pieces)
+        self.words = max(1, (num_cols * (num_rows + 1) + 63) // 64)
+        self.width = 2 * 8 * self.words
+
+    def masks(self, the_board: Board) -> Tuple[int, int]:
+        """
+        :param the_board: a board of this codec's size holding only this codec's pieces
+        :return: the mask of each player's pieces
+        :raises: PositionStoreError if the board does not fit the codec
+        """
+        if (the_board.num_rows, the_board.num_cols) != (self.num_rows, self.num_cols):
+            raise PositionStoreError(f'A {the_board.num_rows}x{the_board.num_cols} board is not '
+                                     f'{self.num_rows}x{self.num_cols}.')
+        if isinstance(the_board, BitBoard):
+            first, second = (the_board.mask_for(piece) for piece in self.pieces)
+            if bin(first | second).count('1') != the_board.num_pieces:
+                raise PositionStoreError(f'The board holds pieces other than {" and ".join(self.pieces)}.')
+            return first, second
+        masks = [0, 0]
+        for row_index, row in enumerate(the_board):
+            for col_index, piece in enumerate(row):
+                if piece != the_board.blank_char:
+                    try:
+                        masks[self.pieces.index(piece)] |= 1 << (col_index * (self.num_rows + 1) + row_index)
+                    except ValueError:
+                        raise PositionStoreError(f'{piece} is not one of {" and ".join(self.pieces)}.')
+        return masks[0], masks[1]
+
+    def pack(self, first: int, second: int) -> bytes:
+        size = 8 * self.words
+        return first.to_bytes(size, 'little') + second.to_bytes(size, 'little')
+
+    def unpack(self, data: Union[bytes, memoryview]) -> Tuple[int, int]:
+        size = 8 * self.words
+        return int.from_bytes(data[:size], 'little'), int.from_bytes(data[size:2 * size], 'little')
+
+    def encode(self, the_board: Board) -> bytes:
+        """
+        :return: the position on the_board in width bytes
+        """
+        return self.pack(*self.masks(the_board))
+
+    def decode(self, data: Union[bytes, memoryview], board_backend: str = 'bitboard',
+               blank_char: str = BLANK_CHAR) -> Board:
+        """
+        :param data: a position from encode
+        :param board_backend: which of BOARD_BACKENDS to put the position on
+        :return: a new board holding the position, without any history
+        :raises: PositionStoreError if data is not a position a game could reach on this board
+        """
+        first, second = self.unpack(data)
+        if first & second:
+            raise PositionStoreError('Two pieces are in the same spot.')
+        the_board = BOARD_BACKENDS[board_backend](self.num_rows, self.num_cols, blank_char)
+        column_height = self.num_rows + 1
+        column_mask = (1 << column_height) - 1
+        for column in range(self.num_cols):
+            column_first = (first >> (column * column_height)) & column_mask
+            column_second = (second >> (column * column_height)) & column_mask
+            height = (column_first | column_second).bit_length()
+            if height > self.num_rows or (column_first | column_second) != (1 << height) - 1:
+                raise PositionStoreError(f'Column {column} has pieces that are floating or off the board.')
+            for row in range(height):
+                the_board.add_piece_to_column(self.pieces[0] if column_first >> row & 1 else self.pieces[1], column)
+        if (first | second) >> (self.num_cols * column_height):
+            raise PositionStoreError('There are pieces past the last column.')
+        return the_board
+
+
+def position_key(first: int, second: int) -> int:
+    """
+    :return: a 64 bit hash of the position with these masks, the same in every process and Python version
+    """
+    key = 0
+    for mask in (first, second):
+        while True:
+            # one round of splitmix64 per 64 bit word
+            key = (key ^ (mask & _MASK64)) + 0x9E3779B97F4A7C15 & _MASK64
+            key = (key ^ (key >> 30)) * 0xBF58476D1CE4E5B9 & _MASK64
+            key = (key ^ (key >> 27)) * 0x94D049BB133111EB & _MASK64
+            key ^= key >> 31
+            mask >>= 64
+            if not mask:
+                break
+    return key
+
+
+class PositionStore(object):
+    """
+    Up to capacity distinct positions of one board size in a memory-mapped file.
+
+    Positions are kept in the order they were added in one contiguous array, so position i
+    is at a known offset and any range of positions can be read as a memoryview without copying.
+    Other processes can open the same file read-only while it is being added to. A hash table in
+    the file finds whether a position is already stored in one probe or a few, so adding a
+    position twice stores it once.
+    """
+
+    @classmethod
+    def create(cls, path: str, num_rows: int, num_cols: int, capacity: int) -> "PositionStore":
+        """
+        Make an empty store, replacing any file at path. The file is sized for capacity positions up front
+        :param capacity: the most positions the store will hold
+        :return: the store, open for adding positions
+        :raises: ValueError if capacity is out of range
+        """
+        if not 0 < capacity <= MAX_CAPACITY:
+            raise ValueError(f'capacity must be from 1 to {MAX_CAPACITY} but is {capacity}')
+        codec = PositionCodec(num_rows, num_cols)
+        num_slots = 1 << (2 * capacity - 1).bit_length()
+        with open(path, 'wb') as store_file:
+            store_file.write(_HEADER.pack(MAGIC, VERSION, num_rows, num_cols, codec.width, capacity,
+                                          num_slots, 0).ljust(HEADER_SIZE, b'\x00'))
+            store_file.truncate(HEADER_SIZE + capacity * (_KEY.size + codec.width) + num_slots * _SLOT.size)
+        return cls(path, writable=True)
+
+    def __init__(self, path: str, writable: bool = False) -> None:
+        """
+        :param path: a file made by create
+        :param writable: whether positions will be added
+        :raises: PositionStoreError if the file is not a position store
+        """
+        self.path = path
+        self.writable = writable
+        with open(path, 'r+b' if writable else 'rb') as store_file:
+            header = store_file.read(HEADER_SIZE)
+            if len(header) < HEADER_SIZE:
+                raise PositionStoreError(f'{path} is too short to be a position store')
+            magic, version, num_rows, num_cols, self.width, self.capacity, self.num_slots, _ = \
+                _HEADER.unpack_from(header)
+            if magic != MAGIC:
+                raise PositionStoreError(f'{path} is not a position store')
+            if version != VERSION:
+                raise PositionStoreError(f'{path} is version {version} but only version {VERSION} can be read')
+            self.codec = PositionCodec(num_rows, num_cols)
+            self._keys_offset = HEADER_SIZE
+            self._positions_offset = self._keys_offset + self.capacity * _KEY.size
+            self._slots_offset = self._positions_offset + self.capacity * self.width
+            size = self._slots_offset + self.num_slots * _SLOT.size
+            if self.width != self.codec.width or self.num_slots & (self.num_slots - 1) or \
+                    os.fstat(store_file.fileno()).st_size != size:
+                raise PositionStoreError(f'{path} is damaged')
+            self._mmap = mmap.mmap(store_file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        self._slot_mask = self.num_slots - 1
+
+    @property
+    def num_rows(self) -> int:
+        return self.codec.num_rows
+
+    @property
+    def num_cols(self) -> int:
+        return self.codec.num_cols
+
+    def __len__(self) -> int:
+        # read from the file every time, so readers see positions added by a writer in another process
+        return struct.unpack_from('<Q', self._mmap, _COUNT_OFFSET)[0]
+
+    def __enter__(self) -> "PositionStore":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self.writable:
+            self._mmap.flush()
+        self._mmap.close()
+
+    def _find(self, key: int, data: bytes) -> Tuple[int, Optional[int]]:
+        """
+        :return: the slot the position is in or should go in, and its number if it is stored
+        """
+        slot = key & self._slot_mask
+        while True:
+            stored = _SLOT.unpack_from(self._mmap, self._slots_offset + slot * _SLOT.size)[0]
+            if stored == 0:
+                return slot, None
+            index = stored - 1
+            if _KEY.unpack_from(self._mmap, self._keys_offset + index * _KEY.size)[0] == key and \
+                    self._mmap[self._position_offset(index):self._position_offset(index + 1)] == data:
+                return slot, index
+            slot = (slot + 1) & self._slot_mask
+
+    def _position_offset(self, index: int) -> int:
+        return self._positions_offset + index * self.width
+
+    def add(self, the_board: Board) -> Tuple[int, bool]:
+        """
+        :param the_board: a board of the store's size
+        :return: the number of the position in the store, and whether it was new
+        :raises: PositionStoreError if the store is full or read-only
+        """
+        return self.add_masks(*self.codec.masks(the_board))
+
+    def add_masks(self, first: int, second: int) -> Tuple[int, bool]:
+        """
+        :param first: the mask of the first player's pieces, see PositionCodec
+        :param second: the mask of the second player's pieces
+        :return: the number of the position in the store, and whether it was new
+        :raises: PositionStoreError if the store is full or read-only
+        """
+        if not self.writable:
+            raise PositionStoreError(f'{self.path} was opened read-only')
+        key = position_key(first, second)
+        data = self.codec.pack(first, second)
+        slot, index = self._find(key, data)
+        if index is not None:
+            return index, False
+        index = len(self)
+        if index >= self.capacity:
+            raise PositionStoreError(f'{self.path} is full, it holds {self.capacity} positions')
+        self._mmap[self._position_offset(index):self._position_offset(index + 1)] = data
+        _KEY.pack_into(self._mmap, self._keys_offset + index * _KEY.size, key)
+        _SLOT.pack_into(self._mmap, self._slots_offset + slot * _SLOT.size, index + 1)
+        # the count goes last so a reader never sees a position that is only half written
+        struct.pack_into('<Q', self._mmap, _COUNT_OFFSET, index + 1)
+        return index, True
+
+    def index_of(self, the_board: Board) -> Optional[int]:
+        """
+        :return: the number of the position on the_board in the store, or None if it is not stored
+        """
+        first, second = self.codec.masks(the_board)
+        return self._find(position_key(first, second), self.codec.pack(first, second))[1]
+
+    def __contains__(self, the_board: Board) -> bool:
+        return self.index_of(the_board) is not None
+
+    def __getitem__(self, index: int) -> bytes:
+        """
+        :return: the packed position number index
+        """
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f'The store holds {len(self)} positions, not {index + 1}.')
+        return self._mmap[self._position_offset(index):self._position_offset(index + 1)]
+
+    def board(self, index: int, board_backend: str = 'bitboard') -> Board:
+        """
+        :return: a new board holding position number index
+        """
+        return self.codec.decode(self[index], board_backend)
+
+    def view(self, start: int = 0, stop: Optional[int] = None) -> memoryview:
+        """
+        The packed positions start to stop without copying them. Cast it to 'Q' to read
+        the masks as 64 bit words, 2 * codec.words words per position.
+        The view has to be released before the store is closed
+        :return: a view of the positions from number start up to but not including number stop
+        """
+        count = len(self)
+        stop = count if stop is None else min(stop, count)
+        start = min(max(0, start), stop)
+        return memoryview(self._mmap)[self._position_offset(start):self._position_offset(stop)]
+
+    def __iter__(self) -> Iterator[bytes]:
+        for index in range(len(self)):
+            yield self[index]
+
+
+def add_records(store: PositionStore, records: Iterable[GameRecord]) -> int:
+    """
+    Add every position of every game in records that is the size of the store
+    :return: how many positions were new
+    """
+    added = 0
+    for record in records:
+        if (record.num_rows, record.num_cols) != (store.num_rows, store.num_cols):
+            continue
+        for position in Replay(record).positions():
+            added += store.add(position)[1]
+    return added
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Put every position of the games in a file of game records into a position store
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description='Collect the distinct positions of recorded games.')
+    parser.add_argument('records', help='a file of game records, see selfplay --format records')
+    parser.add_argument('store', help='the position store to make')
+    parser.add_argument('--rows', type=int, default=6)
+    parser.add_argument('--cols', type=int, default=7)
+    parser.add_argument('--capacity', type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+
+    try:
+        with PositionStore.create(args.store, args.rows, args.cols, args.capacity) as store:
+            add_records(store, read_records(args.records))
+            print(f'{len(store)} positions, {store.codec.width} bytes each')
+    except (GameRecordError, PositionStoreError) as error:
+        raise SystemExit(str(error))
+
+
+if __name__ == '__main__':
+    main()
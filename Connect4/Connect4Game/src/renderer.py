@@ -0,0 +1,178 @@
+import abc
+import sys
+from typing import Dict, List, Optional, TextIO, Type, TYPE_CHECKING
+
+if TYPE_CHECKING:  # game imports this module for its default renderer
+    from . import game, move
+
+# ANSI escape sequences
+CLEAR_SCREEN = '\x1b[H\x1b[2J'
+CLEAR_TO_END_OF_LINE = '\x1b[K'
+SAVE_CURSOR = '\x1b7'
+RESTORE_CURSOR = '\x1b8'
+RESET_SCROLL_REGION = '\x1b[r'
+
+
+def move_cursor(line: int, column: int) -> str:
+    """
+    :param line: the line of the screen, counted from 1 at the top
+    :param column: the column of the screen, counted from 1 at the left
+    :return: the escape sequence that puts the cursor there
+    """
+    return f'\x1b[{line};{column}H'
+
+
+def set_scroll_region(top: int) -> str:
+    """
+    :param top: the first line that scrolls, counted from 1 at the top. The lines above it stay put
+    :return: the escape sequence that makes only the lines from top to the bottom of the screen scroll.
+    It also puts the cursor in the top left corner
+    """
+    return f'\x1b[{top}r'
+
+
+class Renderer(abc.ABC):
+    """
+    Shows a game being played by Game.play
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None) -> None:
+        """
+        :param stream: where to write, sys.stdout at the time of writing if None
+        """
+        self._stream = stream
+
+    @property
+    def stream(self) -> TextIO:
+        return self._stream if self._stream is not None else sys.stdout
+
+    @abc.abstractmethod
+    def start(self, the_game: "game.Game") -> None:
+        """
+        Called once before the first turn
+        :param the_game: the game about to be played
+        :return: None
+        """
+        ...
+
+    @abc.abstractmethod
+    def move_made(self, the_game: "game.Game", the_move: "move.Move") -> None:
+        """
+        Called after every turn, once the_move is on the board and the game knows whether it is over
+        :param the_game: the game being played
+        :param the_move: the move that was just made
+        :return: None
+        """
+        ...
+
+    @abc.abstractmethod
+    def finish(self, the_game: "game.Game") -> None:
+        """
+        Called once after the game is over
+        :param the_game: the finished game
+        :return: None
+        """
+        ...
+
+
+class FullRenderer(Renderer):
+    """
+    Prints the whole board before every turn and again with the result at the end
+    """
+
+    def start(self, the_game: "game.Game") -> None:
+        print(the_game.board, file=self.stream)
+
+    def move_made(self, the_game: "game.Game", the_move: "move.Move") -> None:
+        if not the_game.is_game_over():
+            print(the_game.board, file=self.stream)
+
+    def finish(self, the_game: "game.Game") -> None:
+        print(the_game.board, file=self.stream)
+        print(the_game.result_message(), file=self.stream)
+
+
+class FinalBoardRenderer(Renderer):
+    """
+    Prints nothing until the game is over, then the board and the result
+    """
+
+    def start(self, the_game: "game.Game") -> None:
+        pass
+
+    def move_made(self, the_game: "game.Game", the_move: "move.Move") -> None:
+        pass
+
+    def finish(self, the_game: "game.Game") -> None:
+        print(the_game.board, file=self.stream)
+        print(the_game.result_message(), file=self.stream)
+
+
+class SilentRenderer(Renderer):
+    """
+    Prints nothing at all
+    """
+
+    def start(self, the_game: "game.Game") -> None:
+        pass
+
+    def move_made(self, the_game: "game.Game", the_move: "move.Move") -> None:
+        pass
+
+    def finish(self, the_game: "game.Game") -> None:
+        pass
+
+
+class AnsiRenderer(Renderer):
+    """
+    Clears the terminal and draws the board once at the top of it, then only redraws the spot
+    every move went in using ANSI cursor movement, so a move costs the same on any size of board.
+    The lines below the board are made a scroll region, so anything else printed, like search reports
+    or input prompts, scrolls there while the board stays on the lines the updates are drawn on.
+    The cursor is put back where it was after every update, and the whole screen scrolls again once the game is over.
+    Boards whose repr does not show every spot, like a big SparseBoard, are redrawn whole on every move instead
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None) -> None:
+        super().__init__(stream)
+        self._incremental = False
+        self._sep_width = 0
+
+    def _write(self, parts: List[str]) -> None:
+        # everything for one move goes out in a single write
+        self.stream.write(''.join(parts))
+        self.stream.flush()
+
+    def start(self, the_game: "game.Game") -> None:
+        drawing = repr(the_game.board)
+        self._incremental = drawing.count('\n') == the_game.board.num_rows
+        self._sep_width = max(len(str(the_game.board.num_rows - 1)), len(str(the_game.board.num_cols - 1)))
+        below_board = drawing.count('\n') + 2
+        self._write([CLEAR_SCREEN, drawing, set_scroll_region(below_board), move_cursor(below_board, 1)])
+
+    def move_made(self, the_game: "game.Game", the_move: "move.Move") -> None:
+        if the_move.row is None:
+            return
+        the_board = the_game.board
+        if not self._incremental:
+            drawing = repr(the_board).replace('\n', CLEAR_TO_END_OF_LINE + '\n')
+            self._write([SAVE_CURSOR, move_cursor(1, 1), drawing, CLEAR_TO_END_OF_LINE, RESTORE_CURSOR])
+            return
+        # row 0 is the bottom of the board but the last line of the drawing, which starts with the column headers
+        label = str(the_board.num_rows - 1 - the_move.row)
+        line = 2 + the_board.num_rows - 1 - the_move.row
+        column = 1 + len(label) + self._sep_width + the_move.column * (self._sep_width + 1)
+        self._write([SAVE_CURSOR, move_cursor(line, column), the_board.get_piece_at(the_move.row, the_move.column),
+                     RESTORE_CURSOR])
+
+    def finish(self, the_game: "game.Game") -> None:
+        self._write([SAVE_CURSOR, RESET_SCROLL_REGION, RESTORE_CURSOR, the_game.result_message(), '\n'])
+
+
+# the values the renderer key of a configuration file can take
+RENDERERS: Dict[str, Type[Renderer]] = {
+    'full': FullRenderer,
+    'ansi': AnsiRenderer,
+    'final': FinalBoardRenderer,
+    'silent': SilentRenderer,
+}
@@ -0,0 +1,212 @@
+import argparse
+import json
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, TextIO, Tuple, Type, Union
+from .game import Game, BOARD_BACKENDS, PLAYER_TYPES
+from .game_record import GameRecord, RecordWriter
+from .players import player
+
+PlayerType = Union[str, Type["player.Player"]]
+
+# options every player of a type gets when it plays without anyone watching
+QUIET_PLAYER_OPTIONS: Dict[str, Dict[str, Any]] = {
+    'alphabeta': {'verbose': False},
+    'mcts': {'verbose': False},
+    'lazysmp': {'verbose': False},
+    'learned': {'verbose': False},
+}
+
+PIECES = ('X', 'O')
+BLANK_CHAR = '*'
+
+
+class GameSpec(NamedTuple):
+    """
+    Everything needed to play one game, small enough to send to another process
+    """
+    game: int  # the number of the game in its batch
+    seed: int
+    player_types: Tuple[PlayerType, ...]
+    num_rows: int = 6
+    num_cols: int = 7
+    num_pieces_to_win: int = 4
+    board_backend: str = 'bitboard'
+    player_options: Tuple[Dict[str, Any], ...] = ({}, {})
+
+
+class GameResult(NamedTuple):
+    game: int
+    seed: int
+    players: List[str]
+    winner: Optional[int]  # the index of the winning player in players, None for a tie
+    moves: List[int]  # every column played, in order
+    plies: int
+    seconds: float
+
+    def to_json(self) -> str:
+        """
+        :return: the result as one line of JSON
+        """
+        return json.dumps(self._asdict())
+
+    def to_record(self, num_rows: int, num_cols: int, num_pieces_to_win: int) -> GameRecord:
+        """
+        :return: the result as a compact game record, see game_record
+        """
+        return GameRecord.from_moves(num_rows, num_cols, num_pieces_to_win, self.moves, self.winner)
+
+
+def resolve_player_type(player_type: PlayerType) -> Type["player.Player"]:
+    """
+    :param player_type: a key of PLAYER_TYPES or a Player class
+    :return: the Player class
+    :raises: ValueError if player_type is not a known player type
+    """
+    if isinstance(player_type, str):
+        try:
+            return PLAYER_TYPES[player_type.lower()]
+        except KeyError:
+            raise ValueError(f'{player_type} is not one of {", ".join(PLAYER_TYPES)}')
+    return player_type
+
+
+def create_players(player_types: Sequence[PlayerType],
+                   player_options: Sequence[Dict[str, Any]] = ({}, {})) -> List["player.Player"]:
+    """
+    Create the players for a game without asking anyone anything
+    :param player_types: the type of every player, see resolve_player_type
+    :param player_options: extra keyword arguments for every player
+    :return: the players, each one with the next one as its opponent
+    :raises: ValueError if a player type needs a person to play it
+    """
+    players: List[player.Player] = []
+    for player_type, options in zip(player_types, player_options):
+        player_class = resolve_player_type(player_type)
+        if player_class is PLAYER_TYPES['human']:
+            raise ValueError('Human players cannot play headless games.')
+        quiet_options = next((quiet for name, quiet in QUIET_PLAYER_OPTIONS.items()
+                              if PLAYER_TYPES[name] is player_class), {})
+        name = player_class.get_valid_name(players)
+        players.append(player_class(name, PIECES[len(players)], **{**quiet_options, **options}))
+    for i, current in enumerate(players):
+        current.opponent = players[(i + 1) % len(players)]
+    return players
+
+
+def play_game(spec: GameSpec) -> GameResult:
+    """
+    Play the game described by spec without printing anything.
+    The random module is seeded with spec.seed first, so the same spec always gives the same game
+    as long as the players do not depend on the clock
+    :param spec: the game to play
+    :return: the result of the game
+    """
+    random.seed(spec.seed)
+    start = time.perf_counter()
+    board = BOARD_BACKENDS[spec.board_backend](spec.num_rows, spec.num_cols, BLANK_CHAR)
+    players = create_players(spec.player_types, spec.player_options)
+    game = Game(board, spec.num_pieces_to_win, players)
+    moves = []
+    try:
+        while not game.is_game_over():
+            moves.append(game.play_turn().column)
+    finally:
+        game.close_players()
+    return GameResult(game=spec.game, seed=spec.seed, players=[str(p) for p in players],
+                      winner=game.cur_player_turn if game.someone_won else None,
+                      moves=moves, plies=len(moves), seconds=time.perf_counter() - start)
+
+
+def make_specs(player_types: Sequence[PlayerType], num_games: int, first_seed: int = 0,
+               **game_options: Any) -> List[GameSpec]:
+    """
+    :param player_types: the type of every player
+    :param num_games: how many games to make
+    :param first_seed: the seed of the first game, the others count up from it
+    :param game_options: any of the other GameSpec fields
+    :return: num_games specs with consecutive seeds
+    """
+    return [GameSpec(game=i, seed=first_seed + i, player_types=tuple(player_types), **game_options)
+            for i in range(num_games)]
+
+
+def run_games(specs: Iterable[GameSpec], workers: Optional[int] = None, chunksize: int = 8) -> Iterator[GameResult]:
+    """
+    Play every game in specs across a pool of processes
+    :param specs: the games to play
+    :param workers: how many processes to use, None for one per core and 1 to play in this process
+    :param chunksize: how many games to send to a process at once
+    :return: the results, in the same order as specs no matter how many workers there are
+    """
+    if workers == 1:
+        yield from map(play_game, specs)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(play_game, specs, chunksize=chunksize)
+
+
+def write_results(results: Iterable[GameResult], output: TextIO) -> int:
+    """
+    Write every result as it arrives, one JSON object per line
+    :param results: the results to write
+    :param output: where to write them
+    :return: how many results were written
+    """
+    written = 0
+    for result in results:
+        output.write(result.to_json() + '\n')
+        output.flush()
+        written += 1
+    return written
+
+
+def write_records(results: Iterable[GameResult], writer: RecordWriter, num_rows: int, num_cols: int,
+                  num_pieces_to_win: int) -> int:
+    """
+    Write every result as it arrives as a game record
+    :param results: the results to write
+    :param writer: where to write them
+    :return: how many results were written
+    """
+    for result in results:
+        writer.write(result.to_record(num_rows, num_cols, num_pieces_to_win))
+    writer.flush()
+    return writer.count
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Play a batch of AI vs AI games and write the results as JSONL or as game records
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description='Play AI vs AI games without printing the board.')
+    parser.add_argument('players', nargs=2, choices=[name for name in PLAYER_TYPES if name != 'human'])
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0, help='the seed of the first game')
+    parser.add_argument('--workers', type=int, default=None, help='defaults to one per core')
+    parser.add_argument('--rows', type=int, default=6)
+    parser.add_argument('--cols', type=int, default=7)
+    parser.add_argument('--pieces-to-win', type=int, default=4)
+    parser.add_argument('--backend', choices=list(BOARD_BACKENDS), default='bitboard')
+    parser.add_argument('--output', default='-', help='file to write the results to, - for stdout')
+    parser.add_argument('--format', choices=['jsonl', 'records'], default='jsonl',
+                        help='records writes compact binary game records, see game_record')
+    args = parser.parse_args(argv)
+
+    specs = make_specs(args.players, args.games, args.seed, num_rows=args.rows, num_cols=args.cols,
+                       num_pieces_to_win=args.pieces_to_win, board_backend=args.backend)
+    if args.format == 'records':
+        with RecordWriter(sys.stdout.buffer if args.output == '-' else args.output) as writer:
+            write_records(run_games(specs, args.workers), writer, args.rows, args.cols, args.pieces_to_win)
+    elif args.output == '-':
+        write_results(run_games(specs, args.workers), sys.stdout)
+    else:
+        with open(args.output, 'w') as output:
+            write_results(run_games(specs, args.workers), output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,524 @@
+import abc
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import signal
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+from .bitboard import BitBoard
+from .board import BoardError
+from .broadcast import Broadcaster
+from .events import event_to_json
+from .game import Game, PLAYER_TYPES
+from .instrumentation import INSTRUMENTS, install_profiler_signal
+from .move import Move, MoveError
+from .players import alpha_beta_ai, player, random_ai
+from .selfplay import QUIET_PLAYER_OPTIONS
+from .tournament import parse_player_options
+
+PIECES = ('X', 'O')
+BLANK_CHAR = '*'
+DEFAULT_GEOMETRY = (6, 7, 4)
+# boards bigger than this are turned down so one client cannot tie up the server
+MAX_CELLS = 10_000
+# the most characters a client may send on one line
+MAX_LINE_LENGTH = 1024
+
+
+class ConnectionClosedError(Exception):
+    pass
+
+
+class Connection(object):
+    """
+    One client, talking one line at a time
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.name = ''
+
+    async def send(self, line: str) -> None:
+        """
+        :param line: the message to send, without a newline
+        :return: None
+        :raises: ConnectionClosedError if the client has gone away
+        """
+        try:
+            self.writer.write(line.encode() + b'\n')
+            await self.writer.drain()
+        except (ConnectionError, RuntimeError) as error:
+            raise ConnectionClosedError(str(error))
+
+    async def read_line(self) -> str:
+        """
+        :return: the next line from the client, without the newline
+        :raises: ConnectionClosedError if the client has gone away
+        """
+        try:
+            line = await self.reader.readline()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError) as error:
+            raise ConnectionClosedError(str(error))
+        if not line:
+            raise ConnectionClosedError('The client closed the connection.')
+        return line[:MAX_LINE_LENGTH].decode(errors='replace').strip()
+
+    async def close(self) -> None:
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+class MoveSource(abc.ABC):
+    """
+    Where the moves of one player in a server game come from
+    """
+
+    @abc.abstractmethod
+    async def next_move(self, game: Game) -> Move:
+        """
+        :param game: the game, with the player this source moves for as its current player
+        :return: the move the player wants to make, not made yet
+        """
+        ...
+
+    async def move_rejected(self, error: Exception) -> None:
+        """
+        Called when the move returned by next_move could not be made
+        :param error: why the move could not be made
+        :return: None
+        """
+
+    async def close(self) -> None:
+        """
+        Called once the game is over, however it ended
+        :return: None
+        """
+
+
+class ConnectionMoveSource(MoveSource):
+    """
+    Moves typed by a person on the other end of a connection
+    """
+
+    def __init__(self, connection: Connection) -> None:
+        self.connection = connection
+
+    async def next_move(self, game: Game) -> Move:
+        await self.connection.send('YOUR_TURN')
+        while True:
+            command, _, argument = (await self.connection.read_line()).partition(' ')
+            if command.upper() == 'MOVE':
+                try:
+                    return Move.from_string(game.cur_player, argument.strip())
+                except MoveError as error:
+                    await self.move_rejected(error)
+                    await self.connection.send('YOUR_TURN')
+                    continue
+            elif command.upper() == 'QUIT':
+                raise ConnectionClosedError(f'{self.connection.name} quit.')
+            await self.connection.send(f'ERROR expected MOVE <column> but got {command}')
+
+    async def move_rejected(self, error: Exception) -> None:
+        await self.connection.send(f'INVALID {error}')
+
+
+# the AIs playing the server games this process works out moves for, with the board each one plays on,
+# by the key of their ExecutorMoveSource
+_HOSTED_AIS: Dict[str, Tuple["player.Player", BitBoard]] = {}
+
+
+def _hosted_ai_column(key: str, player_class: Type["player.Player"], options: Dict[str, Any],
+                      pieces: Tuple[str, str], num_rows: int, num_cols: int, history: Sequence[int],
+                      num_pieces_to_win: int) -> int:
+    """
+    Ask the AI hosted for key for a move, making it on the first move it is asked for.
+    The AI and its board are kept between moves, so its transposition table, search tree and pondering
+    carry on like in Game.play, and only the moves made since its last turn are played on its board.
+    AIs only ponder here when their options say ponder=True, as they never play a HumanPlayer.
+    The board is built move by move so hashes come out the same as on the board the game is played on
+    :param pieces: the piece of the player who moved first, then the other one
+    :return: the column the AI picked
+    """
+    hosted = _HOSTED_AIS.get(key)
+    if hosted is None or tuple(hosted[1].history) != tuple(history[:hosted[1].num_pieces]):
+        if hosted is not None:
+            hosted[0].close()
+        the_board = BitBoard(num_rows, num_cols, BLANK_CHAR)
+        the_board.enable_window_index(num_pieces_to_win)
+        ai = player_class(f'{player_class.__name__} 1', pieces[len(history) % 2], **options)
+        ai.opponent = random_ai.RandomAi('Opponent', pieces[(len(history) + 1) % 2])
+        hosted = _HOSTED_AIS[key] = (ai, the_board)
+    ai, the_board = hosted
+    for turn in range(the_board.num_pieces, len(history)):
+        the_board.push_move(history[turn], pieces[turn % 2])
+    column = ai.get_move(the_board, num_pieces_to_win).column
+    # pushed rather than made, so the move is counted once, by the game it is played in
+    the_board.push_move(column, ai.piece)
+    if isinstance(ai, alpha_beta_ai.AlphaBetaAi) and ai.ponder:
+        ai.start_pondering(the_board, num_pieces_to_win)
+    return column
+
+
+def _release_ai(key: str) -> None:
+    hosted = _HOSTED_AIS.pop(key, None)
+    if hosted is not None:
+        hosted[0].close()
+
+
+class ExecutorMoveSource(MoveSource):
+    """
+    Moves an AI player works out in an executor, so searching never stalls the event loop.
+    The AI lives in the process that runs the executor's calls from the first move to the end of the game,
+    so the executor has to run every call in one process, like a thread pool or a process pool of one process
+    """
+
+    def __init__(self, executor: Executor, options: Optional[Dict[str, Any]] = None) -> None:
+        self.executor = executor
+        self.options = options if options is not None else {}
+        self.key = uuid.uuid4().hex  # names the AI among the others hosted by the same process
+        self._hosting = False
+
+    async def next_move(self, game: Game) -> Move:
+        ai = game.cur_player
+        pieces = (game.players[0].piece, game.players[1].piece)
+        self._hosting = True
+        column = await asyncio.get_running_loop().run_in_executor(
+            self.executor, _hosted_ai_column, self.key, type(ai), self.options, pieces, game.board.num_rows,
+            game.board.num_cols, game.board.history, game.num_pieces_to_win)
+        return Move(ai, column)
+
+    async def close(self) -> None:
+        """
+        Close the AI and forget it
+        :return: None
+        """
+        if not self._hosting:
+            return
+        self._hosting = False
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.executor, _release_ai, self.key)
+        except RuntimeError:
+            _release_ai(self.key)  # the executor was shut down, so the AI is only hosted here if it ran threads
+
+
+class RemoteMoveError(Exception):
+    """
+    Raised when a RemotePlayer is asked for something only the person at the other end of the connection knows
+    """
+
+
+class RemotePlayer(player.Player):
+    """
+    A person playing through the server. They name themselves with NAME and their moves arrive through
+    a ConnectionMoveSource in play_game_async, so asking this player for any of them is a mistake.
+    RemoteMoveError is not a MoveError, so take_turn gives up at once instead of asking again forever
+    """
+
+    @classmethod
+    def get_valid_piece(cls, players: List["player.Player"], blank_char: str, case_matters: bool = False) -> str:
+        raise RemoteMoveError('The server gives remote players their pieces.')
+
+    @classmethod
+    def get_valid_name(cls, players: List["player.Player"], case_matters: bool = False) -> str:
+        raise RemoteMoveError('Remote players name themselves with NAME.')
+
+    def get_move(self, the_board: "BitBoard", num_pieces_to_win: int) -> Move:
+        raise RemoteMoveError(f'The moves of {self.name} arrive through its MoveSource, see play_game_async.')
+
+
+async def play_game_async(game: Game, sources: Sequence[MoveSource],
+                          watchers: Sequence[Connection] = ()) -> Optional[player.Player]:
+    """
+    Play game to the end, getting every player's moves from their source
+    :param game: a game that has not started yet
+    :param sources: the move source of every player of game, in the same order
+    :param watchers: the connections to tell about every move
+    :return: the winner, or None for a tie
+    :raises: ConnectionClosedError if a remote player leaves, with game.cur_player being the one who left
+    """
+    try:
+        while not game.is_game_over():
+            source = sources[game.cur_player_turn]
+            player_move = await source.next_move(game)
+            try:
+                player_move.make(game.board)
+            except (MoveError, BoardError) as error:
+                await source.move_rejected(error)
+                continue
+            for watcher in watchers:
+                await watcher.send(f'MOVED {player_move.maker.piece} {player_move.column} {player_move.row}')
+            game.end_turn(player_move)
+    finally:
+        for source in sources:
+            await source.close()
+    return game.cur_player if game.someone_won else None
+
+
+class GameServer(object):
+    """
+    Hosts any number of games in one event loop. AI moves are worked out in executors, workers processes
+    of their own unless one executor is given. Every AI game stays in the executor with the fewest games
+    when it started, so its AI is kept there from move to move, see ExecutorMoveSource.
+
+    Every message is one line of UTF-8 text. A session looks like this, > from the client and < from the server:
+
+        < HELLO connect4
+        > NAME Sophia
+        < WELCOME Sophia
+        > PLAY alphabeta 6 7 4        (an AI player type or human, then optionally rows, columns and pieces to win)
+        < START 1 6 7 4 X AlphaBetaAi 2   (game id, rows, columns, pieces to win, your piece, your opponent)
+        < YOUR_TURN
+        > MOVE 3
+        < MOVED X 3 0                 (piece, column, row of every move, including your own)
+        < INVALID ...                 (if a move could not be made, followed by another YOUR_TURN)
+        < WIN Sophia / TIE / FORFEIT AlphaBetaAi 2
+        > QUIT
+        < BYE
+
+    Anybody can watch a game being played, without a NAME:
+
+        > GAMES
+        < GAMES 1 3                   (the ids of the games being played)
+        > WATCH 1
+        < WATCHING 1
+        < EVENT {"type": "snapshot", ...}   (one line of JSON per event, see events, starting with the game so far)
+        < EVENT {"type": "move", ...}
+        < END 1                       (the game is over or was forfeited)
+
+    A spectator who reads slowly gets snapshots in place of the events they fell behind on, the game never waits.
+    PLAY human waits for another client to ask for a human game of the same size, then pairs them.
+    METRICS gets back METRICS and one line of JSON from instrumentation when the server runs with it on.
+    Anything that makes no sense gets an ERROR line back.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 4444, executor: Optional[Executor] = None,
+                 player_options: Optional[Dict[str, Dict[str, Any]]] = None, workers: Optional[int] = None) -> None:
+        """
+        :param executor: where to work out every AI move, which has to run them all in one process
+        :param player_options: extra keyword arguments for the AIs of every player type
+        :param workers: how many processes to work out AI moves in when no executor is given, one per core if None
+        """
+        self.host = host
+        self.port = port
+        self.executors: List[Executor] = [executor] if executor is not None else \
+            [ProcessPoolExecutor(max_workers=1, initializer=random.seed) for _ in range(workers or os.cpu_count() or 1)]
+        self._executor_games = [0] * len(self.executors)
+        self.player_options = {player_type: dict(options) for player_type, options in QUIET_PLAYER_OPTIONS.items()}
+        for player_type, options in (player_options or {}).items():
+            self.player_options.setdefault(player_type, {}).update(options)
+        self.games_played = 0
+        self.active_games = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._game_ids = itertools.count(1)
+        # what spectators subscribe to, for every game being played
+        self._broadcasters: Dict[int, Broadcaster] = {}
+        # people waiting for a human opponent, by board size and rules
+        self._lobby: Dict[Tuple[int, int, int], Tuple[Connection, asyncio.Future]] = {}
+
+    async def start(self) -> None:
+        """
+        Start listening. With port 0 the operating system picks a free port, which is then stored in port
+        :return: None
+        """
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port,
+                                                  limit=MAX_LINE_LENGTH * 4)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """
+        Stop listening and shut the executors down
+        :return: None
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for executor in self.executors:
+            executor.shutdown(wait=False)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        connection = Connection(reader, writer)
+        try:
+            await connection.send('HELLO connect4')
+            while True:
+                command, _, argument = (await connection.read_line()).partition(' ')
+                command = command.upper()
+                if command == 'NAME' and argument.strip():
+                    connection.name = argument.strip()
+                    await connection.send(f'WELCOME {connection.name}')
+                elif command == 'PLAY' and connection.name:
+                    await self._play(connection, argument.split())
+                elif command == 'GAMES':
+                    await connection.send(' '.join(['GAMES', *(str(game_id) for game_id in self._broadcasters)]))
+                elif command == 'WATCH':
+                    await self._watch(connection, argument.strip())
+                elif command == 'METRICS':
+                    await connection.send(f'METRICS {INSTRUMENTS.to_json()}' if INSTRUMENTS.enabled
+                                          else 'ERROR instrumentation is off')
+                elif command == 'QUIT':
+                    await connection.send('BYE')
+                    break
+                else:
+                    await connection.send('ERROR say NAME <name> first, then PLAY <opponent> [rows cols pieces_to_win]'
+                                          if not connection.name else f'ERROR unknown command {command}')
+        except ConnectionClosedError:
+            pass
+        finally:
+            await connection.close()
+
+    async def _watch(self, connection: Connection, argument: str) -> None:
+        broadcaster = self._broadcasters.get(int(argument)) if argument.isdigit() else None
+        if broadcaster is None:
+            await connection.send(f'ERROR there is no game {argument} being played, see GAMES')
+            return
+        subscription = broadcaster.subscribe()
+        try:
+            await connection.send(f'WATCHING {argument}')
+            async for event in subscription:
+                await connection.send(f'EVENT {event_to_json(event)}')
+            await connection.send(f'END {argument}')
+        finally:
+            subscription.unsubscribe()
+
+    async def _play(self, connection: Connection, arguments: List[str]) -> None:
+        try:
+            opponent = arguments[0].lower() if arguments else ''
+            num_rows, num_cols, num_pieces_to_win = (int(value) for value in arguments[1:4]) \
+                if len(arguments) >= 4 else DEFAULT_GEOMETRY
+        except ValueError:
+            await connection.send('ERROR rows, columns and pieces to win must be integers')
+            return
+        if opponent not in PLAYER_TYPES:
+            await connection.send(f'ERROR the opponent must be one of {", ".join(PLAYER_TYPES)}')
+            return
+        if min(num_rows, num_cols, num_pieces_to_win) < 1 or num_rows * num_cols > MAX_CELLS:
+            await connection.send(f'ERROR the board must have between 1 and {MAX_CELLS} spots')
+            return
+
+        geometry = (num_rows, num_cols, num_pieces_to_win)
+        if opponent != 'human':
+            ai_class = PLAYER_TYPES[opponent]
+            options = self.player_options.get(opponent, {})
+            try:
+                ai_class.check_available(**options)
+            except player.PlayerUnavailableError as error:
+                await connection.send(f'ERROR {error}')
+                return
+            players: List[player.Player] = [RemotePlayer(connection.name, PIECES[0]),
+                                            ai_class(ai_class.get_valid_name([]), PIECES[1], **options)]
+            lane = self._executor_games.index(min(self._executor_games))
+            sources = [ConnectionMoveSource(connection), ExecutorMoveSource(self.executors[lane], options)]
+            self._executor_games[lane] += 1
+            try:
+                await self._run_game(geometry, players, sources, [connection])
+            finally:
+                self._executor_games[lane] -= 1
+            return
+
+        waiting = self._lobby.pop(geometry, None)
+        if waiting is None or waiting[1].done():
+            # wait for somebody to pair with, who will run the game
+            finished = asyncio.get_running_loop().create_future()
+            self._lobby[geometry] = (connection, finished)
+            await connection.send('WAITING')
+            try:
+                await finished
+            finally:
+                if self._lobby.get(geometry, (None,))[0] is connection:
+                    del self._lobby[geometry]
+            return
+        other, finished = waiting
+        try:
+            name = connection.name if connection.name != other.name else f'{connection.name} 2'
+            players = [RemotePlayer(other.name, PIECES[0]), RemotePlayer(name, PIECES[1])]
+            await self._run_game(geometry, players, [ConnectionMoveSource(other), ConnectionMoveSource(connection)],
+                                 [other, connection])
+        finally:
+            finished.set_result(None)
+
+    async def _run_game(self, geometry: Tuple[int, int, int], players: List["player.Player"],
+                        sources: List[MoveSource], connections: List[Connection]) -> None:
+        num_rows, num_cols, num_pieces_to_win = geometry
+        players[0].opponent, players[1].opponent = players[1], players[0]
+        game = Game(BitBoard(num_rows, num_cols, BLANK_CHAR), num_pieces_to_win, players)
+        game_id = next(self._game_ids)
+        broadcaster = Broadcaster()
+        game.add_observer(broadcaster)
+        game.start()
+        self._broadcasters[game_id] = broadcaster
+        self.active_games += 1
+        try:
+            # connection i plays for players[i]
+            for you, connection in enumerate(connections):
+                await connection.send(f'START {game_id} {num_rows} {num_cols} {num_pieces_to_win} '
+                                      f'{players[you].piece} {players[1 - you]}')
+            winner = await play_game_async(game, sources, connections)
+            for connection in connections:
+                await connection.send('TIE' if winner is None else f'WIN {winner}')
+        except ConnectionClosedError:
+            # whoever was to move left, so the other player wins
+            INSTRUMENTS.abandon_game(game)
+            for connection in connections:
+                try:
+                    await connection.send(f'FORFEIT {game.cur_player}')
+                except ConnectionClosedError:
+                    pass
+        finally:
+            game.close_players()
+            del self._broadcasters[game_id]
+            broadcaster.close()
+            self.active_games -= 1
+            self.games_played += 1
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Run a game server from the command line until it is interrupted
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description='Host Connect4 games over TCP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4444)
+    parser.add_argument('--workers', type=int, default=None, help='processes for AI moves, defaults to one per core')
+    parser.add_argument('--set', dest='settings', action='append', default=[],
+                        help='an AI option such as lazysmp.workers=4, the processes every LazySMP AI searches with')
+    parser.add_argument('--instrument', action='store_true',
+                        help='measure moves and games for METRICS, and profile when sent SIGUSR1')
+    args = parser.parse_args(argv)
+
+    if args.instrument:
+        INSTRUMENTS.enable()
+        if hasattr(signal, 'SIGUSR1'):
+            install_profiler_signal()
+
+    server = GameServer(args.host, args.port, player_options=parse_player_options(args.settings),
+                        workers=args.workers)
+
+    async def run() -> None:
+        await server.start()
+        print(f'Serving Connect4 on {server.host}:{server.port}')
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
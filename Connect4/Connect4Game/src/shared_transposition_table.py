@@ -0,0 +1,184 @@
+from multiprocessing import shared_memory
+from typing import Any, Dict, Optional, Tuple
+from .transposition_table import TranspositionTable, TTEntry, pack_entry, unpack_entry
+
+# the block starts with a few 64 bit header words, then two entries per bucket of two words each:
+# the key xor the data, then the data packed by pack_entry (which is never 0, so 0 marks an empty entry)
+_NUM_BUCKETS_WORD = 0
+_STOP_WORD = 1  # non zero while searches attached to the table should stop
+_HEADER_WORDS = 4
+_WORDS_PER_ENTRY = 2
+
+# the tables this process has attached to by name, so every search sent here reuses one attachment
+_ATTACHED: Dict[str, "SharedTranspositionTable"] = {}
+
+
+def attach(name: str) -> "SharedTranspositionTable":
+    """
+    :param name: the name of a table another process made
+    :return: this process's view of the table
+    """
+    table = _ATTACHED.get(name)
+    if table is None:
+        table = _ATTACHED[name] = SharedTranspositionTable(name=name)
+    return table
+
+
+class SharedTranspositionTable(TranspositionTable):
+    """
+    A TranspositionTable kept in a multiprocessing.shared_memory block, so searches in several
+    processes read and write the same entries. It works like TranspositionTable, with the same
+    two entries per bucket and the same replacement scheme, but never takes a lock.
+
+    Every entry is stored as the key xor the packed data next to the data itself. Two processes
+    writing the same entry at once can leave the words of different writes side by side, and a
+    reader can see half of a write, but then the key no longer matches and the entry reads as a
+    miss instead of as another position's result.
+
+    Pickling the table sends its name, and unpickling attaches to the same block. The process
+    that made the table should unlink it when every process is done with it.
+    The hits, misses, evictions and stores counters only count what this process did.
+    """
+
+    BYTES_PER_ENTRY = _WORDS_PER_ENTRY * 8
+
+    def __init__(self, memory_bytes: int = TranspositionTable.DEFAULT_MEMORY_BYTES, name: Optional[str] = None) -> None:
+        """
+        :param memory_bytes: about how big the table should be, ignored when attaching
+        :param name: the name of an existing table to attach to, None to make a new one
+        :raises: ValueError if memory_bytes is too small for one bucket
+        """
+        if name is None:
+            if memory_bytes < 2 * self.BYTES_PER_ENTRY:
+                raise ValueError(f'memory_bytes must be at least {2 * self.BYTES_PER_ENTRY} but is {memory_bytes}')
+            num_buckets = 1 << ((memory_bytes // (2 * self.BYTES_PER_ENTRY)).bit_length() - 1)
+            self._shared_memory = shared_memory.SharedMemory(
+                create=True, size=8 * (_HEADER_WORDS + 2 * _WORDS_PER_ENTRY * num_buckets))
+            self._words = self._shared_memory.buf.cast('Q')
+            self._words[_NUM_BUCKETS_WORD] = num_buckets
+            self.owner = True
+            _ATTACHED[self.name] = self
+        else:
+            self._shared_memory = shared_memory.SharedMemory(name=name)
+            self._words = self._shared_memory.buf.cast('Q')
+            num_buckets = self._words[_NUM_BUCKETS_WORD]
+            self.owner = False
+        self.memory_bytes = 2 * self.BYTES_PER_ENTRY * num_buckets
+        self._bucket_mask = num_buckets - 1
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stores = 0
+
+    @property
+    def name(self) -> str:
+        return self._shared_memory.name
+
+    def __reduce__(self) -> Tuple[Any, Tuple[str]]:
+        return attach, (self.name,)
+
+    @property
+    def stop(self) -> bool:
+        """
+        :return: whether searches sharing the table have been asked to stop
+        """
+        return self._words[_STOP_WORD] != 0
+
+    @stop.setter
+    def stop(self, stop: bool) -> None:
+        self._words[_STOP_WORD] = int(stop)
+
+    @property
+    def capacity(self) -> int:
+        return 2 * (self._bucket_mask + 1)
+
+    def _read(self, entry: int) -> Tuple[Optional[int], int]:
+        """
+        :return: the key and data of the entry-th entry, the key is None if it is empty.
+        The key of a half written entry is garbage, so it matches no position
+        """
+        word = _HEADER_WORDS + _WORDS_PER_ENTRY * entry
+        data = self._words[word + 1]
+        if not data:
+            return None, 0
+        return self._words[word] ^ data, data
+
+    def _write(self, entry: int, key: Optional[int], data: int) -> None:
+        word = _HEADER_WORDS + _WORDS_PER_ENTRY * entry
+        if key is None:
+            self._words[word + 1] = 0
+            self._words[word] = 0
+        else:
+            self._words[word + 1] = data
+            self._words[word] = key ^ data
+
+    def __len__(self) -> int:
+        return sum(self._read(entry)[0] is not None for entry in range(self.capacity))
+
+    def clear(self) -> None:
+        for word in range(_HEADER_WORDS, _HEADER_WORDS + _WORDS_PER_ENTRY * self.capacity):
+            self._words[word] = 0
+        self.hits = self.misses = self.evictions = self.stores = 0
+
+    def probe(self, key: int) -> Optional[TTEntry]:
+        index = (key & self._bucket_mask) << 1
+        for entry in (index, index + 1):
+            stored_key, data = self._read(entry)
+            if stored_key == key:
+                self.hits += 1
+                return unpack_entry(data)
+        self.misses += 1
+        return None
+
+    def store(self, key: int, depth: int, flag: int, score: int, move: Optional[int]) -> None:
+        data = pack_entry(depth, flag, score, move)
+        index = (key & self._bucket_mask) << 1
+        self.stores += 1
+        deepest_key, deepest_data = self._read(index)
+        if deepest_key is None or deepest_key == key or depth >= unpack_entry(deepest_data).depth:
+            if self._read(index + 1)[0] == key:  # the older result for this position is out of date
+                self._write(index + 1, None, 0)
+            if deepest_key is not None and deepest_key != key:
+                # the old deepest entry gets a second chance in the always-replace entry
+                self._replace(index + 1, deepest_key, deepest_data)
+            self._write(index, key, data)
+        else:
+            self._replace(index + 1, key, data)
+
+    def _replace(self, index: int, key: int, data: int) -> None:
+        old_key = self._read(index)[0]
+        if old_key is not None and old_key != key:
+            self.evictions += 1
+        self._write(index, key, data)
+
+    def close(self) -> None:
+        """
+        Stop using the table in this process
+        :return: None
+        """
+        _ATTACHED.pop(self.name, None)
+        self._words.release()
+        self._shared_memory.close()
+
+    def __del__(self) -> None:
+        # the block cannot be closed while the view of it is still around
+        words = getattr(self, '_words', None)
+        if words is not None:
+            words.release()
+
+    def unlink(self) -> None:
+        """
+        Close the table and free its memory once every process has closed it. Only the owner should call this
+        :return: None
+        """
+        self.close()
+        self._shared_memory.unlink()
+
+    def __enter__(self) -> "SharedTranspositionTable":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        if self.owner:
+            self.unlink()
+        else:
+            self.close()
@@ -0,0 +1,118 @@
+import argparse
+import os
+import random
+import time
+from typing import Callable, List, NamedTuple, Optional, Sequence
+from .bitboard import BitBoard
+from .players.lazy_smp_ai import LazySmpAi
+from .players.random_ai import RandomAi
+from .selfplay import PIECES, BLANK_CHAR
+
+
+class SpeedupResult(NamedTuple):
+    workers: int
+    seconds: float  # to search every position to the depth
+    nodes: int  # searched by every worker together
+    speedup: float  # how many times faster than the first worker count measured
+    same_move: float  # the share of the positions where the move matched the first worker count's move
+
+    @property
+    def nodes_per_second(self) -> float:
+        return self.nodes / self.seconds if self.seconds > 0 else float(self.nodes)
+
+
+def random_positions(count: int, plies: int, seed: int, num_rows: int = 6, num_cols: int = 7,
+                     num_pieces_to_win: int = 4) -> List[BitBoard]:
+    """
+    :return: count boards with plies random moves played on them, none of them already won or full
+    """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        the_board = BitBoard(num_rows, num_cols, BLANK_CHAR)
+        for ply in range(plies):
+            column = rng.choice([column for column in range(num_cols) if not the_board.is_column_full(column)])
+            row = the_board.push_move(column, PIECES[ply % 2])
+            if the_board.count_max_matches(row, column) >= num_pieces_to_win or the_board.is_full:
+                break
+        else:
+            positions.append(the_board)
+    return positions
+
+
+def measure_speedup(worker_counts: Sequence[int], positions: Sequence[BitBoard], depth: int,
+                    num_pieces_to_win: int = 4, memory_bytes: int = 64 * 1024 * 1024,
+                    on_result: Optional[Callable[[SpeedupResult], None]] = None) -> List[SpeedupResult]:
+    """
+    Time searching every position to depth with each number of workers. The table is cleared before every
+    position and the helper processes are started before the clock starts, so only the search is timed
+    :param worker_counts: the numbers of workers to try, the first one is what the others are compared to
+    :param positions: the boards to search, the side to move being picked by how many pieces are on them
+    :param depth: how deep to search every position
+    :param on_result: called with each result as soon as it is measured
+    :return: the result for every worker count, in order
+    """
+    results: List[SpeedupResult] = []
+    first_moves: List[int] = []
+    for workers in worker_counts:
+        ai = LazySmpAi(f'LazySmpAi {workers}', PIECES[0], RandomAi('RandomAi', PIECES[1]), time_budget=float('inf'),
+                       max_depth=1, verbose=False, workers=workers, memory_bytes=memory_bytes)
+        try:
+            ai.search(positions[0], num_pieces_to_win)  # start the helper processes
+            ai.max_depth = depth
+            seconds = 0.0
+            nodes = 0
+            moves = []
+            for the_board in positions:
+                ai.piece, ai.opponent.piece = (PIECES[0], PIECES[1]) if the_board.num_pieces % 2 == 0 else \
+                    (PIECES[1], PIECES[0])
+                ai.transposition_table.clear()
+                start = time.perf_counter()
+                stats = ai.search(the_board, num_pieces_to_win)
+                seconds += time.perf_counter() - start
+                nodes += stats.nodes
+                moves.append(stats.column)
+        finally:
+            ai.close()
+        if not results:
+            first_moves = moves
+        speedup = results[0].seconds / seconds if results and seconds > 0 else 1.0
+        same_move = sum(move == first for move, first in zip(moves, first_moves)) / max(1, len(moves))
+        results.append(SpeedupResult(workers, seconds, nodes, speedup, same_move))
+        if on_result is not None:
+            on_result(results[-1])
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Measure how much faster LazySmpAi searches with more workers
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description='Measure the speedup of the Lazy SMP search for each worker count.')
+    parser.add_argument('--workers', type=int, nargs='+', default=None,
+                        help='the worker counts to try, defaults to 1, 2, 4, ... up to the number of cores')
+    parser.add_argument('--depth', type=int, default=10, help='how deep to search every position')
+    parser.add_argument('--positions', type=int, default=8, help='how many random positions to search')
+    parser.add_argument('--plies', type=int, default=6, help='how many random moves make a position')
+    parser.add_argument('--memory', type=int, default=64, help='megabytes of shared transposition table')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    cores = os.cpu_count() or 1
+    worker_counts = args.workers
+    if worker_counts is None:
+        worker_counts = [1 << power for power in range(cores.bit_length()) if 1 << power <= cores]
+        if worker_counts[-1] != cores:
+            worker_counts.append(cores)
+    positions = random_positions(args.positions, args.plies, args.seed)
+    print(f'{len(positions)} positions searched to depth {args.depth} on {cores} cores')
+    print(f'{"workers":>7} {"seconds":>9} {"speedup":>8} {"nodes":>12} {"nodes/sec":>11} {"same move":>9}')
+    measure_speedup(worker_counts, positions, args.depth, memory_bytes=args.memory * 1024 * 1024,
+                    on_result=lambda result: print(f'{result.workers:>7} {result.seconds:>9.2f} '
+                                                   f'{result.speedup:>7.2f}x {result.nodes:>12,} '
+                                                   f'{result.nodes_per_second:>11,.0f} {result.same_move:>9.0%}'))
+
+
+if __name__ == '__main__':
+    main()
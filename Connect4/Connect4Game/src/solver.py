@@ -0,0 +1,408 @@
+import argparse
+import sqlite3
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+from .bitboard import BitBoard
+from .game import Game
+
+
+class InvalidPositionError(Exception):
+    pass
+
+
+class Solution(NamedTuple):
+    """
+    The game-theoretic value of a position, from the point of view of the side to move
+    """
+    result: str  # 'win', 'loss' or 'draw'
+    plies_to_end: int  # how many more pieces are played before the game ends with best play from both sides
+    best_column: Optional[int]  # None if the board is full
+    score: int  # positive the sooner the side to move wins, negative the sooner it loses, 0 for a draw
+    column_scores: Dict[int, int]  # the score of every column that was searched
+    nodes: int
+    seconds: float
+
+
+class SolverCache(object):
+    """
+    Exact scores of solved positions, kept in an SQLite database so they survive between runs.
+    Positions are stored under the smaller of their key and their mirror image's key, along with
+    the board size and rules they were solved for
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.execute('CREATE TABLE IF NOT EXISTS positions (num_rows INTEGER, num_cols INTEGER, '
+                                 'num_pieces_to_win INTEGER, key BLOB, score INTEGER, '
+                                 'PRIMARY KEY (num_rows, num_cols, num_pieces_to_win, key))')
+        self._connection.commit()
+
+    @staticmethod
+    def _to_blob(key: int) -> bytes:
+        # keys can be wider than SQLite's 64 bit integers on big boards
+        return key.to_bytes(max(1, (key.bit_length() + 7) // 8), 'little')
+
+    def load(self, num_rows: int, num_cols: int, num_pieces_to_win: int) -> Dict[int, int]:
+        """
+        :return: the score of every stored position for this board size and these rules, by canonical key
+        """
+        rows = self._connection.execute('SELECT key, score FROM positions WHERE num_rows = ? AND num_cols = ? '
+                                        'AND num_pieces_to_win = ?', (num_rows, num_cols, num_pieces_to_win))
+        return {int.from_bytes(key, 'little'): score for key, score in rows}
+
+    def store(self, num_rows: int, num_cols: int, num_pieces_to_win: int, scores: Iterable[Tuple[int, int]]) -> None:
+        """
+        :param scores: canonical keys and their exact scores
+        :return: None
+        """
+        self._connection.executemany('INSERT OR REPLACE INTO positions VALUES (?, ?, ?, ?, ?)',
+                                     [(num_rows, num_cols, num_pieces_to_win, self._to_blob(key), score)
+                                      for key, score in scores])
+        self._connection.commit()
+
+    def __len__(self) -> int:
+        return self._connection.execute('SELECT COUNT(*) FROM positions').fetchone()[0]
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+class Solver(object):
+    """
+    Finds the exact value of positions with null-window negamax searches.
+
+    Positions are two integers laid out like BitBoard: mask has a bit for every piece and
+    current a bit for every piece of the side to move. current + mask is a unique key for a
+    position because the sentinel bit on top of every column keeps the sum from carrying
+    into the next column. Scores count how early a game is won: winning with the move that
+    puts the m-th piece on the board is worth (num_cells + 2 - m) // 2.
+
+    The search keeps upper bounds in an in-memory table and exact scores of whole solved
+    positions in cache, which is loaded from disk once and written back after every solve.
+    """
+
+    def __init__(self, num_rows: int, num_cols: int, num_pieces_to_win: int,
+                 cache: Optional[SolverCache] = None, max_table_entries: int = 1 << 22) -> None:
+        if num_rows < 1 or num_cols < 1 or num_pieces_to_win < 1:
+            raise ValueError('num_rows, num_cols and num_pieces_to_win must all be at least 1')
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.num_pieces_to_win = num_pieces_to_win
+        self.num_cells = num_rows * num_cols
+        self.cache = cache
+        self.max_table_entries = max_table_entries
+        self.nodes = 0
+
+        self._column_height = num_rows + 1
+        self._bottom = BitBoard.bottom_mask(num_rows, num_cols)
+        self._board_mask = self._bottom * ((1 << num_rows) - 1)
+        self._column_masks = [((1 << num_rows) - 1) << (col * self._column_height) for col in range(num_cols)]
+        self._shifts = (1, self._column_height, self._column_height + 1, self._column_height - 1)
+        center = (num_cols - 1) / 2
+        self._column_order = sorted(range(num_cols), key=lambda col: abs(col - center))
+        self._upper_bounds: Dict[int, int] = {}
+        self._exact: Dict[int, int] = {}
+        if cache is not None:
+            for key, score in cache.load(num_rows, num_cols, num_pieces_to_win).items():
+                self._remember(*self._decode(key), score)
+        self._new_exact: Dict[int, int] = {}
+
+    def position_from_moves(self, moves: Sequence[int]) -> Tuple[int, int, int]:
+        """
+        :param moves: the columns played so far, from 0
+        :return: current, mask and the number of pieces played
+        :raises: InvalidPositionError if a move is not legal or the game is already over
+        """
+        current = mask = 0
+        for played, column in enumerate(moves):
+            if not 0 <= column < self.num_cols:
+                raise InvalidPositionError(f'Move {played + 1} is column {column}, which is not on the board.')
+            move = (mask + (self._bottom & self._column_masks[column])) & self._column_masks[column]
+            if not move:
+                raise InvalidPositionError(f'Move {played + 1} is in column {column}, which is full.')
+            if self._is_win(current | move):
+                raise InvalidPositionError(f'The game is already over after move {played + 1}.')
+            current ^= mask
+            mask |= move
+        return current, mask, len(moves)
+
+    def position_from_rows(self, rows: Sequence[str], first_piece: str = 'X', second_piece: str = 'O') \
+            -> Tuple[int, int, int]:
+        """
+        :param rows: the rows of the board from the top down, one character per spot.
+        Anything that is not one of the two pieces is an empty spot
+        :param first_piece: the piece of the player who moved first
+        :param second_piece: the piece of the other player
+        :return: current, mask and the number of pieces played
+        :raises: InvalidPositionError if the position could not happen in a game
+        """
+        if len(rows) != self.num_rows or any(len(row) != self.num_cols for row in rows):
+            raise InvalidPositionError(f'The board needs {self.num_rows} rows of {self.num_cols} spots.')
+        first = second = 0
+        for row, line in enumerate(reversed(rows)):
+            for col, spot in enumerate(line):
+                bit = 1 << (col * self._column_height + row)
+                if spot == first_piece:
+                    first |= bit
+                elif spot == second_piece:
+                    second |= bit
+        mask = first | second
+        if (mask + self._bottom) & mask:  # adding a piece to every column would carry into an existing piece
+            raise InvalidPositionError('Some pieces are floating above an empty spot.')
+        num_first, num_second = bin(first).count('1'), bin(second).count('1')
+        if num_first - num_second not in (0, 1):
+            raise InvalidPositionError(f'{first_piece} has {num_first} pieces and {second_piece} has {num_second}.')
+        if self._is_win(first) or self._is_win(second):
+            raise InvalidPositionError('Somebody has already won.')
+        return (first if num_first == num_second else second), mask, num_first + num_second
+
+    def _is_win(self, pieces: int) -> bool:
+        return any(BitBoard.has_run(pieces, shift, self.num_pieces_to_win) for shift in self._shifts)
+
+    def _winning_spots(self, pieces: int, mask: int) -> int:
+        """
+        :return: every empty spot, playable or not, that would give pieces num_pieces_to_win in a row
+        """
+        return BitBoard.winning_spots(pieces, self._board_mask ^ mask, self._shifts, self.num_pieces_to_win)
+
+    def _key(self, current: int, mask: int) -> int:
+        return current + mask
+
+    def _mirror(self, bits: int) -> int:
+        column_bits = (1 << self._column_height) - 1
+        mirrored = 0
+        for col in range(self.num_cols):
+            mirrored |= ((bits >> (col * self._column_height)) & column_bits) << \
+                ((self.num_cols - 1 - col) * self._column_height)
+        return mirrored
+
+    def _canonical_key(self, current: int, mask: int) -> int:
+        return min(self._key(current, mask), self._key(self._mirror(current), self._mirror(mask)))
+
+    def _decode(self, key: int) -> Tuple[int, int]:
+        """
+        :return: the current and mask of key. Per column, key + bottom is current plus a bit right above the pieces
+        """
+        with_bottom = key + self._bottom
+        current = mask = 0
+        for col in range(self.num_cols):
+            column = (with_bottom >> (col * self._column_height)) & ((1 << self._column_height) - 1)
+            top = 1 << (column.bit_length() - 1)
+            current |= (column ^ top) << (col * self._column_height)
+            mask |= (top - 1) << (col * self._column_height)
+        return current, mask
+
+    def _remember(self, current: int, mask: int, score: int) -> None:
+        # both orientations go in, so the search finds a position whichever way round it reaches it
+        self._exact[self._key(current, mask)] = score
+        self._exact[self._key(self._mirror(current), self._mirror(mask))] = score
+
+    def _negamax(self, current: int, mask: int, moves: int, alpha: int, beta: int) -> int:
+        """
+        Search a position where the side to move cannot win with its next move
+        :return: the exact score if it is between alpha and beta, otherwise a bound on the side it is on
+        """
+        self.nodes += 1
+        key = current + mask
+        exact = self._exact.get(key)
+        if exact is not None:
+            return exact
+
+        opponent = current ^ mask
+        playable = (mask + self._bottom) & self._board_mask
+        opponent_wins = self._winning_spots(opponent, mask)
+        forced = playable & opponent_wins
+        if forced:
+            if forced & (forced - 1):  # two threats at once cannot both be blocked
+                return -((self.num_cells - moves) // 2)
+            playable = forced
+        playable &= ~(opponent_wins >> 1)  # playing right below a winning spot lets the opponent play it
+        if not playable:
+            return -((self.num_cells - moves) // 2)
+        if moves >= self.num_cells - 2:
+            return 0
+
+        lowest = -((self.num_cells - 2 - moves) // 2)
+        if alpha < lowest:
+            alpha = lowest
+            if alpha >= beta:
+                return alpha
+        highest = (self.num_cells - 1 - moves) // 2
+        upper_bound = self._upper_bounds.get(key)
+        if upper_bound is not None:
+            highest = upper_bound
+        if beta > highest:
+            beta = highest
+            if alpha >= beta:
+                return beta
+
+        # moves that leave the most ways to win are searched first
+        candidates = []
+        for col in self._column_order:
+            move = playable & self._column_masks[col]
+            if move:
+                threats = bin(self._winning_spots(current | move, mask | move)).count('1')
+                candidates.append((-threats, len(candidates), move))
+        candidates.sort()
+        for _, _, move in candidates:
+            score = -self._negamax(opponent, mask | move, moves + 1, -beta, -alpha)
+            if score >= beta:
+                return score
+            if score > alpha:
+                alpha = score
+
+        if len(self._upper_bounds) >= self.max_table_entries:
+            self._upper_bounds.clear()
+        self._upper_bounds[key] = alpha
+        return alpha
+
+    def score(self, current: int, mask: int, moves: int) -> int:
+        """
+        Find the exact score of a position nobody has won yet by narrowing it down with null-window searches
+        :return: the score of the position for the side to move
+        """
+        if moves == self.num_cells:
+            return 0
+        playable = (mask + self._bottom) & self._board_mask
+        if self._winning_spots(current, mask) & playable:
+            return (self.num_cells + 1 - moves) // 2
+        exact = self._exact.get(current + mask)
+        if exact is not None:
+            return exact
+
+        low = -((self.num_cells - moves) // 2)
+        high = (self.num_cells + 1 - moves) // 2
+        while low < high:
+            middle = low + (high - low) // 2
+            # try close to 0 first, where most scores are, instead of bisecting
+            if middle <= 0 and low // 2 < middle:
+                middle = low // 2
+            elif middle >= 0 and high // 2 > middle:
+                middle = high // 2
+            result = self._negamax(current, mask, moves, middle, middle + 1)
+            if result <= middle:
+                high = result
+            else:
+                low = result
+        self._new_exact[self._canonical_key(current, mask)] = low
+        self._remember(current, mask, low)
+        return low
+
+    def describe(self, score: int, moves: int) -> Tuple[str, int]:
+        """
+        :param score: the score of a position
+        :param moves: how many pieces the position has
+        :return: 'win', 'loss' or 'draw' for the side to move, and how many more plies the game lasts
+        """
+        if score == 0:
+            return 'draw', self.num_cells - moves
+        # the game ends with the m-th piece, where score = (num_cells + 2 - m) // 2 and the winner places it
+        last = self.num_cells + 2 - 2 * abs(score)
+        winner_parity = (moves + 1) % 2 if score > 0 else moves % 2
+        if last % 2 != winner_parity:
+            last -= 1
+        return ('win' if score > 0 else 'loss'), last - moves
+
+    def solve(self, current: int, mask: int, moves: int, all_columns: bool = False) -> Solution:
+        """
+        Find the score of a position and a move that keeps it
+        :param all_columns: whether to score every column instead of stopping at the first best one
+        :return: the solution of the position
+        """
+        start = time.perf_counter()
+        self.nodes = 0
+        score = self.score(current, mask, moves)
+        column_scores = {}
+        winning = self._winning_spots(current, mask)
+        # winning moves first, so a position that is won right away never searches the others
+        columns = sorted(self._column_order, key=lambda col: not winning & self._column_masks[col] &
+                         (mask + self._bottom))
+        for col in columns:
+            move = (mask + (self._bottom & self._column_masks[col])) & self._column_masks[col]
+            if not move:
+                continue
+            if winning & move:
+                column_scores[col] = (self.num_cells + 1 - moves) // 2
+            else:
+                column_scores[col] = -self.score(current ^ mask, mask | move, moves + 1)
+            if column_scores[col] == score and not all_columns:
+                break
+        best_column = max(column_scores, key=lambda col: column_scores[col]) if column_scores else None
+        if self.cache is not None and self._new_exact:
+            self.cache.store(self.num_rows, self.num_cols, self.num_pieces_to_win, self._new_exact.items())
+            self._new_exact = {}
+        result, plies_to_end = self.describe(score, moves)
+        return Solution(result, plies_to_end, best_column, score, column_scores, self.nodes,
+                        time.perf_counter() - start)
+
+
+def parse_moves(moves: str) -> List[int]:
+    """
+    :param moves: columns counted from 1, either as digits like 4453 or separated by commas like 10,4,4
+    :return: the columns counted from 0
+    :raises: InvalidPositionError if moves is not a move sequence
+    """
+    parts = moves.split(',') if ',' in moves else list(moves)
+    try:
+        columns = [int(part) - 1 for part in parts if part.strip()]
+    except ValueError:
+        raise InvalidPositionError(f'{moves} is not a sequence of columns')
+    if any(column < 0 for column in columns):
+        raise InvalidPositionError('Columns are counted from 1.')
+    return columns
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Solve a position from the command line
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description='Find out who wins a position with perfect play, and how.')
+    parser.add_argument('moves', nargs='?', default='',
+                        help='the columns played so far counted from 1, like 4453, or 10,4,4 on wide boards')
+    parser.add_argument('--board', help='a file with the rows of the board from the top down instead of moves')
+    parser.add_argument('--pieces', default='XO', help='the piece of the first player then the second')
+    parser.add_argument('--config', default='config_files/connect4_config.txt',
+                        help='a configuration file with the board size and rules')
+    parser.add_argument('--rows', type=int)
+    parser.add_argument('--cols', type=int)
+    parser.add_argument('--pieces-to-win', type=int)
+    parser.add_argument('--cache', default='solver_cache.sqlite3', help='the database of solved positions')
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--all', action='store_true', help='score every column, not just the best one')
+    args = parser.parse_args(argv)
+
+    config = Game.read_config_file(args.config)
+    num_rows = args.rows or int(config['num_rows'])
+    num_cols = args.cols or int(config['num_cols'])
+    num_pieces_to_win = args.pieces_to_win or int(config['num_pieces_to_win'])
+    cache = None if args.no_cache else SolverCache(args.cache)
+    try:
+        solver = Solver(num_rows, num_cols, num_pieces_to_win, cache)
+        if args.board:
+            with open(args.board) as board_file:
+                rows = [line.rstrip('\n') for line in board_file if line.strip()]
+            current, mask, moves = solver.position_from_rows(rows, args.pieces[0], args.pieces[1])
+        else:
+            current, mask, moves = solver.position_from_moves(parse_moves(args.moves))
+        solution = solver.solve(current, mask, moves, args.all)
+    except InvalidPositionError as error:
+        parser.error(str(error))
+        return
+    finally:
+        if cache is not None:
+            cache.close()
+
+    to_move = args.pieces[moves % 2]
+    if solution.best_column is None:
+        print('The board is full, so the game is a draw.')
+        return
+    print(f'{to_move} to move: {solution.result} in {solution.plies_to_end} plies (score {solution.score:+d})')
+    print(f'Best move: column {solution.best_column + 1}')
+    print('Scores:', ', '.join(f'{col + 1}: {score:+d}' for col, score in sorted(solution.column_scores.items())))
+    print(f'{solution.nodes} nodes in {solution.seconds:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+from typing import Dict, List, Iterator, Optional, Tuple
+from .board import Board
+from .window_index import WindowIndex
+
+# how much of a board repr shows when the board is too big to print whole
+DEFAULT_VIEWPORT_ROWS = 20
+DEFAULT_VIEWPORT_COLS = 40
+
+
+class _ColumnHeights(Dict[int, int]):
+    """
+    The number of pieces in every column, only holding the columns that have any
+    """
+
+    def __missing__(self, column: int) -> int:
+        return 0
+
+    def __setitem__(self, column: int, height: int) -> None:
+        if height:
+            super().__setitem__(column, height)
+        else:
+            self.pop(column, None)
+
+
+class SparseBoard(Board):
+    """
+    A Board for very large boards that only stores the pieces that have been played.
+
+    Every column that has a piece in it keeps a list of its pieces from the bottom up,
+    so the memory used grows with the number of pieces instead of the size of the board
+    and the height of a column is the length of its list.
+
+    Nothing is ever done for every spot of the board:
+    is_full compares the number of pieces to the number of spots, no WindowIndex is kept
+    (it would need a list for every spot) and wins are found by walking at most
+    num_pieces_to_win - 1 spots each way from the last move.
+    repr only shows a viewport of the board around the last piece played.
+
+    Rows returned from __getitem__ and __iter__ are snapshots, so writing into them does not change the board.
+    """
+
+    def __init__(self, num_rows: int, num_cols: int, blank_char: str) -> None:
+        if num_rows < 1 or num_cols < 1:
+            raise ValueError(f'A board needs at least 1 row and 1 column but got {num_rows}x{num_cols}')
+        self.blank_char = blank_char
+        self._num_rows = num_rows
+        self._num_cols = num_cols
+        self._columns: Dict[int, List[str]] = {}
+        # the longest run count_max_matches looks for, None to follow runs to the edge of the board
+        self._run_limit: Optional[int] = None
+        self._last_spot: Optional[Tuple[int, int]] = None
+        self._init_bookkeeping(num_cols)
+
+    def _init_bookkeeping(self, num_cols: int) -> None:
+        super()._init_bookkeeping(0)
+        self._number_of_pieces_in_columns = _ColumnHeights()  # type: ignore[assignment]
+
+    @property
+    def num_rows(self) -> int:
+        """
+        :return: the number of rows in the board
+        """
+        return self._num_rows
+
+    @property
+    def num_cols(self) -> int:
+        """
+        :return: the number of columns in the board
+        """
+        return self._num_cols
+
+    @property
+    def contents(self) -> List[List[str]]:
+        """
+        :return: a list of lists snapshot of the whole board, with row 0 at the bottom.
+        This is as big as a Board, so only use it on boards that are small enough to print
+        """
+        return [self[row] for row in range(self.num_rows)]
+
+    @property
+    def is_full(self) -> bool:
+        """
+        :return: whether the board is full or not
+        """
+        return self._num_pieces >= self._num_rows * self._num_cols
+
+    def contains_blank_character(self, row: int, column: int) -> bool:
+        """
+        Checks whether row,col contains a blank character
+        :param row:  row to check
+        :param column: column to check
+        :return: whether row,col contains a blank character or not
+        """
+        return self.get_piece_at(row, column) == self.blank_char
+
+    def enable_window_index(self, num_pieces_to_win: int) -> Optional[WindowIndex]:
+        """
+        A WindowIndex needs memory for every spot of the board, so instead of keeping one
+        count_max_matches stops following a run once it is num_pieces_to_win long
+        :param num_pieces_to_win: how many pieces in a row win the game
+        :return: None, there is no index
+        """
+        self._run_limit = num_pieces_to_win
+        return None
+
+    def _place_piece(self, row: int, column: int, piece: str) -> None:
+        pieces = self._columns.setdefault(column, [])
+        if row < len(pieces):
+            pieces[row] = piece
+        else:
+            pieces.extend([self.blank_char] * (row - len(pieces)))
+            pieces.append(piece)
+        self._last_spot = (row, column)
+
+    def _clear_piece(self, row: int, column: int) -> None:
+        pieces = self._columns.get(column)
+        if pieces is None or row >= len(pieces):
+            return
+        pieces[row] = self.blank_char
+        # drop the blanks on top of the column so it only holds what is needed
+        while pieces and pieces[-1] == self.blank_char:
+            pieces.pop()
+        if not pieces:
+            del self._columns[column]
+
+    def get_piece_at(self, row: int, column: int) -> str:
+        """
+        Get the piece at row,col
+        :param row: row index
+        :param column:  column index
+        :return: the piece at row, col
+        """
+        if not (0 <= row < self._num_rows and 0 <= column < self._num_cols):
+            raise IndexError(f'{row},{column} is not on the board')
+        pieces = self._columns.get(column)
+        if pieces is None or row >= len(pieces):
+            return self.blank_char
+        return pieces[row]
+
+    def _count_num_pieces_in_a_row_within_range(self, piece: str, row_start: int, col_start: int, row_step: int,
+                                                col_step: int) -> int:
+        """
+        Count the number of pieces in a row that match piece going from (row_start, col_start),
+        stopping after num_pieces_to_win - 1 of them once enable_window_index has been called.
+        That is enough to tell whether a run wins, but longer runs are counted short
+        Note that the piece at row_start, column_start is not counted
+        :param piece: the piece to match
+        :param row_start: what row to start on
+        :param col_start: what column to start on
+        :param row_step: how much the row should advance by
+        :param col_step: how much the column should advance by
+        :return: the number of pieces in a row that match piece
+        """
+        if row_step == 0 and col_step == 0:
+            raise ValueError('row_step and col_step cannot both be 0')
+        limit = self._num_rows + self._num_cols if self._run_limit is None else self._run_limit - 1
+        pieces_in_a_row = 0
+        row, col = row_start + row_step, col_start + col_step
+        while pieces_in_a_row < limit and 0 <= row < self._num_rows and 0 <= col < self._num_cols and \
+                self.get_piece_at(row, col) == piece:
+            pieces_in_a_row += 1
+            row += row_step
+            col += col_step
+        return pieces_in_a_row
+
+    def __iter__(self) -> Iterator[List[str]]:
+        """
+        Iterate through snapshots of the rows
+        :return:
+        """
+        for row in range(self.num_rows):
+            yield self[row]
+
+    def __getitem__(self, index: int) -> List[str]:
+        """
+        Get a snapshot of the index row of the board
+        :param index: the index of the row to get, negative indices count from the top
+        :return: the indexth row of the board
+        """
+        if index < 0:
+            index += self.num_rows
+        if not 0 <= index < self.num_rows:
+            raise IndexError(f'{index} is not a row of the board')
+        row = [self.blank_char] * self.num_cols
+        for column, pieces in self._columns.items():
+            if index < len(pieces):
+                row[column] = pieces[index]
+        return row
+
+    def column_iterate(self) -> Iterator[List[str]]:
+        """
+        Allow iteration through the columns
+        :return:
+        """
+        for column in range(self.num_cols):
+            pieces = self._columns.get(column, [])
+            yield tuple(pieces + [self.blank_char] * (self.num_rows - len(pieces)))  # type: ignore[misc]
+
+    def render(self, center: Optional[Tuple[int, int]] = None, num_view_rows: int = DEFAULT_VIEWPORT_ROWS,
+               num_view_cols: int = DEFAULT_VIEWPORT_COLS) -> str:
+        """
+        Draw part of the board the same way a Board repr draws all of it.
+        When the viewport does not cover the whole board a line saying which part is shown comes first
+        :param center: the row,col to keep in the middle of the viewport, the last piece played if None
+        :param num_view_rows: the most rows to show
+        :param num_view_cols: the most columns to show
+        :return: the drawing
+        """
+        if center is None:
+            center = self._last_spot if self._last_spot is not None else (0, self.num_cols // 2)
+        num_view_rows = min(num_view_rows, self.num_rows)
+        num_view_cols = min(num_view_cols, self.num_cols)
+        center_row, center_col = center
+        bottom_row = min(max(center_row - num_view_rows // 2, 0), self.num_rows - num_view_rows)
+        left_col = min(max(center_col - num_view_cols // 2, 0), self.num_cols - num_view_cols)
+        rows = range(bottom_row + num_view_rows - 1, bottom_row - 1, -1)
+        columns = range(left_col, left_col + num_view_cols)
+
+        sep = ' ' * max(len(str(self.num_rows - 1)), len(str(self.num_cols - 1)))
+        rep = [sep * 2 + sep.join([str(column) for column in columns])]
+        rep += [str(self.num_rows - 1 - row) + sep + sep.join([self.get_piece_at(row, column) for column in columns])
+                for row in rows]
+        if num_view_rows < self.num_rows or num_view_cols < self.num_cols:
+            rep.insert(0, f'rows {self.num_rows - 1 - rows[0]}-{self.num_rows - 1 - rows[-1]} of {self.num_rows}, '
+                          f'columns {columns[0]}-{columns[-1]} of {self.num_cols}')
+        return '\n'.join(rep)
+
+    def __repr__(self) -> str:
+        return self.render()
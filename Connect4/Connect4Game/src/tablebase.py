@@ -0,0 +1,506 @@
+import argparse
+import functools
+import itertools
+import mmap
+import os
+import struct
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from math import comb
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+from .bitboard import BitBoard
+from .board import Board
+
+# the file starts with a header, then one byte for every index of TablebaseIndex. The top two bits
+# of the byte are the result for the side to move and the other six how many plies the game lasts.
+# 0 marks an index that is not a position: pieces nobody could have played, or a game already won
+MAGIC = b'C4TBASE\x00'
+VERSION = 1
+_HEADER = struct.Struct('<8sIIIIQQ')
+HEADER_SIZE = 64
+_WIN, _LOSS, _DRAW = 1, 2, 3
+_RESULTS = {_WIN: 'win', _LOSS: 'loss', _DRAW: 'draw'}
+_RESULT_SHIFT = 6
+_MAX_PLIES = (1 << _RESULT_SHIFT) - 1
+_REACHABLE = 1  # what a position found by the forward pass holds until the backward pass scores it
+# how many pieces of work each layer is split into per process
+_CHUNKS_PER_WORKER = 4
+
+
+class TablebaseError(Exception):
+    pass
+
+
+class TablebaseEntry(NamedTuple):
+    """
+    The game-theoretic value of a position, from the point of view of the side to move
+    """
+    result: str  # 'win', 'loss' or 'draw'
+    plies_to_end: int  # how many more pieces are played before the game ends with best play from both sides
+
+
+class TablebaseStats(NamedTuple):
+    positions: int  # the positions that can come up in a game that is not over yet
+    entries: int  # the size of the index, and of the file less its header
+    seconds: float
+
+    @property
+    def positions_per_second(self) -> float:
+        return self.positions / self.seconds if self.seconds > 0 else float(self.positions)
+
+
+def _entry_byte(result: int, plies_to_end: int) -> int:
+    return (result << _RESULT_SHIFT) | plies_to_end
+
+
+def _preference(entry: TablebaseEntry) -> Tuple[int, int]:
+    """
+    :return: a key that is bigger the better entry is for the side to move: quick wins, then draws, then slow losses
+    """
+    if entry.result == 'win':
+        return 2, -entry.plies_to_end
+    return (1, 0) if entry.result == 'draw' else (0, entry.plies_to_end)
+
+
+class TablebaseIndex(object):
+    """
+    Numbers every arrangement of pieces on a board, with the right number of pieces for each player
+    and none of them floating, from 0 up to size - 1, without gaps.
+
+    Positions are laid out like Solver's: every column is num_rows + 1 bits, the bottom first.
+    Positions come in layers by how many pieces they have, and within a layer in blocks by how
+    high every column is. Inside a block, the occupied spots are counted column by column from the
+    bottom, and the spots of the player who moved second are ranked with the combinatorial number
+    system. Every column adds a term to the rank that only depends on its own pieces and on how many
+    spots and second player pieces came before it, so those terms are worked out up front and an
+    index takes one table look up per column.
+    """
+
+    def __init__(self, num_rows: int, num_cols: int) -> None:
+        """
+        :raises: ValueError if the board is empty or has more spots than an entry can count plies for
+        """
+        if num_rows < 1 or num_cols < 1:
+            raise ValueError('num_rows and num_cols must both be at least 1')
+        if num_rows * num_cols > _MAX_PLIES:
+            raise ValueError(f'A tablebase board can have at most {_MAX_PLIES} spots')
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.num_cells = num_rows * num_cols
+        self.column_height = num_rows + 1
+        self.column_bits = (1 << num_rows) - 1
+        self.bottom = BitBoard.bottom_mask(num_rows, num_cols)
+        self.board_mask = self.bottom * self.column_bits
+        self.shifts = (1, self.column_height, self.column_height + 1, self.column_height - 1)
+        self._radix = [(num_rows + 1) ** col for col in range(num_cols)]
+
+        # the blocks of every layer, and where each block starts
+        self.layers: List[List[Tuple[int, ...]]] = [[] for _ in range(self.num_cells + 1)]
+        for heights in itertools.product(range(num_rows + 1), repeat=num_cols):
+            self.layers[sum(heights)].append(heights)
+        self._offsets = [0] * (num_rows + 1) ** num_cols
+        self.layer_starts = []
+        size = 0
+        for num_pieces, blocks in enumerate(self.layers):
+            self.layer_starts.append(size)
+            for heights in blocks:
+                self._offsets[self._heights_key(heights)] = size
+                size += comb(num_pieces, num_pieces // 2)
+        self.layer_starts.append(size)
+        self.size = size
+
+        # _terms[spots_before][second_before][code] is a column's part of the rank, where code is the
+        # column's second player pieces with a bit on top of its highest piece
+        self._terms = [[[self._term(spots_before, second_before, code) for code in range(1 << self.column_height)]
+                        for second_before in range(self.num_cells // 2 + 1)]
+                       for spots_before in range(self.num_cells + 1)]
+
+    def _heights_key(self, heights: Sequence[int]) -> int:
+        return sum(height * radix for height, radix in zip(heights, self._radix))
+
+    @staticmethod
+    def _term(spots_before: int, second_before: int, code: int) -> int:
+        height = max(0, code.bit_length() - 1)
+        term = 0
+        for row in range(height):
+            if code >> row & 1:
+                second_before += 1
+                term += comb(spots_before + row, second_before)
+        return term
+
+    def block_size(self, heights: Sequence[int]) -> int:
+        num_pieces = sum(heights)
+        return comb(num_pieces, num_pieces // 2)
+
+    def mask_of(self, heights: Sequence[int]) -> int:
+        """
+        :return: the spots filled by columns of these heights
+        """
+        return sum(((1 << height) - 1) << (col * self.column_height) for col, height in enumerate(heights))
+
+    def index(self, second: int, mask: int) -> int:
+        """
+        :param second: the pieces of the player who moved second
+        :param mask: every piece
+        :return: the index of the position
+        """
+        heights_key = rank = spots_before = second_before = 0
+        for col in range(self.num_cols):
+            shift = col * self.column_height
+            height = ((mask >> shift) & self.column_bits).bit_length()
+            column = (second >> shift) & self.column_bits
+            rank += self._terms[spots_before][second_before][column | (1 << height)]
+            heights_key += height * self._radix[col]
+            spots_before += height
+            second_before += bin(column).count('1')
+        return self._offsets[heights_key] + rank
+
+    def block(self, heights: Sequence[int]) -> Iterator[Tuple[int, int]]:
+        """
+        :param heights: how many pieces are in every column
+        :return: the second player's pieces and the index of every position in the block
+        """
+        num_pieces = sum(heights)
+        yield from self._colorings(heights, 0, num_pieces // 2, 0, 0, 0, self._offsets[self._heights_key(heights)])
+
+    def _colorings(self, heights: Sequence[int], col: int, second_left: int, spots_before: int,
+                   second: int, second_before: int, index: int) -> Iterator[Tuple[int, int]]:
+        if col == self.num_cols:
+            yield second, index
+            return
+        height = heights[col]
+        spots_after = sum(heights[col + 1:])
+        terms = self._terms[spots_before][second_before]
+        for column in range(1 << height):
+            count = bin(column).count('1')
+            if count <= second_left and second_left - count <= spots_after:
+                yield from self._colorings(heights, col + 1, second_left - count, spots_before + height,
+                                           second | (column << (col * self.column_height)), second_before + count,
+                                           index + terms[column | (1 << height)])
+
+
+@functools.lru_cache(maxsize=None)
+def table_index(num_rows: int, num_cols: int) -> TablebaseIndex:
+    """
+    :return: the index of this board size, worked out once per process
+    """
+    return TablebaseIndex(num_rows, num_cols)
+
+
+class Tablebase(object):
+    """
+    The exact result of every position that can come up on a small board, memory-mapped like
+    OpeningBook. A look up works out the position's index and reads one byte, so it takes the
+    same time whatever the position and never searches.
+    Use write_tablebase to make one.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        :param path: a file written by write_tablebase
+        :raises: TablebaseError if the file is not a tablebase
+        """
+        self.path = path
+        with open(path, 'rb') as tablebase_file:
+            header = tablebase_file.read(HEADER_SIZE)
+            if len(header) < HEADER_SIZE:
+                raise TablebaseError(f'{path} is too short to be a tablebase')
+            magic, version, self.num_rows, self.num_cols, self.num_pieces_to_win, self.num_entries, \
+                self.num_positions = _HEADER.unpack_from(header)
+            if magic != MAGIC:
+                raise TablebaseError(f'{path} is not a tablebase')
+            if version != VERSION:
+                raise TablebaseError(f'{path} is version {version} but only version {VERSION} can be read')
+            self.index = table_index(self.num_rows, self.num_cols)
+            if self.num_entries != self.index.size or \
+                    os.fstat(tablebase_file.fileno()).st_size != HEADER_SIZE + self.num_entries:
+                raise TablebaseError(f'{path} is damaged')
+            self._mmap = mmap.mmap(tablebase_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return self.num_positions
+
+    def __enter__(self) -> "Tablebase":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._mmap.close()
+
+    def matches(self, num_rows: int, num_cols: int, num_pieces_to_win: int) -> bool:
+        """
+        :return: whether the tablebase was made for this board size and these rules
+        """
+        return (self.num_rows, self.num_cols, self.num_pieces_to_win) == (num_rows, num_cols, num_pieces_to_win)
+
+    def probe(self, current: int, mask: int) -> Optional[TablebaseEntry]:
+        """
+        :param current: the pieces of the side to move, laid out like Solver's positions
+        :param mask: every piece
+        :return: the result of the position, or None if it cannot come up in a game that is still going
+        """
+        num_pieces = bin(mask).count('1')
+        second = current if num_pieces % 2 else mask ^ current
+        entry = self._mmap[HEADER_SIZE + self.index.index(second, mask)]
+        if entry >> _RESULT_SHIFT == 0:
+            return None
+        return TablebaseEntry(_RESULTS[entry >> _RESULT_SHIFT], entry & _MAX_PLIES)
+
+    def position_of(self, the_board: Board, piece: str) -> Tuple[int, int]:
+        """
+        :param the_board: a board of the size the tablebase was made for
+        :param piece: the piece of the side to move
+        :return: the pieces of the side to move and every piece, as probe takes them
+        """
+        current = mask = 0
+        for col in range(self.num_cols):
+            for row in range(self.num_rows):
+                if the_board.contains_blank_character(row, col):
+                    break
+                bit = 1 << (col * self.index.column_height + row)
+                mask |= bit
+                if the_board.get_piece_at(row, col) == piece:
+                    current |= bit
+        return current, mask
+
+    def lookup(self, the_board: Board, piece: str) -> Optional[TablebaseEntry]:
+        """
+        :param piece: the piece of the side to move
+        :return: the result of the position on the_board for piece, or None if it cannot come up in a game
+        """
+        return self.probe(*self.position_of(the_board, piece))
+
+    def best_move(self, the_board: Board, piece: str) -> Optional[Tuple[int, TablebaseEntry]]:
+        """
+        :param piece: the piece of the side to move
+        :return: the column that wins soonest, or failing that draws, or failing that loses latest, along with
+        the result of the position. None if the position cannot come up in a game or the board is full
+        """
+        current, mask = self.position_of(the_board, piece)
+        best: Optional[Tuple[int, TablebaseEntry]] = None
+        center = (self.num_cols - 1) / 2
+        for col in sorted(range(self.num_cols), key=lambda column: abs(column - center)):
+            move = (mask + self.index.bottom) & (self.index.column_bits << (col * self.index.column_height))
+            if not move:
+                continue
+            if any(BitBoard.has_run(current | move, shift, self.num_pieces_to_win) for shift in self.index.shifts):
+                return col, TablebaseEntry('win', 1)
+            reply = self.probe(current ^ mask, mask | move)
+            if reply is None:
+                return None
+            entry = TablebaseEntry({'win': 'loss', 'loss': 'win', 'draw': 'draw'}[reply.result],
+                                   reply.plies_to_end + 1)
+            if best is None or _preference(entry) > _preference(best[1]):
+                best = col, entry
+        return best
+
+
+@functools.lru_cache(maxsize=None)
+def load_tablebase(path: str) -> Tablebase:
+    """
+    :param path: the file of a tablebase
+    :return: the tablebase, opened once per process no matter how many players ask for it
+    """
+    return Tablebase(path)
+
+
+class _Layer(NamedTuple):
+    path: str
+    num_rows: int
+    num_cols: int
+    num_pieces_to_win: int
+    num_pieces: int
+    blocks: List[Tuple[int, ...]]
+
+
+def _children(layer: _Layer, index: TablebaseIndex, second: int, mask: int) \
+        -> Iterator[Tuple[bool, int]]:
+    """
+    :return: for every move from the position, whether it wins and, if it does not, the index it leads to
+    """
+    second_moves = layer.num_pieces % 2 == 1
+    current = second if second_moves else mask ^ second
+    playable = (mask + index.bottom) & index.board_mask
+    while playable:
+        move = playable & -playable
+        playable ^= move
+        if any(BitBoard.has_run(current | move, shift, layer.num_pieces_to_win) for shift in index.shifts):
+            yield True, 0
+        else:
+            yield False, index.index(second | move if second_moves else second, mask | move)
+
+
+def _mark_reachable(layer: _Layer) -> int:
+    """
+    Mark every position the positions of the layer that can come up in a game lead to, unless the move wins
+    :return: how many positions of the layer can come up in a game
+    """
+    index = table_index(layer.num_rows, layer.num_cols)
+    reachable = 0
+    with open(layer.path, 'r+b') as tablebase_file, mmap.mmap(tablebase_file.fileno(), 0) as entries:
+        for heights in layer.blocks:
+            mask = index.mask_of(heights)
+            for second, position in index.block(heights):
+                if not entries[HEADER_SIZE + position]:
+                    continue
+                reachable += 1
+                for wins, child in _children(layer, index, second, mask):
+                    if not wins:
+                        entries[HEADER_SIZE + child] = _REACHABLE
+    return reachable
+
+
+def _score_layer(layer: _Layer) -> int:
+    """
+    Work out the result of every position of the layer that can come up in a game, from the results of the next layer
+    :return: how many positions were scored
+    """
+    index = table_index(layer.num_rows, layer.num_cols)
+    plies_left = index.num_cells - layer.num_pieces
+    scored = 0
+    with open(layer.path, 'r+b') as tablebase_file, mmap.mmap(tablebase_file.fileno(), 0) as entries:
+        for heights in layer.blocks:
+            mask = index.mask_of(heights)
+            for second, position in index.block(heights):
+                if not entries[HEADER_SIZE + position]:
+                    continue
+                scored += 1
+                fastest_win = slowest_loss = None
+                draws = False
+                for wins, child in _children(layer, index, second, mask):
+                    if wins:
+                        fastest_win = 1
+                        break
+                    reply = entries[HEADER_SIZE + child]
+                    result, plies = reply >> _RESULT_SHIFT, (reply & _MAX_PLIES) + 1
+                    if result == _LOSS:
+                        fastest_win = plies if fastest_win is None else min(fastest_win, plies)
+                    elif result == _DRAW:
+                        draws = True
+                    else:
+                        slowest_loss = plies if slowest_loss is None else max(slowest_loss, plies)
+                if fastest_win is not None:
+                    entry = _entry_byte(_WIN, fastest_win)
+                elif draws or slowest_loss is None:  # a full board is a draw
+                    entry = _entry_byte(_DRAW, plies_left)
+                else:
+                    entry = _entry_byte(_LOSS, slowest_loss)
+                entries[HEADER_SIZE + position] = entry
+    return scored
+
+
+def _split(index: TablebaseIndex, blocks: List[Tuple[int, ...]], num_chunks: int) -> List[List[Tuple[int, ...]]]:
+    """
+    :return: blocks dealt out into at most num_chunks lists holding about as many positions each
+    """
+    chunks: List[List[Tuple[int, ...]]] = [[] for _ in range(max(1, min(num_chunks, len(blocks))))]
+    sizes = [0] * len(chunks)
+    for heights in sorted(blocks, key=index.block_size, reverse=True):
+        smallest = sizes.index(min(sizes))
+        chunks[smallest].append(heights)
+        sizes[smallest] += index.block_size(heights)
+    return chunks
+
+
+def write_tablebase(path: str, num_rows: int, num_cols: int, num_pieces_to_win: int, workers: Optional[int] = None,
+                    on_layer: Optional[Callable[[str, int, int, float], None]] = None) -> TablebaseStats:
+    """
+    Make a tablebase with retrograde analysis. A forward pass from the empty board marks every position
+    that can come up in a game, a layer of positions with the same number of pieces at a time, then a
+    backward pass from the full board scores every marked position from the scores of the positions its
+    moves lead to. Every layer is split between the processes, which share the file through mmap.
+    The file is written next to path and moved over it, so processes reading the old tablebase are not disturbed
+    :param workers: how many processes to use, None for one per core and 1 to do everything in this process
+    :param on_layer: called after every layer with 'forward' or 'backward', how many pieces the layer has,
+    how many of its positions can come up in a game and how many seconds the layer took
+    :return: how many positions the tablebase has and how long it took to make
+    :raises: ValueError if the board is too big to index
+    """
+    start = time.perf_counter()
+    index = table_index(num_rows, num_cols)
+    temporary_path = f'{path}.tmp{os.getpid()}'
+    with open(temporary_path, 'wb') as tablebase_file:
+        tablebase_file.write(b'\x00' * HEADER_SIZE)
+        tablebase_file.truncate(HEADER_SIZE + index.size)
+        tablebase_file.seek(HEADER_SIZE + index.index(0, 0))
+        tablebase_file.write(bytes([_REACHABLE]))
+
+    num_workers = workers or os.cpu_count() or 1
+    executor: Optional[Executor] = None if num_workers == 1 else ProcessPoolExecutor(max_workers=num_workers)
+    num_chunks = _CHUNKS_PER_WORKER * num_workers
+    positions = 0
+    try:
+        for direction, work, layers in (('forward', _mark_reachable, range(index.num_cells + 1)),
+                                        ('backward', _score_layer, range(index.num_cells, -1, -1))):
+            for num_pieces in layers:
+                layer_start = time.perf_counter()
+                jobs = [_Layer(temporary_path, num_rows, num_cols, num_pieces_to_win, num_pieces, chunk)
+                        for chunk in _split(index, index.layers[num_pieces], num_chunks)]
+                found = sum(executor.map(work, jobs) if executor is not None else map(work, jobs))
+                if direction == 'backward':
+                    positions += found
+                if on_layer is not None:
+                    on_layer(direction, num_pieces, found, time.perf_counter() - layer_start)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    with open(temporary_path, 'r+b') as tablebase_file:
+        tablebase_file.write(_HEADER.pack(MAGIC, VERSION, num_rows, num_cols, num_pieces_to_win, index.size,
+                                          positions))
+    os.replace(temporary_path, path)
+    return TablebaseStats(positions, index.size, time.perf_counter() - start)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Make a tablebase from the command line
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description='Work out the result of every position on a small board.')
+    parser.add_argument('output', help='the tablebase file to write')
+    parser.add_argument('--config', help='a configuration file with the board size and rules')
+    parser.add_argument('--rows', type=int)
+    parser.add_argument('--cols', type=int)
+    parser.add_argument('--pieces-to-win', type=int)
+    parser.add_argument('--workers', type=int, default=None, help='defaults to one per core')
+    parser.add_argument('--verbose', action='store_true', help='report every layer')
+    args = parser.parse_args(argv)
+
+    from .game import Game  # the players import this module, and the game imports the players
+    config: Dict[str, object] = Game.read_config_file(args.config) if args.config else {}
+    try:
+        num_rows = args.rows or int(config['num_rows'])  # type: ignore[call-overload]
+        num_cols = args.cols or int(config['num_cols'])  # type: ignore[call-overload]
+        num_pieces_to_win = args.pieces_to_win or int(config['num_pieces_to_win'])  # type: ignore[call-overload]
+    except KeyError as missing:
+        parser.error(f'{missing} is needed, from --config or on the command line')
+        return
+    try:
+        index = table_index(num_rows, num_cols)
+    except ValueError as error:
+        parser.error(str(error))
+        return
+    print(f'Indexing {index.size:,} arrangements of pieces on a {num_rows}x{num_cols} board')
+
+    def report_layer(direction: str, num_pieces: int, found: int, seconds: float) -> None:
+        print(f'{direction:>8} layer {num_pieces:>2}: {found:>12,} positions in {seconds:.1f}s')
+
+    stats = write_tablebase(args.output, num_rows, num_cols, num_pieces_to_win, args.workers,
+                            report_layer if args.verbose else None)
+    print(f'Scored {stats.positions:,} positions in {stats.seconds:.1f}s '
+          f'({stats.positions_per_second:,.0f} positions/sec), wrote {HEADER_SIZE + stats.entries:,} bytes '
+          f'to {args.output}')
+    with Tablebase(args.output) as tablebase:
+        entry = tablebase.probe(0, 0)
+        if entry is not None:
+            print(f'With perfect play the first player gets a {entry.result} in {entry.plies_to_end} plies')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,389 @@
+import argparse
+import ast
+import itertools
+import math
+import os
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+from .game import Game
+from . import selfplay
+
+# how many standard deviations wide confidence intervals are (95%)
+Z_95 = 1.959964
+
+
+def expected_score(elo_difference: float) -> float:
+    """
+    :param elo_difference: how many Elo points stronger the player is than their opponent
+    :return: the score per game the player is expected to get
+    """
+    return 1 / (1 + 10 ** (-elo_difference / 400))
+
+
+def elo_difference(score: float) -> float:
+    """
+    :param score: the score per game a player got, between 0 and 1
+    :return: how many Elo points stronger that makes them, infinite for a score of 0 or 1
+    """
+    if score <= 0:
+        return -math.inf
+    elif score >= 1:
+        return math.inf
+    return -400 * math.log10(1 / score - 1)
+
+
+class Geometry(NamedTuple):
+    name: str
+    num_rows: int
+    num_cols: int
+    num_pieces_to_win: int
+    board_backend: str = 'bitboard'
+
+    @classmethod
+    def from_config_file(cls, path_to_file: str) -> "Geometry":
+        """
+        :param path_to_file: a configuration file in the Game.create_game_from_file format
+        :return: the board size and rules of the file, with the bitboard backend if it does not pick one
+        """
+        config = Game.read_config_file(path_to_file)
+        return cls(name=os.path.splitext(os.path.basename(path_to_file))[0],
+                   num_rows=int(config['num_rows']), num_cols=int(config['num_cols']),
+                   num_pieces_to_win=int(config['num_pieces_to_win']),
+                   board_backend=str(config.get('board_backend', 'bitboard')).lower())
+
+
+class PairingStats(object):
+    """
+    The results of one player against another, from the first player's point of view
+    """
+
+    def __init__(self) -> None:
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+
+    def add(self, score: float) -> None:
+        """
+        :param score: 1 for a win, 0.5 for a draw and 0 for a loss
+        :return: None
+        """
+        if score == 1:
+            self.wins += 1
+        elif score == 0:
+            self.losses += 1
+        else:
+            self.draws += 1
+
+    @property
+    def games(self) -> int:
+        return self.wins + self.draws + self.losses
+
+    @property
+    def score(self) -> float:
+        """
+        :return: the score per game so far, 0.5 before any games are played
+        """
+        return (self.wins + self.draws / 2) / self.games if self.games else 0.5
+
+    @property
+    def variance(self) -> float:
+        """
+        :return: the variance of the score of one game
+        """
+        if not self.games:
+            return 0.25
+        score = self.score
+        return (self.wins * (1 - score) ** 2 + self.draws * (0.5 - score) ** 2 +
+                self.losses * score ** 2) / self.games
+
+    def elo(self) -> Tuple[float, float, float]:
+        """
+        :return: the Elo difference and the bounds of its 95% confidence interval
+        """
+        if not self.games:
+            return 0.0, -math.inf, math.inf
+        margin = Z_95 * math.sqrt(self.variance / self.games)
+        return elo_difference(self.score), elo_difference(self.score - margin), elo_difference(self.score + margin)
+
+    def log_likelihood_ratio(self, elo0: float, elo1: float) -> float:
+        """
+        The generalized SPRT log likelihood ratio of elo1 against elo0, using the normal approximation
+        :param elo0: the Elo difference of the null hypothesis
+        :param elo1: the Elo difference of the alternative hypothesis
+        :return: the log likelihood ratio, positive numbers favour elo1
+        """
+        if not self.games:
+            return 0.0
+        score0, score1 = expected_score(elo0), expected_score(elo1)
+        variance = max(self.variance, 1e-3)  # all wins or all losses would otherwise divide by 0
+        return self.games * (score1 - score0) * (2 * self.score - score0 - score1) / (2 * variance)
+
+
+class Sprt(NamedTuple):
+    """
+    A sequential probability ratio test between the first player being elo_margin weaker (H0)
+    and the first player being elo_margin stronger (H1)
+    """
+    elo_margin: float = 50
+    alpha: float = 0.05
+    beta: float = 0.05
+    min_games: int = 10
+
+    @property
+    def bounds(self) -> Tuple[float, float]:
+        return math.log(self.beta / (1 - self.alpha)), math.log((1 - self.beta) / self.alpha)
+
+    def decide(self, stats: PairingStats) -> Optional[str]:
+        """
+        :param stats: the results of the pairing so far
+        :return: 'H1' if the first player is stronger, 'H0' if the second one is, None if it is not settled yet
+        """
+        if stats.games < self.min_games:
+            return None
+        lower, upper = self.bounds
+        llr = stats.log_likelihood_ratio(-self.elo_margin, self.elo_margin)
+        if llr >= upper:
+            return 'H1'
+        elif llr <= lower:
+            return 'H0'
+        return None
+
+
+class Pairing(NamedTuple):
+    first: str
+    second: str
+    geometry: Geometry
+
+
+class Tournament(object):
+    """
+    A round robin between player types on one or more board geometries.
+
+    Every pairing plays games in pairs with the same seed and the colors swapped,
+    until the SPRT settles it or it has played max_games_per_pairing games. Games run
+    across a process pool and the ratings are updated as every result comes in.
+    """
+
+    def __init__(self, player_types: Sequence[str], geometries: Sequence[Geometry],
+                 max_games_per_pairing: int = 200, sprt: Sprt = Sprt(), workers: Optional[int] = None,
+                 player_options: Optional[Dict[str, Dict[str, Any]]] = None, first_seed: int = 0) -> None:
+        if len(set(player_types)) < 2:
+            raise ValueError('A tournament needs at least two different player types.')
+        for player_type in player_types:
+            selfplay.resolve_player_type(player_type)
+        self.player_types = list(player_types)
+        self.pairings = [Pairing(first, second, geometry) for geometry in geometries
+                         for first, second in itertools.combinations(self.player_types, 2)]
+        self.max_games_per_pairing = max_games_per_pairing
+        self.sprt = sprt
+        self.workers = workers
+        self.player_options = player_options or {}
+        self.first_seed = first_seed
+        self.stats = {pairing: PairingStats() for pairing in self.pairings}
+        self.decisions: Dict[Pairing, Optional[str]] = {pairing: None for pairing in self.pairings}
+
+    def _specs(self, pairing: Pairing) -> Iterator[selfplay.GameSpec]:
+        geometry = pairing.geometry
+        for game in range(self.max_games_per_pairing):
+            players = (pairing.first, pairing.second) if game % 2 == 0 else (pairing.second, pairing.first)
+            yield selfplay.GameSpec(game=game, seed=self.first_seed + game // 2, player_types=players,
+                                    num_rows=geometry.num_rows, num_cols=geometry.num_cols,
+                                    num_pieces_to_win=geometry.num_pieces_to_win,
+                                    board_backend=geometry.board_backend,
+                                    player_options=tuple(self.player_options.get(player, {}) for player in players))
+
+    def record(self, pairing: Pairing, spec: selfplay.GameSpec, result: selfplay.GameResult) -> None:
+        """
+        Count the result of a game of pairing and check if the pairing is settled
+        :param pairing: the pairing the game was played for
+        :param spec: the game that was played
+        :param result: how it ended
+        :return: None
+        """
+        if result.winner is None:
+            score = 0.5
+        else:
+            score = 1.0 if spec.player_types[result.winner] == pairing.first else 0.0
+        self.stats[pairing].add(score)
+        if self.decisions[pairing] is None:
+            self.decisions[pairing] = self.sprt.decide(self.stats[pairing])
+
+    def is_settled(self, pairing: Pairing) -> bool:
+        return self.decisions[pairing] is not None
+
+    def run(self, on_result: Optional[Callable[["Tournament", Pairing, selfplay.GameResult], None]] = None) -> None:
+        """
+        Play the tournament
+        :param on_result: called after every result is recorded
+        :return: None
+        """
+        if self.workers == 1:
+            for pairing in self.pairings:
+                for spec in self._specs(pairing):
+                    if self.is_settled(pairing):
+                        break
+                    result = selfplay.play_game(spec)
+                    self.record(pairing, spec, result)
+                    if on_result is not None:
+                        on_result(self, pairing, result)
+            return
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            self._run_in_pool(executor, on_result)
+
+    def _run_in_pool(self, executor: Executor,
+                     on_result: Optional[Callable[["Tournament", Pairing, selfplay.GameResult], None]]) -> None:
+        # keep every core busy while only queueing a few games past the ones being played,
+        # so settled pairings stop using CPU soon after they are settled
+        max_in_flight = 2 * (self.workers or os.cpu_count() or 1)
+        spec_sources = {pairing: self._specs(pairing) for pairing in self.pairings}
+        in_flight: Dict[Future, Tuple[Pairing, selfplay.GameSpec]] = {}
+        open_pairings = itertools.cycle(list(self.pairings))
+        exhausted: Set[Pairing] = set()
+
+        while True:
+            while len(in_flight) < max_in_flight and len(exhausted) < len(self.pairings):
+                pairing = next(open_pairings)
+                if pairing in exhausted:
+                    continue
+                spec = next(spec_sources[pairing], None) if not self.is_settled(pairing) else None
+                if spec is None:
+                    exhausted.add(pairing)
+                    continue
+                in_flight[executor.submit(selfplay.play_game, spec)] = (pairing, spec)
+            if not in_flight:
+                return
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                pairing, spec = in_flight.pop(future)
+                if self.is_settled(pairing):
+                    continue
+                result = future.result()
+                self.record(pairing, spec, result)
+                if on_result is not None:
+                    on_result(self, pairing, result)
+
+    def ratings(self, iterations: int = 200) -> Dict[str, Tuple[float, float, float]]:
+        """
+        Fit Bradley-Terry ratings to every result so far, counting draws as half a win for each side
+        :param iterations: how many rounds of the minorization-maximization algorithm to run
+        :return: every player's Elo (averaging 0) and the bounds of its 95% confidence interval
+        """
+        wins = {player: {opponent: 0.0 for opponent in self.player_types} for player in self.player_types}
+        for pairing, stats in self.stats.items():
+            wins[pairing.first][pairing.second] += stats.wins + stats.draws / 2
+            wins[pairing.second][pairing.first] += stats.losses + stats.draws / 2
+
+        strengths = {player: 1.0 for player in self.player_types}
+        for _ in range(iterations):
+            for player in self.player_types:
+                # half a win and half a loss against an average player keeps unbeaten players finite
+                total_wins = sum(wins[player].values()) + 0.5
+                denominator = 1 / (strengths[player] + 1)
+                for opponent in self.player_types:
+                    games = wins[player][opponent] + wins[opponent][player]
+                    if games:
+                        denominator += games / (strengths[player] + strengths[opponent])
+                strengths[player] = total_wins / denominator
+            mean_log = sum(math.log(strength) for strength in strengths.values()) / len(strengths)
+            strengths = {player: math.exp(math.log(strength) - mean_log) for player, strength in strengths.items()}
+
+        ratings = {}
+        for player in self.player_types:
+            elo = 400 * math.log10(strengths[player])
+            overall = PairingStats()
+            for pairing, stats in self.stats.items():
+                if player == pairing.first:
+                    overall.wins += stats.wins
+                    overall.losses += stats.losses
+                    overall.draws += stats.draws
+                elif player == pairing.second:
+                    overall.wins += stats.losses
+                    overall.losses += stats.wins
+                    overall.draws += stats.draws
+            if overall.games:
+                score = min(max(overall.score, 0.01), 0.99)
+                # the standard error of the score, turned into Elo through the slope of the logistic curve
+                half_width = Z_95 * math.sqrt(max(overall.variance, 1e-3) / overall.games) * \
+                    400 / (math.log(10) * score * (1 - score))
+            else:
+                half_width = math.inf
+            ratings[player] = (elo, elo - half_width, elo + half_width)
+        return ratings
+
+    def report(self) -> str:
+        """
+        :return: a table of the ratings and of every pairing
+        """
+        lines = ['Player                Elo        95% CI']
+        for player, (elo, low, high) in sorted(self.ratings().items(), key=lambda item: -item[1][0]):
+            lines.append(f'{player:<16} {elo:>8.1f}  [{low:.1f}, {high:.1f}]')
+        lines.append('')
+        lines.append('Pairing                                      W     D     L   Elo diff           SPRT')
+        for pairing, stats in self.stats.items():
+            elo, low, high = stats.elo()
+            name = f'{pairing.first} vs {pairing.second} ({pairing.geometry.name})'
+            decision = {'H1': f'{pairing.first} stronger', 'H0': f'{pairing.second} stronger',
+                        None: 'unsettled'}[self.decisions[pairing]]
+            lines.append(f'{name:<42} {stats.wins:>5} {stats.draws:>5} {stats.losses:>5} '
+                         f'{elo:>8.1f} [{low:.0f}, {high:.0f}]  {decision}')
+        return '\n'.join(lines)
+
+
+def parse_player_options(settings: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    :param settings: strings like alphabeta.time_budget=0.1
+    :return: the options of every player type
+    :raises: ValueError if a setting is not in the type.option=value format
+    """
+    options: Dict[str, Dict[str, Any]] = {}
+    for setting in settings:
+        try:
+            name, value = setting.split('=', 1)
+            player_type, option = name.split('.', 1)
+        except ValueError:
+            raise ValueError(f'{setting} is not in the type.option=value format')
+        try:
+            parsed_value = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            parsed_value = value
+        options.setdefault(player_type, {})[option] = parsed_value
+    return options
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Run a tournament from the command line and print the standings
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description='Rank AI player types with a round robin tournament.')
+    parser.add_argument('players', nargs='+')
+    parser.add_argument('--configs', nargs='+', default=['config_files/connect4_config.txt'],
+                        help='configuration files with the board geometries to play on')
+    parser.add_argument('--max-games', type=int, default=200, help='the most games a pairing plays')
+    parser.add_argument('--elo-margin', type=float, default=50,
+                        help='the Elo difference the SPRT tries to tell apart')
+    parser.add_argument('--workers', type=int, default=None, help='defaults to one per core')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--set', dest='settings', action='append', default=[],
+                        help='a player option such as alphabeta.time_budget=0.1')
+    parser.add_argument('--quiet', action='store_true', help='only print the final standings')
+    args = parser.parse_args(argv)
+
+    tournament = Tournament(args.players, [Geometry.from_config_file(path) for path in args.configs],
+                            max_games_per_pairing=args.max_games, sprt=Sprt(elo_margin=args.elo_margin),
+                            workers=args.workers, player_options=parse_player_options(args.settings),
+                            first_seed=args.seed)
+
+    def show_progress(the_tournament: Tournament, pairing: Pairing, result: selfplay.GameResult) -> None:
+        stats = the_tournament.stats[pairing]
+        elo, low, high = stats.elo()
+        print(f'{pairing.first} vs {pairing.second} ({pairing.geometry.name}): '
+              f'+{stats.wins} ={stats.draws} -{stats.losses}  Elo {elo:.1f} [{low:.0f}, {high:.0f}]')
+
+    tournament.run(None if args.quiet else show_progress)
+    print(tournament.report())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+from typing import Dict, List, NamedTuple, Optional
+
+# what the score stored with a position means
+EXACT = 0
+LOWER_BOUND = 1  # the position is worth at least the score
+UPPER_BOUND = 2  # the position is worth at most the score
+
+# how the fields of an entry are packed into one 64 bit integer
+_FLAG_BITS = 2
+_MOVE_BITS = 22
+_DEPTH_BITS = 16
+_SCORE_BITS = 24
+_MOVE_SHIFT = _FLAG_BITS
+_DEPTH_SHIFT = _MOVE_SHIFT + _MOVE_BITS
+_SCORE_SHIFT = _DEPTH_SHIFT + _DEPTH_BITS
+_SCORE_OFFSET = 1 << (_SCORE_BITS - 1)
+
+
+class TTEntry(NamedTuple):
+    depth: int
+    flag: int
+    score: int
+    move: Optional[int]  # the best column found, if any
+
+
+def pack_entry(depth: int, flag: int, score: int, move: Optional[int]) -> int:
+    """
+    :param depth: how deep the position was searched, more than 16 bits is stored as the biggest 16 bit depth
+    :param flag: whether score is EXACT, a LOWER_BOUND or an UPPER_BOUND
+    :param score: the score of the position
+    :param move: the best column found, if any
+    :return: depth, flag, score and move packed into a 64 bit integer
+    :raises: ValueError if score or move does not fit
+    """
+    if not -_SCORE_OFFSET <= score < _SCORE_OFFSET:
+        raise ValueError(f'score must fit in {_SCORE_BITS} bits but is {score}')
+    depth = min(depth, (1 << _DEPTH_BITS) - 1)
+    stored_move = 0 if move is None else move + 1
+    if stored_move >= 1 << _MOVE_BITS:
+        raise ValueError(f'move must fit in {_MOVE_BITS} bits but is {move}')
+    return ((score + _SCORE_OFFSET) << _SCORE_SHIFT) | (depth << _DEPTH_SHIFT) | \
+        (stored_move << _MOVE_SHIFT) | flag
+
+
+def unpack_entry(data: int) -> TTEntry:
+    """
+    :param data: an entry packed by pack_entry
+    :return: the fields of the entry
+    """
+    stored_move = (data >> _MOVE_SHIFT) & ((1 << _MOVE_BITS) - 1)
+    return TTEntry(depth=(data >> _DEPTH_SHIFT) & ((1 << _DEPTH_BITS) - 1),
+                   flag=data & ((1 << _FLAG_BITS) - 1),
+                   score=(data >> _SCORE_SHIFT) - _SCORE_OFFSET,
+                   move=stored_move - 1 if stored_move else None)
+
+
+class TranspositionTable(object):
+    """
+    A fixed size cache of searched positions keyed by their zobrist hash.
+
+    The table is a power of two number of buckets with two entries each. The first entry
+    of a bucket keeps whichever position was searched deepest, the second one always takes
+    the newest position that did not make it into the first. Nothing is ever allocated
+    beyond memory_bytes, positions that do not fit are evicted instead.
+
+    Keys should come from Board.canonical_hash so a position and its mirror image share an
+    entry. Moves are stored as given, so callers flip them for mirrored positions.
+    Scores only make sense for one num_pieces_to_win, so clear the table between games
+    with different rules.
+    """
+
+    # roughly what one entry costs: two list slots plus a key and a data int
+    BYTES_PER_ENTRY = 2 * 8 + 2 * 36
+    DEFAULT_MEMORY_BYTES = 16 * 1024 * 1024
+
+    def __init__(self, memory_bytes: int = DEFAULT_MEMORY_BYTES) -> None:
+        if memory_bytes < 2 * self.BYTES_PER_ENTRY:
+            raise ValueError(f'memory_bytes must be at least {2 * self.BYTES_PER_ENTRY} but is {memory_bytes}')
+        num_buckets = 1 << ((memory_bytes // (2 * self.BYTES_PER_ENTRY)).bit_length() - 1)
+        self.memory_bytes = memory_bytes
+        self._bucket_mask = num_buckets - 1
+        self._keys: List[Optional[int]] = [None] * (2 * num_buckets)
+        self._data: List[int] = [0] * (2 * num_buckets)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stores = 0
+
+    @property
+    def capacity(self) -> int:
+        """
+        :return: how many positions the table can hold
+        """
+        return len(self._keys)
+
+    def __len__(self) -> int:
+        return sum(key is not None for key in self._keys)
+
+    def clear(self) -> None:
+        """
+        Forget every position and reset the counters
+        :return: None
+        """
+        self._keys = [None] * len(self._keys)
+        self._data = [0] * len(self._data)
+        self.hits = self.misses = self.evictions = self.stores = 0
+
+    def probe(self, key: int) -> Optional[TTEntry]:
+        """
+        :param key: the hash of the position to look up
+        :return: what was stored for the position, or None if it is not in the table
+        """
+        index = (key & self._bucket_mask) << 1
+        keys = self._keys
+        if keys[index] == key:
+            self.hits += 1
+            return unpack_entry(self._data[index])
+        if keys[index + 1] == key:
+            self.hits += 1
+            return unpack_entry(self._data[index + 1])
+        self.misses += 1
+        return None
+
+    def store(self, key: int, depth: int, flag: int, score: int, move: Optional[int]) -> None:
+        """
+        Remember the result of searching a position
+        :param key: the hash of the position
+        :param depth: how deep the position was searched
+        :param flag: whether score is EXACT, a LOWER_BOUND or an UPPER_BOUND
+        :param score: the score of the position
+        :param move: the best column found, if any
+        :return: None
+        """
+        data = pack_entry(depth, flag, score, move)
+        index = (key & self._bucket_mask) << 1
+        keys = self._keys
+        self.stores += 1
+        deepest_key = keys[index]
+        if deepest_key is None or deepest_key == key or depth >= unpack_entry(self._data[index]).depth:
+            if keys[index + 1] == key:  # the older result for this position is out of date
+                keys[index + 1] = None
+            if deepest_key is not None and deepest_key != key:
+                # the old deepest entry gets a second chance in the always-replace entry
+                self._replace(index + 1, deepest_key, self._data[index])
+            keys[index] = key
+            self._data[index] = data
+        else:
+            self._replace(index + 1, key, data)
+
+    def _replace(self, index: int, key: int, data: int) -> None:
+        old_key = self._keys[index]
+        if old_key is not None and old_key != key:
+            self.evictions += 1
+        self._keys[index] = key
+        self._data[index] = data
+
+    def stats(self) -> Dict[str, int]:
+        """
+        :return: the hit, miss, eviction and store counters and how full the table is
+        """
+        return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'stores': self.stores, 'entries': len(self), 'capacity': self.capacity}
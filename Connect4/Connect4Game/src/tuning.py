@@ -0,0 +1,164 @@
+import argparse
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence
+from .bitboard import BitBoard
+from .evaluation import DEFAULT_WEIGHTS, FEATURES, load_weights, save_weights
+from .game import Game
+from .move import Move
+from .players.alpha_beta_ai import AlphaBetaAi
+from .selfplay import PIECES, BLANK_CHAR
+
+# the features tuned when none are picked
+DEFAULT_TUNED_FEATURES = ('open_1', 'open_2', 'open_3', 'center', 'threats', 'odd_even_threats')
+
+
+class TuningGame(NamedTuple):
+    """
+    One game between two sets of weights, small enough to send to another process
+    """
+    seed: int  # picks the random opening
+    first_weights: Dict[str, float]  # the weights of the player who moves first
+    second_weights: Dict[str, float]
+    num_rows: int = 6
+    num_cols: int = 7
+    num_pieces_to_win: int = 4
+    depth: int = 2
+    opening_plies: int = 4
+
+
+class SpsaStep(NamedTuple):
+    iteration: int
+    weights: Dict[str, float]  # the weights after the step
+    score: float  # the score per game of the plus weights against the minus weights
+    games: int
+    seconds: float
+
+
+def play_tuning_game(spec: TuningGame) -> float:
+    """
+    Play opening_plies random moves, then let two AlphaBetaAi players with fixed depth finish the game
+    :param spec: the game to play
+    :return: 1 if the first player won, 0 if the second player won and 0.5 for a tie
+    """
+    rng = random.Random(spec.seed)
+    players = [AlphaBetaAi(f'AlphaBetaAi {i + 1}', piece, time_budget=float('inf'), max_depth=spec.depth,
+                           verbose=False, evaluation=weights)
+               for i, (piece, weights) in enumerate(zip(PIECES, (spec.first_weights, spec.second_weights)))]
+    players[0].opponent, players[1].opponent = players[1], players[0]
+    game = Game(BitBoard(spec.num_rows, spec.num_cols, BLANK_CHAR), spec.num_pieces_to_win, players)
+    for _ in range(spec.opening_plies):
+        if game.is_game_over():
+            break
+        opening_move = Move(game.cur_player, rng.choice([column for column in range(spec.num_cols)
+                                                         if not game.board.is_column_full(column)]))
+        opening_move.make(game.board)
+        game.end_turn(opening_move)
+    while not game.is_game_over():
+        game.play_turn()
+    if not game.someone_won:
+        return 0.5
+    return 1.0 if game.cur_player_turn == 0 else 0.0
+
+
+def match_specs(plus: Dict[str, float], minus: Dict[str, float], num_pairs: int, first_seed: int,
+                **game_options: int) -> List[TuningGame]:
+    """
+    :return: num_pairs pairs of games, each pair playing the same opening with the colours swapped
+    """
+    specs = []
+    for pair in range(num_pairs):
+        specs.append(TuningGame(first_seed + pair, plus, minus, **game_options))
+        specs.append(TuningGame(first_seed + pair, minus, plus, **game_options))
+    return specs
+
+
+def match_score(results: Sequence[float]) -> float:
+    """
+    :param results: the results of match_specs, in order
+    :return: the score per game of the plus weights
+    """
+    plus_points = sum(result if i % 2 == 0 else 1 - result for i, result in enumerate(results))
+    return plus_points / len(results)
+
+
+def spsa(weights: Dict[str, float], features: Sequence[str], iterations: int, pairs_per_iteration: int,
+         play: Callable[[List[TuningGame]], List[float]], seed: int = 0, learning_rate: float = 4.0,
+         perturbation: float = 1.0, **game_options: int) -> Iterator[SpsaStep]:
+    """
+    Tune the weights of features with simultaneous perturbation stochastic approximation.
+    Every iteration nudges all of the features at once by +-perturbation, plays the nudged weights
+    against the oppositely nudged weights, and moves every weight towards the side that scored better.
+    :param weights: the weights to start from
+    :param features: the features to tune, the other weights stay as they are
+    :param iterations: how many steps to take
+    :param pairs_per_iteration: how many pairs of games to play per step
+    :param play: plays a list of games, in parallel or not, and returns their results in order
+    :param seed: picks the perturbations and the openings
+    :param learning_rate: how far a step moves the weights, shrinking as the iterations go on
+    :param perturbation: how far the weights are nudged, shrinking more slowly
+    :param game_options: any of the other TuningGame fields
+    :return: every step, as it is taken
+    """
+    rng = random.Random(seed)
+    weights = dict(weights)
+    # the usual SPSA gain schedules, with the stability constant at a tenth of the iterations
+    stability = iterations / 10
+    for iteration in range(iterations):
+        start = time.perf_counter()
+        step_size = learning_rate / (iteration + 1 + stability) ** 0.602
+        nudge = perturbation / (iteration + 1) ** 0.101
+        directions = {feature: rng.choice((-1, 1)) for feature in features}
+        plus = {**weights, **{feature: weights.get(feature, 0) + nudge * direction
+                              for feature, direction in directions.items()}}
+        minus = {**weights, **{feature: weights.get(feature, 0) - nudge * direction
+                               for feature, direction in directions.items()}}
+        specs = match_specs(plus, minus, pairs_per_iteration, rng.randrange(1 << 30), **game_options)
+        score = match_score(play(specs))
+        for feature, direction in directions.items():
+            # (score - 0.5) is how much better plus did, and the gradient estimate divides it by the nudge
+            weights[feature] = weights.get(feature, 0) + step_size * (score - 0.5) / (nudge * direction)
+        yield SpsaStep(iteration, dict(weights), score, len(specs), time.perf_counter() - start)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    """
+    Tune evaluation weights with self-play and write them to a weights file after every step
+    :return: None
+    """
+    parser = argparse.ArgumentParser(description='Tune the evaluation weights of AlphaBetaAi with SPSA.')
+    parser.add_argument('--output', default='weights.json', help='the weights file to write')
+    parser.add_argument('--start', default=None, help='a weights file to start from, defaults to the built in weights')
+    parser.add_argument('--features', nargs='+', choices=list(FEATURES), default=list(DEFAULT_TUNED_FEATURES))
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--pairs', type=int, default=16, help='pairs of games played every iteration')
+    parser.add_argument('--depth', type=int, default=2, help='how deep the players search')
+    parser.add_argument('--opening-plies', type=int, default=4, help='random moves at the start of every game')
+    parser.add_argument('--learning-rate', type=float, default=4.0)
+    parser.add_argument('--perturbation', type=float, default=1.0)
+    parser.add_argument('--rows', type=int, default=6)
+    parser.add_argument('--cols', type=int, default=7)
+    parser.add_argument('--pieces-to-win', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=None, help='defaults to one per core')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    weights = dict(load_weights(args.start) if args.start else DEFAULT_WEIGHTS)
+    game_options = {'num_rows': args.rows, 'num_cols': args.cols, 'num_pieces_to_win': args.pieces_to_win,
+                    'depth': args.depth, 'opening_plies': args.opening_plies}
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        def play(specs: List[TuningGame]) -> List[float]:
+            return list(executor.map(play_tuning_game, specs, chunksize=2))
+
+        for step in spsa(weights, args.features, args.iterations, args.pairs, play, args.seed,
+                         args.learning_rate, args.perturbation, **game_options):
+            save_weights(args.output, step.weights, tuning={'method': 'spsa', 'iterations': step.iteration + 1,
+                                                            'features': args.features, **game_options})
+            print(f'iteration {step.iteration + 1}: plus scored {step.score:.2f} in {step.games} games '
+                  f'({step.seconds:.1f}s), ' +
+                  ', '.join(f'{feature} {step.weights[feature]:.2f}' for feature in args.features))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+import functools
+from typing import Dict, List, Tuple
+
+# how many of the most recently used board sizes keep their windows through every spot for new indexes to share
+CELL_WINDOWS_KEPT = 8
+
+
+@functools.lru_cache(maxsize=CELL_WINDOWS_KEPT)
+def _cell_windows(num_rows: int, num_cols: int, num_pieces_to_win: int) -> Dict[Tuple[int, int], Tuple[int, ...]]:
+    """
+    :return: the windows through every spot of the board size, filled in as indexes ask for them
+    """
+    return {}
+
+
+class WindowIndex(object):
+    """
+    An index of every window of num_pieces_to_win spots in a row on a board.
+
+    For every window the index keeps how many pieces each player has in it, and for every
+    player how many open windows (windows nobody else has a piece in) they have with
+    1, 2, ..., num_pieces_to_win pieces. The board calls piece_added and piece_removed
+    on every move, which only touches the windows going through the spot that changed.
+
+    Windows are numbered by direction and the spot they start on:
+        window = (direction * num_rows + start_row) * num_cols + start_col
+    """
+
+    # horizontal, vertical, left diagonal (up and to the right), right diagonal (down and to the right)
+    DIRECTIONS = ((0, 1), (1, 0), (1, 1), (-1, 1))
+
+    def __init__(self, num_rows: int, num_cols: int, num_pieces_to_win: int) -> None:
+        if num_pieces_to_win < 1:
+            raise ValueError(f'num_pieces_to_win must be at least 1 but is {num_pieces_to_win}')
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self.num_pieces_to_win = num_pieces_to_win
+        self._totals = [0] * (len(self.DIRECTIONS) * num_rows * num_cols)
+        self._counts: Dict[str, List[int]] = {}
+        self._open: Dict[str, List[int]] = {}
+        self._cell_windows = _cell_windows(num_rows, num_cols, num_pieces_to_win)
+
+    def windows_through(self, row: int, column: int) -> Tuple[int, ...]:
+        """
+        :param row: the row of the spot
+        :param column: the column of the spot
+        :return: every window that contains row,column
+        """
+        cell = (row, column)
+        windows = self._cell_windows.get(cell)
+        if windows is None:
+            windows = tuple(self._find_windows_through(row, column))
+            self._cell_windows[cell] = windows
+        return windows
+
+    def _find_windows_through(self, row: int, column: int) -> List[int]:
+        windows = []
+        last = self.num_pieces_to_win - 1
+        for direction, (row_step, column_step) in enumerate(self.DIRECTIONS):
+            for offset in range(self.num_pieces_to_win):
+                start_row = row - offset * row_step
+                start_col = column - offset * column_step
+                end_row = start_row + last * row_step
+                end_col = start_col + last * column_step
+                if 0 <= min(start_row, end_row) and max(start_row, end_row) < self.num_rows and \
+                        0 <= start_col and end_col < self.num_cols:
+                    windows.append((direction * self.num_rows + start_row) * self.num_cols + start_col)
+        return windows
+
+    def window_cells(self, window: int) -> List[Tuple[int, int]]:
+        """
+        :param window: the window to get the spots of
+        :return: the row,column of every spot in window
+        """
+        direction, start = divmod(window, self.num_rows * self.num_cols)
+        start_row, start_col = divmod(start, self.num_cols)
+        row_step, column_step = self.DIRECTIONS[direction]
+        return [(start_row + i * row_step, start_col + i * column_step) for i in range(self.num_pieces_to_win)]
+
+    def _counts_for(self, piece: str) -> List[int]:
+        counts = self._counts.get(piece)
+        if counts is None:
+            counts = self._counts[piece] = [0] * len(self._totals)
+            self._open[piece] = [0] * (self.num_pieces_to_win + 1)
+        return counts
+
+    def piece_added(self, piece: str, row: int, column: int) -> None:
+        """
+        Update every window through row,column after piece was put there
+        :param piece: the piece that was added
+        :param row: the row it was added to
+        :param column: the column it was added to
+        :return: None
+        """
+        counts = self._counts_for(piece)
+        open_windows = self._open[piece]
+        totals = self._totals
+        for window in self.windows_through(row, column):
+            mine = counts[window]
+            total = totals[window]
+            if mine == total:  # the window was empty or only had our pieces in it
+                if mine:
+                    open_windows[mine] -= 1
+                open_windows[mine + 1] += 1
+            elif mine == 0:  # the window might have belonged to one other player until now
+                self._close_window_of_other_player(window, total)
+            counts[window] = mine + 1
+            totals[window] = total + 1
+
+    def piece_removed(self, piece: str, row: int, column: int) -> None:
+        """
+        Update every window through row,column after piece was taken away from there
+        :param piece: the piece that was removed
+        :param row: the row it was removed from
+        :param column: the column it was removed from
+        :return: None
+        """
+        counts = self._counts_for(piece)
+        open_windows = self._open[piece]
+        totals = self._totals
+        for window in self.windows_through(row, column):
+            mine = counts[window]
+            total = totals[window]
+            counts[window] = mine - 1
+            totals[window] = total - 1
+            if mine == total:  # the window only had our pieces in it
+                open_windows[mine] -= 1
+                if mine > 1:
+                    open_windows[mine - 1] += 1
+            elif mine == 1:  # the window might belong to one other player again
+                self._reopen_window_of_other_player(window, total - 1)
+
+    def _close_window_of_other_player(self, window: int, total: int) -> None:
+        for other, other_counts in self._counts.items():
+            if other_counts[window] == total:
+                self._open[other][total] -= 1
+                return
+
+    def _reopen_window_of_other_player(self, window: int, total: int) -> None:
+        for other, other_counts in self._counts.items():
+            if other_counts[window] == total:
+                self._open[other][total] += 1
+                return
+
+    def open_windows(self, piece: str, num_pieces: int) -> int:
+        """
+        :param piece: the piece to count windows for
+        :param num_pieces: how many of piece the windows should contain
+        :return: the number of windows with exactly num_pieces of piece and nothing else in them
+        """
+        open_windows = self._open.get(piece)
+        if open_windows is None or not 0 < num_pieces <= self.num_pieces_to_win:
+            return 0
+        return open_windows[num_pieces]
+
+    def has_won(self, piece: str) -> bool:
+        """
+        :param piece: the piece to check
+        :return: whether piece fills a whole window anywhere on the board
+        """
+        return self.open_windows(piece, self.num_pieces_to_win) > 0
+
+    def is_part_of_win(self, row: int, column: int, piece: str) -> bool:
+        """
+        :param row: the row of the spot to check
+        :param column: the column of the spot to check
+        :param piece: the piece at row,column
+        :return: whether a window through row,column is completely filled with piece
+        """
+        if not self.has_won(piece):
+            return False
+        counts = self._counts[piece]
+        return any(counts[window] == self.num_pieces_to_win for window in self.windows_through(row, column))
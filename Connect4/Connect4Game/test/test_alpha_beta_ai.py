@@ -0,0 +1,144 @@
+import unittest
+import time
+from Connect4Game.src.board import Board
+from Connect4Game.src.bitboard import BitBoard
+from Connect4Game.src.sparse_board import SparseBoard
+from Connect4Game.src.game import Game
+from Connect4Game.src.renderer import SilentRenderer
+from Connect4Game.src.players import alpha_beta_ai, human_player
+
+
+def make_players(**kwargs):
+    ai = alpha_beta_ai.AlphaBetaAi('AlphaBetaAi 1', 'X', verbose=False, **kwargs)
+    opponent = alpha_beta_ai.AlphaBetaAi('AlphaBetaAi 2', 'O', ai, verbose=False, **kwargs)
+    ai.opponent = opponent
+    return ai, opponent
+
+
+def play(board, columns):
+    for turn, column in enumerate(columns):
+        board.push_move(column, 'XO'[turn % 2])
+
+
+class TestAlphaBetaAi(unittest.TestCase):
+
+    def test_takes_win(self):
+        for board_type in (Board, BitBoard):
+            ai, _ = make_players(max_depth=4)
+            board = board_type(6, 7, '*')
+            board.enable_window_index(4)
+            play(board, [0, 6, 1, 6, 2, 5])
+            self.assertEqual(3, ai.get_move(board, 4).column)
+
+    def test_blocks_win(self):
+        ai, _ = make_players(max_depth=4)
+        board = BitBoard(6, 7, '*')
+        play(board, [6, 0, 6, 1, 5, 2])
+        self.assertEqual(3, ai.get_move(board, 4).column)
+
+    def test_finds_forced_win(self):
+        # X can make an open ended three on the bottom row, which O can only block on one side
+        ai, _ = make_players(max_depth=5)
+        board = BitBoard(6, 7, '*')
+        play(board, [2, 2, 3, 3])
+        self.assertIn(ai.get_move(board, 4).column, (1, 4))
+        self.assertGreater(ai.last_search.score, alpha_beta_ai.AlphaBetaAi.WIN_SCORE - 42)
+
+    def test_board_is_restored(self):
+        ai, _ = make_players(time_budget=0.05)
+        board = Board(6, 7, '*')
+        board.enable_window_index(4)
+        play(board, [3, 3, 2])
+        before = repr(board)
+        history = board.history
+        ai.search(board, 4)
+        self.assertEqual(before, repr(board))
+        self.assertEqual(history, board.history)
+        self.assertEqual(3, board.num_pieces)
+
+    def test_time_budget_and_report(self):
+        ai, _ = make_players(time_budget=0.1)
+        board = BitBoard(6, 7, '*')
+        start = time.perf_counter()
+        ai.get_move(board, 4)
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertGreaterEqual(ai.last_search.depth, 1)
+        self.assertGreater(ai.last_search.nodes, 0)
+        self.assertIn('nodes/sec', ai.report())
+
+    def test_time_budget_on_a_wide_board(self):
+        # a single ply searches a million moves here, so even the first depth has to be cut short
+        ai, _ = make_players(time_budget=0.1)
+        board = SparseBoard(1000, 1000, '*')
+        start = time.perf_counter()
+        column = ai.get_move(board, 5).column
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(0, ai.last_search.depth)
+        self.assertFalse(board.is_column_full(column))
+
+    def test_ponders_the_reply_that_was_made(self):
+        ai, opponent = make_players(max_depth=5, time_budget=float('inf'), ponder=True)
+        board = BitBoard(6, 7, '*')
+        play(board, [3, 3])
+        ai.take_turn(board, 4)
+        pondering = ai._pondering
+        pondering._thread.join()  # every reply has been searched to max_depth
+        self.assertEqual(3, board.num_pieces)  # pondering searches a copy
+        reply = pondering.replies[0]
+        board.push_move(reply, opponent.piece)
+        ai.get_move(board, 4)
+        stats = ai.last_search
+        self.assertIsNone(ai._pondering)
+        self.assertEqual(5, stats.depth)
+        self.assertEqual(0, stats.nodes)
+        self.assertGreater(stats.pondered_seconds, 0)
+        self.assertIn('after pondering', ai.report())
+        # the other replies' searches were thrown away when the opponent moved
+        self.assertEqual({}, ai.stop_pondering())
+
+    def test_carries_on_from_the_pondered_depth(self):
+        ai, opponent = make_players(time_budget=0.1, ponder=True)
+        board = BitBoard(6, 7, '*')
+        play(board, [3, 3, 2, 4])
+        ai.take_turn(board, 4)
+        ai._pondering._thread.join()
+        board.push_move(ai._pondering.replies[1], opponent.piece)
+        start = time.perf_counter()
+        stats = ai.search(board, 4)
+        # the whole time budget was spent while the opponent was thinking
+        self.assertLess(time.perf_counter() - start, 0.05)
+        self.assertGreaterEqual(stats.pondered_seconds, 0.09)
+        self.assertGreaterEqual(stats.depth, 2)
+
+    def test_unexpected_position_is_searched_normally(self):
+        ai, opponent = make_players(max_depth=3, time_budget=float('inf'), ponder=True)
+        board = Board(6, 7, '*')
+        ai.take_turn(board, 4)
+        board.push_move(0, opponent.piece)
+        board.push_move(0, ai.piece)  # not a position pondering could have reached
+        stats = ai.search(board, 4)
+        self.assertEqual(0, stats.pondered_seconds)
+        self.assertGreater(stats.nodes, 0)
+
+    def test_only_ponders_against_humans_by_default(self):
+        ai, _ = make_players(max_depth=2)
+        board = BitBoard(6, 7, '*')
+        ai.take_turn(board, 4)
+        self.assertIsNone(ai._pondering)
+        ai.opponent = human_player.HumanPlayer('Bob', 'O')
+        ai.take_turn(board, 4)
+        self.assertIsNotNone(ai._pondering)
+        ai.stop_pondering()
+        self.assertIsNone(ai._pondering)
+
+    def test_stops_pondering_when_the_game_ends(self):
+        # whoever did not make the last move was pondering a reply when the game ended
+        ai, opponent = make_players(max_depth=2, time_budget=float('inf'), ponder=True)
+        game = Game(BitBoard(4, 4, '*'), 3, [ai, opponent], SilentRenderer())
+        game.play()
+        self.assertTrue(game.is_game_over())
+        self.assertIsNone(ai._pondering)
+        self.assertIsNone(opponent._pondering)
+
+if __name__ == '__main__':
+    unittest.main()
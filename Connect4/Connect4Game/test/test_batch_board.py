@@ -0,0 +1,100 @@
+import importlib.util
+import random
+import unittest
+from Connect4Game.src import board
+
+HAS_NUMPY = importlib.util.find_spec('numpy') is not None
+if HAS_NUMPY:
+    import numpy as np
+    from Connect4Game.src import batch_board
+    from Connect4Game.src.players import batch_random_ai
+
+
+@unittest.skipIf(not HAS_NUMPY, 'numpy is not installed')
+class TestBatchBoard(unittest.TestCase):
+
+    def test_add_piece_to_column(self):
+        boards = batch_board.BatchBoard(3, 2, 3, 2)
+        rows = boards.add_piece_to_column(batch_board.FIRST_PLAYER, [0, 1, 1])
+        self.assertEqual(rows.tolist(), [0, 0, 0])
+        rows = boards.add_piece_to_column(batch_board.SECOND_PLAYER, [0, 2, 1], np.array([True, False, True]))
+        self.assertEqual(rows.tolist(), [1, -1, 1])
+        self.assertEqual(boards.heights.tolist(), [[2, 0, 0], [0, 1, 0], [0, 2, 0]])
+        self.assertEqual(boards.num_pieces.tolist(), [2, 1, 2])
+        self.assertEqual(boards.cells[0, :, 0].tolist(), [1, -1])
+        self.assertEqual(boards.legal_moves()[0].tolist(), [False, True, True])
+
+    def test_bad_columns_change_nothing(self):
+        boards = batch_board.BatchBoard(2, 1, 2, 2)
+        boards.add_piece_to_column(batch_board.FIRST_PLAYER, [0, 1])
+        with self.assertRaises(board.ColumnFullError):
+            boards.add_piece_to_column(batch_board.SECOND_PLAYER, [1, 1])
+        with self.assertRaises(board.ColumnOutOfBoundsError):
+            boards.add_piece_to_column(batch_board.SECOND_PLAYER, [1, 2])
+        self.assertEqual(boards.num_pieces.tolist(), [1, 1])
+        # a full column is fine in a game that is not active
+        boards.add_piece_to_column(batch_board.SECOND_PLAYER, [1, 1], np.array([True, False]))
+        self.assertEqual(boards.is_full().tolist(), [True, False])
+
+    def test_winners_match_board(self):
+        # play random games on both boards and compare what they think after every move
+        rng = random.Random(3)
+        for num_rows, num_cols, num_pieces_to_win in ((6, 7, 4), (4, 4, 3), (3, 8, 5), (5, 5, 5)):
+            boards = batch_board.BatchBoard(20, num_rows, num_cols, num_pieces_to_win)
+            singles = [board.Board(num_rows, num_cols, '*') for _ in range(20)]
+            for turn in range(num_rows * num_cols):
+                pieces = np.array([rng.choice((1, -1)) for _ in singles])
+                columns = np.array([rng.choice([col for col in range(num_cols) if not single.is_column_full(col)])
+                                    for single in singles])
+                boards.add_piece_to_column(pieces, columns)
+                expected = []
+                for single, piece, column in zip(singles, pieces, columns):
+                    single.add_piece_to_column('X' if piece == 1 else 'O', int(column))
+                    winner = 0
+                    for row in range(num_rows):
+                        for col in range(num_cols):
+                            if single[row][col] != '*' and \
+                                    single.count_max_matches(row, col) >= num_pieces_to_win:
+                                winner = 1 if single[row][col] == 'X' else -1
+                    expected.append(winner)
+                # once both players have a run the batch board reports the second player, skip those
+                found = boards.winners().tolist()
+                for game, winner in enumerate(expected):
+                    if winner == 0:
+                        self.assertEqual(found[game], 0)
+                    else:
+                        self.assertNotEqual(found[game], 0)
+
+    def test_draw(self):
+        boards = batch_board.BatchBoard(1, 2, 2, 2)
+        boards.add_piece_to_column(batch_board.FIRST_PLAYER, [1])
+        boards.add_piece_to_column(batch_board.SECOND_PLAYER, [1])
+        expected = board.Board(2, 2, '*')
+        expected.add_piece_to_column('X', 1)
+        expected.add_piece_to_column('O', 1)
+        self.assertEqual(boards.draw(0), repr(expected))
+
+    def test_play_batch(self):
+        boards = batch_board.BatchBoard(200, 6, 7, 4)
+        players = [batch_random_ai.BatchRandomAi(1), batch_random_ai.BatchRandomAi(2)]
+        winners, plies = batch_board.play_batch(boards, players)
+        self.assertTrue(np.all((plies >= 7) & (plies <= 42)))
+        self.assertTrue(np.all(boards.num_pieces == plies))
+        self.assertTrue(np.array_equal(boards.winners(), winners))
+        ties = winners == batch_board.EMPTY
+        self.assertTrue(np.all(boards.is_full()[ties]))
+        # the first player moves on odd plies, so whoever made the last move won
+        decided = ~ties
+        self.assertTrue(np.all(np.where(plies[decided] % 2 == 1, 1, -1) == winners[decided]))
+
+    def test_batch_random_ai_only_picks_legal_columns(self):
+        boards = batch_board.BatchBoard(50, 2, 3, 3)
+        boards.add_piece_to_column(batch_board.FIRST_PLAYER, np.zeros(50, dtype=int))
+        boards.add_piece_to_column(batch_board.SECOND_PLAYER, np.zeros(50, dtype=int))
+        moves = batch_random_ai.BatchRandomAi(0).get_moves(boards)
+        self.assertTrue(np.all(moves > 0))
+        self.assertEqual(set(moves.tolist()), {1, 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
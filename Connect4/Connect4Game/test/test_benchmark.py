@@ -0,0 +1,26 @@
+import unittest
+from Connect4Game.src import benchmark
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_find_regressions(self):
+        baseline = {'results': {'fast': {'ops_per_sec': 100.0}, 'slow': {'ops_per_sec': 100.0},
+                                'removed': {'ops_per_sec': 1.0}}}
+        current = {'results': {'fast': {'ops_per_sec': 95.0}, 'slow': {'ops_per_sec': 50.0},
+                               'new': {'ops_per_sec': 1.0}}}
+        self.assertEqual([('slow', 100.0, 50.0, 1.0)], benchmark.find_regressions(baseline, current, 0.1))
+        self.assertEqual([], benchmark.find_regressions(baseline, current, 1.5))
+
+    def test_run_benchmarks(self):
+        suite = [bench for bench in benchmark.default_benchmarks() if '[bitboard/6x7]' in bench.name]
+        self.assertTrue(any(bench.name.startswith('games.') for bench in suite))
+        results = benchmark.run_benchmarks(suite, min_time=0.001, repeat=1)
+        self.assertEqual([bench.name for bench in suite], list(results))
+        self.assertTrue(all(result.ops_per_sec > 0 for result in results.values()))
+        saved = benchmark.to_baseline(results)
+        self.assertEqual([], benchmark.find_regressions(saved, saved))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import unittest
+import random
+from unittest.mock import patch
+from Connect4Game.src.board import Board, ColumnFullError, ColumnOutOfBoundsError, EmptySpotError
+from Connect4Game.src.bitboard import BitBoard
+from Connect4Game.src.game import Game
+
+CONFIG_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'config_files')
+
+
+class TestBitBoard(unittest.TestCase):
+
+    def play_random_game_on_both(self, num_rows, num_cols):
+        list_board = Board(num_rows, num_cols, '*')
+        bit_board = BitBoard(num_rows, num_cols, '*')
+        pieces = ['X', 'O']
+        turn = 0
+        while not list_board.is_full:
+            column = random.choice([col for col in range(num_cols) if not list_board.is_column_full(col)])
+            row = list_board.add_piece_to_column(pieces[turn], column)
+            self.assertEqual(row, bit_board.add_piece_to_column(pieces[turn], column))
+            self.assertEqual(list_board.count_max_matches(row, column), bit_board.count_max_matches(row, column))
+            self.assertEqual(list_board.is_full, bit_board.is_full)
+            turn = 1 - turn
+        return list_board, bit_board
+
+    def test_matches_list_board(self):
+        for num_rows, num_cols in [(1, 1), (1, 5), (5, 1), (6, 7), (random.randint(2, 12), random.randint(2, 12))]:
+            list_board, bit_board = self.play_random_game_on_both(num_rows, num_cols)
+            self.assertEqual(repr(list_board), repr(bit_board))
+            for row in range(num_rows):
+                self.assertEqual(list_board[row], bit_board[row])
+            self.assertEqual(list(list_board.column_iterate()), list(bit_board.column_iterate()))
+
+    def test_remove_piece_from_position(self):
+        test_board = BitBoard(4, 4, '*')
+        row = test_board.add_piece_to_column('X', 2)
+        self.assertFalse(test_board.contains_blank_character(row, 2))
+        test_board.remove_piece_from_position(row, 2)
+        self.assertTrue(test_board.contains_blank_character(row, 2))
+        self.assertEqual(0, test_board.add_piece_to_column('O', 2))
+        self.assertEqual('O', test_board.get_piece_at(0, 2))
+        with self.assertRaises(EmptySpotError):
+            test_board.count_max_matches(1, 2)
+
+    def test_errors(self):
+        test_board = BitBoard(2, 2, '*')
+        test_board.add_piece_to_column('X', 0)
+        test_board.add_piece_to_column('O', 0)
+        with self.assertRaises(ColumnFullError):
+            test_board.add_piece_to_column('X', 0)
+        with self.assertRaises(ColumnOutOfBoundsError):
+            test_board.add_piece_to_column('X', 2)
+        with self.assertRaises(ValueError):
+            test_board.add_piece_to_column('XO', 1)
+
+    def test_has_won(self):
+        test_board = BitBoard(6, 7, '*')
+        for column in range(3):
+            test_board.add_piece_to_column('X', column)
+        self.assertFalse(test_board.has_won('X', 4))
+        self.assertTrue(test_board.has_won('X', 3))
+        test_board.add_piece_to_column('X', 3)
+        self.assertTrue(test_board.has_won('X', 4))
+        self.assertFalse(test_board.has_won('O', 1))
+
+        # a run must not wrap from the top of one column to the bottom of the next
+        wrap_board = BitBoard(3, 3, '*')
+        for piece in 'OOX':
+            wrap_board.add_piece_to_column(piece, 0)
+        for piece in 'XX':
+            wrap_board.add_piece_to_column(piece, 1)
+        self.assertFalse(wrap_board.has_won('X', 3))
+        self.assertEqual(1, wrap_board.count_matches_vertically(2, 0))
+        self.assertEqual(2, wrap_board.count_matches_vertically(0, 1))
+
+    def test_diagonals(self):
+        test_board = BitBoard(6, 7, '*')
+        for column in range(4):
+            for _ in range(column):
+                test_board.add_piece_to_column('O', column)
+            test_board.add_piece_to_column('X', column)
+        self.assertEqual(4, test_board.count_matches_in_left_diagonal(0, 0))
+        self.assertTrue(test_board.has_won('X', 4))
+        self.assertFalse(test_board.has_won('X', 5))
+
+    def test_create_game_from_file(self):
+        with patch.object(Game, 'setup_players'):
+            game = Game.create_game_from_file(os.path.join(CONFIG_DIR, 'connect4_bitboard_config.txt'))
+        self.assertIsInstance(game.board, BitBoard)
+        self.assertEqual((6, 7), (game.board.num_rows, game.board.num_cols))
+
+
+if __name__ == '__main__':
+    unittest.main()
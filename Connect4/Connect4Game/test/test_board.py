@@ -1,6 +1,6 @@
 import unittest
 import random
-from Connect4Game.src.board import Board
+from Connect4Game.src.board import Board, NoMoveToUndoError
 from copy import deepcopy
 
 
@@ -85,4 +85,24 @@ class TestBoard(unittest.TestCase):
         rand_row = random.randint(0, test_board.num_rows - 1)
         rand_col = random.randint(0, test_board.num_cols - 1)
         test_board[rand_row][rand_col] = "$"
-        self.assertEqual("$", test_board.get_piece_at(rand_row, rand_col))
\ No newline at end of file
+        self.assertEqual("$", test_board.get_piece_at(rand_row, rand_col))
+
+    def test_push_and_pop_move(self):
+        # set test board
+        test_board = Board(self.test_num_row,
+                           self.test_num_col, self.test_blank_char)
+        before = repr(test_board)
+        played = []
+        for turn in range(self.test_num_row * self.test_num_col // 2):
+            column = random.choice([col for col in range(test_board.num_cols)
+                                    if not test_board.is_column_full(col)])
+            row = test_board.push_move(column, random.choice(["$", "&"]))
+            played.append((row, column))
+        self.assertEqual(tuple(column for row, column in played), test_board.history)
+        while played:
+            self.assertEqual(played.pop(), test_board.pop_move())
+        self.assertEqual(before, repr(test_board))
+        self.assertEqual(0, test_board.num_pieces)
+        self.assertEqual(False, any(test_board.is_column_full(col) for col in range(test_board.num_cols)))
+        with self.assertRaises(NoMoveToUndoError):
+            test_board.pop_move()
@@ -0,0 +1,187 @@
+import asyncio
+import io
+import json
+import random
+import unittest
+from unittest.mock import patch
+from Connect4Game.src.bitboard import BitBoard
+from Connect4Game.src.broadcast import Broadcaster, COALESCE, DROP
+from Connect4Game.src.events import (GameObserver, GameSnapshot, GameStarted, GameTied, GameWon, MoveMade,
+                                     event_to_json)
+from Connect4Game.src.game import Game
+from Connect4Game.src.players.random_ai import RandomAi
+from Connect4Game.src.renderer import SilentRenderer
+
+
+class Recorder(GameObserver):
+
+    def __init__(self):
+        self.events = []
+
+    def notify(self, event):
+        self.events.append(event)
+
+
+def random_game(num_rows=4, num_cols=4, num_pieces_to_win=3):
+    players = [RandomAi('RandomAi 1', 'X'), RandomAi('RandomAi 2', 'O')]
+    players[0].opponent, players[1].opponent = players[1], players[0]
+    return Game(BitBoard(num_rows, num_cols, '*'), num_pieces_to_win, players, SilentRenderer())
+
+
+def replay(events):
+    """
+    :return: the columns played, as a spectator would work them out from the events they got
+    """
+    columns = []
+    for event in events:
+        if isinstance(event, GameSnapshot):
+            columns = [made.column for made in event.moves]
+        elif isinstance(event, MoveMade):
+            columns.append(event.column)
+    return columns
+
+
+class TestGameEvents(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(3)
+
+    def test_play_emits_every_event(self):
+        for _ in range(20):
+            game = random_game()
+            recorder = Recorder()
+            game.add_observer(recorder)
+            with patch('sys.stdout', io.StringIO()):
+                game.play()
+            started, *moves, result = recorder.events
+            self.assertEqual(GameStarted(4, 4, 3, ('RandomAi 1', 'RandomAi 2'), ('X', 'O')), started)
+            self.assertEqual(list(range(len(moves))), [made.ply for made in moves])
+            self.assertEqual(list(game.board.history), [made.column for made in moves])
+            for made in moves:
+                self.assertEqual(made.piece, game.board.get_piece_at(made.row, made.column))
+                self.assertEqual(('RandomAi 1', 'X') if made.ply % 2 == 0 else ('RandomAi 2', 'O'),
+                                 (made.player, made.piece))
+            if game.someone_won:
+                self.assertEqual(GameWon(str(game.cur_player), game.cur_player.piece, len(moves)), result)
+            else:
+                self.assertEqual(GameTied(len(moves)), result)
+
+    def test_turn_by_turn_games_start_once(self):
+        game = random_game()
+        recorder = Recorder()
+        game.add_observer(recorder)
+        game.play_turn()
+        game.play_turn()
+        game.start()
+        self.assertEqual([GameStarted, MoveMade, MoveMade], [type(event) for event in recorder.events])
+        game.remove_observer(recorder)
+        game.play_turn()
+        self.assertEqual(3, len(recorder.events))
+
+    def test_events_as_json(self):
+        made = MoveMade(0, 'Ann', 'X', 0, 3)
+        self.assertEqual({'type': 'move', 'ply': 0, 'player': 'Ann', 'piece': 'X', 'row': 0, 'column': 3},
+                         json.loads(event_to_json(made)))
+        snapshot = json.loads(event_to_json(GameSnapshot(None, (made,), GameTied(1))))
+        self.assertEqual(['snapshot', 'move', 'tie'],
+                         [snapshot['type'], snapshot['moves'][0]['type'], snapshot['result']['type']])
+
+
+class TestBroadcaster(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        random.seed(5)
+
+    async def test_fan_out_to_thousands(self):
+        broadcaster = Broadcaster()
+        subscriptions = [broadcaster.subscribe() for _ in range(2000)]
+        game = random_game()
+        recorder = Recorder()
+        for observer in (broadcaster, recorder):
+            game.add_observer(observer)
+        with patch('sys.stdout', io.StringIO()):
+            game.play()
+        broadcaster.close()
+
+        async def read_all(subscription):
+            return [event async for event in subscription]
+
+        everything = await asyncio.gather(*(read_all(subscription) for subscription in subscriptions))
+        self.assertTrue(all(events == recorder.events for events in everything))
+        self.assertEqual(0, broadcaster.num_subscribers)
+
+    async def test_coalesce_keeps_slow_subscribers_whole(self):
+        broadcaster = Broadcaster(max_queued=4, policy=COALESCE)
+        slow = broadcaster.subscribe()
+        fast = broadcaster.subscribe(max_queued=100)
+        game = random_game(6, 7, 4)
+        game.add_observer(broadcaster)
+        with patch('sys.stdout', io.StringIO()):
+            game.play()
+        self.assertLessEqual(slow.num_queued, 4)
+        self.assertGreater(slow.coalesced, 0)
+        self.assertEqual(0, fast.coalesced)
+        events = []
+        while slow.num_queued:
+            events.append(await slow.get())
+        self.assertIsInstance(events[0], GameSnapshot)
+        self.assertEqual(list(game.board.history), replay(events))
+        last = events[-1]
+        self.assertEqual(broadcaster.snapshot().result, last.result if isinstance(last, GameSnapshot) else last)
+
+    async def test_drop_keeps_the_latest_events(self):
+        broadcaster = Broadcaster(max_queued=3, policy=DROP)
+        subscription = broadcaster.subscribe()
+        events = [MoveMade(ply, 'Ann', 'X', 0, ply) for ply in range(10)]
+        for event in events:
+            broadcaster.publish(event)
+        broadcaster.close()
+        self.assertEqual(events[-3:], [event async for event in subscription])
+        self.assertEqual(7, subscription.dropped)
+        self.assertEqual(3, subscription.delivered)
+
+    async def test_late_and_leaving_subscribers(self):
+        broadcaster = Broadcaster()
+        started = GameStarted(4, 4, 3, ('Ann', 'Bob'), ('X', 'O'))
+        broadcaster.publish(started)
+        broadcaster.publish(MoveMade(0, 'Ann', 'X', 0, 2))
+        late = broadcaster.subscribe()
+        self.assertEqual(GameSnapshot(started, (MoveMade(0, 'Ann', 'X', 0, 2),), None), await late.get())
+        late.unsubscribe()
+        late.unsubscribe()
+        broadcaster.publish(MoveMade(1, 'Bob', 'O', 0, 1))
+        self.assertIsNone(await late.get())
+        self.assertEqual(0, broadcaster.num_subscribers)
+        broadcaster.close()
+        after = broadcaster.subscribe()
+        self.assertEqual([2, 1], replay([event async for event in after]))
+        with self.assertRaises(ValueError):
+            broadcaster.subscribe(policy='block')
+
+    async def test_game_in_another_thread(self):
+        broadcaster = Broadcaster(max_queued=2)
+        subscriptions = [broadcaster.subscribe() for _ in range(100)]
+        game = random_game(6, 7, 4)
+        game.add_observer(broadcaster)
+
+        async def watch(subscription, delay):
+            events = []
+            async for event in subscription:
+                events.append(event)
+                await asyncio.sleep(delay)
+            return events
+
+        def play():
+            with patch('sys.stdout', io.StringIO()):
+                game.play()
+            broadcaster.close()
+
+        watching = asyncio.gather(*(watch(subscription, 0.001 * (i % 3))
+                                    for i, subscription in enumerate(subscriptions)))
+        await asyncio.to_thread(play)
+        for events in await watching:
+            self.assertEqual(list(game.board.history), replay(events))
+
+
+if __name__ == '__main__':
+    unittest.main()
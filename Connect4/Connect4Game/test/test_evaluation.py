@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from Connect4Game.src import evaluation, tuning
+from Connect4Game.src.bitboard import BitBoard
+from Connect4Game.src.board import Board
+from Connect4Game.src.evaluation import FeatureEvaluation, WeightsFileError
+from Connect4Game.src.players.alpha_beta_ai import AlphaBetaAi
+
+
+def play(board, columns):
+    for ply, column in enumerate(columns):
+        board.push_move(column, 'XO'[ply % 2])
+    return board
+
+
+class TestEvaluation(unittest.TestCase):
+
+    def test_default_weights_square_open_windows(self):
+        board = BitBoard(6, 7, '*')
+        board.enable_window_index(4)
+        play(board, [3, 3, 2, 4, 1])
+        index = board.window_index
+        expected = sum(n * n * (index.open_windows('O', n) - index.open_windows('X', n)) for n in range(1, 4))
+        self.assertEqual(expected, FeatureEvaluation().evaluate(board, 'O', 'X', 4))
+        # without the window index there is nothing to count
+        self.assertEqual(0, FeatureEvaluation().evaluate(play(BitBoard(6, 7, '*'), [3, 3, 2]), 'O', 'X', 4))
+
+    def test_features(self):
+        columns = [0, 3, 1, 3, 2, 6, 4, 3, 4]
+        features = FeatureEvaluation().features(play(BitBoard(6, 7, '*'), columns), 'O', 'X', 4)
+        self.assertEqual(3, features['center'])  # O holds the middle column
+        self.assertEqual(features, FeatureEvaluation().features(play(Board(6, 7, '*'), columns), 'O', 'X', 4))
+        board = play(BitBoard(4, 4, '*'), [0, 3, 1, 3])
+        features = FeatureEvaluation().features(board, 'X', 'O', 3)
+        # X, who moved first, threatens the bottom of column 2, which is on X's rows.
+        # O threatens the third row of column 3, which is on X's rows too
+        self.assertEqual(0, features['threats'])
+        self.assertEqual(1, features['odd_even_threats'])
+
+    def test_weights(self):
+        with self.assertRaises(ValueError):
+            FeatureEvaluation({'luck': 1})
+        board = play(BitBoard(6, 7, '*'), [3, 0])
+        self.assertEqual(0, FeatureEvaluation({'center': 2.5}).evaluate(board, 'O', 'X', 4) + 2)  # rounds -2.5
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'weights.json')
+            evaluation.save_weights(path, {'center': 3, 'open_2': 1.5}, tuning={'iterations': 1})
+            self.assertEqual({'center': 3, 'open_2': 1.5}, evaluation.load_weights(path))
+            with patch.dict(os.environ, {evaluation.WEIGHTS_ENVIRONMENT_VARIABLE: path}):
+                ai = AlphaBetaAi('AlphaBetaAi 1', 'X', verbose=False)
+            self.assertEqual({'center': 3.0, 'open_2': 1.5}, ai.evaluation.weights)
+            self.assertEqual(evaluation.DEFAULT_WEIGHTS, AlphaBetaAi('AlphaBetaAi 2', 'O').evaluation.weights)
+            bad_path = os.path.join(directory, 'bad.json')
+            with open(bad_path, 'w') as bad_file:
+                bad_file.write('{"weights": {"luck": 1}}')
+            with self.assertRaises(WeightsFileError):
+                evaluation.load_weights(bad_path)
+            with self.assertRaises(WeightsFileError):
+                evaluation.load_weights(os.path.join(directory, 'missing.json'))
+
+
+class TestTuning(unittest.TestCase):
+
+    def test_games_are_reproducible(self):
+        spec = tuning.TuningGame(seed=4, first_weights=evaluation.DEFAULT_WEIGHTS, second_weights={'center': 1},
+                                 num_rows=5, num_cols=5, num_pieces_to_win=4, depth=1)
+        result = tuning.play_tuning_game(spec)
+        self.assertIn(result, (0, 0.5, 1))
+        self.assertEqual(result, tuning.play_tuning_game(spec))
+        specs = tuning.match_specs({'center': 1}, {'center': 0}, 3, 10)
+        self.assertEqual(6, len(specs))
+        self.assertEqual((specs[0].first_weights, specs[0].seed), (specs[1].second_weights, specs[1].seed))
+        self.assertEqual(0.75, tuning.match_score([1, 0, 0.5, 0.5]))
+
+    def test_spsa_climbs(self):
+        # pretend that more weight on center always wins, and more on threats always loses
+        def play(specs):
+            return [1.0 if (spec.first_weights['center'] - spec.second_weights['center'] >
+                            spec.first_weights['threats'] - spec.second_weights['threats']) else 0.0
+                    for spec in specs]
+        steps = list(tuning.spsa({'center': 0, 'threats': 0}, ['center', 'threats'], 20, 2, play, seed=1))
+        self.assertEqual(20, len(steps))
+        self.assertGreater(steps[-1].weights['center'], 0)
+        self.assertLess(steps[-1].weights['threats'], 0)
+        self.assertEqual(4, steps[0].games)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import io
+import os
+import tempfile
+import unittest
+from Connect4Game.src import game_record, selfplay
+from Connect4Game.src.board import Board
+from Connect4Game.src.game_record import GameRecord, GameRecordError, RecordWriter, Replay
+from Connect4Game.src.renderer import SilentRenderer
+
+
+def play(columns, board_type=Board, num_rows=6, num_cols=7):
+    board = board_type(num_rows, num_cols, '*')
+    for ply, column in enumerate(columns):
+        board.push_move(column, 'XO'[ply % 2])
+    return board
+
+
+class TestGameRecord(unittest.TestCase):
+
+    def test_round_trip(self):
+        records = [GameRecord.from_moves(6, 7, 4, [3, 3, 4, 4, 5, 5, 6], winner=0),
+                   GameRecord.from_moves(2, 2, 3, [0, 1, 0, 1]),
+                   GameRecord.from_moves(4, 200, 5, [199, 0, 150], annotations=[12, -1_000_000, 0]),
+                   GameRecord.from_moves(6, 7, 4, [])]
+        stream = io.BytesIO()
+        with RecordWriter(stream) as writer:
+            for record in records:
+                writer.write(record)
+        self.assertEqual(4, writer.count)
+        stream.seek(0)
+        self.assertEqual(records, list(game_record.read_records(stream)))
+        # the header, then one byte per move for records without annotations
+        self.assertEqual(12 + 7, len(records[0].to_bytes()))
+
+    def test_bad_records_and_files(self):
+        with self.assertRaises(GameRecordError):
+            GameRecord.from_moves(6, 300, 4, [0])
+        with self.assertRaises(GameRecordError):
+            GameRecord.from_moves(6, 7, 4, [7])
+        with self.assertRaises(GameRecordError):
+            GameRecord.from_moves(6, 7, 4, [1, 2], annotations=[1])
+        with self.assertRaises(GameRecordError):
+            list(game_record.read_records(io.BytesIO(b'not a file of game records')))
+        stream = io.BytesIO()
+        with RecordWriter(stream) as writer:
+            writer.write(GameRecord.from_moves(6, 7, 4, [1, 2, 3]))
+        with self.assertRaises(GameRecordError):
+            list(game_record.read_records(io.BytesIO(stream.getvalue()[:-1])))
+
+    def test_streams_and_appends_to_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'games.c4r')
+            specs = selfplay.make_specs(['random', 'random'], 20)
+            with RecordWriter(path) as writer:
+                selfplay.write_records(selfplay.run_games(specs[:10], workers=1), writer, 6, 7, 4)
+            with RecordWriter(path, append=True) as writer:
+                selfplay.write_records(selfplay.run_games(specs[10:], workers=1), writer, 6, 7, 4)
+            results = list(selfplay.run_games(specs, workers=1))
+            records = game_record.read_records(path)
+            self.assertEqual(iter(records), records)  # a generator, not a list
+            for result, record in zip(results, records):
+                self.assertEqual(bytes(result.moves), record.moves)
+                self.assertEqual(result.winner, record.winner)
+            self.assertEqual((20, sum(result.plies for result in results)),
+                             game_record.summarize(game_record.read_records(path))[:2])
+
+    def test_replay_matches_pushing_moves(self):
+        moves = [3, 3, 2, 4, 4, 1, 0, 6, 6, 6, 5, 2, 2, 2, 3, 0, 1, 5, 5]
+        record = GameRecord.from_moves(6, 7, 4, moves)
+        for backend in ('list', 'bitboard'):
+            replayed = Replay(record, backend, checkpoint_every=4)
+            for ply in (7, 0, len(moves), 13, 12, 1, -2):
+                expected = play(moves[:ply if ply >= 0 else len(moves) + ply])
+                position = replayed.position(ply)
+                self.assertEqual(repr(expected), repr(position))
+                self.assertEqual(expected.history, position.history)
+                self.assertEqual(expected.zobrist_hash, position.zobrist_hash)
+            # checkpoints are copies, so changing a position does not change the replay
+            replayed.position(8).push_move(0, 'X')
+            self.assertEqual(repr(play(moves[:9])), repr(replayed.position(9)))
+            self.assertEqual(len(moves) // 4 + 1, len(replayed._checkpoints))
+            for ply, position in enumerate(replayed.positions()):
+                self.assertEqual(ply, position.num_pieces)
+        with self.assertRaises(IndexError):
+            Replay(record).position(len(moves) + 1)
+
+    def test_replay_rejects_impossible_moves(self):
+        record = GameRecord.from_moves(2, 2, 2, [0, 0, 0])
+        with self.assertRaises(GameRecordError):
+            game_record.replay(record)
+        self.assertEqual(2, game_record.replay(record, 2).num_pieces)
+        with self.assertRaises(GameRecordError):
+            Replay(record).game(SilentRenderer()).play()
+
+    def test_replay_as_a_game(self):
+        for seed in range(5):
+            result = selfplay.play_game(selfplay.GameSpec(game=0, seed=seed, player_types=('basic', 'random')))
+            game = Replay(result.to_record(6, 7, 4), 'list').game(SilentRenderer())
+            game.play()
+            self.assertEqual(result.moves, list(game.board.history))
+            self.assertEqual(result.winner, game.cur_player_turn if game.someone_won else None)
+
+
+if __name__ == '__main__':
+    unittest.main()
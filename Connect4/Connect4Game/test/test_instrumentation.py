@@ -0,0 +1,127 @@
+import gc
+import io
+import json
+import time
+import unittest
+from unittest.mock import patch
+from Connect4Game.src import selfplay
+from Connect4Game.src.board import Board
+from Connect4Game.src.game import Game
+from Connect4Game.src.game_record import GameRecord, Replay
+from Connect4Game.src.instrumentation import Instruments
+from Connect4Game.src.move import Move
+from Connect4Game.src.players import alpha_beta_ai, human_player, mcts_ai, random_ai
+
+
+def busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestInstruments(unittest.TestCase):
+
+    def setUp(self):
+        self.instruments = Instruments()
+        self.addCleanup(self.instruments.disable)
+
+    def test_disabled_runs_the_original_code(self):
+        originals = (Move.make, Game.is_part_of_win, random_ai.RandomAi.get_move, mcts_ai._copy_board, Board.copy)
+        self.instruments.enable()
+        self.instruments.enable()  # enabling twice does not wrap twice
+        self.assertTrue(self.instruments.enabled)
+        self.assertIsNot(originals[0], Move.make)
+        self.assertEqual(originals[0].__doc__, Move.make.__doc__)
+        self.instruments.disable()
+        self.assertFalse(self.instruments.enabled)
+        self.assertEqual(originals, (Move.make, Game.is_part_of_win, random_ai.RandomAi.get_move,
+                                     mcts_ai._copy_board, Board.copy))
+
+    def test_counts_a_game(self):
+        self.instruments.enable()
+        result = selfplay.play_game(selfplay.GameSpec(game=0, seed=1, player_types=('basic', 'alphabeta'),
+                                                      player_options=({}, {'max_depth': 2})))
+        self.instruments.disable()
+        counters = self.instruments.counters
+        self.assertEqual(result.plies, counters['turns'])
+        self.assertEqual(result.plies, counters['moves'])
+        self.assertGreaterEqual(counters['win_checks'], result.plies)
+        self.assertGreater(counters['nodes'], 0)
+        self.assertEqual(1, counters['games'])
+        totals = self.instruments.games[0]
+        self.assertEqual(result.plies, totals.plies)
+        self.assertEqual(counters['win_checks'], totals.win_checks)
+        self.assertEqual(None if result.winner is None else result.players[result.winner], totals.winner)
+        # BasicAi calls RandomAi.get_move through super, which is only measured once
+        get_move = {label: self.instruments.latencies[('get_move', label)].count
+                    for label in ('BasicAi', 'AlphaBetaAi')}
+        self.assertEqual(result.plies, sum(get_move.values()))
+        self.assertNotIn(('get_move', 'RandomAi'), self.instruments.latencies)
+
+    def test_unfinished_games_are_forgotten(self):
+        self.instruments.enable()
+        players = selfplay.create_players(('random', 'random'))
+        for abandon in (True, False):
+            game = Game(Board(6, 7, '*'), 4, players)
+            game.play_turn()
+            self.assertEqual(1, len(self.instruments._open_games))
+            if abandon:
+                self.instruments.abandon_game(game)
+                self.assertEqual(0, len(self.instruments._open_games))
+            del game
+            gc.collect()
+            self.assertEqual(0, len(self.instruments._open_games))
+        self.assertEqual(0, self.instruments.counters['games'])
+
+    def test_counts_retries_and_copies(self):
+        self.instruments.enable()
+        board = Board(1, 2, '*')
+        board.push_move(0, 'X')
+        person = human_player.HumanPlayer('Bob', 'O')
+        with patch('Connect4Game.src.players.human_player.input', side_effect=['left', '0', '1']), \
+                patch('sys.stdout', new_callable=io.StringIO):
+            self.assertEqual(1, person.take_turn(board, 2).column)
+        self.assertEqual(2, self.instruments.counters['retries'])
+        self.assertEqual(3, self.instruments.latencies[('get_move', 'HumanPlayer')].count)
+        ai = mcts_ai.MctsAi('MctsAi 1', 'X', random_ai.RandomAi('RandomAi 2', 'O'),
+                            time_budget=None, max_playouts=20, verbose=False)
+        ai.get_move(Board(4, 4, '*'), 3)
+        self.assertEqual(1, self.instruments.counters['board_copies'])
+        self.assertEqual(20, self.instruments.counters['playouts'])
+        # pondering and replaying games copy boards too
+        ai = alpha_beta_ai.AlphaBetaAi('AlphaBetaAi 1', 'X', random_ai.RandomAi('RandomAi 2', 'O'), max_depth=1,
+                                       verbose=False)
+        ai.start_pondering(Board(4, 4, '*'), 3)
+        ai.stop_pondering()
+        Replay(GameRecord.from_moves(4, 4, 3, [0, 1, 2])).position(2)
+        self.assertEqual(3, self.instruments.counters['board_copies'])
+
+    def test_exports(self):
+        self.instruments.enable()
+        selfplay.play_game(selfplay.GameSpec(game=0, seed=2, player_types=('random', 'random')))
+        exported = json.loads(self.instruments.to_json())
+        self.assertEqual(self.instruments.counters['moves'], exported['latency_seconds']['move_make']['all']['count'])
+        self.assertEqual(1, len(exported['games']))
+        text = self.instruments.to_prometheus()
+        self.assertIn('# TYPE connect4_moves_total counter', text)
+        buckets = [int(line.rsplit(' ', 1)[1]) for line in text.splitlines()
+                   if line.startswith('connect4_latency_seconds_bucket{operation="move_make"')]
+        self.assertEqual(sorted(buckets), buckets)
+        self.assertIn(f'connect4_latency_seconds_count{{operation="move_make"}} {buckets[-1]}', text)
+        self.assertIn('operation="get_move",player="RandomAi",le="+Inf"', text)
+        self.instruments.reset()
+        self.assertEqual(0, sum(self.instruments.counters.values()))
+
+    def test_sampling_profiler(self):
+        self.assertTrue(self.instruments.toggle_profiler())
+        busy_wait(0.2)
+        self.assertFalse(self.instruments.toggle_profiler())
+        profiler = self.instruments.profiler
+        self.assertFalse(profiler.running)
+        self.assertTrue(profiler.top(1)[0][0].startswith('busy_wait'))
+        self.assertIn('test_sampling_profiler', profiler.collapsed())
+        self.assertIsNone(self.instruments.stop_profiler())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+import os
+import pickle
+import tempfile
+import unittest
+import time
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import patch
+from Connect4Game.src.bitboard import BitBoard
+from Connect4Game.src.game import Game
+from Connect4Game.src.renderer import SilentRenderer
+from Connect4Game.src.selfplay import GameSpec, play_game
+from Connect4Game.src.players.lazy_smp_ai import LazySmpAi
+from Connect4Game.src.players.random_ai import RandomAi
+from Connect4Game.src.shared_transposition_table import SharedTranspositionTable
+from Connect4Game.src.smp_speedup import measure_speedup, random_positions
+from Connect4Game.src.transposition_table import TranspositionTable, EXACT, LOWER_BOUND
+
+
+def store_in_other_process(table, key):
+    table.store(key, 7, LOWER_BOUND, 42, 5)
+    return table.probe(1234)
+
+
+def play(board, columns):
+    for turn, column in enumerate(columns):
+        board.push_move(column, 'XO'[turn % 2])
+
+
+class TestSharedTranspositionTable(unittest.TestCase):
+
+    def test_same_replacement_as_transposition_table(self):
+        with SharedTranspositionTable(memory_bytes=4 * SharedTranspositionTable.BYTES_PER_ENTRY) as shared:
+            table = TranspositionTable(memory_bytes=4 * TranspositionTable.BYTES_PER_ENTRY)
+            self.assertEqual(table.capacity, shared.capacity)
+            for key, depth in ((1, 8), (3, 3), (5, 4), (7, 9), (2, 1), (4, 6), (3, 2)):
+                table.store(key, depth, EXACT, key, 0)
+                shared.store(key, depth, EXACT, key, 0)
+            for key in range(9):
+                self.assertEqual(table.probe(key), shared.probe(key))
+            self.assertEqual((table.hits, table.misses, table.evictions, table.stores),
+                             (shared.hits, shared.misses, shared.evictions, shared.stores))
+            self.assertEqual(len(table), len(shared))
+            shared.clear()
+            self.assertEqual(0, len(shared))
+
+    def test_other_processes_share_the_entries(self):
+        with SharedTranspositionTable(memory_bytes=1 << 16) as table:
+            table.store(1234, 3, EXACT, -7, 2)
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                seen = executor.submit(store_in_other_process, table, 99).result()
+            self.assertEqual((3, EXACT, -7, 2), seen)
+            self.assertEqual((7, LOWER_BOUND, 42, 5), table.probe(99))
+            # unpickling in the process that made the table reuses it
+            self.assertIs(table, pickle.loads(pickle.dumps(table)))
+
+    def test_torn_entry_is_a_miss(self):
+        with SharedTranspositionTable(memory_bytes=1 << 10) as table:
+            table.store(1234, 3, EXACT, -7, 2)
+            table.store(5678, 5, EXACT, 1, 1)
+            index = (1234 & table._bucket_mask) << 1
+            key, data = table._read(index)
+            self.assertEqual(1234, key)
+            # the data of another write landed next to this key
+            table._words[4 + 2 * index + 1] = table._read((5678 & table._bucket_mask) << 1)[1]
+            self.assertIsNone(table.probe(1234))
+
+    def test_stop_flag(self):
+        with SharedTranspositionTable(memory_bytes=1 << 10) as table:
+            self.assertFalse(table.stop)
+            table.stop = True
+            self.assertTrue(pickle.loads(pickle.dumps(table)).stop)
+            table.clear()
+            self.assertTrue(table.stop)
+
+
+class TestLazySmpAi(unittest.TestCase):
+
+    def make_ai(self, **kwargs):
+        ai = LazySmpAi('LazySmpAi 1', 'X', RandomAi('RandomAi 1', 'O'), verbose=False, **kwargs)
+        self.addCleanup(ai.close)
+        return ai
+
+    def test_takes_win(self):
+        ai = self.make_ai(max_depth=4, workers=2, memory_bytes=1 << 16)
+        board = BitBoard(6, 7, '*')
+        play(board, [0, 6, 1, 6, 2, 5])
+        self.assertEqual(3, ai.get_move(board, 4).column)
+        self.assertEqual(2, len(ai.worker_searches))
+        self.assertIn('workers reached depths', ai.report())
+
+    def test_finds_forced_win(self):
+        ai = self.make_ai(max_depth=5, workers=3, memory_bytes=1 << 16)
+        board = BitBoard(6, 7, '*')
+        play(board, [2, 2, 3, 3])
+        before = repr(board)
+        self.assertIn(ai.get_move(board, 4).column, (1, 4))
+        self.assertGreater(ai.last_search.score, LazySmpAi.WIN_SCORE - 42)
+        self.assertEqual(before, repr(board))
+        self.assertEqual(sum(stats.nodes for stats in ai.worker_searches), ai.last_search.nodes)
+
+    def test_helpers_stop_with_the_main_search(self):
+        ai = self.make_ai(time_budget=0.2, workers=2, memory_bytes=1 << 16)
+        ai.get_move(BitBoard(6, 7, '*'), 4)  # starts the helper process
+        start = time.perf_counter()
+        ai.get_move(BitBoard(6, 7, '*'), 4)
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertFalse(ai.transposition_table.stop)
+
+    def test_close_frees_the_table(self):
+        ai = self.make_ai(max_depth=2, workers=2, memory_bytes=1 << 16)
+        ai.get_move(BitBoard(6, 7, '*'), 4)
+        name = ai.transposition_table.name
+        ai.close()
+        with self.assertRaises(FileNotFoundError):
+            SharedTranspositionTable(name=name)
+        self.assertNotIsInstance(ai.transposition_table, SharedTranspositionTable)
+
+    def test_games_close_their_players(self):
+        players = [LazySmpAi('LazySmpAi 1', 'X', max_depth=1, verbose=False, workers=2, memory_bytes=1 << 16),
+                   RandomAi('RandomAi 2', 'O')]
+        players[0].opponent, players[1].opponent = players[1], players[0]
+        self.addCleanup(players[0].close)
+        Game(BitBoard(4, 4, '*'), 3, players, SilentRenderer()).play()
+        self.assertIsNone(players[0]._executor)
+        self.assertNotIsInstance(players[0].transposition_table, SharedTranspositionTable)
+
+    def test_defaults_to_one_worker(self):
+        self.assertEqual(1, LazySmpAi.create_for_game([], '*').workers)
+        result = play_game(GameSpec(game=0, seed=1, player_types=('lazysmp', 'random'), num_rows=4, num_cols=4,
+                                    num_pieces_to_win=3, player_options=({'max_depth': 2}, {})))
+        self.assertGreater(result.plies, 0)
+
+    def test_workers_from_config_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'config.txt')
+            with open(path, 'w') as config_file:
+                config_file.write('num_rows : 4\nnum_cols : 4\nnum_pieces_to_win : 3\nblank_char : *\nworkers : 2\n')
+            with patch('builtins.input', side_effect=['lazysmp', 'random']):
+                game = Game.create_game_from_file(path)
+            self.addCleanup(game.close_players)
+            self.assertEqual(2, game.players[0].workers)
+            self.assertIsInstance(game.players[0].transposition_table, SharedTranspositionTable)
+            with open(path, 'a') as config_file:
+                config_file.write('workers : 0\n')
+            with patch.object(Game, 'setup_players'), self.assertRaises(ValueError):
+                Game.create_game_from_file(path)
+
+    def test_one_worker_needs_no_shared_memory(self):
+        ai = self.make_ai(max_depth=3, workers=1)
+        self.assertNotIsInstance(ai.transposition_table, SharedTranspositionTable)
+        self.assertIsNotNone(ai.get_move(BitBoard(6, 7, '*'), 4))
+
+    def test_measure_speedup(self):
+        positions = random_positions(2, 5, seed=3)
+        self.assertTrue(all(board.num_pieces == 5 for board in positions))
+        results = measure_speedup([1, 2], positions, 3, memory_bytes=1 << 16)
+        self.assertEqual([1, 2], [result.workers for result in results])
+        self.assertEqual(1.0, results[0].speedup)
+        self.assertTrue(all(result.nodes > 0 and result.seconds > 0 for result in results))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import importlib.util
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from Connect4Game.src import evaluation, selfplay
+from Connect4Game.src.bitboard import BitBoard
+from Connect4Game.src.board import Board
+from Connect4Game.src.game import Game
+from Connect4Game.src.game_record import GameRecord, RecordWriter, read_records
+from Connect4Game.src.players.alpha_beta_ai import AlphaBetaAi
+from Connect4Game.src.players.player import PlayerUnavailableError
+from Connect4Game.src.players.random_ai import RandomAi
+
+HAS_NUMPY = importlib.util.find_spec('numpy') is not None
+if HAS_NUMPY:
+    import numpy as np
+    from Connect4Game.src import learned_evaluation
+    from Connect4Game.src.players import learned_ai
+    from Connect4Game.src.players.learned_ai import LearnedAi
+
+
+def play(board, columns):
+    for ply, column in enumerate(columns):
+        board.push_move(column, 'XO'[ply % 2])
+    return board
+
+
+def self_play_records(num_games):
+    records = io.BytesIO()
+    with RecordWriter(records) as writer:
+        specs = selfplay.make_specs(['basic', 'random'], num_games)
+        selfplay.write_records(selfplay.run_games(specs, workers=1), writer, 6, 7, 4)
+        data = records.getvalue()
+    return list(read_records(io.BytesIO(data)))
+
+
+@unittest.skipIf(not HAS_NUMPY, 'numpy is not installed')
+class TestLearnedEvaluation(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.data = learned_evaluation.read_training_data(self_play_records(60))
+        cls.model = learned_evaluation.train_evaluation(cls.data, num_hidden=16, epochs=3)
+
+    def test_features(self):
+        encoder = learned_evaluation.FeatureEncoder(6, 7, 4)
+        board = play(BitBoard(6, 7, '*'), [3, 3, 2, 4, 1])
+        board.enable_window_index(4)
+        features = encoder.encode_masks([board.mask_for('O')], [board.mask_for('X')])[0]
+        self.assertEqual(encoder.num_features, len(features))
+        cells = features[:42].reshape(6, 7)
+        self.assertEqual(1, cells[0, 4])  # O's piece on the bottom of column 4
+        self.assertEqual(1, cells[1, 3])
+        self.assertEqual(3, features[42:84].sum())  # X's pieces
+        # the open window counts agree with the window index
+        for num_pieces in range(1, 4):
+            self.assertEqual(board.window_index.open_windows('O', num_pieces), features[84 + num_pieces - 1])
+            self.assertEqual(board.window_index.open_windows('X', num_pieces), features[87 + num_pieces - 1])
+        self.assertEqual(0, features[-1])  # X moved first
+        mirrored = encoder.mirror(encoder.cells([board.mask_for('X')]))
+        self.assertEqual(1, mirrored.reshape(6, 7)[0, 6 - 3])
+        self.assertEqual(1, mirrored.reshape(6, 7)[0, 6 - 1])
+
+    def test_training_data(self):
+        records = [GameRecord.from_moves(6, 7, 4, [3, 0, 3, 0, 3, 0, 3], winner=0)]
+        data = learned_evaluation.read_training_data(records, mirror=False)
+        self.assertEqual([1, -1, 1, -1, 1, -1, 1], data.targets.tolist())  # the final position is left out
+        self.assertEqual(14, len(learned_evaluation.read_training_data(records).targets))
+        with self.assertRaises(ValueError):
+            learned_evaluation.read_training_data(records + [GameRecord.from_moves(4, 4, 3, [0])])
+
+    def test_training_lowers_the_loss(self):
+        epochs = []
+        learned_evaluation.train_evaluation(self.data, num_hidden=8, epochs=4, on_epoch=epochs.append)
+        self.assertEqual(4, len(epochs))
+        self.assertLess(epochs[-1].training_loss, epochs[0].training_loss)
+        linear = learned_evaluation.train_evaluation(self.data, num_hidden=0, epochs=2, validation_fraction=0)
+        self.assertEqual(0, linear.num_hidden)
+
+    def test_batches_match_single_positions(self):
+        board = play(BitBoard(6, 7, '*'), [3, 3, 2, 4])
+        list_board = play(Board(6, 7, '*'), [3, 3, 2, 4])
+        single = self.model.evaluate(board, 'X', 'O', 4)
+        self.assertEqual(single, self.model.evaluate(list_board, 'X', 'O', 4))
+        batch = self.model.evaluate_masks([board.mask_for('X'), board.mask_for('O')],
+                                          [board.mask_for('O'), board.mask_for('X')])
+        self.assertAlmostEqual(single, int(batch[0]), delta=1)
+        self.assertLessEqual(np.abs(batch).max(), learned_evaluation.SCORE_SCALE)
+        with self.assertRaises(ValueError):
+            self.model.evaluate(BitBoard(4, 4, '*'), 'X', 'O', 4)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'model.npz')
+            self.model.save(path, epochs=3)
+            loaded = evaluation.load_evaluation(path)
+            self.assertIsInstance(loaded, learned_evaluation.LearnedEvaluation)
+            board = play(BitBoard(6, 7, '*'), [3, 2])
+            self.assertEqual(self.model.evaluate(board, 'X', 'O', 4), loaded.evaluate(board, 'X', 'O', 4))
+            with open(os.path.join(directory, 'bad.npz'), 'w') as bad_file:
+                bad_file.write('not a model')
+            with self.assertRaises(learned_evaluation.LearnedModelError):
+                learned_evaluation.load_model(os.path.join(directory, 'bad.npz'))
+
+    def test_batched_leaves_search_the_same(self):
+        board = play(BitBoard(6, 7, '*'), [3, 3, 2, 4])
+        searches = []
+        for batch_leaves in (True, False):
+            ai = LearnedAi('LearnedAi 1', 'X', AlphaBetaAi('AlphaBetaAi 2', 'O', verbose=False), max_depth=3,
+                           verbose=False, model=self.model, batch_leaves=batch_leaves)
+            searches.append(ai.search(board, 4))
+        self.assertAlmostEqual(searches[0].score, searches[1].score, delta=1)
+
+    def test_learned_ai_takes_and_blocks_wins(self):
+        ai = LearnedAi('LearnedAi 1', 'X', AlphaBetaAi('AlphaBetaAi 2', 'O', verbose=False), max_depth=3,
+                       verbose=False, model=self.model)
+        self.assertEqual(3, ai.get_move(play(BitBoard(6, 7, '*'), [0, 6, 1, 6, 2, 5]), 4).column)
+        self.assertEqual(3, ai.get_move(play(BitBoard(6, 7, '*'), [6, 0, 6, 1, 5, 2]), 4).column)
+        with patch.dict(os.environ, {learned_ai.MODEL_ENVIRONMENT_VARIABLE: ''}), \
+                self.assertRaises(PlayerUnavailableError):
+            LearnedAi('LearnedAi 2', 'O')
+
+    def test_learned_player_type(self):
+        # without a model the type is turned down and asked for again
+        with patch.dict(os.environ, {learned_ai.MODEL_ENVIRONMENT_VARIABLE: ''}), \
+                patch('builtins.input', side_effect=['learned', 'random', 'random']), \
+                patch('sys.stdout', new_callable=io.StringIO) as output:
+            game = Game(BitBoard(6, 7, '*'), 4)
+        self.assertIn(learned_ai.MODEL_ENVIRONMENT_VARIABLE, output.getvalue())
+        self.assertEqual([RandomAi, RandomAi], [type(player) for player in game.players])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'model.npz')
+            self.model.save(path, epochs=3)
+            with patch('builtins.input', side_effect=['learned', 'random']):
+                game = Game(BitBoard(6, 7, '*'), 4, player_options={'learned': {'model': path, 'max_depth': 2}})
+        self.assertIsInstance(game.players[0], LearnedAi)
+        self.assertIsInstance(game.players[0].evaluation, learned_evaluation.LearnedEvaluation)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import random
+import time
+import unittest
+from unittest.mock import patch
+from Connect4Game.src.board import Board
+from Connect4Game.src.bitboard import BitBoard
+from Connect4Game.src.game import Game
+from Connect4Game.src.sparse_board import SparseBoard
+from Connect4Game.src.renderer import SilentRenderer
+from Connect4Game.src.players import mcts_ai
+
+
+def make_players(**kwargs):
+    ai = mcts_ai.MctsAi('MctsAi 1', 'X', verbose=False, **kwargs)
+    opponent = mcts_ai.MctsAi('MctsAi 2', 'O', ai, verbose=False, **kwargs)
+    ai.opponent = opponent
+    return ai, opponent
+
+
+def play(board, columns):
+    for turn, column in enumerate(columns):
+        board.push_move(column, 'XO'[turn % 2])
+
+
+class TestMctsAi(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(0)
+
+    def test_takes_win(self):
+        for board_type in (Board, BitBoard):
+            for policy in mcts_ai.PLAYOUT_POLICIES:
+                ai, _ = make_players(time_budget=None, max_playouts=500, playout_policy=policy)
+                board = board_type(6, 7, '*')
+                play(board, [0, 6, 1, 6, 2, 5])
+                self.assertEqual(3, ai.get_move(board, 4).column)
+                self.assertEqual(500, ai.last_search.playouts)
+
+    def test_board_is_not_changed(self):
+        ai, _ = make_players(time_budget=None, max_playouts=200)
+        board = Board(6, 7, '*')
+        play(board, [3, 3, 2])
+        before = repr(board)
+        ai.search(board, 4)
+        self.assertEqual(before, repr(board))
+        self.assertEqual(3, board.num_pieces)
+
+    def test_copies_only_the_spots_played_in(self):
+        board = SparseBoard(1000, 1000, '*')
+        play(board, [500, 500, 501, 2])
+        with patch.object(SparseBoard, '__getitem__', side_effect=AssertionError('read a whole row')):
+            copy = mcts_ai._copy_board(board, '*')
+        self.assertEqual(board.history, copy.history)
+        self.assertEqual(['X', 'O', 'X', 'O'], [copy.get_piece_at(0, 500), copy.get_piece_at(1, 500),
+                                                copy.get_piece_at(0, 501), copy.get_piece_at(0, 2)])
+        board = Board(6, 7, '*')
+        board.add_piece_to_column('X', 3)
+        self.assertEqual('X', mcts_ai._copy_board(board, '*').get_piece_at(0, 3))
+
+    def test_reuses_subtree(self):
+        ai, opponent = make_players(time_budget=None, max_playouts=300)
+        board = BitBoard(6, 7, '*')
+        board.push_move(ai.get_move(board, 4).column, 'X')
+        board.push_move(opponent.get_move(board, 4).column, 'O')
+        kept = ai._tree.root.children.get(board.history[-1])
+        self.assertIsNotNone(kept)
+        visits_before = kept.visits
+        self.assertGreater(visits_before, 0)
+        ai.get_move(board, 4)
+        self.assertEqual(sum(ai.last_search.visits.values()), visits_before - 1 + 300)
+
+    def test_root_parallel_merges_visits(self):
+        ai, _ = make_players(time_budget=None, max_playouts=400, workers=2)
+        try:
+            board = BitBoard(5, 5, '*')
+            ai.get_move(board, 4)
+            self.assertEqual(2, ai.last_search.trees)
+            self.assertEqual(400, ai.last_search.playouts)
+            self.assertEqual(400, sum(ai.last_search.visits.values()))
+            self.assertIn('playouts/sec per core', ai.report())
+        finally:
+            ai.close()
+
+    def test_games_close_the_workers(self):
+        ai, opponent = make_players(time_budget=None, max_playouts=100, workers=2)
+        self.addCleanup(ai.close)
+        Game(BitBoard(4, 4, '*'), 3, [ai, opponent], SilentRenderer()).play()
+        self.assertIsNone(ai._executor)
+        self.assertIsNone(ai._tree)
+
+    def test_time_budget(self):
+        ai, _ = make_players(time_budget=0.1)
+        start = time.perf_counter()
+        ai.get_move(BitBoard(6, 7, '*'), 4)
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertGreater(ai.last_search.playouts, 0)
+
+    def test_needs_a_budget_and_a_known_policy(self):
+        with self.assertRaises(ValueError):
+            mcts_ai.MctsAi('MctsAi 1', 'X', time_budget=None, max_playouts=None)
+        with self.assertRaises(ValueError):
+            mcts_ai.MctsAi('MctsAi 1', 'X', playout_policy='clever')
+
+
+if __name__ == '__main__':
+    unittest.main()
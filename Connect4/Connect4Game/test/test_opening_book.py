@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+from Connect4Game.src import opening_book
+from Connect4Game.src.opening_book import BookEntry, OpeningBook, OpeningBookError
+from Connect4Game.src.players.alpha_beta_ai import AlphaBetaAi
+
+
+class TestOpeningBook(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'book.bin')
+
+    def tearDown(self):
+        opening_book.load_book.cache_clear()
+        self.directory.cleanup()
+
+    def test_opening_positions(self):
+        # the empty board, 2 first moves up to mirroring, and every pair of moves up to mirroring
+        positions = list(opening_book.opening_positions(3, 3, 3, 2))
+        self.assertEqual(positions[0], ())
+        self.assertEqual(len(positions), 1 + 2 + 5)
+        # full boards have no move to look up
+        self.assertEqual(list(opening_book.opening_positions(1, 2, 2, 3)), [(), (0,)])
+
+    def test_build_write_and_lookup(self):
+        entries = opening_book.build_book(4, 5, 3, 2, max_depth=4, workers=1)
+        written = opening_book.write_book(self.path, 4, 5, 3, 2, entries)
+        with OpeningBook(self.path) as book:
+            self.assertEqual(written, len(book))
+            self.assertTrue(book.matches(4, 5, 3))
+            self.assertFalse(book.matches(4, 5, 4))
+            hits = 0
+            for entry in entries:
+                found = book.probe(entry.key)
+                if found is not None:
+                    hits += 1
+                    self.assertEqual((entry.depth, entry.score, entry.move), (found.depth, found.score, found.move))
+            self.assertEqual(hits, written)
+            # a position and its mirror image get mirrored moves
+            left = book.lookup(opening_book.board_from_moves((0,), 4, 5))
+            right = book.lookup(opening_book.board_from_moves((4,), 4, 5))
+            self.assertEqual(left.column, 4 - right.column)
+            # too many pieces to be in the book
+            self.assertIsNone(book.lookup(opening_book.board_from_moves((0, 1, 2), 4, 5)))
+
+    def test_collisions_keep_the_deeper_position(self):
+        opening_book.write_book(self.path, 6, 7, 4, 2, [BookEntry(1, 3, 0, 0), BookEntry(3, 5, 0, 1),
+                                                        BookEntry(5, 4, 0, 2)], num_slots=2)
+        with OpeningBook(self.path) as book:
+            self.assertEqual(1, len(book))
+            self.assertIsNone(book.probe(1))
+            self.assertEqual(1, book.probe(3).move)
+            self.assertIsNone(book.probe(2))
+
+    def test_bad_files(self):
+        with open(self.path, 'wb') as book_file:
+            book_file.write(b'not a book' * 10)
+        with self.assertRaises(OpeningBookError):
+            OpeningBook(self.path)
+        opening_book.write_book(self.path, 6, 7, 4, 2, [BookEntry(1, 3, 0, 0)])
+        with open(self.path, 'ab') as book_file:
+            book_file.write(b'\x00')
+        with self.assertRaises(OpeningBookError):
+            OpeningBook(self.path)
+
+    def test_player_uses_book(self):
+        opening_book.write_book(self.path, 6, 7, 4, 2, [BookEntry(0, 9, 5, 6)])
+        player = AlphaBetaAi('AlphaBeta1', 'X', time_budget=1, max_depth=2, verbose=False,
+                             opening_book=self.path)
+        player.opponent = AlphaBetaAi('AlphaBeta2', 'O', player, verbose=False)
+        board = opening_book.board_from_moves((), 6, 7)
+        self.assertEqual(6, player.get_move(board, 4).column)
+        self.assertTrue(player.last_search.from_book)
+        self.assertEqual(0, player.last_search.nodes)
+        self.assertIn('opening book', player.report())
+        # the book is for another game, so the player searches
+        self.assertEqual(3, player.get_move(board, 5).column)
+        self.assertFalse(player.last_search.from_book)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import io
+import unittest
+from unittest.mock import patch
+from Connect4Game.src import perft
+from Connect4Game.src.bitboard import BitBoard
+from Connect4Game.src.game import BOARD_BACKENDS
+from Connect4Game.src.perft import KNOWN_COUNTS_6X7, PerftCounts
+from Connect4Game.src.solver import InvalidPositionError
+
+
+class TestPerft(unittest.TestCase):
+
+    def test_every_backend_matches_the_known_counts(self):
+        for backend in BOARD_BACKENDS:
+            result = perft.split_perft(backend, 6, 7, 4, [], 5, workers=1)
+            self.assertEqual(list(KNOWN_COUNTS_6X7[:5]), [tuple(counts) for counts in result.counts])
+            self.assertEqual(sum(counts[0] for counts in KNOWN_COUNTS_6X7[:5]), result.nodes)
+            self.assertGreater(result.nodes_per_sec, 0)
+
+    def test_split_across_processes(self):
+        board = perft.root_board('list', 6, 7, 4, [3, 3, 4, 2])
+        expected = perft.perft(board, 4, 4)
+        self.assertEqual('XOXO', ''.join(board.get_piece_at(row, col)
+                                         for row, col in ((0, 3), (1, 3), (0, 4), (0, 2))))
+        self.assertEqual(4, board.num_pieces)  # perft leaves the board as it found it
+        result = perft.split_perft('bitboard', 6, 7, 4, [3, 3, 4, 2], 4, workers=2)
+        self.assertEqual(expected, result.counts)
+        self.assertGreater(expected[2].wins, 0)
+
+    def test_wins_and_draws_end_the_game(self):
+        # on a 2x2 board nobody gets 3 in a row, so every game is a draw once the board is full
+        counts = perft.perft(BitBoard(2, 2, '*'), 6, 3)
+        self.assertEqual([PerftCounts(2, 0, 0), PerftCounts(4, 0, 0), PerftCounts(6, 0, 0), PerftCounts(6, 0, 6),
+                          PerftCounts(0, 0, 0), PerftCounts(0, 0, 0)], counts)
+        # 1 in a row wins straight away
+        result = perft.split_perft('sparse', 2, 3, 1, [], 2, workers=1)
+        self.assertEqual([(3, 3, 0), (0, 0, 0)], [tuple(counts) for counts in result.counts])
+
+    def test_bad_positions(self):
+        with self.assertRaises(InvalidPositionError):
+            perft.root_board('list', 6, 7, 4, [7])
+        with self.assertRaises(InvalidPositionError):
+            perft.root_board('list', 2, 2, 4, [0, 0, 0])
+        with self.assertRaises(InvalidPositionError):
+            perft.root_board('list', 6, 7, 4, [0, 1, 0, 1, 0, 1, 0])
+
+    def test_main_checks_the_backends(self):
+        with patch('sys.stdout', new_callable=io.StringIO) as output:
+            self.assertEqual(0, perft.main(['--depth', '3', '--workers', '1']))
+        self.assertIn('Every backend matches the known counts to depth 3.', output.getvalue())
+        self.assertIn('bitboard: 399 nodes', output.getvalue())
+        wrong = ((7, 0, 0), (48, 0, 0))
+        with patch.object(perft, 'KNOWN_COUNTS_6X7', wrong), patch('sys.stdout', new_callable=io.StringIO) as output:
+            self.assertEqual(1, perft.main(['--depth', '2', '--backend', 'list', '--workers', '1']))
+        self.assertIn('MISMATCH list: depth 2', output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import os
+import random
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from Connect4Game.src import position_store, selfplay
+from Connect4Game.src.bitboard import BitBoard
+from Connect4Game.src.board import Board
+from Connect4Game.src.game_record import GameRecord
+from Connect4Game.src.position_store import PositionCodec, PositionStore, PositionStoreError
+
+
+def random_board(board_type, num_rows, num_cols, rng):
+    board = board_type(num_rows, num_cols, '*')
+    for ply in range(rng.randrange(num_rows * num_cols + 1)):
+        board.add_piece_to_column('XO'[ply % 2], rng.choice([col for col in range(num_cols)
+                                                             if not board.is_column_full(col)]))
+    return board
+
+
+def count_pieces(path, start, stop):
+    # runs in another process, reading the store straight from the shared pages
+    with PositionStore(path) as store:
+        view = store.view(start, stop)
+        pieces = sum(bin(word).count('1') for word in view.cast('Q'))
+        view.release()
+        return pieces
+
+
+class TestPositionCodec(unittest.TestCase):
+
+    def test_round_trip(self):
+        rng = random.Random(3)
+        for num_rows, num_cols in ((6, 7), (1, 1), (8, 8), (50, 50)):
+            codec = PositionCodec(num_rows, num_cols)
+            for _ in range(10):
+                for board_type in (Board, BitBoard):
+                    board = random_board(board_type, num_rows, num_cols, rng)
+                    data = codec.encode(board)
+                    self.assertEqual(codec.width, len(data))
+                    for backend in ('list', 'bitboard'):
+                        self.assertEqual(repr(board), repr(codec.decode(data, backend)))
+        self.assertEqual(16, PositionCodec(6, 7).width)
+        self.assertEqual(2 * 8 * 40, PositionCodec(50, 50).width)
+
+    def test_bad_positions(self):
+        codec = PositionCodec(2, 2)
+        with self.assertRaises(PositionStoreError):
+            codec.decode(codec.pack(0b10, 0))  # floating
+        with self.assertRaises(PositionStoreError):
+            codec.decode(codec.pack(0b1, 0b1))  # on top of each other
+        with self.assertRaises(PositionStoreError):
+            codec.decode(codec.pack(0b111, 0))  # taller than the board
+        with self.assertRaises(PositionStoreError):
+            codec.encode(Board(3, 2, '*'))
+        board = Board(2, 2, '*')
+        board.add_piece_to_column('#', 0)
+        with self.assertRaises(PositionStoreError):
+            codec.encode(board)
+
+
+class TestPositionStore(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'positions.c4p')
+
+    def test_deduplicates_and_persists(self):
+        rng = random.Random(5)
+        boards = [random_board(BitBoard, 4, 5, rng) for _ in range(300)]
+        distinct = {repr(board) for board in boards}
+        with PositionStore.create(self.path, 4, 5, capacity=len(distinct)) as store:
+            for board in boards:
+                index, added = store.add(board)
+                self.assertEqual(repr(board), repr(store.board(index)))
+            self.assertEqual(len(distinct), len(store))
+            self.assertEqual((0, False), store.add(boards[0]))
+            new_board = next(board for board in iter(lambda: random_board(Board, 4, 5, rng), None)
+                             if repr(board) not in distinct)
+            with self.assertRaises(PositionStoreError):
+                store.add(new_board)  # the store is full
+        with PositionStore(self.path) as store:
+            self.assertEqual(len(distinct), len(store))
+            self.assertEqual(distinct, {repr(store.codec.decode(data)) for data in store})
+            self.assertIn(boards[7], store)
+            with self.assertRaises(PositionStoreError):
+                store.add(boards[0])
+
+    def test_workers_read_slices_without_copying(self):
+        rng = random.Random(8)
+        with PositionStore.create(self.path, 6, 7, capacity=1000) as store:
+            for _ in range(1000):
+                store.add(random_board(BitBoard, 6, 7, rng))
+            view = store.view(10, 20)
+            self.assertEqual(10 * store.codec.width, view.nbytes)
+            self.assertIs(store._mmap, view.obj)
+            view.release()
+            expected = sum(store.board(index).num_pieces for index in range(len(store)))
+            bounds = [0, 250, 500, 750, len(store)]
+        with ProcessPoolExecutor(2) as executor:
+            pieces = executor.map(count_pieces, [self.path] * 4, bounds[:-1], bounds[1:])
+            self.assertEqual(expected, sum(pieces))
+
+    def test_positions_from_game_records(self):
+        results = selfplay.run_games(selfplay.make_specs(['random', 'random'], 20), workers=1)
+        records = [result.to_record(6, 7, 4) for result in results]
+        with PositionStore.create(self.path, 6, 7, capacity=1000) as store:
+            added = position_store.add_records(store, records + [GameRecord.from_moves(5, 5, 4, [1])])
+            self.assertEqual(len(store), added)
+            # every game starts from the empty board, which is stored once
+            self.assertEqual(0, store.index_of(BitBoard(6, 7, '*')))
+            self.assertLess(len(store), sum(record.plies + 1 for record in records))
+
+    def test_not_a_store(self):
+        with open(self.path, 'wb') as store_file:
+            store_file.write(b'not a position store' * 10)
+        with self.assertRaises(PositionStoreError):
+            PositionStore(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
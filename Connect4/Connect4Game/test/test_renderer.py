@@ -0,0 +1,161 @@
+import io
+import os
+import random
+import re
+import tempfile
+import unittest
+from unittest.mock import patch
+from Connect4Game.src.board import Board
+from Connect4Game.src.game import Game
+from Connect4Game.src.players.random_ai import RandomAi
+from Connect4Game.src.renderer import AnsiRenderer, FinalBoardRenderer, FullRenderer, SilentRenderer
+from Connect4Game.src.sparse_board import SparseBoard
+
+ESCAPE = re.compile(r'\x1b(?:\[(\d*)(?:;(\d*))?([HJKr])|([78]))')
+
+
+class Terminal(object):
+    """
+    Plays back the escape sequences AnsiRenderer writes onto a grid of characters.
+    With a height, a newline on the last line of the scroll region scrolls the region up like a real terminal
+    """
+
+    def __init__(self, height=None):
+        self.screen = {}
+        self.line = self.column = 0
+        self.saved = (0, 0)
+        self.writes = 0
+        self.height = height
+        self.region = (0, None if height is None else height - 1)
+
+    def write(self, text):
+        self.writes += 1
+        position = 0
+        for match in ESCAPE.finditer(text):
+            self._put(text[position:match.start()])
+            position = match.end()
+            line, column, command, save = match.groups()
+            if command == 'H':
+                self.line, self.column = int(line or 1) - 1, int(column or 1) - 1
+            elif command == 'J':
+                self.screen.clear()
+            elif command == 'K':
+                for spot in [spot for spot in self.screen if spot[0] == self.line and spot[1] >= self.column]:
+                    del self.screen[spot]
+            elif command == 'r':
+                self.region = (int(line or 1) - 1, int(column) - 1 if column else
+                               None if self.height is None else self.height - 1)
+                self.line = self.column = 0
+            elif save == '7':
+                self.saved = (self.line, self.column)
+            else:
+                self.line, self.column = self.saved
+        self._put(text[position:])
+
+    def _put(self, text):
+        for char in text:
+            if char == '\n' and self.line == self.region[1]:
+                top, bottom = self.region
+                self.screen = {(line - 1 if top < line <= bottom else line, column): piece
+                               for (line, column), piece in self.screen.items() if line != top}
+                self.column = 0
+            elif char == '\n':
+                self.line, self.column = self.line + 1, 0
+            else:
+                self.screen[self.line, self.column] = char
+                self.column += 1
+
+    def flush(self):
+        pass
+
+    def lines(self):
+        num_lines = max(line for line, _ in self.screen) + 1
+        return [''.join(self.screen.get((line, column), ' ')
+                        for column in range(max(column for _, column in self.screen) + 1)).rstrip()
+                for line in range(num_lines)]
+
+
+def random_game(board, renderer, seed):
+    random.seed(seed)
+    return Game(board, 4, [RandomAi('RandomAi 1', 'X'), RandomAi('RandomAi 2', 'O')], renderer)
+
+
+class TestRenderers(unittest.TestCase):
+
+    def test_full_renderer_prints_every_turn(self):
+        stream = io.StringIO()
+        game = random_game(Board(6, 7, '*'), FullRenderer(stream), 1)
+        game.play()
+        expected = io.StringIO()
+        replay = random_game(Board(6, 7, '*'), SilentRenderer(), 1)
+        while not replay.is_game_over():
+            print(replay.board, file=expected)
+            replay.play_turn()
+        print(replay.board, file=expected)
+        print(replay.result_message(), file=expected)
+        self.assertEqual(expected.getvalue(), stream.getvalue())
+
+    def test_final_and_silent(self):
+        stream = io.StringIO()
+        game = random_game(Board(6, 7, '*'), FinalBoardRenderer(stream), 2)
+        game.play()
+        self.assertEqual(f'{game.board!r}\n{game.result_message()}\n', stream.getvalue())
+        game.declare_winner_or_tie()
+        self.assertEqual(2 * f'{game.board!r}\n{game.result_message()}\n', stream.getvalue())
+        with patch('sys.stdout', new_callable=io.StringIO) as output:
+            random_game(Board(6, 7, '*'), SilentRenderer(), 2).play()
+        self.assertEqual('', output.getvalue())
+
+    def test_ansi_renderer_only_draws_the_new_piece(self):
+        for num_rows, num_cols, seed in ((6, 7, 3), (12, 15, 4), (1, 4, 5)):
+            terminal = Terminal()
+            game = random_game(Board(num_rows, num_cols, '*'), AnsiRenderer(terminal), seed)
+            game.play()
+            # the board was drawn once, then one write per move and one for the result
+            self.assertEqual(game.board.num_pieces + 2, terminal.writes)
+            self.assertEqual(repr(game.board).split('\n') + [game.result_message()], terminal.lines())
+
+    def test_ansi_renderer_keeps_the_board_in_place_while_players_print(self):
+        terminal = Terminal(height=12)
+
+        class ChattyAi(RandomAi):
+            def get_move(self, the_board, num_pieces_to_win):
+                print(f'{self} is thinking', file=terminal)
+                return super().get_move(the_board, num_pieces_to_win)
+
+        class CheckedRenderer(AnsiRenderer):
+            def finish(self, the_game):
+                self.screen_before_finish = terminal.lines()
+                super().finish(the_game)
+
+        random.seed(7)
+        renderer = CheckedRenderer(terminal)
+        game = Game(Board(6, 7, '*'), 4, [ChattyAi('RandomAi 1', 'X'), ChattyAi('RandomAi 2', 'O')], renderer)
+        game.play()
+        self.assertGreater(game.board.num_pieces, 5)  # enough lines were printed to scroll
+        self.assertEqual(repr(game.board).split('\n'), renderer.screen_before_finish[:7])
+        self.assertEqual(f'{game.cur_player} is thinking', renderer.screen_before_finish[-1])
+        self.assertEqual(game.result_message(), terminal.lines()[-1])
+        self.assertEqual((0, 11), terminal.region)
+
+    def test_ansi_renderer_redraws_viewports(self):
+        terminal = Terminal()
+        game = random_game(SparseBoard(30, 50, '.'), AnsiRenderer(terminal), 6)
+        game.play()
+        self.assertEqual(repr(game.board).split('\n') + [game.result_message()], terminal.lines())
+
+    def test_renderer_from_config_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'config.txt')
+            with open(path, 'w') as config_file:
+                config_file.write('num_rows : 6\nnum_cols : 7\nnum_pieces_to_win : 4\nblank_char : *\nrenderer : ansi\n')
+            with patch.object(Game, 'setup_players'):
+                self.assertIsInstance(Game.create_game_from_file(path).renderer, AnsiRenderer)
+            with open(path, 'a') as config_file:
+                config_file.write('renderer : fancy\n')
+            with patch.object(Game, 'setup_players'), self.assertRaises(ValueError):
+                Game.create_game_from_file(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
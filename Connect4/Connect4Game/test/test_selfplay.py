@@ -0,0 +1,55 @@
+import io
+import json
+import unittest
+from unittest.mock import patch
+from Connect4Game.src import selfplay
+from Connect4Game.src.board import Board
+
+
+def without_times(results):
+    return [result._replace(seconds=0) for result in results]
+
+
+class TestSelfPlay(unittest.TestCase):
+
+    def test_games_are_reproducible_across_workers(self):
+        specs = selfplay.make_specs(['random', 'basic'], 12, first_seed=7)
+        in_process = without_times(selfplay.run_games(specs, workers=1))
+        in_pool = without_times(selfplay.run_games(specs, workers=3, chunksize=2))
+        self.assertEqual(in_process, in_pool)
+        self.assertEqual(list(range(12)), [result.game for result in in_pool])
+
+    def test_result_is_a_real_game(self):
+        with patch('builtins.input', side_effect=AssertionError('headless games must not ask for input')), \
+                patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            result = selfplay.play_game(selfplay.GameSpec(game=0, seed=3, player_types=('basic', 'alphabeta'),
+                                                          player_options=({}, {'max_depth': 2})))
+        self.assertEqual('', stdout.getvalue())
+        self.assertEqual(len(result.moves), result.plies)
+        board = Board(6, 7, '*')
+        for ply, column in enumerate(result.moves):
+            row = board.add_piece_to_column(selfplay.PIECES[ply % 2], column)
+        if result.winner is None:
+            self.assertEqual(42, result.plies)
+        else:
+            self.assertEqual(result.winner, (result.plies - 1) % 2)
+            self.assertGreaterEqual(board.count_max_matches(row, result.moves[-1]), 4)
+
+    def test_write_results(self):
+        output = io.StringIO()
+        specs = selfplay.make_specs(['random', 'random'], 3, num_rows=4, num_cols=4, num_pieces_to_win=3,
+                                    board_backend='list')
+        self.assertEqual(3, selfplay.write_results(selfplay.run_games(specs, workers=1), output))
+        lines = output.getvalue().splitlines()
+        self.assertEqual(3, len(lines))
+        self.assertEqual({'game', 'seed', 'players', 'winner', 'moves', 'plies', 'seconds'}, set(json.loads(lines[0])))
+
+    def test_human_players_are_rejected(self):
+        with self.assertRaises(ValueError):
+            selfplay.create_players(['human', 'random'])
+        with self.assertRaises(ValueError):
+            selfplay.create_players(['nobody', 'random'])
+
+
+if __name__ == '__main__':
+    unittest.main()
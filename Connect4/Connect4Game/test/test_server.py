@@ -0,0 +1,237 @@
+import asyncio
+import json
+import os
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from Connect4Game.src import instrumentation, server
+from Connect4Game.src.bitboard import BitBoard
+from Connect4Game.src.game import Game
+from Connect4Game.src.players import random_ai, basic_ai
+from Connect4Game.src.players.learned_ai import MODEL_ENVIRONMENT_VARIABLE
+
+ENDINGS = ('WIN', 'TIE', 'FORFEIT')
+
+
+class Client(object):
+    """
+    A loopback client that plays the leftmost column that is not full
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.lines = []
+
+    @classmethod
+    async def connect(cls, port, name):
+        client = cls(*await asyncio.open_connection('127.0.0.1', port))
+        assert await client.read() == 'HELLO connect4'
+        await client.send(f'NAME {name}')
+        assert await client.read() == f'WELCOME {name}'
+        client.lines.clear()
+        return client
+
+    async def send(self, line):
+        self.writer.write(line.encode() + b'\n')
+        await self.writer.drain()
+
+    async def read(self):
+        line = (await self.reader.readline()).decode().strip()
+        self.lines.append(line)
+        return line
+
+    async def play(self, opponent, num_rows=4, num_cols=4, num_pieces_to_win=3):
+        await self.send(f'PLAY {opponent} {num_rows} {num_cols} {num_pieces_to_win}')
+        heights = [0] * num_cols
+        while True:
+            line = await self.read()
+            if line.startswith('MOVED'):
+                heights[int(line.split()[2])] += 1
+            elif line == 'YOUR_TURN':
+                await self.send(f'MOVE {next(col for col in range(num_cols) if heights[col] < num_rows)}')
+            elif line.split()[0] in ENDINGS:
+                return line
+
+    async def close(self):
+        await self.send('QUIT')
+        await self.read()
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+class TestGameServer(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.server = server.GameServer(port=0, executor=ThreadPoolExecutor(4))
+        await self.server.start()
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def test_player_options_keep_ais_quiet(self):
+        options = server.GameServer(port=0, executor=self.server.executors[0],
+                                    player_options={'lazysmp': {'workers': 2}}).player_options
+        self.assertEqual({'verbose': False, 'workers': 2}, options['lazysmp'])
+        self.assertEqual({'verbose': False}, options['alphabeta'])
+
+    async def test_play_against_ai(self):
+        client = await Client.connect(self.server.port, 'Sophia')
+        ending = await client.play('basic')
+        self.assertIn(ending.split()[0], ('WIN', 'TIE'))
+        self.assertTrue(client.lines[0].startswith('START 1 4 4 3 X BasicAi'))
+        # the player can play again on the same connection
+        self.assertIn((await client.play('random')).split()[0], ('WIN', 'TIE'))
+        await client.close()
+        self.assertEqual(2, self.server.games_played)
+
+    async def test_invalid_moves_are_rejected(self):
+        client = await Client.connect(self.server.port, 'Sophia')
+        await client.send('PLAY random 2 2 2')
+        self.assertTrue((await client.read()).startswith('START'))
+        self.assertEqual('YOUR_TURN', await client.read())
+        for bad_move in ('MOVE 5', 'MOVE left'):
+            await client.send(bad_move)
+            self.assertTrue((await client.read()).startswith('INVALID'))
+            self.assertEqual('YOUR_TURN', await client.read())
+        await client.send('MOVE 0')
+        self.assertEqual('MOVED X 0 0', await client.read())
+        await client.close()
+
+    async def test_bad_commands(self):
+        client = await Client.connect(self.server.port, 'Sophia')
+        for command in ('PLAY chess', 'PLAY random 1000 1000 4', 'PLAY random a b c', 'JUMP'):
+            await client.send(command)
+            self.assertTrue((await client.read()).startswith('ERROR'))
+        with patch.dict(os.environ, {MODEL_ENVIRONMENT_VARIABLE: ''}):
+            await client.send('PLAY learned')
+            self.assertTrue((await client.read()).startswith('ERROR LearnedAi needs'))
+        await client.close()
+
+    async def test_metrics(self):
+        client = await Client.connect(self.server.port, 'Sophia')
+        await client.send('METRICS')
+        self.assertTrue((await client.read()).startswith('ERROR'))
+        instrumentation.INSTRUMENTS.enable()
+        self.addCleanup(instrumentation.INSTRUMENTS.reset)
+        self.addCleanup(instrumentation.INSTRUMENTS.disable)
+        ending = await client.play('random')
+        await client.send('METRICS')
+        metrics = json.loads((await client.read()).split(' ', 1)[1])
+        self.assertEqual(ending.split()[0] != 'TIE', metrics['games'][-1]['winner'] is not None)
+        self.assertEqual(sum(line.startswith('MOVED') for line in client.lines), metrics['counters']['moves'])
+        await client.close()
+
+    async def test_two_people_are_paired(self):
+        first = await Client.connect(self.server.port, 'Ann')
+        second = await Client.connect(self.server.port, 'Bob')
+        first_ending, second_ending = await asyncio.gather(first.play('human'), second.play('human'))
+        self.assertEqual(first_ending, second_ending)
+        self.assertEqual('WAITING', first.lines[0])
+        self.assertEqual('START 1 4 4 3 X Bob', first.lines[1])
+        self.assertEqual('START 1 4 4 3 O Ann', second.lines[0])
+        # both play the leftmost column, so Ann gets three in a row first
+        self.assertEqual('WIN Ann', first_ending)
+        await first.close()
+        await second.close()
+
+    async def test_leaving_forfeits(self):
+        first = await Client.connect(self.server.port, 'Ann')
+        second = await Client.connect(self.server.port, 'Bob')
+        await first.send('PLAY human')
+        self.assertEqual('WAITING', await first.read())
+        await second.send('PLAY human')
+        self.assertTrue((await first.read()).startswith('START'))
+        self.assertEqual('YOUR_TURN', await first.read())
+        first.writer.close()
+        while not (await second.read()).startswith('FORFEIT'):
+            pass
+        self.assertEqual('FORFEIT Ann', second.lines[-1])
+        await second.close()
+
+    async def test_spectators(self):
+        first = await Client.connect(self.server.port, 'Ann')
+        second = await Client.connect(self.server.port, 'Bob')
+        await first.send('PLAY human 4 4 3')
+        self.assertEqual('WAITING', await first.read())
+        await second.send('PLAY human 4 4 3')
+        self.assertTrue((await second.read()).startswith('START 1'))
+
+        spectator = Client(*await asyncio.open_connection('127.0.0.1', self.server.port))
+        self.assertEqual('HELLO connect4', await spectator.read())
+        for command in ('WATCH 7', 'WATCH one'):
+            await spectator.send(command)
+            self.assertTrue((await spectator.read()).startswith('ERROR'))
+        await spectator.send('GAMES')
+        self.assertEqual('GAMES 1', await spectator.read())
+        await spectator.send('WATCH 1')
+        self.assertEqual('WATCHING 1', await spectator.read())
+        snapshot = json.loads((await spectator.read()).split(' ', 1)[1])
+        self.assertEqual(('snapshot', ['Ann', 'Bob'], []),
+                         (snapshot['type'], snapshot['started']['players'], snapshot['moves']))
+
+        # Ann stacks the leftmost column while Bob stacks the next one, so Ann wins
+        for client, column in zip((first, second) * 3, (0, 1, 0, 1, 0)):
+            while await client.read() != 'YOUR_TURN':
+                pass
+            await client.send(f'MOVE {column}')
+        events = []
+        while not (await spectator.read()).startswith('END'):
+            events.append(json.loads(spectator.lines[-1].split(' ', 1)[1]))
+        self.assertEqual('END 1', spectator.lines[-1])
+        self.assertEqual([0, 1, 0, 1, 0], [event['column'] for event in events[:-1]])
+        self.assertEqual({'type': 'win', 'player': 'Ann', 'piece': 'X', 'plies': 5}, events[-1])
+        await spectator.send('GAMES')
+        self.assertEqual('GAMES', await spectator.read())
+        for client in (first, second, spectator):
+            await client.close()
+
+    async def test_many_games_at_once(self):
+        clients = await asyncio.gather(*(Client.connect(self.server.port, f'Player {i}') for i in range(100)))
+        endings = await asyncio.gather(*(client.play('random') for client in clients))
+        self.assertTrue(all(ending.split()[0] in ('WIN', 'TIE') for ending in endings))
+        self.assertEqual(100, self.server.games_played)
+        await asyncio.gather(*(client.close() for client in clients))
+
+
+class TestPlayGameAsync(unittest.IsolatedAsyncioTestCase):
+
+    async def test_remote_players_only_move_through_their_source(self):
+        person = server.RemotePlayer('Ann', 'X', random_ai.RandomAi('RandomAi 2', 'O'))
+        with self.assertRaises(server.RemoteMoveError):
+            person.take_turn(BitBoard(4, 4, '*'), 3)
+        with self.assertRaises(server.RemoteMoveError):
+            server.RemotePlayer.create_for_game([], '*')
+
+    async def test_ai_against_ai(self):
+        players = [basic_ai.BasicAi('BasicAi 1', 'X'), random_ai.RandomAi('RandomAi 2', 'O')]
+        players[0].opponent, players[1].opponent = players[1], players[0]
+        game = Game(BitBoard(6, 7, '*'), 4, players)
+        with ThreadPoolExecutor(2) as executor:
+            sources = [server.ExecutorMoveSource(executor), server.ExecutorMoveSource(executor)]
+            winner = await server.play_game_async(game, sources)
+        self.assertTrue(game.is_game_over())
+        self.assertIs(winner, game.cur_player if game.someone_won else None)
+
+    async def test_one_ai_per_game(self):
+        made = []
+
+        class CountedAi(random_ai.RandomAi):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                made.append(self)
+
+        players = [CountedAi('CountedAi 1', 'X'), CountedAi('CountedAi 2', 'O')]
+        players[0].opponent, players[1].opponent = players[1], players[0]
+        game = Game(BitBoard(6, 7, '*'), 4, players)
+        del made[:]
+        with ThreadPoolExecutor(1) as executor:
+            sources = [server.ExecutorMoveSource(executor), server.ExecutorMoveSource(executor)]
+            await server.play_game_async(game, sources)
+        self.assertGreater(game.board.num_pieces, 2)
+        self.assertEqual(2, len(made))
+        self.assertFalse(any(source.key in server._HOSTED_AIS for source in sources))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import functools
+import os
+import random
+import tempfile
+import unittest
+from Connect4Game.src import solver
+from Connect4Game.src.solver import InvalidPositionError, Solver, SolverCache
+
+
+def brute_force_score(num_rows, num_cols, num_pieces_to_win, moves):
+    """
+    Score a position by trying every game from it, in the Solver's scores
+    """
+    num_cells = num_rows * num_cols
+
+    def wins(cells, row, col):
+        piece = cells[col][row]
+        for row_step, col_step in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            count = 1
+            for sign in (1, -1):
+                r, c = row + sign * row_step, col + sign * col_step
+                while 0 <= r and 0 <= c < num_cols and r < len(cells[c]) and cells[c][r] == piece:
+                    count += 1
+                    r, c = r + sign * row_step, c + sign * col_step
+            if count >= num_pieces_to_win:
+                return True
+        return False
+
+    @functools.lru_cache(maxsize=None)
+    def score(cells, played):
+        best = None
+        for col in range(num_cols):
+            if len(cells[col]) == num_rows:
+                continue
+            after = cells[:col] + (cells[col] + (played % 2,),) + cells[col + 1:]
+            if wins(after, len(cells[col]), col):
+                return (num_cells + 1 - played) // 2
+            child = -score(after, played + 1)
+            best = child if best is None else max(best, child)
+        return 0 if best is None else best
+
+    cells = tuple(() for _ in range(num_cols))
+    for played, col in enumerate(moves):
+        cells = cells[:col] + (cells[col] + (played % 2,),) + cells[col + 1:]
+    return score(cells, len(moves))
+
+
+class TestSolver(unittest.TestCase):
+
+    def test_matches_brute_force_on_odd_geometries(self):
+        rng = random.Random(7)
+        for num_rows, num_cols, num_pieces_to_win in ((3, 4, 3), (4, 3, 3), (2, 5, 3), (3, 3, 2), (1, 6, 3),
+                                                      (4, 4, 3), (3, 3, 4), (2, 2, 1)):
+            the_solver = Solver(num_rows, num_cols, num_pieces_to_win)
+            for _ in range(8):
+                moves = []
+                try:
+                    for _ in range(rng.randrange(num_rows * num_cols // 2 + 1)):
+                        playable = [col for col in range(num_cols) if moves.count(col) < num_rows]
+                        moves.append(rng.choice(playable))
+                        the_solver.position_from_moves(moves)
+                except InvalidPositionError:
+                    moves.pop()
+                expected = brute_force_score(num_rows, num_cols, num_pieces_to_win, tuple(moves))
+                solution = the_solver.solve(*the_solver.position_from_moves(moves), all_columns=True)
+                self.assertEqual(expected, solution.score, (num_rows, num_cols, num_pieces_to_win, moves))
+                if solution.best_column is not None:
+                    self.assertEqual(solution.score, max(solution.column_scores.values()))
+                    self.assertEqual(solution.score, solution.column_scores[solution.best_column])
+
+    def test_describe(self):
+        the_solver = Solver(6, 7, 4)
+        self.assertEqual(('win', 1), the_solver.describe(21, 0))
+        self.assertEqual(('win', 1), the_solver.describe(21, 1))
+        self.assertEqual(('loss', 2), the_solver.describe(-20, 1))
+        self.assertEqual(('win', 3), the_solver.describe(20, 1))
+        self.assertEqual(('draw', 40), the_solver.describe(0, 2))
+
+    def test_solves_a_late_position(self):
+        # X has three in a row on the bottom with both ends open
+        the_solver = Solver(6, 7, 4)
+        solution = the_solver.solve(*the_solver.position_from_moves(solver.parse_moves('334455')))
+        self.assertEqual(('win', 1), (solution.result, solution.plies_to_end))
+        self.assertIn(solution.best_column, (1, 4))
+
+    def test_invalid_positions(self):
+        the_solver = Solver(2, 3, 2)
+        with self.assertRaises(InvalidPositionError):
+            the_solver.position_from_moves([0, 0, 0])
+        with self.assertRaises(InvalidPositionError):
+            the_solver.position_from_moves([3])
+        with self.assertRaises(InvalidPositionError):
+            the_solver.position_from_moves([0, 2, 1, 2])  # X wins with the third move
+        with self.assertRaises(InvalidPositionError):
+            solver.parse_moves('4a')
+        with self.assertRaises(InvalidPositionError):
+            the_solver.position_from_rows(['X..', '...'])  # floating
+        with self.assertRaises(InvalidPositionError):
+            the_solver.position_from_rows(['...', 'XX.'])  # O never moved
+        the_solver = Solver(2, 3, 3)
+        self.assertEqual(the_solver.position_from_moves([0, 2, 0]), the_solver.position_from_rows(['X..', 'X.O']))
+        self.assertEqual([9, 3, 3], solver.parse_moves('10,4,4'))
+
+    def test_cache_persists_between_solvers(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.sqlite3')
+            cache = SolverCache(path)
+            first = Solver(4, 5, 3, cache)
+            solution = first.solve(*first.position_from_moves([2]))
+            self.assertGreater(len(cache), 0)
+            cache.close()
+
+            cache = SolverCache(path)
+            second = Solver(4, 5, 3, cache)
+            # the mirror image of the same position is already solved
+            again = second.solve(*second.position_from_moves([2]))
+            self.assertEqual(solution.score, again.score)
+            self.assertLess(again.nodes, solution.nodes)
+            # other rules do not share the cache
+            self.assertEqual({}, cache.load(4, 5, 4))
+            cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import random
+import tempfile
+import tracemalloc
+import unittest
+from unittest.mock import patch
+from Connect4Game.src.board import Board, ColumnFullError, ColumnOutOfBoundsError, EmptySpotError
+from Connect4Game.src.game import Game
+from Connect4Game.src.players.random_ai import RandomAi
+from Connect4Game.src.sparse_board import SparseBoard
+
+CONFIG_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'config_files')
+
+
+class TestSparseBoard(unittest.TestCase):
+
+    def test_matches_list_board(self):
+        rng = random.Random(4)
+        for num_rows, num_cols in [(1, 1), (1, 5), (5, 1), (6, 7), (rng.randint(2, 12), rng.randint(2, 12))]:
+            list_board = Board(num_rows, num_cols, '*')
+            sparse_board = SparseBoard(num_rows, num_cols, '*')
+            turn = 0
+            while not list_board.is_full:
+                column = rng.choice([col for col in range(num_cols) if not list_board.is_column_full(col)])
+                row = list_board.push_move(column, 'XO'[turn])
+                self.assertEqual(row, sparse_board.push_move(column, 'XO'[turn]))
+                self.assertEqual(list_board.count_max_matches(row, column), sparse_board.count_max_matches(row, column))
+                self.assertEqual(list_board.is_full, sparse_board.is_full)
+                self.assertEqual(list_board.zobrist_hash, sparse_board.zobrist_hash)
+                turn = 1 - turn
+            self.assertEqual(repr(list_board), repr(sparse_board))
+            self.assertEqual(list_board.contents, sparse_board.contents)
+            self.assertEqual(list(list_board.column_iterate()), list(sparse_board.column_iterate()))
+            while sparse_board.history:
+                self.assertEqual(list_board.pop_move(), sparse_board.pop_move())
+            self.assertEqual({}, sparse_board._columns)
+            self.assertEqual(0, sparse_board.zobrist_hash)
+
+    def test_remove_piece_and_errors(self):
+        test_board = SparseBoard(2, 2, '*')
+        row = test_board.add_piece_to_column('X', 1)
+        test_board.remove_piece_from_position(row, 1)
+        self.assertTrue(test_board.contains_blank_character(row, 1))
+        with self.assertRaises(EmptySpotError):
+            test_board.count_max_matches(0, 1)
+        test_board.add_piece_to_column('X', 0)
+        test_board.add_piece_to_column('O', 0)
+        with self.assertRaises(ColumnFullError):
+            test_board.add_piece_to_column('X', 0)
+        with self.assertRaises(ColumnOutOfBoundsError):
+            test_board.add_piece_to_column('X', 2)
+        with self.assertRaises(IndexError):
+            test_board.get_piece_at(2, 0)
+
+    def test_win_check_is_bounded(self):
+        test_board = SparseBoard(1, 10 ** 9, '*')
+        self.assertIsNone(test_board.enable_window_index(5))
+        self.assertIsNone(test_board.window_index)
+        for column in range(20):
+            test_board.add_piece_to_column('X', column)
+        # the run is 20 long but only num_pieces_to_win - 1 spots are looked at each way
+        self.assertEqual(9, test_board.count_max_matches(0, 10))
+        self.assertFalse(test_board.is_full)
+
+    def test_huge_board_from_config_file(self):
+        tracemalloc.start()
+        self.addCleanup(tracemalloc.stop)
+        with patch.object(Game, 'setup_players'):
+            game = Game.create_game_from_file(os.path.join(CONFIG_DIR, 'connect5_huge_sparse_config.txt'))
+        self.assertIsInstance(game.board, SparseBoard)
+        game.players = [RandomAi('RandomAi 1', 'X'), RandomAi('RandomAi 2', 'O')]
+        random.seed(6)
+        for _ in range(200):
+            game.play_turn()
+        # a list board of this size would be millions of list slots
+        self.assertLess(tracemalloc.get_traced_memory()[0], 1 << 20)
+        self.assertEqual(200, game.board.num_pieces)
+        self.assertLessEqual(len(game.board._columns), 200)
+        self.assertEqual(len(game.board._columns), len(game.board._number_of_pieces_in_columns))
+
+    def test_win_on_huge_board(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'config.txt')
+            with open(path, 'w') as config_file:
+                config_file.write('num_rows : 100000\nnum_cols : 100000\nnum_pieces_to_win : 5\n'
+                                  'blank_char : .\nboard_backend : sparse\n')
+            with patch.object(Game, 'setup_players'):
+                game = Game.create_game_from_file(path)
+        for column in (500, 501, 502, 504):
+            game.board.add_piece_to_column('X', column)
+        self.assertFalse(game.is_part_of_win(0, 504))
+        game.board.add_piece_to_column('X', 503)
+        self.assertTrue(game.is_part_of_win(0, 503))
+
+    def test_viewport(self):
+        test_board = SparseBoard(1000, 1000, '*')
+        for _ in range(3):
+            test_board.add_piece_to_column('X', 700)
+        lines = repr(test_board).split('\n')
+        self.assertEqual('rows 980-999 of 1000, columns 680-719 of 1000', lines[0])
+        self.assertEqual(22, len(lines))
+        self.assertTrue(lines[1].startswith('      680   681'))
+        self.assertEqual('999' + '   *' * 20 + '   X' + '   *' * 19, lines[-1])
+        self.assertEqual('997' + '   *' * 20 + '   X' + '   *' * 19, lines[-3])
+        self.assertEqual('996' + '   *' * 40, lines[-4])
+        corner = test_board.render(center=(999, 999), num_view_rows=2, num_view_cols=3).split('\n')
+        self.assertEqual(['rows 0-1 of 1000, columns 997-999 of 1000', '      997   998   999',
+                          '0   *   *   *', '1   *   *   *'], corner)
+
+
+if __name__ == '__main__':
+    unittest.main()
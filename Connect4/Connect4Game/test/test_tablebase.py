@@ -0,0 +1,106 @@
+import filecmp
+import os
+import random
+import tempfile
+import unittest
+from Connect4Game.src.bitboard import BitBoard
+from Connect4Game.src.players.alpha_beta_ai import AlphaBetaAi
+from Connect4Game.src.solver import InvalidPositionError, Solver
+from Connect4Game.src.tablebase import Tablebase, TablebaseEntry, TablebaseError, table_index, write_tablebase
+
+
+def play(board, columns):
+    for turn, column in enumerate(columns):
+        board.push_move(column, 'XO'[turn % 2])
+
+
+class TestTablebase(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def make(self, num_rows, num_cols, num_pieces_to_win, workers=1):
+        path = os.path.join(self.directory, f'{num_rows}x{num_cols}_{num_pieces_to_win}_{workers}.bin')
+        stats = write_tablebase(path, num_rows, num_cols, num_pieces_to_win, workers)
+        self.assertGreater(stats.positions_per_second, 0)
+        return path, stats
+
+    def test_index_numbers_every_arrangement_once(self):
+        index = table_index(3, 3)
+        seen = set()
+        for blocks in index.layers:
+            for heights in blocks:
+                mask = index.mask_of(heights)
+                for second, position in index.block(heights):
+                    self.assertEqual(position, index.index(second, mask))
+                    seen.add(position)
+        self.assertEqual(set(range(index.size)), seen)
+
+    def test_matches_the_solver(self):
+        path, stats = self.make(3, 4, 3)
+        solver = Solver(3, 4, 3)
+        rng = random.Random(7)
+        with Tablebase(path) as tablebase:
+            self.assertEqual(stats.positions, len(tablebase))
+            self.assertTrue(tablebase.matches(3, 4, 3))
+            for _ in range(40):
+                moves = []
+                while True:
+                    current, mask, num_pieces = solver.position_from_moves(moves)
+                    solution = solver.solve(current, mask, num_pieces)
+                    self.assertEqual((solution.result, solution.plies_to_end), tablebase.probe(current, mask))
+                    if solution.best_column is None:
+                        break
+                    moves.append(rng.choice([column for column in range(4) if moves.count(column) < 3]))
+                    try:
+                        solver.position_from_moves(moves)
+                    except InvalidPositionError:  # the move won
+                        break
+
+    def test_processes_write_the_same_file(self):
+        one, _ = self.make(3, 4, 3)
+        several, _ = self.make(3, 4, 3, workers=2)
+        self.assertTrue(filecmp.cmp(one, several, shallow=False))
+
+    def test_best_move(self):
+        path, _ = self.make(3, 4, 3)
+        with Tablebase(path) as tablebase:
+            board = BitBoard(3, 4, '*')
+            play(board, [1, 1, 2, 2])
+            self.assertIn(tablebase.best_move(board, 'X'), ((0, TablebaseEntry('win', 1)),
+                                                            (3, TablebaseEntry('win', 1))))
+            # a won game is not a position
+            board.push_move(3, 'X')
+            self.assertIsNone(tablebase.lookup(board, 'O'))
+
+    def test_alpha_beta_ai_plays_from_the_tablebase(self):
+        path, _ = self.make(3, 4, 3)
+        ai = AlphaBetaAi('AlphaBetaAi 1', 'X', AlphaBetaAi('AlphaBetaAi 2', 'O', verbose=False), verbose=False,
+                         tablebase=path)
+        board = BitBoard(3, 4, '*')
+        with Tablebase(path) as tablebase:
+            expected = tablebase.lookup(board, 'X')
+        column = ai.get_move(board, 3).column
+        self.assertTrue(ai.last_search.from_tablebase)
+        self.assertEqual(0, ai.last_search.nodes)
+        board.push_move(column, 'X')
+        with Tablebase(path) as tablebase:
+            reply = tablebase.lookup(board, 'O')
+        self.assertEqual(expected.plies_to_end - 1, reply.plies_to_end)
+        self.assertIn('from the tablebase', ai.report())
+        # other rules are searched as usual
+        ai.get_move(BitBoard(3, 4, '*'), 4)
+        self.assertFalse(ai.last_search.from_tablebase)
+
+    def test_not_a_tablebase(self):
+        path = os.path.join(self.directory, 'other.bin')
+        with open(path, 'wb') as other_file:
+            other_file.write(b'\x00' * 100)
+        with self.assertRaises(TablebaseError):
+            Tablebase(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import unittest
+from Connect4Game.src import tournament
+
+CONFIG_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'config_files')
+SMALL_BOARD = tournament.Geometry('small', 4, 5, 3, 'bitboard')
+
+
+class TestTournament(unittest.TestCase):
+
+    def test_elo_conversions(self):
+        self.assertAlmostEqual(0.5, tournament.expected_score(0))
+        for elo in (-300, -50, 10, 200):
+            self.assertAlmostEqual(elo, tournament.elo_difference(tournament.expected_score(elo)))
+
+    def test_pairing_stats(self):
+        stats = tournament.PairingStats()
+        for score in (1, 1, 1, 0.5, 0):
+            stats.add(score)
+        self.assertEqual((3, 1, 1), (stats.wins, stats.draws, stats.losses))
+        self.assertAlmostEqual(0.7, stats.score)
+        elo, low, high = stats.elo()
+        self.assertLess(low, elo)
+        self.assertLess(elo, high)
+
+    def test_sprt(self):
+        sprt = tournament.Sprt(elo_margin=50, min_games=10)
+        stats = tournament.PairingStats()
+        for _ in range(9):
+            stats.add(1)
+        self.assertIsNone(sprt.decide(stats))
+        stats.add(1)
+        self.assertEqual('H1', sprt.decide(stats))
+        even = tournament.PairingStats()
+        for score in (1, 0) * 10:
+            even.add(score)
+        self.assertIsNone(sprt.decide(even))
+
+    def test_geometry_from_config_file(self):
+        geometry = tournament.Geometry.from_config_file(os.path.join(CONFIG_DIR, 'connect4_config.txt'))
+        self.assertEqual(('connect4_config', 6, 7, 4, 'bitboard'), geometry)
+
+    def test_run(self):
+        for workers in (1, 2):
+            the_tournament = tournament.Tournament(['random', 'basic'], [SMALL_BOARD], max_games_per_pairing=30,
+                                                   workers=workers)
+            the_tournament.run()
+            pairing = the_tournament.pairings[0]
+            stats = the_tournament.stats[pairing]
+            self.assertGreater(stats.games, 0)
+            self.assertLessEqual(stats.games, 30)
+            ratings = the_tournament.ratings()
+            self.assertAlmostEqual(0, sum(elo for elo, low, high in ratings.values()), places=6)
+            self.assertIn('random vs basic (small)', the_tournament.report())
+
+    def test_parse_player_options(self):
+        self.assertEqual({'alphabeta': {'time_budget': 0.1, 'verbose': False}},
+                         tournament.parse_player_options(['alphabeta.time_budget=0.1', 'alphabeta.verbose=False']))
+        with self.assertRaises(ValueError):
+            tournament.parse_player_options(['time_budget'])
+
+
+if __name__ == '__main__':
+    unittest.main()
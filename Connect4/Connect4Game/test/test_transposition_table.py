@@ -0,0 +1,85 @@
+import unittest
+import random
+from Connect4Game.src.bitboard import BitBoard
+from Connect4Game.src.board import Board
+from Connect4Game.src import transposition_table
+from Connect4Game.src.transposition_table import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
+
+
+class TestTranspositionTable(unittest.TestCase):
+
+    def test_pack_and_unpack(self):
+        for depth, flag, score, move in [(0, EXACT, 0, None), (12, LOWER_BOUND, -999_999, 0),
+                                         (65535, UPPER_BOUND, 999_999, 1000)]:
+            data = transposition_table.pack_entry(depth, flag, score, move)
+            self.assertEqual((depth, flag, score, move), transposition_table.unpack_entry(data))
+        with self.assertRaises(ValueError):
+            transposition_table.pack_entry(1, EXACT, 1 << 30, None)
+
+    def test_store_and_probe(self):
+        table = TranspositionTable()
+        self.assertIsNone(table.probe(1234))
+        table.store(1234, 5, EXACT, -7, 3)
+        self.assertEqual((5, EXACT, -7, 3), table.probe(1234))
+        self.assertEqual(1, table.hits)
+        self.assertEqual(1, table.misses)
+
+    def test_memory_cap_and_replacement(self):
+        table = TranspositionTable(memory_bytes=2 * TranspositionTable.BYTES_PER_ENTRY)
+        self.assertEqual(2, table.capacity)  # one bucket, so every key collides
+        table.store(1, 8, EXACT, 1, 0)
+        table.store(2, 3, EXACT, 2, 0)
+        # 2 is too shallow to replace 1, so it goes into the always-replace entry
+        self.assertIsNotNone(table.probe(1))
+        self.assertIsNotNone(table.probe(2))
+        table.store(3, 4, EXACT, 3, 0)
+        self.assertIsNotNone(table.probe(1))
+        self.assertIsNone(table.probe(2))
+        self.assertEqual(1, table.evictions)
+        # deeper than 1, so 1 moves to the always-replace entry and 3 is evicted
+        table.store(4, 9, EXACT, 4, 0)
+        self.assertIsNotNone(table.probe(4))
+        self.assertIsNotNone(table.probe(1))
+        self.assertIsNone(table.probe(3))
+        self.assertEqual(2, table.evictions)
+        self.assertEqual(2, len(table))
+        table.clear()
+        self.assertEqual(0, len(table))
+
+    def test_zobrist_hash(self):
+        for board_type in (Board, BitBoard):
+            board = board_type(6, 7, '*')
+            self.assertEqual(0, board.zobrist_hash)
+            for column in (3, 2, 4, 2):
+                board.push_move(column, 'XO'[board.num_pieces % 2])
+            other_order = board_type(6, 7, '*')
+            for column in (4, 2, 3, 2):
+                other_order.push_move(column, 'XO'[other_order.num_pieces % 2])
+            self.assertEqual(board.zobrist_hash, other_order.zobrist_hash)
+
+            mirror = board_type(6, 7, '*')
+            for column in (3, 4, 2, 4):
+                mirror.push_move(column, 'XO'[mirror.num_pieces % 2])
+            self.assertNotEqual(board.zobrist_hash, mirror.zobrist_hash)
+            self.assertEqual(board.canonical_hash()[0], mirror.canonical_hash()[0])
+            self.assertNotEqual(board.canonical_hash()[1], mirror.canonical_hash()[1])
+
+            while board.history:
+                board.pop_move()
+            self.assertEqual(0, board.zobrist_hash)
+            self.assertEqual(0, board.mirrored_zobrist_hash)
+
+    def test_hash_collisions(self):
+        seen = {}
+        board = BitBoard(5, 5, '*')
+        for _ in range(2000):
+            column = random.choice([col for col in range(5) if not board.is_column_full(col)])
+            board.push_move(column, 'XO'[board.num_pieces % 2])
+            position = repr(board)
+            self.assertEqual(seen.setdefault(board.zobrist_hash, position), position)
+            if board.is_full or random.random() < 0.3:
+                board.pop_move()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import random
+from Connect4Game.src.board import Board
+from Connect4Game.src.bitboard import BitBoard
+from Connect4Game.src.game import Game
+from Connect4Game.src.players import random_ai
+from Connect4Game.src import window_index
+from Connect4Game.src.window_index import WindowIndex
+
+
+def count_open_windows(board, piece, num_pieces, num_pieces_to_win):
+    """
+    Count open windows the slow way, by looking at every window on the board
+    """
+    found = 0
+    for row_step, column_step in WindowIndex.DIRECTIONS:
+        for row in range(board.num_rows):
+            for column in range(board.num_cols):
+                cells = [(row + i * row_step, column + i * column_step) for i in range(num_pieces_to_win)]
+                if not all(0 <= r < board.num_rows and 0 <= c < board.num_cols for r, c in cells):
+                    continue
+                contents = [board.get_piece_at(r, c) for r, c in cells]
+                if contents.count(piece) == num_pieces and \
+                        contents.count(board.blank_char) == num_pieces_to_win - num_pieces:
+                    found += 1
+    return found
+
+
+class TestWindowIndex(unittest.TestCase):
+
+    def assert_index_matches_board(self, board, num_pieces_to_win):
+        for piece in 'XO':
+            for num_pieces in range(1, num_pieces_to_win + 1):
+                self.assertEqual(count_open_windows(board, piece, num_pieces, num_pieces_to_win),
+                                 board.window_index.open_windows(piece, num_pieces))
+
+    def test_add_and_remove(self):
+        for board_type in (Board, BitBoard):
+            num_rows, num_cols, num_pieces_to_win = random.randint(3, 8), random.randint(3, 8), random.randint(2, 4)
+            board = board_type(num_rows, num_cols, '*')
+            board.enable_window_index(num_pieces_to_win)
+            played = []
+            for turn in range(num_rows * num_cols):
+                column = random.choice([col for col in range(num_cols) if not board.is_column_full(col)])
+                played.append((board.add_piece_to_column('XO'[turn % 2], column), column))
+                self.assert_index_matches_board(board, num_pieces_to_win)
+                self.assertEqual(turn + 1, board.num_pieces)
+            while played:
+                row, column = played.pop()
+                board.remove_piece_from_position(row, column)
+                self.assert_index_matches_board(board, num_pieces_to_win)
+            self.assertEqual(0, board.num_pieces)
+
+    def test_enable_on_a_board_with_pieces(self):
+        board = Board(6, 7, '*')
+        for column in (3, 3, 4, 2, 5):
+            board.add_piece_to_column('X' if column != 3 else 'O', column)
+        board.enable_window_index(4)
+        self.assert_index_matches_board(board, 4)
+
+    def test_is_part_of_win(self):
+        board = Board(6, 7, '*')
+        index = board.enable_window_index(4)
+        for column in range(3):
+            board.add_piece_to_column('X', column)
+            board.add_piece_to_column('O', column)
+        self.assertFalse(index.has_won('X'))
+        board.add_piece_to_column('X', 3)
+        self.assertTrue(index.has_won('X'))
+        self.assertTrue(index.is_part_of_win(0, 3, 'X'))
+        self.assertFalse(index.is_part_of_win(1, 0, 'O'))
+
+    def test_game_win_and_tie(self):
+        players = [random_ai.RandomAi('RandomAi 1', 'X'), random_ai.RandomAi('RandomAi 2', 'O')]
+        game = Game(Board(2, 2, '*'), 3, players)
+        for column in (0, 1, 0):
+            game.board.add_piece_to_column('X', column)
+            self.assertFalse(game.is_tie_game)
+        row = game.board.add_piece_to_column('O', 1)
+        self.assertFalse(game.is_part_of_win(row, 1))
+        self.assertTrue(game.is_tie_game)
+
+    def test_spot_windows_are_shared_by_few_board_sizes(self):
+        first, second = WindowIndex(6, 7, 4), WindowIndex(6, 7, 4)
+        self.assertEqual(first.windows_through(2, 3), second.windows_through(2, 3))
+        self.assertIs(first._cell_windows, second._cell_windows)
+        for num_rows in range(1, 3 * window_index.CELL_WINDOWS_KEPT):
+            WindowIndex(num_rows, 5, 3).windows_through(0, 0)
+        self.assertEqual(window_index.CELL_WINDOWS_KEPT, window_index._cell_windows.cache_info().currsize)
+        self.assertEqual(sorted(first._find_windows_through(2, 3)), sorted(first.windows_through(2, 3)))
+
+
+if __name__ == '__main__':
+    unittest.main()
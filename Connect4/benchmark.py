@@ -0,0 +1,9 @@
+import sys
+from Connect4Game.src import benchmark
+
+# runtime command line arguments:
+# python3 benchmark.py --output baseline.json
+# python3 benchmark.py --compare baseline.json --threshold 0.1
+
+if __name__ == '__main__':
+    sys.exit(benchmark.main())
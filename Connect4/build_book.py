@@ -0,0 +1,7 @@
+from Connect4Game.src import opening_book
+
+# runtime command line arguments:
+# python3 build_book.py book_6x7.bin --rows 6 --cols 7 --pieces-to-win 4 --plies 4 --depth 10
+
+if __name__ == '__main__':
+    opening_book.main()
@@ -0,0 +1,8 @@
+from Connect4Game.src import tablebase
+
+# runtime command line arguments:
+# python3 build_tablebase.py tablebase_4x5.bin --config config_files/connect4_4x5_config.txt
+# python3 build_tablebase.py tablebase_4x4.bin --rows 4 --cols 4 --pieces-to-win 4 --workers 4 --verbose
+
+if __name__ == '__main__':
+    tablebase.main()
@@ -0,0 +1,9 @@
+import sys
+from Connect4Game.src import perft
+
+# runtime command line arguments:
+# python3 perft.py --depth 7
+# python3 perft.py 4453 --depth 6 --backend bitboard --workers 4
+
+if __name__ == '__main__':
+    sys.exit(perft.main())
@@ -0,0 +1,9 @@
+from Connect4Game.src import game_record
+
+# runtime command line arguments:
+# python3 selfplay.py random basic --games 1000 --format records --output games.c4r
+# python3 read_records.py games.c4r
+# python3 read_records.py games.c4r --game 12 --ply 20
+
+if __name__ == '__main__':
+    game_record.main()
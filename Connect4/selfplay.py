@@ -0,0 +1,7 @@
+from Connect4Game.src import selfplay
+
+# runtime command line arguments:
+# python3 selfplay.py random basic --games 1000 --workers 8 --output results.jsonl
+
+if __name__ == '__main__':
+    selfplay.main()
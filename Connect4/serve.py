@@ -0,0 +1,8 @@
+from Connect4Game.src import server
+
+# runtime command line arguments:
+# python3 serve.py --host 127.0.0.1 --port 4444
+# then connect with a line based client such as: nc 127.0.0.1 4444
+
+if __name__ == '__main__':
+    server.main()
@@ -26,6 +26,9 @@ setup(
         'Connect4': ['config_files/connect4.txt']
         },
     include_package_data=True,
+    extras_require={
+        'numpy': ['numpy>=1.20']  # BatchBoard, the batched players and the learned evaluation
+        },
     python_requires='>=3.5',
     classifiers=[
         'Topic :: Games/Entertainment :: Board Games',
@@ -0,0 +1,8 @@
+from Connect4Game.src import smp_speedup
+
+# runtime command line arguments:
+# python3 smp_speedup.py
+# python3 smp_speedup.py --workers 1 2 4 8 --depth 10 --positions 16
+
+if __name__ == '__main__':
+    smp_speedup.main()
@@ -0,0 +1,7 @@
+from Connect4Game.src import solver
+
+# runtime command line arguments:
+# python3 solve.py 4453 --config config_files/connect4_config.txt
+
+if __name__ == '__main__':
+    solver.main()
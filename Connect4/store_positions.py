@@ -0,0 +1,8 @@
+from Connect4Game.src import position_store
+
+# runtime command line arguments:
+# python3 selfplay.py random basic --games 10000 --format records --output games.c4r
+# python3 store_positions.py games.c4r positions.c4p --capacity 1000000
+
+if __name__ == '__main__':
+    position_store.main()
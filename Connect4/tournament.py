@@ -0,0 +1,7 @@
+from Connect4Game.src import tournament
+
+# runtime command line arguments:
+# python3 tournament.py random basic alphabeta --configs config_files/connect4_config.txt --set alphabeta.time_budget=0.05
+
+if __name__ == '__main__':
+    tournament.main()
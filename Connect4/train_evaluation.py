@@ -0,0 +1,10 @@
+from Connect4Game.src import learned_evaluation
+
+# runtime command line arguments:
+# python3 selfplay.py alphabeta basic --games 2000 --format records --output games.c4r
+# python3 train_evaluation.py games.c4r --hidden 64 --epochs 30 --output config_files/evaluation.npz
+# then let the AI players search with the learned evaluation:
+# CONNECT4_WEIGHTS=config_files/evaluation.npz python3 main.py
+
+if __name__ == '__main__':
+    learned_evaluation.main()
@@ -0,0 +1,9 @@
+from Connect4Game.src import tuning
+
+# runtime command line arguments:
+# python3 tune.py --iterations 200 --pairs 16 --output config_files/weights.json
+# then let the AI players load the tuned weights:
+# CONNECT4_WEIGHTS=config_files/weights.json python3 main.py
+
+if __name__ == '__main__':
+    tuning.main()